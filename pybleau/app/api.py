@@ -1,5 +1,7 @@
 from .ui.dataframe_analyzer_model_view import DataFrameAnalyzer, DataFrameAnalyzerView  # noqa
 from .model.dataframe_plot_manager import DataFramePlotManager  # noqa
+from .model.chunked_dataframe_analyzer import ChunkedDataFrameAnalyzer  # noqa
+from .model.chunked_table import open_chunked_table  # noqa
 from .ui.dataframe_plot_manager_view import DataFramePlotManagerView  # noqa
 from .tools.filter_expression_manager import FilterExpression, FilterExpressionManager  # noqa
 from .app.main import main  # noqa
@@ -2,6 +2,9 @@
 import logging
 from six import string_types
 
+from pybleau.app.model.chunked_dataframe_analyzer import \
+    ChunkedDataFrameAnalyzer
+from pybleau.app.model.chunked_table import open_chunked_table
 from pybleau.app.ui.dataframe_analyzer_model_view import DataFrameAnalyzer, \
     DataFrameAnalyzerView
 from pybleau.utils.pandas_utils import pd_read_any
@@ -9,7 +12,8 @@ from pybleau.utils.pandas_utils import pd_read_any
 logger = logging.getLogger(__name__)
 
 
-def main(target, read_func_kw=None, ui_kind="start", **kwargs):
+def main(target, read_func_kw=None, ui_kind="start", chunked=False,
+         optimize_dtypes=False, **kwargs):
     """" Launch the DF explorer as a standalone application.
 
     Parameters
@@ -25,6 +29,16 @@ def main(target, read_func_kw=None, ui_kind="start", **kwargs):
         Type of window to create. Passed to Traitsui's `edit_traits`. Use
         "start" to create the GUI event loop instead of using `edit_traits`.
 
+    chunked : bool, optional
+        Whether to explore the target file (Parquet or HDF5 table) one chunk
+        of rows at a time instead of loading it in memory. In that case,
+        read_func_kw are passed to the ChunkedTable class (for example the
+        key of the HDF5 table).
+
+    optimize_dtypes : bool, optional
+        Whether to convert the loaded data to memory efficient dtypes (see
+        pybleau.utils.pandas_utils.optimize_dtypes).
+
     kwargs : dict
         Keywords to control the attributes of the instance of
         `pybleau.app.ui.dataframe_analyzer_model_view.DataFrameAnalyzerView`
@@ -33,10 +47,15 @@ def main(target, read_func_kw=None, ui_kind="start", **kwargs):
     if read_func_kw is None:
         read_func_kw = {}
 
-    if isinstance(target, string_types):
-        target = pd_read_any(target, **read_func_kw)
+    if chunked and isinstance(target, string_types):
+        table = open_chunked_table(target, **read_func_kw)
+        analyzer = ChunkedDataFrameAnalyzer(table)
+    else:
+        if isinstance(target, string_types):
+            target = pd_read_any(target, **read_func_kw)
+        analyzer = DataFrameAnalyzer(source_df=target,
+                                     optimize_source_dtypes=optimize_dtypes)
 
-    analyzer = DataFrameAnalyzer(source_df=target)
     view = DataFrameAnalyzerView(model=analyzer, **kwargs)
     if ui_kind == "start":
         view.configure_traits()
@@ -21,6 +21,7 @@ from ...vega_translators.vega_chaco import chaco2vega
 from ...vega_translators.vega_utils import df_to_vega
 from ...reporting.string_definitions import CONTENT_KEY, DATA_FILE_KEY, \
     DATA_FILE_KEY_KEY, DATA_KEY, DATASETS_KEY, IDX_NAME_KEY
+from .export_job import EXPORT_FORMATS, ExportJob
 from .plot_io_utils import plot_data2dataframes
 
 logger = logging.getLogger(__name__)
@@ -70,7 +71,7 @@ class DataFramePlotManagerExporter(HasStrictTraits):
 
     data_filename = Str(EXTERNAL_DATA_FNAME)
 
-    data_format = Enum([".csv", ".xlsx", ".h5"])
+    data_format = Enum([".csv", ".parquet", ".feather", ".xlsx", ".h5"])
 
     #: Whether to skip plots whose visible flag is off
     skip_hidden = Bool(True)
@@ -396,8 +397,9 @@ class DataFramePlotManagerExporter(HasStrictTraits):
             target = join(target, self.data_filename + data_format)
 
         df = self.df_plotter.data_source
-        if data_format == ".csv":
-            df.to_csv(target)
+        if data_format in EXPORT_FORMATS:
+            # Written by chunks of rows:
+            ExportJob(data=df, path=target, export_format=data_format).run()
         elif data_format == ".xlsx":
             df.to_excel(target, sheet_name=key, **kwargs)
         elif data_format == ".h5":
@@ -413,8 +415,8 @@ class DataFramePlotManagerExporter(HasStrictTraits):
     def _export_plot_data_to_file(self, plot_list, data_path, **kwargs):
         """ Export the plots' PlotData to a file.
 
-        Supported formats include zipped .csv, multi-tab .xlsx and multi-key
-        HDF5.
+        Supported formats include zipped .csv (or .parquet or .feather),
+        multi-tab .xlsx and multi-key HDF5.
 
         Parameters
         ----------
@@ -443,9 +445,9 @@ class DataFramePlotManagerExporter(HasStrictTraits):
             writer = pd.HDFStore(data_path)
 
         try:
-            if data_format == ".csv":
-                data_path = join(data_dir,
-                                 string2filename(DEFAULT_DATASET_NAME)+".csv")
+            if data_format in EXPORT_FORMATS:
+                data_path = join(data_dir, string2filename(
+                    DEFAULT_DATASET_NAME) + data_format)
                 self._export_data_source_to_file(target=data_path)
             elif data_format == ".xlsx":
                 writer = pd.ExcelWriter(data_path)
@@ -455,16 +457,17 @@ class DataFramePlotManagerExporter(HasStrictTraits):
                 self._export_data_source_to_file(target=writer,
                                                  key=DEFAULT_DATASET_NAME)
 
-            created_csv_files = [data_path]
+            created_files = [data_path]
             for i, desc in enumerate(plot_list):
                 df_dict = plot_data2dataframes(desc)
                 for name, df in df_dict.items():
                     key = "plot_{}_{}".format(i, name)
-                    if data_format == ".csv":
+                    if data_format in EXPORT_FORMATS:
                         target_fpath = join(data_dir,
-                                            string2filename(key)+".csv")
-                        df.to_csv(target_fpath)
-                        created_csv_files.append(target_fpath)
+                                            string2filename(key)+data_format)
+                        ExportJob(data=df, path=target_fpath,
+                                  export_format=data_format).run()
+                        created_files.append(target_fpath)
                     elif data_format == ".xlsx":
                         df.to_excel(writer, sheet_name=key, **kwargs)
                     elif data_format == ".h5":
@@ -478,14 +481,14 @@ class DataFramePlotManagerExporter(HasStrictTraits):
             if data_format in [".xlsx", ".h5"]:
                 writer.close()
 
-        if data_format == ".csv" and len(created_csv_files) > 1:
-            # zip up all csv files:
+        if data_format in EXPORT_FORMATS and len(created_files) > 1:
+            # zip up all data files:
             data_path = join(data_dir, self.data_filename + ".zip")
             with ZipFile(data_path, "w") as f:
-                for f_path in created_csv_files:
+                for f_path in created_files:
                     f.write(f_path, basename(f_path))
 
-            for f_path in created_csv_files:
+            for f_path in created_files:
                 os.remove(f_path)
 
         if self.interactive:
@@ -0,0 +1,392 @@
+""" Jobs writing tabular data to a file by chunks of rows, in a worker thread.
+
+Writing a large DataFrame with to_csv blocks the calling thread until the
+whole file is written, and formats all rows at once. An ExportJob instead
+gathers and writes the rows by chunks (so memory use is bounded by the chunk
+size, even for a DataFrameView whose rows aren't gathered yet), reports its
+progress through traits and can be cancelled between chunks. Rows are written
+to a temporary file, moved to the target path once complete, so a cancelled
+or failed export doesn't leave a truncated file behind.
+
+Besides CSV, the data can be written to the (faster and smaller) columnar
+Parquet and Feather formats, which require pyarrow.
+"""
+from functools import partial
+import logging
+import os
+import threading
+
+from traits.api import Any, Bool, Dict, Enum, Event, Float, HasStrictTraits, \
+    Instance, Int, Property, Str
+
+from ..model.dataframe_view import DataFrameView
+from ..utils.ui_calls import UICallQueue
+
+logger = logging.getLogger(__name__)
+
+CSV_FORMAT = ".csv"
+
+PARQUET_FORMAT = ".parquet"
+
+FEATHER_FORMAT = ".feather"
+
+#: File formats supported by export jobs, as file extensions
+EXPORT_FORMATS = [CSV_FORMAT, PARQUET_FORMAT, FEATHER_FORMAT]
+
+#: Descriptions of the export formats, to request a file from the user
+EXPORT_FORMAT_DESCRIPTIONS = {CSV_FORMAT: "CSV", PARQUET_FORMAT: "Parquet",
+                              FEATHER_FORMAT: "Feather"}
+
+#: Default number of rows written at a time
+DEFAULT_EXPORT_CHUNK_SIZE = 100000
+
+JOB_PENDING = "pending"
+
+JOB_RUNNING = "running"
+
+JOB_DONE = "done"
+
+JOB_CANCELLED = "cancelled"
+
+JOB_FAILED = "failed"
+
+#: Suffix of the file the rows are written to until the export is complete
+PARTIAL_FILE_SUFFIX = ".part"
+
+
+class ExportJob(HasStrictTraits):
+    """ Writes the rows of a DataFrame (or DataFrameView) to a file by chunks.
+
+    Call start to write the file in a worker thread, or run to write it in
+    the calling thread. Progress and status traits are updated in the UI
+    thread if a UI is running, otherwise by the thread calling wait.
+    """
+    #: Data to export: a DataFrame, or a view on rows of a DataFrame (for
+    #: example a DataFrameAnalyzer's filtered_view). It must not be modified
+    #: in place while being exported.
+    data = Any
+
+    #: Path of the file to write
+    path = Str
+
+    #: Format of the file, as its extension. Defaults to the path's extension.
+    export_format = Enum(EXPORT_FORMATS)
+
+    #: Whether to write the index of the data
+    index = Bool(True)
+
+    #: Number of rows written at a time. Set to 0 to write all rows at once.
+    chunk_size = Int(DEFAULT_EXPORT_CHUNK_SIZE)
+
+    #: Keywords passed to the writer of the format (for example DataFrame's
+    #: to_csv, or pyarrow's ParquetWriter)
+    writer_kw = Dict
+
+    #: Status of the job
+    status = Enum(JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_CANCELLED,
+                  JOB_FAILED)
+
+    #: Number of rows to write
+    num_rows = Int
+
+    #: Number of rows written so far
+    num_rows_written = Int
+
+    #: Fraction of the rows written so far (between 0 and 1)
+    progress = Property(Float, depends_on="num_rows_written, num_rows")
+
+    #: Description of the error that made the job fail, if any
+    error_msg = Str
+
+    #: Event fired with the final status once the job is done, cancelled or
+    #: failed
+    finished = Event
+
+    #: Thread writing the file, if started
+    _worker = Any
+
+    #: Set to stop writing before the next chunk
+    _cancel_requested = Any
+
+    #: Trait updates of the worker thread, applied in the UI thread (or the
+    #: thread waiting for the job if no UI is running)
+    _updates = Instance(UICallQueue, ())
+
+    def start(self):
+        """ Write the file in a worker thread.
+
+        Raises
+        ------
+        ValueError
+            If the job was already started.
+        """
+        self._prepare()
+        worker = threading.Thread(target=self._run_in_worker)
+        worker.daemon = True
+        self._worker = worker
+        worker.start()
+
+    def run(self):
+        """ Write the file in the calling thread.
+
+        Returns
+        -------
+        bool
+            Whether the file was written (False if cancelled).
+
+        Raises
+        ------
+        ValueError
+            If the job was already started.
+        """
+        self._prepare()
+        try:
+            completed = self._write(self._set_num_rows_written)
+        except Exception as e:
+            self._finish(JOB_FAILED, str(e))
+            raise
+
+        self._finish(JOB_DONE if completed else JOB_CANCELLED)
+        return completed
+
+    def cancel(self):
+        """ Stop writing the file before the next chunk of rows.
+
+        Rows already written are discarded.
+        """
+        self._cancel_requested.set()
+
+    def wait(self, timeout=None):
+        """ Block until the worker thread is done writing, and update the
+        progress and status if no UI is running.
+
+        Note: when a UI is running, the status is only updated once the UI
+        event loop processes it.
+        """
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+        self._updates.process()
+
+    # Private interface -------------------------------------------------------
+
+    def _prepare(self):
+        if self.status != JOB_PENDING:
+            msg = "Export job to {} was already started.".format(self.path)
+            logger.exception(msg)
+            raise ValueError(msg)
+
+        self.num_rows = len(self.data)
+        self.status = JOB_RUNNING
+
+    def _run_in_worker(self):
+        dispatch = self._updates.dispatch
+        report_progress = partial(dispatch, self._set_num_rows_written)
+        try:
+            completed = self._write(report_progress)
+        except Exception as e:
+            msg = "Failed to export the data to {}. Error was {}."
+            msg = msg.format(self.path, e)
+            logger.exception(msg)
+            dispatch(self._finish, JOB_FAILED, msg)
+            return
+
+        dispatch(self._finish, JOB_DONE if completed else JOB_CANCELLED)
+
+    def _write(self, report_progress):
+        """ Write the rows by chunks to a temporary file, and move it to the
+        target path if not cancelled. Returns whether the file was written.
+        """
+        data = self.data
+        if not isinstance(data, DataFrameView):
+            data = DataFrameView(data)
+
+        num_rows = len(data)
+        chunk_size = self.chunk_size
+        if chunk_size <= 0:
+            chunk_size = max(num_rows, 1)
+
+        partial_path = self.path + PARTIAL_FILE_SUFFIX
+        writer = make_chunk_writer(self.export_format, partial_path,
+                                   index=self.index, **self.writer_kw)
+        completed = False
+        try:
+            start = 0
+            # Always write a chunk, so empty data still gets a header/schema:
+            while not self._cancel_requested.is_set():
+                stop = min(start + chunk_size, num_rows)
+                writer.write(data.take(slice(start, stop)).to_frame())
+                report_progress(stop)
+                start = stop
+                if start >= num_rows:
+                    completed = True
+                    break
+        finally:
+            writer.close()
+            if not completed and os.path.isfile(partial_path):
+                os.remove(partial_path)
+
+        if completed:
+            os.replace(partial_path, self.path)
+        return completed
+
+    def _set_num_rows_written(self, num_rows):
+        self.num_rows_written = num_rows
+
+    def _finish(self, status, error_msg=""):
+        self._worker = None
+        self.error_msg = error_msg
+        self.status = status
+        self.finished = status
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_progress(self):
+        if self.num_rows == 0:
+            return 1. if self.status == JOB_DONE else 0.
+        return self.num_rows_written / float(self.num_rows)
+
+    # Traits initialization methods -------------------------------------------
+
+    def _export_format_default(self):
+        return get_export_format(self.path)
+
+    def __cancel_requested_default(self):
+        return threading.Event()
+
+
+class _CsvChunkWriter(object):
+    """ Writes chunks of rows to a CSV file, with a single header.
+    """
+    def __init__(self, path, index=True, **kwargs):
+        self._file = open(path, "w", newline="")
+        self._index = index
+        self._kwargs = kwargs
+        self._header = True
+
+    def write(self, chunk):
+        chunk.to_csv(self._file, header=self._header, index=self._index,
+                     **self._kwargs)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowChunkWriter(object):
+    """ Writes chunks of rows to a Parquet file (a row group per chunk) or a
+    Feather file (a record batch per chunk).
+
+    The schema of the file is set by the first chunk.
+    """
+    def __init__(self, path, export_format, index=True, **kwargs):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            msg = "Exporting to {} files requires pyarrow.".format(
+                EXPORT_FORMAT_DESCRIPTIONS[export_format])
+            logger.exception(msg)
+            raise ImportError(msg)
+
+        self._path = path
+        self._export_format = export_format
+        self._index = index
+        self._kwargs = kwargs
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(chunk, schema=self._schema,
+                                     preserve_index=self._index)
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._open_writer(table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def _open_writer(self, schema):
+        import pyarrow as pa
+        from pyarrow.parquet import ParquetWriter
+
+        if self._export_format == PARQUET_FORMAT:
+            return ParquetWriter(self._path, schema, **self._kwargs)
+        return pa.ipc.new_file(self._path, schema, **self._kwargs)
+
+
+def make_chunk_writer(export_format, path, index=True, **kwargs):
+    """ Returns a writer of chunks of rows (DataFrames) to a file, with write
+    and close methods.
+
+    Parameters
+    ----------
+    export_format : str
+        Format of the file, one of EXPORT_FORMATS.
+
+    path : str
+        Path of the file to write.
+
+    index : bool, optional
+        Whether to write the index of the rows.
+
+    kwargs : dict
+        Keywords passed to the writer of the format.
+    """
+    if export_format == CSV_FORMAT:
+        return _CsvChunkWriter(path, index=index, **kwargs)
+    elif export_format in (PARQUET_FORMAT, FEATHER_FORMAT):
+        return _ArrowChunkWriter(path, export_format, index=index, **kwargs)
+
+    msg = "Export format {} not supported: use one of {}.".format(
+        export_format, EXPORT_FORMATS)
+    logger.exception(msg)
+    raise ValueError(msg)
+
+
+def get_export_format(path):
+    """ Returns the export format of a file from its extension (CSV if it
+    isn't a supported export format).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in EXPORT_FORMATS:
+        return ext
+    return CSV_FORMAT
+
+
+def export_data(data, path, start=True, **traits):
+    """ Returns a job exporting data to a file, started in a worker thread.
+
+    Parameters
+    ----------
+    data : pd.DataFrame or DataFrameView
+        Data to export. It must not be modified in place while being
+        exported.
+
+    path : str
+        Path of the file to write. Its extension sets the format (see
+        EXPORT_FORMATS), unless an export_format is passed.
+
+    start : bool, optional
+        Whether to start the job. Set to False to connect listeners before
+        starting it.
+
+    traits : dict
+        Other attributes of the ExportJob (for example the chunk_size).
+    """
+    job = ExportJob(data=data, path=path, **traits)
+    if start:
+        job.start()
+    return job
+
+
+def export_file_wildcard():
+    """ Returns the wildcard of a file dialog requesting an export file.
+    """
+    return "|".join(
+        "{0} files (*{1})|*{1}".format(EXPORT_FORMAT_DESCRIPTIONS[ext], ext)
+        for ext in EXPORT_FORMATS
+    )
@@ -1,6 +1,7 @@
 
 from unittest import TestCase, skipIf
-from pandas import DataFrame, read_csv, read_excel, read_hdf
+from pandas import DataFrame, read_csv, read_excel, read_feather, \
+    read_hdf, read_parquet
 import os
 from shutil import rmtree
 from os.path import dirname, isdir, isfile, join, splitext
@@ -17,6 +18,12 @@ try:
 except ImportError:
     KIWI_AVAILABLE = False
 
+try:
+    import pyarrow  # noqa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 BACKEND_AVAILABLE = os.environ.get("ETS_TOOLKIT", "qt4") != "null"
 
 if KIWI_AVAILABLE and BACKEND_AVAILABLE:
@@ -159,6 +166,10 @@ class BasePlotManagerExportTester(object):
         elif ext == ".h5":
             reader = read_hdf
             kw["key"] = DEFAULT_DATASET_NAME
+        elif ext == ".parquet":
+            reader = read_parquet
+        elif ext == ".feather":
+            reader = read_feather
 
         df_back = reader(data_file, **kw)
         # FIXME: anyway to avoid Excel messing up the dtypes?
@@ -261,6 +272,23 @@ class TestPlotManagerExportImages(BasePlotManagerExportTester, TestCase):
 
             self.tearDown()
 
+    @skipIf(not PYARROW_AVAILABLE, "pyarrow not available")
+    def test_export_1_plot_export_source_data_columnar(self):
+        for fmt in [".parquet", ".feather"]:
+            exporter = NonInteractiveExporter(df_plotter=self.model,
+                                              target_dir=self.target_dir,
+                                              export_data=EXPORT_YES,
+                                              data_format=fmt)
+            export_func = getattr(exporter, self.converter)
+            export_func()
+            content = os.listdir(self.target_dir)
+            self.assertEqual(set(content),
+                             {self.target_filename, EXTERNAL_DATA_FNAME+fmt})
+            data_file = join(self.target_dir, EXTERNAL_DATA_FNAME+fmt)
+            self.assert_data_in_file(data_file)
+
+            self.tearDown()
+
     def test_export_3_plots_export_source_data(self):
         model = DataFramePlotManager(contained_plots=[self.desc, self.desc2,
                                                       self.desc3],
@@ -0,0 +1,129 @@
+from os.path import isfile, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import skipIf, TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from traits.testing.unittest_tools import UnittestTools
+
+from pybleau.app.io.export_job import ExportJob, export_data, \
+    FEATHER_FORMAT, get_export_format, JOB_CANCELLED, JOB_DONE, JOB_FAILED, \
+    PARQUET_FORMAT, PARTIAL_FILE_SUFFIX
+from pybleau.app.model.dataframe_view import DataFrameView
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+class TestExportJob(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.temp_dir = mkdtemp()
+        self.df = pd.DataFrame({"a": np.arange(10.), "b": list("abcdeabcde")},
+                               index=pd.Index(np.arange(10, 20), name="idx"))
+
+    def tearDown(self):
+        rmtree(self.temp_dir)
+
+    def read_csv(self, path):
+        return pd.read_csv(path, index_col="idx")
+
+    def test_csv_by_chunks(self):
+        path = join(self.temp_dir, "data.csv")
+        job = ExportJob(data=self.df, path=path, chunk_size=3)
+        with self.assertTraitChanges(job, "num_rows_written", count=4):
+            self.assertTrue(job.run())
+
+        assert_frame_equal(self.read_csv(path), self.df)
+        self.assertEqual(job.status, JOB_DONE)
+        self.assertEqual(job.num_rows_written, 10)
+        self.assertEqual(job.progress, 1.)
+        self.assertFalse(isfile(path + PARTIAL_FILE_SUFFIX))
+
+    def test_export_view(self):
+        path = join(self.temp_dir, "data.csv")
+        view = DataFrameView(self.df, positions=np.array([7, 2, 3]))
+        ExportJob(data=view, path=path, chunk_size=2).run()
+        assert_frame_equal(self.read_csv(path), self.df.iloc[[7, 2, 3]])
+
+    def test_export_empty_data(self):
+        path = join(self.temp_dir, "data.csv")
+        job = ExportJob(data=self.df.iloc[:0], path=path)
+        job.run()
+        self.assertEqual(self.read_csv(path).columns.tolist(), ["a", "b"])
+        self.assertEqual(job.progress, 1.)
+
+    def test_export_in_worker(self):
+        path = join(self.temp_dir, "data.csv")
+        job = export_data(self.df, path, start=False, chunk_size=4)
+        with self.assertTraitChanges(job, "finished", count=1):
+            job.start()
+            job.wait()
+        self.assertEqual(job.status, JOB_DONE)
+        assert_frame_equal(self.read_csv(path), self.df)
+
+    def test_cancel(self):
+        path = join(self.temp_dir, "data.csv")
+        job = ExportJob(data=self.df, path=path, chunk_size=3)
+        job.cancel()
+        self.assertFalse(job.run())
+        self.assertEqual(job.status, JOB_CANCELLED)
+        self.assertFalse(isfile(path))
+        self.assertFalse(isfile(path + PARTIAL_FILE_SUFFIX))
+
+    def test_cancel_while_writing(self):
+        path = join(self.temp_dir, "data.csv")
+        job = ExportJob(data=self.df, path=path, chunk_size=3)
+        job.on_trait_change(lambda new: job.cancel() if new == 3 else None,
+                            "num_rows_written")
+        self.assertFalse(job.run())
+        self.assertEqual(job.num_rows_written, 3)
+        self.assertFalse(isfile(path))
+        self.assertFalse(isfile(path + PARTIAL_FILE_SUFFIX))
+
+    def test_start_twice(self):
+        job = ExportJob(data=self.df, path=join(self.temp_dir, "data.csv"))
+        job.run()
+        with self.assertRaises(ValueError):
+            job.start()
+
+    def test_failure(self):
+        path = join(self.temp_dir, "missing_dir", "data.csv")
+        job = ExportJob(data=self.df, path=path)
+        job.start()
+        job.wait()
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertIn("data.csv", job.error_msg)
+
+    def test_export_format(self):
+        self.assertEqual(get_export_format("a/b.PARQUET"), PARQUET_FORMAT)
+        self.assertEqual(get_export_format("b.feather"), FEATHER_FORMAT)
+        self.assertEqual(get_export_format("b.txt"), ".csv")
+        job = ExportJob(data=self.df, path="b.feather")
+        self.assertEqual(job.export_format, FEATHER_FORMAT)
+
+    @skipIf(not PYARROW_AVAILABLE, "pyarrow not available")
+    def test_parquet_by_chunks(self):
+        path = join(self.temp_dir, "data.parquet")
+        ExportJob(data=self.df, path=path, chunk_size=3).run()
+        assert_frame_equal(pd.read_parquet(path), self.df)
+
+    @skipIf(not PYARROW_AVAILABLE, "pyarrow not available")
+    def test_feather_by_chunks(self):
+        path = join(self.temp_dir, "data.feather")
+        ExportJob(data=self.df, path=path, chunk_size=3).run()
+        assert_frame_equal(pd.read_feather(path), self.df)
+
+    @skipIf(PYARROW_AVAILABLE, "pyarrow available")
+    def test_parquet_without_pyarrow(self):
+        path = join(self.temp_dir, "data.parquet")
+        job = ExportJob(data=self.df, path=path)
+        with self.assertRaises(ImportError):
+            job.run()
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertFalse(isfile(path + PARTIAL_FILE_SUFFIX))
@@ -0,0 +1,133 @@
+""" DataFrameAnalyzer exploring tables too large to be loaded in memory.
+"""
+import logging
+from functools import partial
+
+import numpy as np
+from pandas import Series
+from traits.api import Bool, Instance
+
+from .chunked_table import ChunkedTable, ChunkedTableView
+from .dataframe_analyzer import DataFrameAnalyzer, NO_SORTING_ENTRY
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedDataFrameAnalyzer(DataFrameAnalyzer):
+    """ DataFrameAnalyzer reading its data from a ChunkedTable, one chunk at a
+    time.
+
+    The source_df is an empty DataFrame with the table's columns: the rows
+    stay in the table (for example the row groups of a Parquet file). Filters
+    are evaluated chunk by chunk on the columns they use, summaries are merged
+    from per-chunk sketches (see SketchSummaryEngine), and the filtered_view
+    only stores the positions of the filtered rows. Only the displayed rows
+    are read, and the filtered_df is only gathered when requested (for
+    example by plots or to export it).
+
+    Rows are kept in the order of the table: sorting along a column (or the
+    index) reads that column for all rows. Rows can't be appended.
+
+    Parameters
+    ----------
+    table : ChunkedTable
+        Table to explore.
+    """
+    #: Table the data is read from
+    table = Instance(ChunkedTable)
+
+    #: Summaries are merged from per-chunk sketches. Exact summaries gather
+    #: the summarized columns of all filtered rows.
+    approximate_summary = Bool(True)
+
+    def __init__(self, table, **traits):
+        # Set the table before the source_df, which triggers filtering it:
+        traits = dict(table=table, **traits)
+        traits["source_df"] = table.schema
+        super(ChunkedDataFrameAnalyzer, self).__init__(
+            copy_source_df=False, data_sorted=False, **traits
+        )
+        self.data_sorted = False
+
+    def append_rows(self, new_rows):
+        msg = "Rows can't be appended to a {}.".format(self.__class__.__name__)
+        logger.exception(msg)
+        raise NotImplementedError(msg)
+
+    # Traits listeners --------------------------------------------------------
+
+    def _table_changed(self, new):
+        self.source_df = new.schema
+
+    def _source_df_changed(self):
+        """ Filter the new data, in the order of the table.
+        """
+        self.sort_by_col = NO_SORTING_ENTRY
+        self._reset_source_analysis()
+        self.data_sorted = False
+
+    # Private interface -------------------------------------------------------
+
+    def _is_source_view(self, view):
+        return view.source is self.table
+
+    def _make_source_view(self, positions):
+        return ChunkedTableView(self.table, positions)
+
+    def _num_source_rows(self):
+        return self.table.num_rows
+
+    def _is_sorted_filter_name(self, name):
+        # Checking the order of a column would read it entirely:
+        return False
+
+    def _evaluate_filter_mask(self, query, positions=None):
+        """ Evaluate the query on (some rows of) the table, chunk by chunk.
+
+        Only the columns used in the query are read.
+
+        Parameters
+        ----------
+        query : str
+            Filter expression to evaluate.
+
+        positions : np.ndarray or None, optional
+            Positions of the table rows to evaluate the query on. Leave as
+            None to evaluate it on all rows.
+        """
+        columns = [self.column_name_map[name]
+                   for name in self._get_query_columns(query)]
+        order = None
+        if positions is not None:
+            order = np.argsort(positions, kind="mergesort")
+            positions = np.asarray(positions)[order]
+
+        masks = []
+        for chunk in self.table.iter_chunks(columns=columns,
+                                            positions=positions):
+            resolve = partial(self._resolve_filter_name, data=chunk)
+            masks.append(self._evaluate_query(query, resolve, len(chunk)))
+
+        mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+        if order is not None:
+            unsorted_mask = np.empty_like(mask)
+            unsorted_mask[order] = mask
+            mask = unsorted_mask
+        return mask
+
+    def _get_sort_values(self, col_name):
+        """ Returns the values of all rows along a (non-reversed) sorting
+        entry, read from the table.
+
+        Raises
+        ------
+        KeyError
+            If the column isn't found in the table.
+        """
+        if col_name == self.index_name:
+            return Series(self.table.read_index())
+
+        source_col_name = self.get_source_column_name(col_name)
+        if source_col_name not in self.table.columns:
+            raise KeyError(col_name)
+        return self.table.read_rows(columns=[source_col_name])[source_col_name]
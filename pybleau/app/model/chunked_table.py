@@ -0,0 +1,408 @@
+""" Tables read by chunks of rows, to explore data that doesn't fit in memory.
+
+A ChunkedTable describes its columns with an empty DataFrame (the schema) and
+reads one chunk of rows at a time, optionally restricted to some columns:
+
+- ParquetTable: row groups of a Parquet file (requires pyarrow),
+- HDFTable: slices of a table stored in an HDF5 file with
+  format='table' (requires pytables),
+- DataFrameTable: slices of an in-memory DataFrame.
+
+A ChunkedTableView is the DataFrameView of rows of a ChunkedTable: it only
+reads the rows and columns consumers ask for.
+"""
+import logging
+from os.path import isfile, splitext
+import threading
+
+import numpy as np
+from pandas import concat, DataFrame, HDFStore, Index, RangeIndex
+from traits.api import Any, Array, Bool, HasStrictTraits, Instance, Int, \
+    Property, Str
+
+from .dataframe_view import _take_positions, DataFrameView, \
+    gather_columns
+
+logger = logging.getLogger(__name__)
+
+#: Default number of rows in each chunk of tables without natural chunks
+DEFAULT_CHUNK_SIZE = 2 ** 18
+
+#: File extensions of the Parquet files
+PARQUET_EXTENSIONS = [".parquet", ".pq"]
+
+#: File extensions of the HDF5 files
+HDF_EXTENSIONS = [".h5", ".hdf", ".hdf5"]
+
+
+class ChunkedTable(HasStrictTraits):
+    """ Base class for tables read one chunk of rows at a time.
+
+    Subclasses set the schema and chunk_bounds, and implement _read_chunk.
+    Reads are serialized, so tables can be read from multiple threads.
+    """
+    #: Empty DataFrame with the columns, dtypes and index name of the table
+    schema = Instance(DataFrame)
+
+    #: Position of the first row of each chunk, followed by the number of rows
+    chunk_bounds = Array(dtype=np.int64, shape=(None,))
+
+    #: Number of rows of the table
+    num_rows = Property(Int, depends_on="chunk_bounds")
+
+    #: Number of chunks of the table
+    num_chunks = Property(Int, depends_on="chunk_bounds")
+
+    #: Lock serializing the reads (from the UI and filtering threads)
+    _read_lock = Any
+
+    @property
+    def columns(self):
+        return self.schema.columns
+
+    @property
+    def dtypes(self):
+        return self.schema.dtypes
+
+    def read_chunk(self, chunk_id, columns=None):
+        """ Returns the rows of a chunk as a DataFrame.
+
+        Parameters
+        ----------
+        chunk_id : int
+            Number of the chunk to read.
+
+        columns : list(str) or None, optional
+            Columns to read. Leave as None to read all columns. Pass an empty
+            list to only read the index.
+        """
+        if columns is not None:
+            columns = list(columns)
+        with self._read_lock:
+            return self._read_chunk(chunk_id, columns)
+
+    def iter_chunks(self, columns=None, positions=None):
+        """ Iterate over the chunks of the table, as DataFrames.
+
+        Parameters
+        ----------
+        columns : list(str) or None, optional
+            Columns to read. Leave as None to read all columns. Pass an empty
+            list to only read the index.
+
+        positions : np.ndarray or None, optional
+            Increasing positions of the rows to read. Chunks without any of
+            these rows are skipped. Leave as None to read all rows.
+        """
+        if positions is None:
+            for chunk_id in range(self.num_chunks):
+                yield self.read_chunk(chunk_id, columns)
+            return
+
+        bounds = self.chunk_bounds
+        positions = np.asarray(positions, dtype=np.intp)
+        splits = np.searchsorted(positions, bounds)
+        for chunk_id in range(self.num_chunks):
+            chunk_positions = positions[splits[chunk_id]:splits[chunk_id + 1]]
+            if len(chunk_positions):
+                chunk = self.read_chunk(chunk_id, columns)
+                yield chunk.iloc[chunk_positions - bounds[chunk_id]]
+
+    def read_rows(self, positions=None, columns=None):
+        """ Gather rows of the table into a DataFrame.
+
+        Only the chunks containing the rows are read.
+
+        Parameters
+        ----------
+        positions : sequence(int) or None, optional
+            Positions of the rows to read, in the order they should be
+            returned. Leave as None to read all rows.
+
+        columns : list(str) or None, optional
+            Columns to read. Leave as None to read all columns. Pass an empty
+            list to only read the index.
+        """
+        order = None
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.intp)
+            if len(positions) > 1 and np.any(np.diff(positions) < 0):
+                order = np.argsort(positions, kind="mergesort")
+                positions = positions[order]
+
+        chunks = list(self.iter_chunks(columns=columns, positions=positions))
+        if not chunks:
+            data = self.schema if columns is None else \
+                self.schema[list(columns)]
+        elif len(chunks) == 1:
+            data = chunks[0]
+        else:
+            data = concat(chunks)
+
+        if order is not None:
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            data = data.iloc[inverse]
+        return data
+
+    def read_index(self, positions=None):
+        """ Returns the index of rows of the table, without reading columns.
+        """
+        return self.read_rows(positions, columns=[]).index
+
+    # Private interface -------------------------------------------------------
+
+    def _read_chunk(self, chunk_id, columns):
+        """ Returns the rows of a chunk (columns is None or a list).
+        """
+        raise NotImplementedError()
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_num_rows(self):
+        if len(self.chunk_bounds) == 0:
+            return 0
+        return int(self.chunk_bounds[-1])
+
+    def _get_num_chunks(self):
+        return max(len(self.chunk_bounds) - 1, 0)
+
+    # Traits initialization methods -------------------------------------------
+
+    def __read_lock_default(self):
+        return threading.Lock()
+
+
+class DataFrameTable(ChunkedTable):
+    """ In-memory DataFrame processed one chunk of rows at a time.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Data of the table.
+
+    chunk_size : int, optional
+        Number of rows in each chunk.
+    """
+    #: Data of the table
+    data = Instance(DataFrame)
+
+    def __init__(self, data, chunk_size=DEFAULT_CHUNK_SIZE, **traits):
+        bounds = np.append(np.arange(0, len(data), chunk_size), len(data))
+        super(DataFrameTable, self).__init__(
+            data=data, chunk_bounds=bounds,
+            schema=gather_columns(data, list(data.columns), slice(0, 0)),
+            **traits
+        )
+
+    def _read_chunk(self, chunk_id, columns):
+        start, stop = self.chunk_bounds[chunk_id:chunk_id + 2]
+        if columns is None:
+            return self.data.iloc[start:stop]
+        return gather_columns(self.data, list(columns), slice(start, stop))
+
+
+class ParquetTable(ChunkedTable):
+    """ Table of a Parquet file, read one row group at a time.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Parquet file.
+    """
+    #: Path to the Parquet file
+    path = Str
+
+    #: Whether the file doesn't store the index (positions are used instead)
+    range_index = Bool
+
+    #: pyarrow ParquetFile reading the file
+    _parquet_file = Any
+
+    def __init__(self, path, **traits):
+        try:
+            from pyarrow.parquet import ParquetFile
+        except ImportError:
+            msg = "Reading Parquet files by chunks requires pyarrow."
+            logger.exception(msg)
+            raise ImportError(msg)
+
+        parquet_file = ParquetFile(path)
+        metadata = parquet_file.metadata
+        sizes = [metadata.row_group(i).num_rows
+                 for i in range(metadata.num_row_groups)]
+        schema = parquet_file.schema_arrow
+        pandas_metadata = schema.pandas_metadata or {}
+        index_columns = pandas_metadata.get("index_columns", [])
+        range_index = not any(isinstance(col, str) for col in index_columns)
+        schema_df = schema.empty_table().to_pandas()
+        if range_index:
+            names = [col.get("name") for col in index_columns]
+            schema_df.index = RangeIndex(0, name=names[0] if names else None)
+
+        super(ParquetTable, self).__init__(
+            path=path, schema=schema_df, range_index=range_index,
+            chunk_bounds=np.concatenate([[0], np.cumsum(sizes)]),
+            _parquet_file=parquet_file, **traits
+        )
+
+    def _read_chunk(self, chunk_id, columns):
+        start, stop = self.chunk_bounds[chunk_id:chunk_id + 2]
+        if self.range_index:
+            index = RangeIndex(start, stop, name=self.schema.index.name)
+            if columns is not None and not len(columns):
+                return DataFrame(index=index)
+
+        table = self._parquet_file.read_row_group(
+            chunk_id, columns=columns, use_pandas_metadata=True
+        )
+        data = table.to_pandas()
+        if self.range_index:
+            data.index = index
+        return data
+
+
+class HDFTable(ChunkedTable):
+    """ Table of an HDF5 file, read by slices of rows.
+
+    The table must have been stored with format='table', so that slices of
+    rows and columns can be read.
+
+    Parameters
+    ----------
+    path : str
+        Path to the HDF5 file.
+
+    key : str or None, optional
+        Key of the table in the file. Can be omitted if the file contains a
+        single table.
+
+    chunk_size : int, optional
+        Number of rows in each chunk.
+    """
+    #: Path to the HDF5 file
+    path = Str
+
+    #: Key of the table in the HDF5 file
+    key = Str
+
+    def __init__(self, path, key=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 **traits):
+        try:
+            import tables  # noqa: F401
+        except ImportError:
+            msg = "Reading HDF5 files by chunks requires pytables."
+            logger.exception(msg)
+            raise ImportError(msg)
+
+        with HDFStore(path, mode="r") as store:
+            if key is None:
+                keys = store.keys()
+                if len(keys) != 1:
+                    msg = "{} contains {} tables: specify the key of the " \
+                          "table to read.".format(path, len(keys))
+                    logger.exception(msg)
+                    raise ValueError(msg)
+                key = keys[0]
+
+            storer = store.get_storer(key)
+            if not storer.is_table:
+                msg = "The data stored at {} in {} can't be read by chunks: " \
+                      "store it with format='table'.".format(key, path)
+                logger.exception(msg)
+                raise ValueError(msg)
+
+            num_rows = storer.nrows
+            schema = store.select(key, start=0, stop=0)
+
+        bounds = np.append(np.arange(0, num_rows, chunk_size), num_rows)
+        super(HDFTable, self).__init__(path=path, key=key, schema=schema,
+                                       chunk_bounds=bounds, **traits)
+
+    def _read_chunk(self, chunk_id, columns):
+        start, stop = self.chunk_bounds[chunk_id:chunk_id + 2]
+        with HDFStore(self.path, mode="r") as store:
+            if columns is not None and not len(columns):
+                index = store.select_column(self.key, "index", start=start,
+                                            stop=stop)
+                return DataFrame(index=Index(index.to_numpy(),
+                                             name=self.schema.index.name))
+            return store.select(self.key, start=start, stop=stop,
+                                columns=columns)
+
+
+class ChunkedTableView(DataFrameView):
+    """ Rows of a ChunkedTable, selected and ordered by their positions.
+
+    Rows and columns are only read from the table when a consumer asks for
+    them, one chunk at a time.
+    """
+    def __len__(self):
+        if self.positions is None:
+            return self.source.num_rows
+        return len(self.positions)
+
+    @property
+    def index(self):
+        """ Index of the rows of the view (read once).
+        """
+        if self._index is None:
+            self._index = self.source.read_index(self.positions)
+        return self._index
+
+    @property
+    def index_name(self):
+        return self.source.schema.index.name
+
+    def column(self, name):
+        return self.source.read_rows(self.positions, columns=[name])[name]
+
+    def take(self, rows):
+        if self.positions is None:
+            positions = _take_positions(self.source.num_rows, rows)
+        else:
+            positions = self.positions[rows]
+        return ChunkedTableView(self.source, positions)
+
+    def to_frame(self, columns=None):
+        """ Read the rows of the view from the table into a DataFrame.
+
+        Parameters
+        ----------
+        columns : list or None, optional
+            Columns to read. Leave as None to read all columns.
+        """
+        return self.source.read_rows(self.positions, columns=columns)
+
+    def select_columns(self, include=None, exclude=None):
+        schema = self.source.schema
+        return schema.select_dtypes(include=include, exclude=exclude).columns
+
+
+def open_chunked_table(path, **kwargs):
+    """ Returns the ChunkedTable of a Parquet or HDF5 file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file to read.
+
+    kwargs : dict
+        Keywords passed to the ChunkedTable class (for example the key of the
+        table in an HDF5 file).
+    """
+    if not isfile(path):
+        msg = "File not found: {}".format(path)
+        logger.exception(msg)
+        raise IOError(msg)
+
+    ext = splitext(path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return ParquetTable(path, **kwargs)
+    elif ext in HDF_EXTENSIONS:
+        return HDFTable(path, **kwargs)
+
+    msg = "Extension {} not supported for reading by chunks: use a Parquet " \
+          "or HDF5 file.".format(ext)
+    logger.exception(msg)
+    raise ValueError(msg)
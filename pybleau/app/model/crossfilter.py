@@ -0,0 +1,296 @@
+""" Crossfilter: rows selected by ranges brushed along several columns.
+
+Each brushed column gets a DimensionIndex: its row positions sorted by value,
+so the rows of a range are found with 2 binary searches. Every row stores a
+bit per brushed column, set when the row is outside that column's range, and
+rows are selected when all their bits are clear. Moving a brush only flips
+the bits of the rows entering or leaving its range, in O(log n + k) for k
+such rows, instead of evaluating the ranges on all rows again.
+"""
+import logging
+import threading
+
+import numpy as np
+from pandas import isnull
+from traits.api import Any, Array, Callable, Dict, Event, HasStrictTraits, \
+    Int, List, Property
+
+logger = logging.getLogger(__name__)
+
+#: Maximum number of columns brushed at the same time (bits of a row mask)
+MAX_BRUSHES = 64
+
+
+class DimensionIndex(object):
+    """ Row positions of a column sorted by value, to look up value ranges.
+
+    Null values are sorted last and never fall in a range.
+
+    Parameters
+    ----------
+    values : pd.Series or np.ndarray
+        Values of the column, for all rows.
+    """
+    def __init__(self, values):
+        values = np.asarray(values)
+        nulls = isnull(values)
+        valid = np.flatnonzero(~nulls)
+        order = valid[np.argsort(values[valid], kind="mergesort")]
+
+        #: Row positions, sorted by value (null values last)
+        self.positions = np.concatenate([order, np.flatnonzero(nulls)])
+
+        #: Number of non-null values
+        self.num_valid = len(valid)
+
+        #: Sorted non-null values
+        self.values = values[order]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def search(self, low, high):
+        """ Returns the bounds, along the positions, of the rows with values
+        between low and high (included).
+        """
+        start = np.searchsorted(self.values, low, side="left")
+        stop = np.searchsorted(self.values, high, side="right")
+        return int(start), int(max(start, stop))
+
+
+class CrossFilter(HasStrictTraits):
+    """ Rows selected by ranges brushed along several columns.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows of the data.
+
+    get_values : callable
+        Function returning the values of a column (for all rows) from its
+        name. Raises a KeyError for unknown columns.
+    """
+    #: Number of rows of the data
+    num_rows = Int
+
+    #: Function returning the values of a column (for all rows) from its name
+    get_values = Callable
+
+    #: Brushed ranges (low and high values, included), by column name
+    brushes = Property(Dict)
+
+    #: Number of rows in all brushed ranges
+    num_selected = Int
+
+    #: Event fired when rows enter or leave the selection, with the increasing
+    #: positions of the rows entering it and of the rows leaving it
+    mask_updated = Event
+
+    #: Bits of the brushes excluding each row
+    _row_bits = Array(dtype=np.uint64, shape=(None,))
+
+    #: Range of the brush along each column, as positions along its index
+    _bounds = Dict
+
+    #: Brushed ranges, by column name
+    _brushes = Dict
+
+    #: Bit of the brush along each column
+    _bits = Dict
+
+    #: Bits not used by a brush
+    _free_bits = List
+
+    #: Sorted indexes of the columns brushed so far, by column name
+    _indexes = Dict
+
+    #: Lock protecting the row bits from concurrent reads
+    _lock = Any
+
+    def __init__(self, num_rows, get_values, **traits):
+        super(CrossFilter, self).__init__(num_rows=num_rows,
+                                          get_values=get_values, **traits)
+        self._row_bits = np.zeros(num_rows, dtype=np.uint64)
+        self.num_selected = num_rows
+
+    def brush(self, name, low, high):
+        """ Restrict the selection to rows with values of a column between low
+        and high (included), replacing the current brush along that column.
+
+        Raises
+        ------
+        KeyError
+            If the column isn't found.
+        ValueError
+            If too many columns are already brushed.
+        """
+        index = self.get_index(name)
+        start, stop = index.search(low, high)
+        with self._lock:
+            if name in self._bits:
+                bit = self._bits[name]
+                old_start, old_stop = self._bounds[name]
+            else:
+                if not self._free_bits:
+                    msg = "Can't brush more than {} columns at the same " \
+                          "time.".format(MAX_BRUSHES)
+                    logger.exception(msg)
+                    raise ValueError(msg)
+                bit = self._free_bits.pop(0)
+                old_start, old_stop = 0, len(index)
+
+            self._bits[name] = bit
+            self._bounds[name] = (start, stop)
+            self._brushes[name] = (low, high)
+            entered, exited = self._move_range(
+                index, bit, (old_start, old_stop), (start, stop)
+            )
+        self._notify(entered, exited)
+
+    def brush_ranges(self, brushes):
+        """ Brush ranges along several columns, dropping (with a warning) the
+        ones along columns that aren't found.
+
+        Parameters
+        ----------
+        brushes : dict
+            Ranges (low and high values, included), by column name.
+        """
+        for name, (low, high) in brushes.items():
+            try:
+                self.brush(name, low, high)
+            except KeyError:
+                msg = "Column {} isn't in the data anymore: dropping its " \
+                      "brush.".format(name)
+                logger.warning(msg)
+
+    def clear_brush(self, name):
+        """ Stop restricting the selection along a column (if brushed).
+        """
+        with self._lock:
+            if name not in self._bits:
+                return
+            index = self._indexes[name]
+            bit = self._bits.pop(name)
+            bounds = self._bounds.pop(name)
+            self._brushes.pop(name)
+            entered, exited = self._move_range(index, bit, bounds,
+                                               (0, len(index)))
+            self._free_bits.append(bit)
+        self._notify(entered, exited)
+
+    def clear(self):
+        """ Remove all brushes.
+        """
+        for name in list(self._bits):
+            self.clear_brush(name)
+
+    def get_index(self, name):
+        """ Returns the DimensionIndex of a column, building it if needed.
+
+        Raises
+        ------
+        KeyError
+            If the column isn't found.
+        """
+        index = self._indexes.get(name, None)
+        if index is None:
+            index = DimensionIndex(self.get_values(name))
+            if len(index) != self.num_rows:
+                msg = "Column {} has {} values for {} rows.".format(
+                    name, len(index), self.num_rows)
+                logger.exception(msg)
+                raise ValueError(msg)
+            self._indexes[name] = index
+        return index
+
+    def get_mask(self, exclude=None):
+        """ Returns the boolean mask of the rows in all brushed ranges.
+
+        Parameters
+        ----------
+        exclude : str or None, optional
+            Column whose brush to ignore, for example to show the rows a plot
+            brushed along that column would select from.
+        """
+        with self._lock:
+            bits = self._row_bits
+            if exclude in self._bits:
+                bits = bits & ~np.uint64(1 << self._bits[exclude])
+            return bits == 0
+
+    def get_positions(self):
+        """ Returns the increasing positions of the rows in all brushed ranges.
+        """
+        with self._lock:
+            return np.flatnonzero(self._row_bits == 0)
+
+    def contains(self, positions):
+        """ Returns whether rows are in all brushed ranges, from their
+        positions.
+        """
+        with self._lock:
+            return self._row_bits[positions] == 0
+
+    def restrict(self, positions=None):
+        """ Returns the rows, among the ones at some positions, in all brushed
+        ranges.
+
+        Parameters
+        ----------
+        positions : np.ndarray or None, optional
+            Positions of the rows to restrict, kept in their order. All rows
+            (in increasing order) if None.
+        """
+        if positions is None:
+            return self.get_positions()
+        return positions[self.contains(positions)]
+
+    # Private interface -------------------------------------------------------
+
+    def _move_range(self, index, bit, old_bounds, new_bounds):
+        """ Update the rows entering or leaving a brushed range, and return
+        the positions of the rows entering and leaving the selection.
+        """
+        flag = np.uint64(1 << bit)
+        leaving = _range_difference(index.positions, old_bounds, new_bounds)
+        joining = _range_difference(index.positions, new_bounds, old_bounds)
+
+        was_selected = self._row_bits[leaving] == 0
+        self._row_bits[leaving] |= flag
+        self._row_bits[joining] &= ~flag
+        entered = np.sort(joining[self._row_bits[joining] == 0])
+        exited = np.sort(leaving[was_selected])
+        self.num_selected += len(entered) - len(exited)
+        return entered, exited
+
+    def _notify(self, entered, exited):
+        if len(entered) or len(exited):
+            self.mask_updated = (entered, exited)
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_brushes(self):
+        return dict(self._brushes)
+
+    # Traits initialization methods -------------------------------------------
+
+    def __free_bits_default(self):
+        return list(range(MAX_BRUSHES))
+
+    def __lock_default(self):
+        return threading.Lock()
+
+
+def _range_difference(positions, bounds, other_bounds):
+    """ Returns the positions in a range (start, stop) of an index but not in
+    another one.
+    """
+    start, stop = bounds
+    other_start, other_stop = other_bounds
+    if other_start >= other_stop or other_stop <= start or \
+            other_start >= stop:
+        return positions[start:stop]
+
+    return np.concatenate([positions[start:min(other_start, stop)],
+                           positions[max(other_stop, start):stop]])
@@ -0,0 +1,412 @@
+""" Process-wide store of DataFrames shared by reference-counted handles.
+
+Analyzers opened on the same data, and frozen plots showing the same data,
+would otherwise each hold their own copy. Instead, the DataStore keeps one
+DataFrame per key (the identity of the DataFrame, a hash of its content, or a
+unique id for data that shouldn't be shared) and hands out DataHandles on it.
+The DataFrame is dropped when its last handle is released (explicitly or when
+the handle is garbage collected).
+
+The store keeps track of the arrays of the columns (and the index) of each
+DataFrame: DataFrames sharing some arrays (like a frozen plot of a few
+columns of an analyzer's data) share their memory, which is only counted
+once.
+
+Stored DataFrames are shared, so they must not be modified in place: a holder
+which needs to modify its data gets its own copy (copy on write) from
+DataHandle.copy_for_write, where only the arrays shared with other
+DataFrames are copied.
+"""
+import hashlib
+import logging
+import threading
+from uuid import uuid4
+import weakref
+
+import numpy as np
+from pandas import DataFrame, Series
+from pandas.util import hash_pandas_object
+from traits.api import Any, Dict, HasStrictTraits, Int, Property
+
+logger = logging.getLogger(__name__)
+
+# Store shared by the whole process (see get_data_store):
+_data_store = None
+
+_data_store_lock = threading.Lock()
+
+
+class DataHandle(object):
+    """ Reference to a DataFrame stored in a DataStore.
+
+    The DataFrame stays in the store until all its handles are released.
+    Handles are released when garbage collected if release wasn't called.
+
+    Parameters
+    ----------
+    store : DataStore
+        Store holding the data.
+
+    key : str
+        Key of the data in the store.
+    """
+    def __init__(self, store, key):
+        self._store = store
+        self.key = key
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    @property
+    def data(self):
+        """ The stored DataFrame. It is shared: don't modify it in place.
+        """
+        return self._get_entry().data
+
+    @property
+    def info(self):
+        """ Dict of information stored with the data.
+        """
+        return self._get_entry().info
+
+    @property
+    def released(self):
+        return not self._finalizer.alive
+
+    def release(self):
+        """ Stop holding the data (can be called multiple times).
+        """
+        self._finalizer()
+
+    def copy_for_write(self):
+        """ Returns the data in a form the caller may modify in place.
+
+        If other handles hold the data, the handle is moved to a copy of the
+        data, which is returned. Otherwise the data is returned, and it
+        isn't shared anymore. In both cases, only the columns whose arrays
+        are shared with other stored DataFrames are copied.
+        """
+        store = self._store
+        with store._lock:
+            entry = self._get_entry()
+            new_key = uuid4().hex
+            if entry.num_handles == 1:
+                # Only holder: the data leaves its (shared) key
+                data = store._copy_shared_arrays(entry)
+                store._release_arrays(entry)
+                del store._entries[self.key]
+            else:
+                entry.num_handles -= 1
+                data = entry.data.copy()
+            store._insert(data, dict(entry.info), key=new_key)
+            store._entries[new_key].num_handles = 1
+
+            self._finalizer.detach()
+            self.key = new_key
+            self._finalizer = weakref.finalize(self, store._release, new_key)
+            return store._entries[new_key].data
+
+    def _get_entry(self):
+        if self.released:
+            msg = "The handle on {} was released.".format(self.key)
+            logger.exception(msg)
+            raise ValueError(msg)
+        return self._store._get_entry(self.key)
+
+
+class DataStore(HasStrictTraits):
+    """ Store of DataFrames, shared by reference-counted DataHandles.
+    """
+    #: Total memory used by the stored DataFrames, in bytes
+    resident_bytes = Property(Int)
+
+    #: Number of DataFrames stored
+    num_entries = Property(Int)
+
+    #: Stored data, by key
+    _entries = Dict
+
+    #: Arrays of the columns and indices of the stored data, by array key
+    #: (see _array_key)
+    _arrays = Dict
+
+    #: Lock protecting the entries (reentrant, since handles may be garbage
+    #: collected while it is held)
+    _lock = Any
+
+    def add(self, data, key=None, info=None):
+        """ Store a DataFrame, and return a handle on it.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Data to store. It must not be modified in place afterwards.
+
+        key : str or None, optional
+            Key of the data. If data is already stored with that key, the
+            handle refers to the stored data instead. Leave as None to store
+            the data with a unique key.
+
+        info : dict or None, optional
+            Information to store with the data (see DataHandle.info).
+        """
+        with self._lock:
+            if key is None or key not in self._entries:
+                key = self._insert(data, info or {}, key=key)
+            return self._acquire(key)
+
+    def share(self, data, info=None, by_content=False):
+        """ Store a DataFrame keyed by its identity, or by its content, and
+        return a handle on it.
+
+        If the same DataFrame (or the same content) is already stored, the
+        handle refers to the stored DataFrame, so data can be dropped by the
+        caller.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Data to store. It must not be modified in place afterwards.
+
+        info : dict or None, optional
+            Information to store with the data (see DataHandle.info).
+
+        by_content : bool, optional
+            Whether to look for the data by content, which requires hashing
+            all its values, rather than by identity (which is free).
+        """
+        key = content_key(data) if by_content else identity_key(data)
+        return self.add(data, key=key, info=info)
+
+    def get_or_add(self, key, factory):
+        """ Returns a handle on the data stored with a key, creating it if
+        needed.
+
+        Parameters
+        ----------
+        key : str
+            Key of the data.
+
+        factory : callable
+            Function returning the data to store, and the dict of information
+            to store with it, if the key isn't found. Called without holding
+            the store's lock.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._acquire(key)
+
+        data, info = factory()
+        return self.add(data, key=key, info=info)
+
+    def acquire(self, key):
+        """ Returns a new handle on the data stored with a key.
+
+        Raises
+        ------
+        KeyError
+            If no data is stored with the key.
+        """
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(key)
+            return self._acquire(key)
+
+    def report(self):
+        """ Returns a DataFrame describing the stored data: number of handles
+        and memory used (in bytes, including the arrays shared with other
+        DataFrames), by key.
+        """
+        with self._lock:
+            rows = {key: [entry.num_handles, entry.nbytes]
+                    for key, entry in self._entries.items()}
+        return DataFrame.from_dict(rows, orient="index",
+                                   columns=["num_handles", "nbytes"])
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # Private interface -------------------------------------------------------
+
+    def _insert(self, data, info, key=None):
+        if key is None:
+            key = uuid4().hex
+        arrays = {}
+        for values in _iter_arrays(data):
+            array_key = _array_key(values)
+            stored = self._arrays.get(array_key, None)
+            if stored is None:
+                stored = self._arrays[array_key] = _StoredArray(values)
+            stored.num_entries += 1
+            arrays[array_key] = stored
+        self._entries[key] = _StoreEntry(data, info, arrays)
+        return key
+
+    def _acquire(self, key):
+        self._entries[key].num_handles += 1
+        return DataHandle(self, key)
+
+    def _get_entry(self, key):
+        with self._lock:
+            return self._entries[key]
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return
+            entry.num_handles -= 1
+            if entry.num_handles <= 0:
+                self._release_arrays(entry)
+                del self._entries[key]
+
+    def _release_arrays(self, entry):
+        """ Drop the arrays of an entry removed from the store, if no other
+        entry uses them.
+        """
+        for array_key, stored in entry.arrays.items():
+            stored.num_entries -= 1
+            if stored.num_entries <= 0:
+                del self._arrays[array_key]
+
+    def _copy_shared_arrays(self, entry):
+        """ Returns the data of an entry, where the columns (and index) whose
+        arrays are used by other entries are copied.
+        """
+        data = entry.data
+        arrays = list(_iter_arrays(data))
+        shared = [entry.arrays[_array_key(values)].num_entries > 1
+                  for values in arrays]
+        if not any(shared):
+            return data
+
+        data = data.copy(deep=False)
+        for i, col_shared in enumerate(shared[:-1]):
+            if col_shared:
+                data.isetitem(i, data.iloc[:, i].copy())
+        if shared[-1]:
+            data.index = data.index.copy(deep=True)
+        return data
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_resident_bytes(self):
+        with self._lock:
+            return sum(stored.nbytes for stored in self._arrays.values())
+
+    def _get_num_entries(self):
+        return len(self._entries)
+
+    # Traits initialization methods -------------------------------------------
+
+    def __lock_default(self):
+        return threading.RLock()
+
+
+class _StoreEntry(object):
+    """ DataFrame stored in a DataStore, with its number of handles.
+    """
+    def __init__(self, data, info, arrays):
+        self.data = data
+        self.info = info
+        self.num_handles = 0
+        #: _StoredArrays of the columns and index of the data, by array key
+        self.arrays = arrays
+
+    @property
+    def nbytes(self):
+        """ Memory used by the data, in bytes.
+        """
+        return sum(stored.nbytes for stored in self.arrays.values())
+
+
+class _StoredArray(object):
+    """ Array of a column (or index) of stored DataFrames.
+    """
+    def __init__(self, values):
+        self.values = values
+        #: Number of stored DataFrames using the array
+        self.num_entries = 0
+        self._nbytes = None
+
+    @property
+    def nbytes(self):
+        """ Memory used by the array, in bytes.
+
+        Computed when first read, since it scans the values of object arrays.
+        """
+        if self._nbytes is None:
+            values = self.values
+            if hasattr(values, "memory_usage"):
+                nbytes = values.memory_usage(deep=True)
+            else:
+                nbytes = Series(values, copy=False).memory_usage(
+                    index=False, deep=True
+                )
+            self._nbytes = int(nbytes)
+        return self._nbytes
+
+
+def get_data_store():
+    """ Returns the DataStore shared by the whole process.
+    """
+    global _data_store
+    with _data_store_lock:
+        if _data_store is None:
+            _data_store = DataStore()
+    return _data_store
+
+
+def identity_key(data):
+    """ Returns a key identifying a DataFrame object.
+
+    The key is only unique while the DataFrame is alive, which is the case
+    while it is stored.
+    """
+    return "id:{}".format(id(data))
+
+
+def content_key(data):
+    """ Returns a key identifying the content of a DataFrame: values, index,
+    column names and dtypes.
+
+    Falls back to a unique key if the values can't be hashed (for example
+    lists stored in object columns).
+    """
+    digest = hashlib.sha1()
+    layout = (list(data.columns), [str(dtype) for dtype in data.dtypes],
+              data.index.name, str(data.index.dtype))
+    digest.update(repr(layout).encode("utf-8"))
+    try:
+        hashes = hash_pandas_object(data, index=True)
+    except TypeError as e:
+        msg = "Failed to hash the data ({}): it won't be shared.".format(e)
+        logger.debug(msg)
+        return uuid4().hex
+
+    digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _iter_arrays(data):
+    """ Yields the arrays of the columns of a DataFrame, in order, and its
+    index last.
+
+    Columns are read one at a time, to avoid consolidating the DataFrame.
+    """
+    for i in range(data.shape[1]):
+        col = data.iloc[:, i]
+        yield col.to_numpy() if isinstance(col.dtype, np.dtype) else \
+            col.array
+    yield data.index
+
+
+def _array_key(values):
+    """ Returns a key identifying an array (or an Index) while it is stored.
+
+    NumPy arrays are identified by the memory they view, so the columns of
+    different DataFrames built on the same arrays share their key. Other
+    arrays are identified by their identity.
+    """
+    if isinstance(values, np.ndarray):
+        return ("memory", values.__array_interface__["data"][0],
+                values.shape, values.strides, values.dtype.str)
+    return ("id", id(values))
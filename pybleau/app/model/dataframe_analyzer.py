@@ -1,15 +1,33 @@
 import logging
-from pandas import concat, DataFrame
+import re
+import threading
+from pandas import DataFrame, eval as pd_eval, Series
 import numpy as np
 from functools import partial
 
-from traits.api import Bool, Callable, Enum, Event, Instance,\
-    Int, List, on_trait_change, Str
+from traits.api import Any, Bool, Callable, Dict, Enum, Event, Float, \
+    Instance, Int, List, on_trait_change, Property, Str
+from traits.trait_list_object import TraitList
 
 from app_common.std_lib.str_utils import add_suffix_if_exists, sanitize_string
 from app_common.model_tools.data_element import DataElement
 
+from ...utils.pandas_utils import optimize_dtypes
+
 from ..tools.filter_expression_manager import FilterExpression
+from .crossfilter import CrossFilter
+from .data_store import content_key, DataHandle, get_data_store
+from .dataframe_view import DataFrameView
+from .filter_cache import FilterResultCache, MemoryBoundedCache
+from .filter_compiler import compile_filter, to_mask, UnsupportedExpression
+from .filter_scheduler import FilterScheduler
+from .filter_utils import find_refining_clauses, split_conjunction
+from .selection import labels_to_positions, RowSelection
+from .streaming import align_appended_rows, AppendableFrame, \
+    index_appended_in_order
+from .summary_engine import ENGINE_DTYPE_KINDS, get_shared_executor, \
+    IncrementalSummary, NumericalSummaryEngine, SketchSummaryEngine, \
+    summarize_categorical
 try:
     from .dataframe_plot_manager import DataFramePlotManager
 except ImportError:
@@ -30,6 +48,17 @@ NO_SORTING_ENTRY = ""
 
 CATEGORICAL_COL_TYPES = ['O', 'category', 'datetime64']
 
+#: Lazily computed summary properties, by type of summary
+NUMERICAL_SUMMARY_TRAITS = ["summary_df", "summary_error_df"]
+
+CATEGORICAL_SUMMARY_TRAITS = ["summary_categorical_df",
+                              "summary_categorical_error_df"]
+
+SELECTION_SUMMARY_TRAITS = ["selection_summary_df"]
+
+# Pattern to find the (potential) column names used in a filter expression:
+IDENTIFIER_PATTERN = re.compile(r"[^\W\d]\w*")
+
 
 class InvalidQuery(ValueError):
     pass
@@ -38,21 +67,75 @@ class InvalidQuery(ValueError):
 class DataFrameAnalyzer(DataElement):
     """ Tool that filters data from and builds a customizable summary of a DF.
 
-    NOTE: the source dataframe is copied because its column names may be
-    changed so that the filtering tool may be used (requires column names to be
-    valid variable name).
-
-    TODO: This class copies the source_df which could lead to large amount of
-    memory wasted if the DF is large. Is there a way to avoid that copy?
+    NOTE: by default, the source dataframe is copied because its column names
+    may be changed so that the filtering tool may be used (requires column
+    names to be valid variable name).
+
+    To avoid doubling the memory footprint of large DataFrames, pass
+    `copy_source_df=False` when creating the analyzer: the source_df is then
+    the caller's DataFrame, and sanitized column names used in filter
+    expressions and sorting are translated to the original column names, using
+    the column_name_map, at evaluation time.
+
+    Conversely, pass `optimize_source_dtypes=True` to shrink the copy: low
+    cardinality strings become categoricals, ISO date strings datetimes, and
+    numbers are downcast when lossless. The dtype_optimization_report
+    describes the memory saved.
+
+    Copies are held through the process-wide DataStore. Pass
+    `share_source_df=True` to share them: analyzers created on the same data
+    with the same options then hold the same source_df, at the cost of
+    hashing the data to find it. The source_df is never modified in place:
+    appending rows creates a new DataFrame, whose buffers only receive the
+    new rows (the arrays of the stored copy are copied on the first append).
+
+    Ranges brushed along columns (see brush_column, typically from plots)
+    restrict the filtered data further, through a CrossFilter: moving a brush
+    only processes the rows entering or leaving its range.
+
+    Summaries are computed lazily: changing the filtered data only marks them
+    as outdated, and they are computed when read (for example by a view
+    displaying them). While summary_visible is False, listeners aren't
+    notified either, so hidden summary panels don't trigger any computation.
     """
 
     # Data storage attributes -------------------------------------------------
 
-    #: **Copy** of the data to analyze, where column names have been sanitized
+    #: Data to analyze. A **copy** where column names have been sanitized,
+    #: unless the analyzer was created with copy_source_df=False.
     source_df = Instance(DataFrame)
 
-    #: Result of filtering the source_df with the filter_exp expression
-    filtered_df = Instance(DataFrame)
+    #: Map of sanitized column names (usable in filter_exp and sort_by_col) to
+    #: the corresponding source_df column names
+    column_name_map = Dict
+
+    #: Version of the source data, incremented every time it changes
+    source_data_version = Int
+
+    #: Handle on the source_df in the DataStore, if the analyzer made a copy
+    source_handle = Instance(DataHandle)
+
+    #: Dtypes and memory usage of the source_df columns before and after
+    #: optimizing their dtypes, if requested (see optimize_dtypes)
+    dtype_optimization_report = Instance(DataFrame)
+
+    #: Rows of the source_df selected by the filter_exp expression (and
+    #: sorted), stored as row positions rather than as a copy of the data
+    filtered_view = Instance(DataFrameView)
+
+    #: Result of filtering the source_df with the filter_exp expression,
+    #: gathered from the filtered_view the first time it is requested. Its
+    #: listeners aren't notified when the filtered rows change, since that
+    #: would gather all of them: listen to filtered_data_changed instead.
+    filtered_df = Property(Instance(DataFrame))
+
+    #: Event fired with the new filtered_view when the filtered rows change.
+    #: Listeners read the columns they need from the view.
+    filtered_data_changed = Event
+
+    #: Rows of the filtered_df being displayed (all of them, or the selected
+    #: ones if show_selected_only), read by windows (see get_displayed_rows)
+    displayed_view = Instance(DataFrameView)
 
     #: Subset of filtered_df being displayed
     displayed_df = Instance(DataFrame)
@@ -74,17 +157,144 @@ class DataFrameAnalyzer(DataElement):
     #: Whether to auto-recomputate filtered DF when filter_exp changes
     filter_auto_apply = Bool(True)
 
+    #: Whether to evaluate filters in a background thread when filter_exp
+    #: changes (the filtered_df is updated once the result is available)
+    filter_async = Bool(False)
+
+    #: Delay (in seconds) to wait for further filter_exp changes before
+    #: evaluating it, in filter_async mode
+    filter_debounce_delay = Float(0.3)
+
+    #: Whether a filter is being evaluated in the background
+    filter_computing = Property(Bool,
+                                depends_on="_filter_scheduler.computing")
+
     #: List of known filter expressions (mapped to a unique name)
     known_filter_exps = List(FilterExpression)
 
-    #: Result of the summary statistics analysis (floating point columns)
-    summary_df = Instance(DataFrame)
+    #: Cache of the row positions selected by recently used filters
+    filter_cache = Instance(FilterResultCache, ())
+
+    #: Cache of the boolean masks of recently evaluated filter clauses
+    clause_mask_cache = Instance(MemoryBoundedCache, ())
+
+    #: Ranges brushed along source_df columns, further restricting the
+    #: filtered rows (created by the first brush_column call)
+    crossfilter = Instance(CrossFilter)
+
+    #: Cache of the source_df row positions sorted along sort_by_col entries
+    sort_permutation_cache = Instance(FilterResultCache, ())
+
+    #: Whether the columns (or index) of filter names are sorted, by source
+    #: data version and name
+    _sorted_filter_names = Dict
+
+    #: Data version, clauses and positions of the last filter evaluated
+    _last_filter_result = Any
+
+    #: Scheduler of the background filter evaluations, whose results are
+    #: applied in the UI thread (or by the thread waiting for them if no UI
+    #: is running)
+    _filter_scheduler = Instance(FilterScheduler, ())
+
+    #: Lock protecting the filter caches from concurrent evaluations
+    _filter_lock = Any
+
+    #: Event fired with the permutation applied to the filtered_df rows when
+    #: they are only reordered (sorting, shuffling): the new filtered_df is
+    #: the old one's iloc[permutation]
+    filtered_rows_reordered = Event
+
+    #: Whether the filtered_df change being processed only reorders its rows
+    _reordering_rows = Bool
+
+    #: While processing a filtered_df change caused by appending rows: key of
+    #: the filtered rows before appending, view of the appended filtered rows,
+    #: whether they were appended at the end of the filtered_df and view of
+    #: the filtered rows before appending
+    _appended_rows = Any
+
+    #: Buffers of the source_df columns receiving the appended rows
+    _appendable_source = Instance(AppendableFrame)
+
+    #: filtered_view and the DataFrame gathered from it, if requested
+    _materialized_filtered_df = Any
+
+    #: Result of the summary statistics analysis (floating point columns),
+    #: computed when read if the filtered data changed
+    summary_df = Property(Instance(DataFrame))
+
+    #: Engine computing (and caching) the numerical summary statistics
+    summary_engine = Instance(NumericalSummaryEngine, ())
 
     #: List of analysis elements we need
     summary_index = List(DEFAULT_SUMMARY_ELEMENTS)
 
-    #: Result of the summary statistics analysis (floating point columns)
-    summary_categorical_df = Instance(DataFrame)
+    #: Result of the summary statistics analysis (categorical columns),
+    #: computed when read if the filtered data changed
+    summary_categorical_df = Property(Instance(DataFrame))
+
+    #: Numerical summary of the selected rows, computed when read. It is
+    #: updated from the rows entering or leaving the selection, so growing a
+    #: selection doesn't summarize all selected rows again. Percentiles are
+    #: approximate.
+    selection_summary_df = Property(Instance(DataFrame))
+
+    #: Columns left out of the summaries (for example hidden in a view)
+    hidden_summary_columns = List
+
+    #: Whether the summaries are displayed. While False, changes of the
+    #: filtered data don't notify summary listeners (nor compute summaries).
+    summary_visible = Bool(True)
+
+    #: Whether to compute approximate summaries from mergeable sketches,
+    #: which only read the data once and are cached per chunk of rows.
+    #: Error bounds are stored in summary_error_df and
+    #: summary_categorical_error_df.
+    approximate_summary = Bool(False)
+
+    #: Engine computing (and caching) the approximate summaries
+    sketch_engine = Instance(SketchSummaryEngine, ())
+
+    #: Bounds on the absolute errors of the approximate summary_df values
+    summary_error_df = Property(Instance(DataFrame))
+
+    #: Bounds on the absolute errors of the approximate
+    #: summary_categorical_df values
+    summary_categorical_error_df = Property(Instance(DataFrame))
+
+    #: Number of threads computing the summaries by blocks of columns (0 to
+    #: use the number of CPUs, 1 to use the calling thread only)
+    summary_num_threads = Int(0)
+
+    #: Whether to compute exact summaries even in approximate_summary mode
+    _force_exact_summary = Bool
+
+    #: Last computed summary_df and summary_error_df
+    _summary_df = Instance(DataFrame, ())
+
+    _summary_error_df = Instance(DataFrame, ())
+
+    #: Last computed summary_categorical_df and summary_categorical_error_df
+    _summary_categorical_df = Instance(DataFrame, ())
+
+    _summary_categorical_error_df = Instance(DataFrame, ())
+
+    #: Whether the numerical summary must be recomputed when read
+    _summary_outdated = Bool(True)
+
+    #: Whether the categorical summary must be recomputed when read
+    _categorical_summary_outdated = Bool(True)
+
+    #: Last computed selection_summary_df
+    _selection_summary_df = Instance(DataFrame, ())
+
+    #: Whether the selection summary must be recomputed when read
+    _selection_summary_outdated = Bool(True)
+
+    #: Statistics of the selected rows, updated as the selection changes
+    #: (created when the selection_summary_df is first read)
+    _selection_stats = Instance(IncrementalSummary)
 
     #: Behavior when a filter leads to an exception. Mostly useful for testing
     filter_error_handling = Enum(["raise", "warn", "ignore"])
@@ -92,6 +302,15 @@ class DataFrameAnalyzer(DataElement):
     #: Name of the column to sort the table on
     sort_by_col = Enum(values='sort_by_col_list')
 
+    #: Whether changing the sort_by_col of a large filtered_df may only sort
+    #: the rows that can be displayed (top-N partial sort). The other rows
+    #: follow in an unspecified order until complete_sort is called.
+    partial_sort = Bool(False)
+
+    #: Number of leading filtered_df rows in sorted order when a partial sort
+    #: was applied, -1 if all rows are sorted
+    _num_sorted_rows = Int(-1)
+
     #: List of possible values for the sort_by_col
     sort_by_col_list = List
 
@@ -101,12 +320,20 @@ class DataFrameAnalyzer(DataElement):
     #: Name of the index if any
     index_name = Str
 
-    #: List of DF row locations currently selected. Used by PlotManager and
-    #: TableEditor, but not invariant under sorting operations.
-    selected_idx = List(Int)
+    #: Selected rows of the filtered DF, which selected_idx and data_selected
+    #: are computed from. Its version changes every time the selection
+    #: changes.
+    selection = Instance(RowSelection, ())
+
+    #: List of DF row locations currently selected, in the order they were
+    #: selected. Used by PlotManager and TableEditor, but not invariant under
+    #: sorting operations. Built from the selection when read.
+    selected_idx = Property(List(Int), depends_on="selection.version")
 
-    #: List of DF index values that are selected
-    data_selected = List
+    #: List of DF index values that are selected. Built from the selection
+    #: when read. Only notified when the selected rows change, not when they
+    #: move because the filtered rows are reordered.
+    data_selected = Property(List, depends_on="selection.rows_changed")
 
     #: Restrict displayed_df to the selected data
     show_selected_only = Bool
@@ -122,14 +349,14 @@ class DataFrameAnalyzer(DataElement):
     categorical_dtypes = List(CATEGORICAL_COL_TYPES)
 
     def __init__(self, convert_source_dtypes=False, data_sorted=True,
-                 **traits):
+                 copy_source_df=True, optimize_source_dtypes=False,
+                 share_source_df=False, **traits):
 
         traits["data_sorted"] = data_sorted
         source_df = traits.get("source_df", None)
         if isinstance(source_df, DataFrame):
             # If the index isn't unique, selection functionalities will break.
-            index = source_df.index
-            if len(index.unique()) != len(index):
+            if not source_df.index.is_unique:
                 # The breakage will come from the fact that the translation
                 # between a selection position to a selected index isn't
                 # bijective:
@@ -139,10 +366,25 @@ class DataFrameAnalyzer(DataElement):
                 logger.exception(msg)
                 raise NotImplementedError(msg)
 
-            traits["source_df"] = copy_and_sanitize(
-                source_df, convert_dtypes=convert_source_dtypes,
-                sort_index=data_sorted
-            )
+            if copy_source_df:
+                handle = acquire_sanitized_copy(
+                    source_df, convert_dtypes=convert_source_dtypes,
+                    sort_index=data_sorted, optimize=optimize_source_dtypes,
+                    share=share_source_df
+                )
+                traits["source_df"] = handle.data
+                traits["source_handle"] = handle
+                report = handle.info.get("dtype_optimization_report", None)
+                if report is not None:
+                    traits["dtype_optimization_report"] = report
+            elif convert_source_dtypes or optimize_source_dtypes:
+                msg = "Converting the source DataFrame dtypes requires a " \
+                      "copy: it can't be requested with copy_source_df=False."
+                logger.exception(msg)
+                raise ValueError(msg)
+            else:
+                is_sorted = source_df.index.is_monotonic_increasing
+                traits["data_sorted"] = is_sorted
         else:
             msg = "Creating a {} without the source dataframe. Most " \
                   "functionality will break until that attribute is set."
@@ -156,9 +398,10 @@ class DataFrameAnalyzer(DataElement):
 
         super(DataFrameAnalyzer, self).__init__(**traits)
 
-        if self.source_df is not None:
-            self.compute_summary()
-            self.compute_categorical_summary()
+        # Without a copy, the source data can't be sorted: the index sorting
+        # is applied to the filtered data instead:
+        if data_sorted and not self.data_sorted and not sort_by:
+            sort_by = self.index_name
 
         if NO_SORTING_ENTRY not in self.sort_by_col_list:
             self.sort_by_col_list.insert(0, NO_SORTING_ENTRY)
@@ -179,26 +422,316 @@ class DataFrameAnalyzer(DataElement):
         """
         # We use the filtered df instead of the displayed_df because plots
         # display all filtered data and may be the source of the selection:
-        return self.filtered_df.index[idx_list].tolist()
+        return self.filtered_view.take(idx_list).index.tolist()
 
     def map_df_index_to_idx(self, index_vals):
         """ Maps a list of index values to a list of positions along the DF.
 
-        Note: this call looses the order of index_vals because of isin. isin is
-        used to avoid for loops, as selection may contain a lot of values.
+        Note: this call looses the order of index_vals: positions are returned
+        in increasing order. The index's hash table is used to avoid scanning
+        the whole index, as selection may contain a lot of values.
         """
-        return list(np.where(self.filtered_df.index.isin(index_vals))[0])
+        return labels_to_positions(self.filtered_view.index,
+                                   index_vals).tolist()
+
+    def extend_selection(self, positions):
+        """ Add rows (positions along the filtered DF) to the selection.
+        """
+        self.selection.extend(positions)
+
+    def toggle_selection(self, positions):
+        """ Toggle the selection state of rows (positions along the filtered
+        DF).
+        """
+        self.selection.toggle(positions)
+
+    def get_source_column_name(self, col_name):
+        """ Returns the source_df column name for a (sanitized) column name.
+
+        Names that aren't known sanitized names are returned unchanged.
+        """
+        return self.column_name_map.get(col_name, col_name)
+
+    def get_filter_columns(self, expression=None):
+        """ Returns the names of the columns used by a filter expression.
+
+        Parameters
+        ----------
+        expression : str or None, optional
+            Filter expression to analyze. Defaults to the current filter_exp.
+
+        Returns
+        -------
+        list(str)
+            Sorted list of the (sanitized) column names used in the
+            expression. The index isn't included.
+        """
+        if expression is None:
+            expression = self.filter_exp
+
+        query = self.filter_transformation(self._clean_filter_exp(expression))
+        return self._get_query_columns(query)
 
     def recompute_filtered_df(self):
         """ Force a recomputation of the filtered DF from the source one.
         """
-        self.filtered_df = self._compute_filtered_df()
+        # Results of pending background evaluations are now obsolete:
+        self.cancel_filter_computation()
+        self.filtered_view = self._compute_filtered_view()
+
+    def schedule_filter_computation(self, delay=None):
+        """ Evaluate the filter_exp in a background thread after a delay.
+
+        Scheduling a new evaluation supersedes the pending one: if it hasn't
+        started yet, it is cancelled, otherwise its result is dropped. The
+        filtered_df is updated in the UI thread once the result of the latest
+        request is available. If no UI is running, the result is applied by
+        wait_for_filter or apply_filter_results, in the calling thread.
+
+        Parameters
+        ----------
+        delay : float or None, optional
+            Time to wait (in seconds) before evaluating the filter, to allow
+            for further modifications. Defaults to the filter_debounce_delay.
+        """
+        if delay is None:
+            delay = self.filter_debounce_delay
+
+        filter_exp, sort_by_col = self.filter_exp, self.sort_by_col
+        evaluate = partial(self._filter_and_sort, filter_exp, sort_by_col)
+        apply = partial(self._apply_filter_request_result, filter_exp,
+                        self._filter_data_key(filter_exp), sort_by_col)
+        self._filter_scheduler.schedule(delay, evaluate, apply)
+
+    def cancel_filter_computation(self):
+        """ Cancel any pending background filter evaluation.
+        """
+        self._filter_scheduler.cancel()
+
+    def wait_for_filter(self, timeout=None):
+        """ Block until the pending background filter evaluation is done,
+        and apply its result if no UI is running.
+
+        Note: when a UI is running, the result is only applied once the UI
+        event loop processes it.
+        """
+        self._filter_scheduler.wait(timeout)
+
+    def apply_filter_results(self):
+        """ Apply the results of the background filter evaluations done so
+        far, in the calling thread.
+
+        Only needed when no UI is running: results are otherwise applied in
+        the UI thread as soon as they are available.
+
+        Returns
+        -------
+        bool
+            Whether any result was processed.
+        """
+        return self._filter_scheduler.process_results()
+
+    def complete_sort(self):
+        """ Sort all rows of the filtered_df if only part of them was sorted.
+
+        To be called before using the filtered_df row order beyond the
+        displayed rows, for example when exporting it.
+        """
+        if self._num_sorted_rows >= 0 and self.sort_by_col:
+            self._apply_sort(self.sort_by_col, allow_partial=False)
+
+    def get_displayed_rows(self, start, stop, columns=None):
+        """ Returns rows of the displayed_view, as a DataFrame.
+
+        Used to display the data by windows of rows. If only part of the
+        filtered rows were sorted, they are all sorted first if needed.
+
+        Parameters
+        ----------
+        start, stop : int
+            Positions of the first row and after the last row to return,
+            along the displayed_view. Clipped to its length.
+
+        columns : list or None, optional
+            Columns to return. Leave as None to return all columns.
+        """
+        view = self.displayed_view
+        if view is None:
+            return None
+
+        start = max(start, 0)
+        stop = max(min(stop, len(view)), start)
+        num_sorted = self._num_sorted_rows
+        if num_sorted >= 0 and self.sort_by_col and stop > start:
+            if self.show_selected_only:
+                order = self.selection.ordered_positions
+                last_row = order[start:stop].max()
+            else:
+                last_row = stop - 1
+            if last_row >= num_sorted:
+                self.complete_sort()
+                view = self.displayed_view
+
+        return view.take(slice(start, stop)).to_frame(columns)
+
+    def append_rows(self, new_rows):
+        """ Append rows to the source_df, updating the analysis incrementally.
+
+        The source_df isn't copied: its columns are stored in buffers with
+        spare capacity, which only receive the new rows. The current filter is
+        only evaluated on the new rows, and the numerical summary statistics
+        are merged with those of the new rows. Percentiles are estimated from
+        quantile sketches updated with the new rows, with error bounds in the
+        summary_error_df (see compute_exact_summary). When the new rows come
+        last in the current sorting, plots only receive the values of the new
+        rows. Listeners of the filtered_df are notified once.
+
+        Parameters
+        ----------
+        new_rows : pd.DataFrame
+            Rows to append, with the columns of the source_df (or of the
+            DataFrame it was created from, before sanitizing the column names)
+            and index values not already in the source_df.
+
+        Raises
+        ------
+        ValueError
+            If the columns don't match or if index values are already used.
+        """
+        new_rows = align_appended_rows(
+            new_rows, self.source_df, index_sorted=self.data_sorted,
+            sanitize_columns=sanitize_column_names
+        )
+        if len(new_rows) == 0:
+            return
+
+        self.cancel_filter_computation()
+        old_df = self.source_df
+        old_view = self.filtered_view
+        old_data_key = self._get_filtered_data_key()
+        old_positions = self._get_filtered_positions()
+        source_df = self._get_appendable_source().append(new_rows)
+        handle = None
+        if self.source_handle is not None:
+            handle = get_data_store().add(source_df)
+
+        brushed = self.crossfilter is not None and self.crossfilter.brushes
+        if old_data_key is None or brushed or \
+                old_data_key[0] != self.source_data_version:
+            # The filtered_df was set externally, or brushed ranges apply to
+            # the new rows: filter everything again
+            self.source_df = source_df
+            self._set_source_handle(handle)
+            return
+
+        data_sorted = self.data_sorted and index_appended_in_order(
+            old_df.index, new_rows.index
+        )
+        with self._filter_lock:
+            # Skip the full recomputation triggered by a source_df change:
+            self.trait_setq(source_df=source_df)
+            self._set_source_handle(handle)
+            self.source_data_version += 1
+            if self.crossfilter is not None:
+                self.crossfilter = self._make_crossfilter()
+            self.filter_cache.clear()
+            self.clause_mask_cache.clear()
+            self.sort_permutation_cache.clear()
+            self._last_filter_result = None
+            # Sketches of the complete chunks of old rows remain valid:
+            self.sketch_engine.append_data(old_data_key[0],
+                                           self.source_data_version,
+                                           len(old_df))
+
+        self.data_sorted = data_sorted
+        query = old_data_key[1]
+        appended = np.arange(len(old_df), len(source_df))
+        if query:
+            try:
+                with self._filter_lock:
+                    mask = self._evaluate_filter_mask(query,
+                                                      positions=appended)
+            except Exception as e:
+                msg = "Failed to filter the appended rows with '{}' ({}): " \
+                      "filtering all rows again.".format(query, e)
+                logger.warning(msg)
+                self.recompute_filtered_df()
+                return
+            appended = appended[mask]
+
+        sort_by_col = self.sort_by_col
+        at_end = sort_by_col in (NO_SORTING_ENTRY, "") or \
+            (sort_by_col == self.index_name and data_sorted)
+        if at_end and old_positions is None and not query:
+            # Still all rows in their original order:
+            positions = None
+        else:
+            if old_positions is None:
+                old_positions = np.arange(len(old_df))
+            positions = np.concatenate([old_positions, appended])
+            if not at_end:
+                with self._filter_lock:
+                    positions = self._sort_positions(positions, sort_by_col)
+                self._num_sorted_rows = -1
+
+        # The selected rows move if the new rows are sorted among them:
+        selected_labels = None
+        if not at_end and self.selection.count:
+            selected_labels = self.data_selected
+
+        new_view = DataFrameView(source_df, positions)
+        data_key = (self.source_data_version, query)
+        self._appended_rows = (old_data_key,
+                               DataFrameView(source_df, appended), at_end,
+                               old_view)
+        try:
+            self._set_filtered_view(new_view, data_key)
+        finally:
+            self._appended_rows = None
+
+        if selected_labels is not None:
+            self.data_selected = selected_labels
+
+    def brush_column(self, col_name, low, high):
+        """ Restrict the filtered rows to values of a column (or of the index)
+        between low and high (included).
+
+        Replaces the previous range brushed along that column. The
+        filtered_df is the rows matching the filter_exp and all brushed
+        ranges.
+
+        Raises
+        ------
+        ValueError
+            If the column isn't found.
+        """
+        if self.crossfilter is None:
+            self.crossfilter = self._make_crossfilter()
+        try:
+            self.crossfilter.brush(col_name, low, high)
+        except KeyError:
+            msg = "Can't brush column {}: it isn't in the data.".format(
+                col_name)
+            logger.exception(msg)
+            raise ValueError(msg)
+
+    def clear_brushes(self, col_name=None):
+        """ Remove the range brushed along a column, or all of them.
+        """
+        if self.crossfilter is None:
+            return
+        if col_name is None:
+            self.crossfilter.clear()
+        else:
+            self.crossfilter.clear_brush(col_name)
 
     def shuffle_filtered_df(self):
         """ Shuffle the filtered DF order randomly.
         """
         self.sort_by_col = NO_SORTING_ENTRY
-        self.filtered_df = self.filtered_df.sample(frac=1)
+        permutation = np.random.permutation(len(self.filtered_view))
+        self._reorder_filtered_view(self.filtered_view.take(permutation),
+                                    permutation)
 
     # Traits Listeners --------------------------------------------------------
 
@@ -207,114 +740,184 @@ class DataFrameAnalyzer(DataElement):
         """ Selection modified in plot tools: update table selections.
         """
         new = object.index_selected
-        if set(self.selected_idx) != set(new):
+        if not self.selection.matches(new):
             self.selected_idx = new
 
-    @on_trait_change("selected_idx[]", post_init=True)
+    @on_trait_change("plot_manager_list:brushed_ranges", post_init=True)
+    def update_brushes(self, object, name, old, new):
+        """ Ranges brushed in plots: apply the ones that changed.
+        """
+        for col_name in set(old) - set(new):
+            self.clear_brushes(col_name)
+        for col_name, (low, high) in new.items():
+            if old.get(col_name, None) != (low, high):
+                self.brush_column(col_name, low, high)
+
+    @on_trait_change("selection.version", post_init=True)
     def update_selected_idx_in_plotter(self):
         """ Update selection in all plot managers if selection changed in table
         """
         for plot_manager in self.plot_manager_list:
             current = plot_manager.index_selected
-            if set(current) != set(self.selected_idx):
+            if not self.selection.matches(current):
                 plot_manager.index_selected = self.selected_idx
 
         self.selected_data_in_plotter_updated = True
 
-    @on_trait_change("selected_idx[]", post_init=True)
-    def update_data_selected(self):
-        """ Update the selection in terms of the DF index values, which remains
-        unmodified even when changing the way the data is sorted.
-        """
-        # Store the selection in terms of the DF index
-        data_selected = self.map_idx_to_df_index(self.selected_idx)
-        if set(self.data_selected) != set(data_selected):
-            self.data_selected = data_selected
-
-    @on_trait_change("data_selected")
-    def update_selected_idx_from_data(self):
-        """ Update selected table rows from DF index.
-        """
-        # Store the selection in terms of the DF index
-        selected_idx = self.map_df_index_to_idx(self.data_selected)
-        if set(self.selected_idx) != set(selected_idx):
-            self.selected_idx = selected_idx
-
-    @on_trait_change("filtered_df", post_init=True)
-    def update_plotter_datasource(self, new):
+    @on_trait_change("filtered_data_changed")
+    def update_plotter_datasource(self):
         """ Update plotter data if filtered data is changed so new plots made
         w/ new filtered data.
         """
+        # Plots gather the columns they use from the views:
+        new = self.filtered_view
+        appended_view = None
+        if self._appended_rows is not None and self._appended_rows[2]:
+            appended_view = self._appended_rows[1]
+
         for plot_manager in self.plot_manager_list:
-            plot_manager.data_source = new
+            if appended_view is not None:
+                plot_manager.append_rows(new, appended_view)
+            elif self._reordering_rows:
+                plot_manager.update_row_order(new)
+            else:
+                plot_manager.data_view = new
 
-    @on_trait_change("filtered_df, summary_index[]", post_init=True)
-    def compute_summary(self):
-        data = self.filtered_df
-        if data is None or len(data) == 0:
-            self.summary_df = DataFrame([])
-            return self.summary_df
+    def compute_exact_summary(self):
+        """ Compute the exact summaries, even in approximate_summary mode.
 
+        The next change of the filtered data leads to approximate summaries
+        again.
+        """
+        self._force_exact_summary = True
         try:
-            summary = data.describe(exclude=self.categorical_dtypes)
-        except ValueError as e:
-            msg = "Failed to describe. Most likely due to no floating point " \
-                  "columns found in data. Error was {}".format(e)
-            logger.debug(msg)
-            self.summary_df = DataFrame([])
-            return self.summary_df
+            self.compute_summary()
+            self.compute_categorical_summary()
+        finally:
+            self._force_exact_summary = False
 
-        all_summaries = [summary]
-        for entry in self.summary_index:
-            if entry.endswith("%") and entry not in summary.index:
-                percent = float(entry[:-1])
-                values = compute_percentile(data[summary.columns], percent)
-                values_df = DataFrame({entry: values}).transpose()
-                all_summaries.append(values_df)
+        self._notify_summary_listeners(NUMERICAL_SUMMARY_TRAITS +
+                                       CATEGORICAL_SUMMARY_TRAITS)
+
+    def compute_summary(self):
+        """ Compute the numerical summary of the filtered data.
+
+        Not needed to access the summary_df, which is computed when read if
+        the filtered data changed.
+
+        Returns
+        -------
+        pd.DataFrame
+            The new summary_df.
+        """
+        self._summary_df, self._summary_error_df = \
+            self._summarize_numerical_columns()
+        self._summary_outdated = False
+        return self._summary_df
 
-        try:
-            summary = concat(all_summaries, sort=True)
-        except TypeError:
-            # For pandas <= 0.20
-            import warnings
-            msg = "Pandas version 0.20 and before will not be supported long" \
-                  " term: it is recommended to update."
-            warnings.warn(msg)
-            summary = concat(all_summaries)
-
-        self.summary_df = summary.reindex(list(self.summary_index))
-        return self.summary_df
-
-    @on_trait_change("filtered_df", post_init=True)
     def compute_categorical_summary(self):
-        data = self.filtered_df
-        if data is None:
-            self.summary_categorical_df = DataFrame([])
-            return self.summary_categorical_df
+        """ Compute the categorical summary of the filtered data.
 
-        try:
-            summary = data.describe(include=self.categorical_dtypes)
-        except ValueError:
-            # No categorical data
-            self.summary_categorical_df = DataFrame([])
-            return self.summary_categorical_df
-
-        next_values = []
-        next_freqs = []
-        for col in summary.columns:
-            value_counts = data[col].value_counts()
-            if len(value_counts) <= 1:
-                next_values.append(np.nan)
-                next_freqs.append(np.nan)
+        Not needed to access the summary_categorical_df, which is computed
+        when read if the filtered data changed.
+
+        Returns
+        -------
+        pd.DataFrame
+            The new summary_categorical_df.
+        """
+        self._summary_categorical_df, self._summary_categorical_error_df = \
+            self._summarize_categorical_columns()
+        self._categorical_summary_outdated = False
+        return self._summary_categorical_df
+
+    @on_trait_change("filtered_view, summary_index[], approximate_summary, "
+                     "hidden_summary_columns[]", post_init=True)
+    def invalidate_summary(self):
+        """ Mark the numerical summary as outdated, and notify its listeners
+        if it is visible.
+        """
+        if self._reordering_rows:
+            # Statistics don't depend on the row order:
+            return
+
+        if self._appended_rows is not None and not self._summary_outdated:
+            # Merge the statistics of the appended rows with the previous ones
+            # (cached when the summary was last computed):
+            old_data_key, appended_view, _, old_view = self._appended_rows
+            columns = self._get_summary_columns(
+                exclude=self.categorical_dtypes)
+            self.summary_engine.append_data(
+                old_data_key, self._get_filtered_data_key(),
+                appended_view[columns], old_data=old_view
+            )
+
+        self._summary_outdated = True
+        if self.summary_visible:
+            self._notify_summary_listeners(NUMERICAL_SUMMARY_TRAITS)
+
+    @on_trait_change("filtered_view, approximate_summary, "
+                     "hidden_summary_columns[]", post_init=True)
+    def invalidate_categorical_summary(self):
+        """ Mark the categorical summary as outdated, and notify its
+        listeners if it is visible.
+        """
+        if self._reordering_rows:
+            # Statistics don't depend on the row order:
+            return
+
+        self._categorical_summary_outdated = True
+        if self.summary_visible:
+            self._notify_summary_listeners(CATEGORICAL_SUMMARY_TRAITS)
+
+    @on_trait_change("filtered_view, hidden_summary_columns[]",
+                     post_init=True)
+    def reset_selection_summary(self):
+        """ Drop the statistics of the selected rows, which are now
+        different rows (or columns).
+        """
+        self._selection_stats = None
+        self.invalidate_selection_summary()
+
+    @on_trait_change("summary_index[]", post_init=True)
+    def invalidate_selection_summary(self):
+        """ Mark the selection summary as outdated, and notify its listeners
+        if it is visible.
+        """
+        self._selection_summary_outdated = True
+        if self.summary_visible:
+            self._notify_summary_listeners(SELECTION_SUMMARY_TRAITS)
+
+    @on_trait_change("selection:rows_changed")
+    def update_selection_stats(self, new):
+        """ Update the statistics of the selected rows from the rows added
+        to or removed from the selection.
+        """
+        stats = self._selection_stats
+        if stats is not None:
+            if new is None:
+                self._selection_stats = None
             else:
-                next_values.append(value_counts.index[1])
-                next_freqs.append(int(value_counts.iloc[1]))
+                added, removed = new
+                stats.remove(self._get_selection_values(stats.columns,
+                                                        removed))
+                stats.add(self._get_selection_values(stats.columns, added))
+
+        self.invalidate_selection_summary()
+
+    def _summary_visible_changed(self, new):
+        """ Notify the listeners of the summaries which changed while they
+        were hidden.
+        """
+        if not new:
+            return
 
-        adtl_data = {"next": next_values, "next_freq": next_freqs}
-        adtl_summary = DataFrame(adtl_data, index=summary.columns).transpose()
-        self.summary_categorical_df = concat([summary, adtl_summary]).reindex(
-            DEFAULT_CATEG_SUMMARY_ELEMENTS)
-        return self.summary_categorical_df
+        if self._summary_outdated:
+            self._notify_summary_listeners(NUMERICAL_SUMMARY_TRAITS)
+        if self._categorical_summary_outdated:
+            self._notify_summary_listeners(CATEGORICAL_SUMMARY_TRAITS)
+        if self._selection_summary_outdated:
+            self._notify_summary_listeners(SELECTION_SUMMARY_TRAITS)
 
     def _filter_transformation_changed(self):
         self.recompute_filtered_df()
@@ -333,6 +936,10 @@ class DataFrameAnalyzer(DataElement):
         if filter_equivalent:
             return
 
+        if self.filter_async:
+            self.schedule_filter_computation()
+            return
+
         try:
             self.recompute_filtered_df()
         except Exception as e:
@@ -343,44 +950,249 @@ class DataFrameAnalyzer(DataElement):
                 msg = "Failed to filter DF with '{}'. Error was {}."
                 logger.warn(msg.format(new, e))
 
-    @on_trait_change("filtered_df, num_displayed_rows, show_selected_only, "
-                     "selected_idx[]")
+    @on_trait_change("num_displayed_rows", post_init=True)
+    def extend_partial_sort(self):
+        """ Sort more rows if more rows than partially sorted are displayed.
+        """
+        num_sorted = self._num_sorted_rows
+        if num_sorted < 0 or not self.sort_by_col:
+            return
+
+        if self.num_displayed_rows < 0 or \
+                self.num_displayed_rows > num_sorted:
+            self._apply_sort(self.sort_by_col)
+
+    @on_trait_change("filtered_view, num_displayed_rows, show_selected_only")
     def recompute_displayed_df(self):
         self.displayed_df = self._compute_displayed_df()
 
+    @on_trait_change("filtered_view, show_selected_only")
+    def update_displayed_view(self):
+        self.displayed_view = self._compute_displayed_view()
+
+    @on_trait_change("selection.version", post_init=True)
+    def update_displayed_selection(self):
+        """ Update the displayed data if only the selected rows are shown.
+        """
+        if self.show_selected_only:
+            self.recompute_displayed_df()
+            self.update_displayed_view()
+
     def _source_df_changed(self):
         """ Update the filtered data and the sorting options and attribute.
         """
-        self.recompute_filtered_df()
+        self._reset_source_analysis()
+        appendable = self._appendable_source
+        if appendable is not None and appendable.frame is not self.source_df:
+            # Release the buffers of the previous source_df:
+            self._appendable_source = None
 
-        index = self.source_df.index
-        self.data_sorted = sorted(index) == index.tolist()
+        self.data_sorted = self.source_df.index.is_monotonic_increasing
         if not self.data_sorted:
             self.sort_by_col = NO_SORTING_ENTRY
         else:
             self.sort_by_col = self.index_name
 
+    @on_trait_change("source_df", post_init=True)
+    def release_source_handle(self):
+        """ Stop holding the stored copy once the source_df is replaced.
+        """
+        handle = self.source_handle
+        if handle is not None and (handle.released or
+                                   handle.data is not self.source_df):
+            self._set_source_handle(None)
+
+    @on_trait_change("crossfilter:mask_updated")
+    def update_brushed_rows(self, new):
+        """ Update the filtered rows when rows enter or leave the brushed
+        ranges.
+
+        Rows only leaving them are dropped from the filtered_df, which stays
+        sorted. Otherwise the filtered_df is recomputed (the filter_exp result
+        is cached).
+        """
+        entered, exited = new
+        positions = self._get_filtered_positions()
+        if len(entered) or positions is None or self._num_sorted_rows >= 0:
+            self.recompute_filtered_df()
+            return
+
+        self.cancel_filter_computation()
+        self.selection.clear()
+        positions = self.crossfilter.restrict(positions)
+        self._set_filtered_view(self._make_source_view(positions),
+                                self._filter_data_key(self.filter_exp))
+
+    def _filtered_view_changed(self, new):
+        # Don't hold on to data gathered from the previous view:
+        self._materialized_filtered_df = None
+        self._resize_selection(0 if new is None else len(new))
+        self.filtered_data_changed = new
+
     def _sort_by_col_changed(self, new):
-        if new == NO_SORTING_ENTRY or self.filtered_df is None:
+        if new == NO_SORTING_ENTRY or self.filtered_view is None:
             return
 
-        if new.endswith(REVERSED_SUFFIX):
-            new = new[:-len(REVERSED_SUFFIX)]
-            ascending = False
-        else:
-            ascending = True
+        self._apply_sort(new)
+
+    # Private interface -------------------------------------------------------
 
-        if new == self.index_name:
-            self.filtered_df = self.filtered_df.sort_index(ascending=ascending)
+    def _set_source_handle(self, handle):
+        """ Replace the handle on the stored source_df, releasing the
+        previous one.
+        """
+        if self.source_handle is not None:
+            self.source_handle.release()
+        self.source_handle = handle
+
+    def _make_crossfilter(self, brushes=None):
+        """ Returns a CrossFilter on the source data, with ranges brushed.
+
+        Brushes along columns that aren't in the data anymore are dropped.
+        """
+        crossfilter = CrossFilter(self._num_source_rows(),
+                                  self._get_sort_values)
+        crossfilter.brush_ranges(brushes or {})
+        return crossfilter
+
+    def _summarize_numerical_columns(self):
+        """ Returns the numerical summary of the filtered data and the error
+        bounds of its values (empty unless it is approximate).
+        """
+        data = self.filtered_view
+        if data is None or len(data) == 0:
+            return DataFrame([]), DataFrame([])
+
+        # Select the columns to summarize like describe would, so only these
+        # columns are gathered:
+        columns = self._get_summary_columns(exclude=self.categorical_dtypes)
+        if len(columns) == 0:
+            msg = "No floating point columns found in data: skipping summary."
+            logger.debug(msg)
+            return DataFrame([]), DataFrame([])
+
+        executor = get_shared_executor(self.summary_num_threads)
+        if self.approximate_summary and not self._force_exact_summary:
+            return self.sketch_engine.summarize(
+                data.source, data.positions, columns, self.summary_index,
+                data_version=self._get_sketch_data_version(),
+                executor=executor
+            )
+
+        # Only the columns without cached statistics are gathered. The
+        # percentiles of appended data are estimated from quantile sketches,
+        # unless exact values are requested:
+        data_key = self._get_filtered_data_key()
+        summary = self.summary_engine.summarize(
+            data, self.summary_index, data_key=data_key, executor=executor,
+            columns=columns, use_sketches=not self._force_exact_summary
+        )
+        error = self.summary_engine.error_bounds(
+            data_key, self.summary_index, columns
+        )
+        return summary, error
+
+    def _summarize_categorical_columns(self):
+        """ Returns the categorical summary of the filtered data and the error
+        bounds of its values (empty unless it is approximate).
+        """
+        data = self.filtered_view
+        if data is None:
+            return DataFrame([]), DataFrame([])
+
+        columns = self._get_summary_columns(include=self.categorical_dtypes)
+        if len(columns) == 0:
+            # No categorical data
+            return DataFrame([]), DataFrame([])
+
+        executor = get_shared_executor(self.summary_num_threads)
+        error = DataFrame([])
+        if self.approximate_summary and not self._force_exact_summary:
+            summary, error = self.sketch_engine.summarize_categorical(
+                data.source, data.positions, columns,
+                data_version=self._get_sketch_data_version(),
+                executor=executor
+            )
+            error = error.reindex(DEFAULT_CATEG_SUMMARY_ELEMENTS)
         else:
-            self.filtered_df = self.filtered_df.sort_values(
-                by=new, ascending=ascending)
+            summary = summarize_categorical(data[columns], max_workers=1,
+                                            executor=executor)
 
-        # Remap the selections
-        if self.data_selected:
-            self.selected_idx = self.map_df_index_to_idx(self.data_selected)
+        return summary.reindex(DEFAULT_CATEG_SUMMARY_ELEMENTS), error
 
-    # Private interface -------------------------------------------------------
+    def _get_summary_columns(self, include=None, exclude=None):
+        """ Returns the filtered data columns of some dtypes to summarize,
+        skipping the hidden_summary_columns.
+        """
+        columns = self.filtered_view.select_columns(include=include,
+                                                    exclude=exclude)
+        hidden = set(self.hidden_summary_columns)
+        return [col for col in columns if col not in hidden]
+
+    def _summarize_selection(self):
+        """ Returns the numerical summary of the selected rows, from the
+        statistics maintained as the selection changes.
+        """
+        if self.filtered_view is None or not self.selection.count:
+            return DataFrame([])
+
+        stats = self._selection_stats
+        if stats is None:
+            columns = [
+                col for col in self._get_summary_columns(
+                    exclude=self.categorical_dtypes)
+                if self.filtered_view.dtypes[col].kind in ENGINE_DTYPE_KINDS
+            ]
+            get_values = partial(self._get_selection_values, columns)
+            stats = IncrementalSummary(columns, get_values)
+            stats.add(get_values())
+            self._selection_stats = stats
+
+        return stats.summarize(self.summary_index)
+
+    def _get_selection_values(self, columns, positions=None):
+        """ Returns the values of columns of filtered rows (the selected
+        rows by default), as a 2D float array.
+        """
+        if positions is None:
+            positions = self.selection.positions
+        data = self.filtered_view.take(positions).to_frame(columns)
+        return data.to_numpy(dtype=np.float64)
+
+    def _notify_summary_listeners(self, names):
+        """ Notify the listeners of summary properties that they changed.
+
+        The summaries are only computed if they have listeners (which read
+        their new values).
+        """
+        for name in names:
+            self.trait_property_changed(name, getattr(self, "_" + name))
+
+    def _reset_source_analysis(self):
+        """ Drop the results computed on the previous source data and filter
+        the new one.
+        """
+        self.column_name_map = build_column_name_map(self.source_df.columns)
+        self.source_data_version += 1
+        self.filter_cache.clear()
+        self.clause_mask_cache.clear()
+        self.sort_permutation_cache.clear()
+        self._sorted_filter_names.clear()
+        self.summary_engine.clear()
+        self.sketch_engine.clear()
+        if self.crossfilter is not None:
+            self.crossfilter = self._make_crossfilter(
+                self.crossfilter.brushes
+            )
+        self.recompute_filtered_df()
+
+    def _resize_selection(self, num_rows):
+        """ Make the selection apply to a new number of filtered rows,
+        dropping the selected positions beyond them.
+        """
+        order = self.selection.ordered_positions
+        self.selection.set_positions(order[order < num_rows],
+                                     num_rows=num_rows)
 
     @staticmethod
     def _clean_filter_exp(expr):
@@ -402,39 +1214,631 @@ class DataFrameAnalyzer(DataElement):
 
         return expr
 
-    def _compute_filtered_df(self):
-        """ Compute filtered DF from source DF, filter expression & sort param.
+    def _get_appendable_source(self):
+        """ Returns the buffers of the source_df columns, to append rows to.
+        """
+        appendable = self._appendable_source
+        if appendable is None or appendable.frame is not self.source_df:
+            appendable = AppendableFrame(self.source_df)
+            self._appendable_source = appendable
+        return appendable
+
+    def _compute_filtered_view(self):
+        """ Compute filtered view from source DF, filter expression & sort
+        param.
         """
         if self.source_df is None:
             return None
 
         # Reset selection
-        self.selected_idx = []
-
-        if not self.filter_exp.strip():
-            return self.source_df
+        self.selection.clear()
 
-        query = self.filter_transformation(
-            self._clean_filter_exp(self.filter_exp)
+        self._num_sorted_rows = -1
+        new_view, sort_failed, filter_result = self._filter_and_sort(
+            self.filter_exp, self.sort_by_col
         )
-        if not self._validate_query(query):
-            msg = "Invalid filter expression error: {}.".format(query)
-            logger.error(msg)
-            raise InvalidQuery(msg)
+        if filter_result is not None:
+            self._last_filter_result = filter_result
+        if sort_failed:
+            self._reset_invalid_sorting()
+
+        new_view.data_key = self._filter_data_key(self.filter_exp)
+        return new_view
+
+    def _get_query_columns(self, query):
+        """ Returns the sorted (sanitized) column names used in a query.
+        """
+        try:
+            names = compile_filter(query).columns
+        except UnsupportedExpression:
+            names = IDENTIFIER_PATTERN.findall(query)
+
+        return sorted(set(names) & set(self.column_name_map))
+
+    def _filter_data_key(self, filter_exp):
+        """ Returns the key identifying the rows a filter expression selects.
+        """
+        query = ""
+        if filter_exp.strip():
+            query = self.filter_transformation(
+                self._clean_filter_exp(filter_exp)
+            ).strip()
+        if self.crossfilter is not None and self.crossfilter.brushes:
+            brushes = tuple(sorted(self.crossfilter.brushes.items()))
+            return self.source_data_version, query, brushes
+        return self.source_data_version, query
+
+    def _get_filtered_data_key(self):
+        """ Returns the key identifying the filtered_df rows, None if unknown.
+        """
+        view = self.filtered_view
+        if view is None or not self._is_source_view(view):
+            # filtered_df was set externally:
+            return None
+        return view.data_key
+
+    def _get_filtered_positions(self):
+        """ Returns the source_df positions of the filtered_df rows, in order.
+
+        Returns None if unknown because the filtered_df was set externally.
+        """
+        view = self.filtered_view
+        if view is None or not self._is_source_view(view):
+            return None
+
+        positions = view.positions
+        if positions is None:
+            positions = np.arange(self._num_source_rows())
+        return positions
+
+    def _is_source_view(self, view):
+        """ Returns whether a view is a view on the source data.
+        """
+        return view.source is self.source_df
+
+    def _make_source_view(self, positions):
+        """ Returns the view of the source data rows at some positions.
+        """
+        return DataFrameView(self.source_df, positions)
+
+    def _num_source_rows(self):
+        return len(self.source_df)
+
+    def _get_sketch_data_version(self):
+        """ Returns the version of the filtered_view's source data, to cache
+        sketches of its chunks, or None if it isn't the source_df.
+        """
+        data_key = self._get_filtered_data_key()
+        if data_key is None:
+            return None
+        return data_key[0]
+
+    def _set_filtered_view(self, new_view, data_key):
+        """ Set the filtered_view, recording the key identifying its rows.
+        """
+        new_view.data_key = data_key
+        self.filtered_view = new_view
 
-        new_df = self.source_df.query(query)
-        # FIXME: this custom code should be replaced by a call to
-        # _sort_by_col_changed
-        if self.sort_by_col:
-            if self.sort_by_col in new_df.columns:
-                new_df = new_df.sort_values(self.sort_by_col)
+    def _reorder_filtered_view(self, new_view, permutation):
+        """ Set the filtered_view to a reordered version of the current one.
+
+        Listeners that don't depend on the row order skip their update.
+
+        Parameters
+        ----------
+        new_view : DataFrameView
+            New filtered view, containing the rows of the current one in the
+            order of the permutation.
+
+        permutation : np.ndarray
+            Positions of the new rows in the current filtered_df.
+        """
+        self._reordering_rows = True
+        try:
+            self._set_filtered_view(new_view, self._get_filtered_data_key())
+        finally:
+            self._reordering_rows = False
+
+        self.selection.reorder(permutation)
+        self.filtered_rows_reordered = permutation
+
+    def _apply_sort(self, sort_by_col, allow_partial=True):
+        """ Reorder the filtered_df rows along a sort_by_col_list entry.
+
+        Parameters
+        ----------
+        sort_by_col : str
+            Entry of the sort_by_col_list to sort along.
+
+        allow_partial : bool, optional
+            Whether to only sort the rows that can be displayed, if
+            partial_sort is enabled and that is worth it.
+        """
+        old_positions = self._get_filtered_positions()
+        if old_positions is None:
+            # The filtered_df was set externally: sort it directly
+            self._num_sorted_rows = -1
+            old_df = self.filtered_df
+            new_df = self._sort_df(old_df, sort_by_col)
+            if old_df.index.is_unique:
+                permutation = old_df.index.get_indexer(new_df.index)
+                self._reorder_filtered_view(DataFrameView(new_df),
+                                            permutation)
             else:
-                msg = "Trying to sort the DF by a column that doesn't exist " \
-                      "in the DF: {}. Skipping.".format(self.sort_by_col)
+                selected_labels = self.data_selected
+                self.filtered_df = new_df
+                self.data_selected = selected_labels
+            return
+
+        positions = None
+        window = 0
+        if allow_partial:
+            window = self._get_partial_sort_window(sort_by_col,
+                                                   len(old_positions))
+        with self._filter_lock:
+            if window:
+                positions = self._partial_sort_positions(
+                    old_positions, sort_by_col, window
+                )
+            if positions is None:
+                window = -1
+                positions = self._sort_positions(old_positions, sort_by_col)
+
+        self._num_sorted_rows = window
+        permutation = relative_permutation(old_positions, positions,
+                                           self._num_source_rows())
+        self._reorder_filtered_view(self._make_source_view(positions),
+                                    permutation)
+
+    def _get_partial_sort_window(self, sort_by_col, num_rows):
+        """ Returns the number of rows to partially sort, 0 for a full sort.
+
+        A full sort is preferred if the sort permutation is already known,
+        if all rows are displayed or if a plot depends on the row order.
+        """
+        if not self.partial_sort or self.num_displayed_rows <= 0:
+            return 0
+
+        window = self.num_displayed_rows + self.num_display_increment
+        if window >= num_rows:
+            return 0
+
+        cached = self.sort_permutation_cache.get(sort_by_col,
+                                                 self.source_data_version)
+        if cached is not None:
+            return 0
+
+        for plot_manager in self.plot_manager_list:
+            if plot_manager.requires_row_order():
+                return 0
+
+        return window
+
+    def _partial_sort_positions(self, positions, sort_by_col, num_rows):
+        """ Returns positions with their first num_rows sorted along an entry.
+
+        Returns None if the values can't be partially sorted (for example
+        non-numerical values).
+
+        Raises
+        ------
+        KeyError
+            If the column to sort along isn't found in the source_df.
+        """
+        if sort_by_col.endswith(REVERSED_SUFFIX):
+            col_name = sort_by_col[:-len(REVERSED_SUFFIX)]
+            ascending = False
+        else:
+            col_name = sort_by_col
+            ascending = True
+
+        values = self._get_sort_values(col_name).iloc[positions]
+        order = partial_sort_order(values, num_rows, ascending=ascending)
+        if order is None:
+            return None
+        return positions[order]
+
+    def _filter_and_sort(self, filter_exp, sort_by_col):
+        """ Filter the source DF with an expression and sort the result.
+
+        Doesn't modify any trait so it can be called from a worker thread.
+
+        Returns
+        -------
+        tuple
+            Filtered view (of all rows in their original order if its
+            positions are None), whether sorting it failed because the
+            sort_by_col doesn't exist, and the data version, clauses and
+            positions of the filter evaluated (None without filter), to
+            store as the _last_filter_result.
+        """
+        positions = filter_result = None
+        if filter_exp.strip():
+            query = self.filter_transformation(
+                self._clean_filter_exp(filter_exp)
+            )
+            if not self._validate_query(query):
+                msg = "Invalid filter expression error: {}.".format(query)
                 logger.error(msg)
-                self.sort_by_col = NO_SORTING_ENTRY
+                raise InvalidQuery(msg)
+
+            with self._filter_lock:
+                filter_result = self._compute_filter_positions(query)
+            positions = filter_result[2]
+
+        if self.crossfilter is not None and self.crossfilter.brushes:
+            positions = self.crossfilter.restrict(positions)
+
+        positions, sort_failed = self._sort_filtered_positions(positions,
+                                                               sort_by_col)
+        return self._make_source_view(positions), sort_failed, filter_result
+
+    def _sort_filtered_positions(self, positions, sort_by_col):
+        """ Sort filtered source_df row positions along a sort_by_col_list
+        entry, if any.
+
+        Returns
+        -------
+        tuple
+            Sorted positions (None for all rows in their original order), and
+            whether sorting failed because the sort_by_col doesn't exist.
+        """
+        if not sort_by_col:
+            return positions, False
+
+        try:
+            with self._filter_lock:
+                return self._sort_positions(positions, sort_by_col), False
+        except KeyError:
+            return positions, True
+
+    def _sort_positions(self, positions, sort_by_col):
+        """ Sort source_df row positions along a sort_by_col_list entry.
+
+        The cached sort permutation of the entry is filtered to the positions
+        provided, which is linear in the size of the source_df, unless the
+        source_df is already sorted along the entry (for example along its
+        index): the positions are then sorted directly.
+
+        Parameters
+        ----------
+        positions : np.ndarray or None
+            Positions of the source_df rows to sort. None means all rows.
+
+        sort_by_col : str
+            Entry of the sort_by_col_list to sort along.
+
+        Raises
+        ------
+        KeyError
+            If the column to sort along isn't found in the source_df.
+        """
+        if positions is not None and self._is_sorted_filter_name(sort_by_col):
+            # The row order is the sort order (ties included, since the sort
+            # is stable): no need to go through all source_df rows.
+            return np.sort(positions)
+
+        permutation = self._get_sort_permutation(sort_by_col)
+        if positions is None:
+            return permutation
+
+        selected = np.zeros(self._num_source_rows(), dtype=bool)
+        selected[positions] = True
+        return permutation[selected[permutation]]
+
+    def _get_sort_permutation(self, sort_by_col):
+        """ Returns the source_df row positions sorted along a sort_by_col_list
+        entry, from the cache if available.
+
+        Null values are always last. Reversed entries read the permutation of
+        the non-null values backwards.
+
+        Raises
+        ------
+        KeyError
+            If the column to sort along isn't found in the source_df.
+        """
+        version = self.source_data_version
+        cache = self.sort_permutation_cache
+        permutation = cache.get(sort_by_col, version)
+        if permutation is not None:
+            return permutation
+
+        if sort_by_col.endswith(REVERSED_SUFFIX):
+            col_name = sort_by_col[:-len(REVERSED_SUFFIX)]
+            ascending = self._get_sort_permutation(col_name)
+            num_nulls = int(self._get_sort_values(col_name).isnull().sum())
+            permutation = reverse_sort_permutation(ascending, num_nulls)
+        else:
+            values = self._get_sort_values(sort_by_col)
+            permutation = compute_sort_permutation(values)
+
+        return cache.set(sort_by_col, version, permutation)
+
+    def _get_sort_values(self, col_name):
+        """ Returns the source_df values along a (non-reversed) sorting entry.
+
+        Raises
+        ------
+        KeyError
+            If the column isn't found in the source_df.
+        """
+        if col_name == self.index_name:
+            return Series(self.source_df.index)
+
+        source_col_name = self.get_source_column_name(col_name)
+        if source_col_name not in self.source_df.columns:
+            raise KeyError(col_name)
+        return self.source_df[source_col_name]
+
+    def _reset_invalid_sorting(self):
+        msg = "Trying to sort the DF by a column that doesn't exist in the " \
+              "DF: {}. Skipping.".format(self.sort_by_col)
+        logger.error(msg)
+        self.sort_by_col = NO_SORTING_ENTRY
+
+    def _apply_filter_request_result(self, filter_exp, data_key, sort_by_col,
+                                     result, error):
+        """ Apply the result of a background filter evaluation (see
+        _filter_and_sort), or report its error.
+
+        The filtered rows, sorted along sort_by_col, are sorted again if the
+        sort_by_col changed in the meantime.
+        """
+        if error is not None:
+            if self.filter_error_handling != "ignore":
+                msg = "Failed to filter DF with '{}'. Error was {}."
+                logger.warning(msg.format(filter_exp, error))
+            return
+
+        new_view, sort_failed, filter_result = result
+        if filter_result is not None:
+            self._last_filter_result = filter_result
+
+        if sort_by_col != self.sort_by_col:
+            # The sort changed while the filter was evaluated: sort the
+            # filtered positions (back in source order) along the new entry.
+            positions = new_view.positions
+            if positions is not None:
+                positions = np.sort(positions)
+            positions, sort_failed = self._sort_filtered_positions(
+                positions, self.sort_by_col
+            )
+            new_view = self._make_source_view(positions)
+
+        self.selection.clear()
+        self._num_sorted_rows = -1
+        self._set_filtered_view(new_view, data_key)
+        if sort_failed:
+            self._reset_invalid_sorting()
+
+    def _compute_filter_positions(self, query):
+        """ Returns the row positions in source_df selected by the query.
+
+        Results are looked up in (and stored into) the filter_cache so that
+        returning to a recently used filter doesn't re-evaluate it. If the
+        query is a conjunction refining the previously evaluated filter, only
+        the added clauses are evaluated, on the previously selected rows.
+
+        Returns
+        -------
+        tuple
+            Data version, clauses of the query and positions of the selected
+            rows, to store as the _last_filter_result.
+        """
+        version = self.source_data_version
+        cache_key = query.strip()
+        clauses = split_conjunction(query)
+        positions = self.filter_cache.get(cache_key, version)
+        if positions is None:
+            added_clauses = None
+            last_result = self._last_filter_result
+            if last_result is not None:
+                last_version, last_clauses, last_positions = last_result
+                if last_version == version:
+                    added_clauses = find_refining_clauses(clauses,
+                                                          last_clauses)
+
+            if added_clauses:
+                added_query = " and ".join("({})".format(clause)
+                                           for clause in added_clauses)
+                mask = self._evaluate_filter_mask(added_query,
+                                                  positions=last_positions)
+                positions = last_positions[mask]
+            else:
+                positions = self._search_filter_range(query)
+                if positions is None:
+                    positions = np.flatnonzero(
+                        self._evaluate_filter_mask(query)
+                    )
+
+            positions = self.filter_cache.set(cache_key, version, positions)
+
+        return version, clauses, positions
+
+    def _search_filter_range(self, query):
+        """ Returns the source_df row positions selected by a query with
+        range clauses on sorted columns (or the sorted index).
+
+        These clauses are answered with binary searches, as a contiguous range
+        of rows, and the other clauses are only evaluated on these rows.
+
+        Returns
+        -------
+        np.ndarray or None
+            Increasing positions of the selected rows, or None if the query
+            has no range clause on a sorted column (or if the other clauses
+            can't be evaluated by the filter compiler).
+        """
+        try:
+            found = compile_filter(query).split_range(
+                self._resolve_filter_name, self._is_sorted_filter_name
+            )
+        except UnsupportedExpression:
+            return None
+
+        if found is None:
+            return None
+
+        start, stop, remainder = found
+        positions = np.arange(start, stop)
+        if remainder is None or len(positions) == 0:
+            return positions
+
+        resolve = partial(self._resolve_filter_name, positions=positions)
+        try:
+            mask = remainder.evaluate(resolve)
+        except UnsupportedExpression:
+            return None
+
+        if mask.shape != positions.shape:
+            # Let the complete evaluation report the invalid query:
+            return None
+        return positions[mask]
+
+    def _is_sorted_filter_name(self, name):
+        """ Returns whether the column (or index) a filter name refers to is
+        sorted in increasing order, without null values.
+        """
+        key = (self.source_data_version, name)
+        is_sorted = self._sorted_filter_names.get(key, None)
+        if is_sorted is None:
+            try:
+                values = self._resolve_filter_name(name)
+            except KeyError:
+                return False
+            is_sorted = bool(values.is_monotonic_increasing) and \
+                not values.hasnans
+            self._sorted_filter_names[key] = is_sorted
+        return is_sorted
+
+    def _evaluate_filter_mask(self, query, positions=None):
+        """ Evaluate the query on (some rows of) source_df into a boolean mask.
+
+        The query is compiled into clauses evaluated as vectorized masks,
+        which are cached (when evaluating all rows) so that filters sharing
+        clauses reuse them. Queries the filter compiler doesn't support are
+        evaluated by pandas.
+
+        Column names used in the query are resolved explicitly so that
+        sanitized names refer to the original source_df columns, without
+        renaming (and therefore copying) the source data. Only the columns
+        used in the query are collected.
+
+        Parameters
+        ----------
+        query : str
+            Filter expression to evaluate.
+
+        positions : np.ndarray or None, optional
+            Positions of the source_df rows to evaluate the query on. Leave as
+            None to evaluate it on all rows.
+        """
+        resolve = partial(self._resolve_filter_name, positions=positions)
+        if positions is None:
+            mask_cache = self.clause_mask_cache
+            num_rows = len(self.source_df)
+        else:
+            # Masks of a subset of the rows can't be shared:
+            mask_cache = None
+            num_rows = len(positions)
+        return self._evaluate_query(query, resolve, num_rows,
+                                    mask_cache=mask_cache)
+
+    def _evaluate_query(self, query, resolve, num_rows, mask_cache=None):
+        """ Evaluate a query into a boolean mask, resolving names with a
+        function.
+
+        Raises
+        ------
+        InvalidQuery
+            If the query doesn't evaluate to a boolean for each of the num_rows
+            rows.
+        """
+        try:
+            compiled = compile_filter(query)
+            mask = compiled.evaluate(resolve, mask_cache=mask_cache,
+                                     data_version=self.source_data_version)
+        except UnsupportedExpression as e:
+            msg = "Evaluating filter {} with pandas: {}".format(query, e)
+            logger.debug(msg)
+            resolvers = {}
+            for name in set(IDENTIFIER_PATTERN.findall(query)) | {"index"}:
+                try:
+                    resolvers[name] = resolve(name)
+                except KeyError:
+                    pass
+
+            mask = to_mask(pd_eval(query, resolvers=[resolvers]))
+
+        if mask.dtype != bool or mask.shape != (num_rows,):
+            msg = "Filter expression {} doesn't evaluate to a boolean value " \
+                  "for each row.".format(query)
+            logger.error(msg)
+            raise InvalidQuery(msg)
+
+        return mask
+
+    def _resolve_filter_name(self, name, positions=None, data=None):
+        """ Returns the column (or index) a filter expression name refers to.
+
+        Parameters
+        ----------
+        name : str
+            Name used in the filter expression: a sanitized column name,
+            'index' or the name of the index.
+
+        positions : np.ndarray or None, optional
+            Positions of the source_df rows to return. Leave as None to return
+            all rows.
+
+        data : pd.DataFrame or None, optional
+            DataFrame with the source_df columns to read from. Defaults to the
+            source_df.
+
+        Raises
+        ------
+        KeyError
+            If the name doesn't refer to any column or to the index.
+        """
+        df = self.source_df if data is None else data
+        if name in self.column_name_map:
+            col = df[self.column_name_map[name]]
+            if positions is not None:
+                col = col.iloc[positions]
+            return col
+
+        index = df.index
+        if name == "index" or (index.name is not None and
+                               name == index.name):
+            if positions is not None:
+                index = index[positions]
+            return index
+
+        raise KeyError(name)
+
+    def _sort_df(self, df, sort_by_col):
+        """ Sort a DF along a sort_by_col_list entry, including the index.
+
+        Raises
+        ------
+        KeyError
+            If the column to sort along isn't found in the DataFrame.
+        """
+        if sort_by_col.endswith(REVERSED_SUFFIX):
+            sort_by_col = sort_by_col[:-len(REVERSED_SUFFIX)]
+            ascending = False
+        else:
+            ascending = True
+
+        if sort_by_col == self.index_name:
+            return df.sort_index(ascending=ascending)
 
-        return new_df
+        col_name = self.get_source_column_name(sort_by_col)
+        if col_name not in df.columns:
+            raise KeyError(sort_by_col)
+
+        return df.sort_values(by=col_name, ascending=ascending)
 
     def _validate_query(self, query):
         """ Make sure query is usable and not just user still typing.
@@ -465,26 +1869,124 @@ class DataFrameAnalyzer(DataElement):
         - If show_selected_only is True, only show what is selected. Otherwise,
         - If it is too long and max_displayed is set.
         """
-        filt_df = self.filtered_df
-        if filt_df is None:
+        filt_view = self.filtered_view
+        if filt_view is None:
             return
 
+        # Only gather the displayed rows:
         if self.show_selected_only:
-            displayed_df = filt_df.iloc[self.selected_idx, :]
-        elif 0 < self.num_displayed_rows < len(filt_df):
-            displayed_df = filt_df.iloc[:self.num_displayed_rows, :]
+            displayed_df = filt_view.take(
+                self.selection.ordered_positions
+            ).to_frame()
+        elif 0 < self.num_displayed_rows < len(filt_view):
+            displayed_df = filt_view.take(
+                slice(None, self.num_displayed_rows)
+            ).to_frame()
         else:
-            displayed_df = filt_df
+            displayed_df = self.filtered_df
 
         return displayed_df
 
+    def _compute_displayed_view(self):
+        """ Returns the view of the displayed rows: the filtered rows, or the
+        selected ones if show_selected_only.
+        """
+        filt_view = self.filtered_view
+        if filt_view is None or not self.show_selected_only:
+            return filt_view
+        return filt_view.take(self.selection.ordered_positions)
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_filter_computing(self):
+        return self._filter_scheduler.computing
+
+    def _get_filtered_df(self):
+        view = self.filtered_view
+        if view is None:
+            return None
+
+        materialized = self._materialized_filtered_df
+        if materialized is None or materialized[0] is not view:
+            materialized = (view, view.to_frame())
+            self._materialized_filtered_df = materialized
+        return materialized[1]
+
+    def _set_filtered_df(self, new_df):
+        """ Set the filtered data externally, bypassing the filter_exp.
+        """
+        if new_df is None:
+            self.filtered_view = None
+            return
+
+        # A view of all rows of new_df gathers into new_df itself:
+        self.filtered_view = DataFrameView(new_df)
+
+    def _get_selected_idx(self):
+        # Edits of the list (like appending a position) update the selection:
+        return TraitList(self.selection.ordered_positions.tolist(),
+                         notifiers=[self._selected_idx_edited])
+
+    def _set_selected_idx(self, positions):
+        """ Select rows by their positions along the filtered DF.
+
+        The selection grows to fit the positions, since they may be set (for
+        example by a plot) before the filtered DF is updated.
+        """
+        num_rows = self.selection.num_rows
+        if len(positions):
+            num_rows = max(num_rows, max(positions) + 1)
+        self.selection.set_positions(positions, num_rows=num_rows)
+
+    def _selected_idx_edited(self, trait_list, index, removed, added):
+        self.selected_idx = list(trait_list)
+
+    def _get_data_selected(self):
+        if self.filtered_view is None:
+            return []
+        return self.map_idx_to_df_index(self.selection.ordered_positions)
+
+    def _set_data_selected(self, index_vals):
+        self.selected_idx = self.map_df_index_to_idx(index_vals)
+
+    def _get_summary_df(self):
+        if self._summary_outdated:
+            self.compute_summary()
+        return self._summary_df
+
+    def _get_summary_error_df(self):
+        if self._summary_outdated:
+            self.compute_summary()
+        return self._summary_error_df
+
+    def _get_selection_summary_df(self):
+        if self._selection_summary_outdated:
+            self._selection_summary_df = self._summarize_selection()
+            self._selection_summary_outdated = False
+        return self._selection_summary_df
+
+    def _get_summary_categorical_df(self):
+        if self._categorical_summary_outdated:
+            self.compute_categorical_summary()
+        return self._summary_categorical_df
+
+    def _get_summary_categorical_error_df(self):
+        if self._categorical_summary_outdated:
+            self.compute_categorical_summary()
+        return self._summary_categorical_error_df
+
     # Traits initialization methods -------------------------------------------
 
     def _displayed_df_default(self):
         return self._compute_displayed_df()
 
-    def _filtered_df_default(self):
-        return self._compute_filtered_df()
+    def _displayed_view_default(self):
+        return self._compute_displayed_view()
+
+    def _filtered_view_default(self):
+        view = self._compute_filtered_view()
+        self._resize_selection(0 if view is None else len(view))
+        return view
 
     def _sort_by_col_list_default(self):
         if self.source_df is None:
@@ -495,11 +1997,20 @@ class DataFrameAnalyzer(DataElement):
         cols = [NO_SORTING_ENTRY, self.index_name,
                 self.index_name + REVERSED_SUFFIX]
 
-        for col in self.source_df.columns:
+        for col in self.column_name_map:
             cols.append(col)
             cols.append(col + REVERSED_SUFFIX)
         return cols
 
+    def _column_name_map_default(self):
+        if self.source_df is None:
+            return {}
+
+        return build_column_name_map(self.source_df.columns)
+
+    def __filter_lock_default(self):
+        return threading.Lock()
+
     def _filter_transformation_default(self):
         return lambda x: x
 
@@ -516,6 +2027,47 @@ class DataFrameAnalyzer(DataElement):
         return self.num_displayed_rows
 
 
+def acquire_sanitized_copy(source_df, convert_dtypes=False, sort_index=True,
+                           optimize=False, share=False):
+    """ Returns a DataHandle on a sanitized copy of a DataFrame, possibly
+    shared with other analyzers of the same data.
+
+    Parameters
+    ----------
+    source_df : pd.DataFrame
+        DataFrame to copy.
+
+    convert_dtypes, sort_index : bool, optional
+        Options of the copy (see copy_and_sanitize).
+
+    optimize : bool, optional
+        Whether to optimize the dtypes of the copy. The optimization report
+        is stored in the handle info, as "dtype_optimization_report".
+
+    share : bool, optional
+        Whether to look for (and store) the copy by the content of source_df,
+        which requires hashing all its values. Otherwise, the copy is private
+        to the caller.
+    """
+    def build_copy():
+        df = copy_and_sanitize(source_df, convert_dtypes=convert_dtypes,
+                               sort_index=sort_index)
+        info = {}
+        if optimize:
+            df, info["dtype_optimization_report"] = optimize_dtypes(df)
+        return df, info
+
+    store = get_data_store()
+    if not share:
+        df, info = build_copy()
+        return store.add(df, info=info)
+
+    options = (convert_dtypes, sort_index, optimize)
+    key = "{}:{}".format(content_key(source_df),
+                         "".join(str(int(option)) for option in options))
+    return store.get_or_add(key, build_copy)
+
+
 def copy_and_sanitize(source_df, convert_dtypes=False, sort_index=True):
     """ Prepare the source DataFrame to create a DataFrameAnalyzer.
 
@@ -525,36 +2077,148 @@ def copy_and_sanitize(source_df, convert_dtypes=False, sort_index=True):
       - Sort the DF by its index so the sorting tool is consistent.
       - Optionally: convert all columns to float, and skip columns where that's
         not possible.
+
+    Columns are copied on write: each one is copied once, by the first step
+    transforming it (or at the end if none does), rather than copying the
+    whole DF before transforming it.
     """
-    df = source_df.copy()
+    df = source_df.copy(deep=False)
 
     # Convert column names to be valid variable names (so they can be used in
     # filter expressions)
-    new_cols = []
-    for col in source_df.columns:
-        new_col = sanitize_string(col)
-        # Make sure the cleaning operation doesn't lead to a column collision:
-        new_col = add_suffix_if_exists(new_col, new_cols, suffix_patt="_{}")
-        new_cols.append(new_col)
+    df.columns = sanitize_column_names(source_df.columns)
 
-    df.columns = new_cols
+    # Sorting copies all columns:
+    copied = sort_index and not df.index.is_monotonic_increasing
+    if copied:
+        df = df.sort_index(ascending=True)
 
-    if convert_dtypes:
-        # Try to convert columns to floats
-        for col in df.columns:
+    for i, col in enumerate(df.columns):
+        if convert_dtypes:
+            # Try to convert columns to floats
             try:
-                df[col] = df[col].astype("float64")
+                df.isetitem(i, df.iloc[:, i].astype("float64"))
+                continue
             except ValueError as e:
                 msg = "Unable to convert column {} to floats (error was {})."
                 msg = msg.format(col, e)
                 logger.debug(msg)
-
-    if sort_index:
-        df = df.sort_index(ascending=True)
+        if not copied:
+            df.isetitem(i, df.iloc[:, i].copy())
 
     return df
 
 
+def sanitize_column_names(columns):
+    """ Returns list of column names converted to valid variable names.
+
+    Collisions created by the cleaning operation are avoided by adding a
+    numerical suffix.
+    """
+    new_cols = []
+    for col in columns:
+        new_col = sanitize_string(col)
+        # Make sure the cleaning operation doesn't lead to a column collision:
+        new_col = add_suffix_if_exists(new_col, new_cols, suffix_patt="_{}")
+        new_cols.append(new_col)
+
+    return new_cols
+
+
+def build_column_name_map(columns):
+    """ Returns a dict mapping sanitized column names to the column names.
+    """
+    return dict(zip(sanitize_column_names(columns), columns))
+
+
+def compute_sort_permutation(values):
+    """ Returns the positions of the values in (stable) ascending order.
+
+    Null values are placed last, in their original order.
+    """
+    values = Series(values).reset_index(drop=True)
+    if values.is_monotonic_increasing:
+        return np.arange(len(values))
+    return values.sort_values(kind="mergesort").index.to_numpy()
+
+
+def reverse_sort_permutation(permutation, num_nulls):
+    """ Returns the descending version of an ascending sort permutation.
+
+    The positions of the non-null values are reversed, but the null values
+    (last num_nulls positions) remain last.
+    """
+    num_values = len(permutation) - num_nulls
+    return np.concatenate([permutation[:num_values][::-1],
+                           permutation[num_values:]])
+
+
+def partial_sort_order(values, num_rows, ascending=True):
+    """ Returns the positions of the first num_rows values in sorted order,
+    followed by the positions of the other values in their original order.
+
+    The first positions are the same as with compute_sort_permutation (or its
+    reversed version), but computed in linear time with a partition.
+
+    Parameters
+    ----------
+    values : pd.Series
+        Values to sort.
+
+    num_rows : int
+        Number of values to sort.
+
+    ascending : bool, optional
+        Whether to sort the values in ascending or descending order.
+
+    Returns
+    -------
+    np.ndarray or None
+        Order of the values, or None if they can't be partially sorted
+        (non-numerical values or fewer non-null values than num_rows).
+    """
+    kind = values.dtype.kind
+    if kind not in "biufmM":
+        return None
+
+    if kind in "mM":
+        # The array's integers, since tz-aware values convert to objects:
+        keys = values.array.asi8.astype(np.float64)
+        keys[values.isnull().to_numpy()] = np.nan
+    else:
+        keys = values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if num_rows >= np.count_nonzero(~np.isnan(keys)):
+        return None
+
+    if not ascending:
+        # Reversing the array puts ties in reversed order like
+        # reverse_sort_permutation:
+        keys = -keys[::-1]
+
+    kth = np.partition(keys, num_rows - 1)[num_rows - 1]
+    top = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:num_rows - len(top)]
+    top = np.concatenate([top, ties])
+    top = top[np.lexsort((top, keys[top]))]
+    if not ascending:
+        top = len(keys) - 1 - top
+
+    others = np.ones(len(keys), dtype=bool)
+    others[top] = False
+    return np.concatenate([top, np.flatnonzero(others)])
+
+
+def relative_permutation(old_positions, new_positions, size):
+    """ Returns the positions of new_positions elements in old_positions.
+
+    Both arrays must contain the same (unique) positions, smaller than size.
+    """
+    rank = np.empty(size, dtype=np.intp)
+    rank[old_positions] = np.arange(len(old_positions))
+    return rank[new_positions]
+
+
 def compute_percentile(data, percent):
     """ Compute percentile for all float columns of a DF and return as Series.
     """
@@ -3,8 +3,8 @@ import logging
 from uuid import UUID
 import numpy as np
 
-from traits.api import Dict, Enum, Instance, Int, List, on_trait_change, \
-    Property, Set, Str
+from traits.api import Any, Bool, cached_property, Dict, Enum, Instance, \
+    Int, List, on_trait_change, Property, Set, Str
 from chaco.api import BasePlotContainer, Plot
 
 from app_common.std_lib.sys_utils import extract_traceback
@@ -12,17 +12,31 @@ from app_common.chaco.constraints_plot_container_manager import \
     ConstraintsPlotContainerManager
 from app_common.model_tools.data_element import DataElement
 
+from .dataframe_view import DataFrameView
 from .plot_descriptor import CONTAINER_IDX_REMOVAL, CUSTOM_PLOT_TYPE, \
     PlotDescriptor
 from ..plotting.plot_config import BaseSinglePlotConfigurator
-from ..plotting.plot_factories import DEFAULT_FACTORIES, \
-    DISCONNECTED_SELECTION_COLOR, HistogramPlotFactory, ScatterPlotFactory, \
-    SELECTION_COLOR, SELECTION_METADATA_NAME
+from ..plotting.plot_factories import BarPlotFactory, DEFAULT_FACTORIES, \
+    DISCONNECTED_SELECTION_COLOR, HeatmapPlotFactory, HistogramPlotFactory, \
+    LinePlotFactory, ScatterPlotFactory, SELECTION_COLOR, \
+    SELECTION_METADATA_NAME
 from ..plotting.api import HEATMAP_PLOT_TYPE
 from ..model.multi_canvas_manager import MultiCanvasManager
 
 logger = logging.getLogger(__name__)
 
+#: Factories of plots which don't depend on the order of the data rows. Other
+#: plots (including scatter plots, since selections are row positions) are
+#: rebuilt when the rows are reordered.
+ROW_ORDER_INSENSITIVE_FACTORIES = (HeatmapPlotFactory, HistogramPlotFactory)
+
+#: Factories of plots whose rendering depends on the order of the data rows
+ROW_ORDER_DEPENDENT_FACTORIES = (BarPlotFactory, LinePlotFactory)
+
+#: Factories of plots whose data arrays are columns of the data_source, so
+#: rows appended to the data_source can be appended to the plot data
+APPENDABLE_FACTORIES = (LinePlotFactory, ScatterPlotFactory)
+
 DATA_COLUMN_TYPES = ["Input", "Output", "Index"]
 
 
@@ -52,8 +66,17 @@ class DataFramePlotManager(DataElement):
     #: Source analyzer name, to reconnect during serialization/deserialization
     source_analyzer_id = Instance(UUID)
 
-    #: Initial data_source container to build ArrayPlotData instances from it
-    data_source = Instance(pd.DataFrame)
+    #: Rows to plot (for example the filtered_view of the source_analyzer).
+    #: Plots only gather the columns they use from it.
+    data_view = Instance(DataFrameView)
+
+    #: All rows and columns of the data_view, gathered into a DataFrame when
+    #: requested. Setting a DataFrame sets the data_view to all its rows.
+    data_source = Property(Instance(pd.DataFrame), depends_on="data_view")
+
+    #: Columns of the data_view, without rows, to select plotted columns from
+    #: in configurators
+    data_schema = Property(Instance(pd.DataFrame), depends_on="data_view")
 
     #: Description of the columns in data_source. Used to guess what to plot
     data_column_types = Dict(Str, Enum(DATA_COLUMN_TYPES))
@@ -79,16 +102,33 @@ class DataFramePlotManager(DataElement):
     #: Map of all inspector tools from their plot description id
     inspectors = Dict
 
+    #: Map of the range selection tools brushing the x column of plots, from
+    #: their plot description id
+    range_selectors = Dict
+
     #: List of indices selected
     index_selected = List
 
+    #: Ranges (low and high values) brushed in plots, by column name: they
+    #: restrict the source_analyzer's filtered data (see
+    #: DataFrameAnalyzer.brush_column)
+    brushed_ranges = Dict
+
     containers_in_use = Property(Set,
                                  depends_on="contained_plots:container_idx")
 
+    #: Whether the data_source change being processed only reorders its rows
+    _reordering_rows = Bool
+
+    #: Rows appended at the end of the data_source, during the data_source
+    #: change they cause
+    _appended_rows = Any
+
     def __init__(self, **traits):
         if "source_analyzer" in traits:
             traits["source_analyzer_id"] = traits["source_analyzer"].uuid
-            traits["data_source"] = traits["source_analyzer"].filtered_df
+            traits.pop("data_source", None)
+            traits["data_view"] = traits["source_analyzer"].filtered_view
 
         # Support passing a custom Chaco plot/container to the list of
         # contained plots:
@@ -100,7 +140,7 @@ class DataFramePlotManager(DataElement):
 
         super(DataFramePlotManager, self).__init__(**traits)
 
-        if self.contained_plots and self.data_source is not None:
+        if self.contained_plots and self.data_view is not None:
             self._create_initial_plots_from_descriptions()
 
         # Make sure the source analyzer and self are connected, so
@@ -169,8 +209,99 @@ class DataFramePlotManager(DataElement):
                                      "component.index.metadata_changed",
                                      remove=True)
 
+            if plot_desc.id in self.range_selectors:
+                tool = self.range_selectors.pop(plot_desc.id)
+                tool.on_trait_change(self._update_brushed_range, "selection",
+                                     remove=True)
+                if tool.selection is not None:
+                    self._set_brushed_range(plot_desc, None)
+
+    def requires_row_order(self):
+        """ Returns whether a plot's rendering depends on the data row order.
+        """
+        for desc in self.contained_plots:
+            if desc.frozen or desc.plot is None:
+                continue
+            if isinstance(desc.plot_factory, ROW_ORDER_DEPENDENT_FACTORIES):
+                return True
+        return False
+
+    def update_row_order(self, new_data):
+        """ Set the data_view to a version of it with reordered rows.
+
+        Plots which don't depend on the row order (histograms, heatmaps) are
+        not rebuilt.
+
+        Parameters
+        ----------
+        new_data : DataFrameView or pd.DataFrame
+            New data_view (or all rows of a DataFrame).
+        """
+        self._reordering_rows = True
+        try:
+            self.data_view = _as_view(new_data)
+        finally:
+            self._reordering_rows = False
+
+    def append_rows(self, new_data, appended_data):
+        """ Set the data_view to a version of it with rows appended.
+
+        Plots whose data arrays are data columns (scatter and line plots with
+        a single renderer) only receive the values of the appended rows. Other
+        plots are rebuilt.
+
+        Parameters
+        ----------
+        new_data : DataFrameView or pd.DataFrame
+            New data_view (or all rows of a DataFrame), ending with the
+            appended rows.
+
+        appended_data : DataFrameView or pd.DataFrame
+            Rows appended at the end of the data_view.
+        """
+        self._appended_rows = _as_view(appended_data)
+        try:
+            self.data_view = _as_view(new_data)
+        finally:
+            self._appended_rows = None
+
     # Private interface -------------------------------------------------------
 
+    def _append_plot_data(self, desc, appended_view):
+        """ Append the values of new rows to the data arrays of a plot.
+
+        Returns whether the plot could be updated that way.
+        """
+        factory = desc.plot_factory
+        if not isinstance(factory, APPENDABLE_FACTORIES) or \
+                len(factory.renderer_desc) != 1:
+            return False
+
+        config = desc.plot_config
+        col_names = [config.x_col_name, config.y_col_name]
+        if config.z_col_name:
+            col_names.append(config.z_col_name)
+        col_names += config.hover_col_names
+        arrays = desc.plot.data.arrays
+        if set(col_names) != set(arrays.keys()):
+            # Arrays aren't columns, like for plots colored by a column:
+            return False
+
+        config.data_source = self._get_plot_data(config)
+        if self.source_analyzer:
+            desc.data_filter = self.source_analyzer.filter_exp
+        else:
+            desc.data_filter = ""
+
+        appended_df = self._get_plot_data(config, view=appended_view)
+        new_arrays = {}
+        for col_name in set(col_names):
+            new_values = config.df_column2array(col_name, df=appended_df)
+            new_arrays[col_name] = np.concatenate([arrays[col_name],
+                                                   new_values])
+        desc.plot.data.update_data(new_arrays)
+        return True
+
     def _create_initial_plots_from_descriptions(self):
         """ Initialize from list of plot descriptions (which gets serialized).
         """
@@ -181,7 +312,8 @@ class DataFramePlotManager(DataElement):
                 desc.id = str(i)
                 # Set/sync config data sources unless frozen
                 if not desc.frozen:
-                    desc.plot_config.data_source = self.data_source
+                    config = desc.plot_config
+                    config.data_source = self._get_plot_data(config)
 
                 # The following attributes are only stored in the descriptors
                 # so they shouldn't be lost:
@@ -280,6 +412,16 @@ class DataFramePlotManager(DataElement):
         if position is None:
             position = self.next_plot_id
 
+        # Column names may be sanitized versions of the data_source's:
+        if self.source_analyzer and not config.column_name_map:
+            config.column_name_map = self.source_analyzer.column_name_map
+
+        # Configurators built from the data_schema only plot the data_view's
+        # rows once they know their columns:
+        if config.data_source is not None and \
+                config.data_source is self.data_schema:
+            config.data_source = self._get_plot_data(config)
+
         factory = self._factory_from_config(config)
         plot, desc = factory.generate_plot()
         if initial_creation:
@@ -322,6 +464,9 @@ class DataFramePlotManager(DataElement):
         if factory.inspector is not None:
             self.inspectors[desc.id] = factory.inspector
 
+        if factory.range_selector is not None:
+            self.range_selectors[desc.id] = factory.range_selector
+
         self.next_plot_id += 1
         return desc
 
@@ -367,6 +512,36 @@ class DataFramePlotManager(DataElement):
             config.plot_title = config.plot_title.format(i=pos)
             self._add_new_plot(config, position=pos, **kwargs)
 
+    def _get_plot_columns(self, config):
+        """ Returns the data_view columns a (single plot) configurator uses.
+
+        Names which aren't data_view columns (the index, or the columns of
+        melted data for bar plots) are skipped.
+        """
+        col_names = [config.x_col_name, config.y_col_name, config.z_col_name]
+        col_names += config.hover_col_names
+        col_names += getattr(config, "columns_to_melt", [])
+        known_cols = self.data_view.columns
+        columns = []
+        for col_name in col_names:
+            col_name = config.source_col_name(col_name)
+            if col_name in known_cols and col_name not in columns:
+                columns.append(col_name)
+        return columns
+
+    def _get_plot_data(self, config, view=None):
+        """ Returns the rows of the data_view (or of another view) a
+        configurator plots, with only the columns it uses.
+
+        All the rows of a DataFrame are returned as is, without gathering
+        them.
+        """
+        if view is None:
+            view = self.data_view
+        if view.is_full and isinstance(view.source, pd.DataFrame):
+            return view.source
+        return view.to_frame(columns=self._get_plot_columns(config))
+
     def _update_selection(self, object, name, old, new):
         """ Store the new selection and apply it to all inspectors.
         """
@@ -374,6 +549,29 @@ class DataFramePlotManager(DataElement):
         if self.index_selected != selection:
             self.index_selected = selection
 
+    def _update_brushed_range(self, tool, name, new):
+        """ A range was brushed (or cleared) in a plot: store it, unless the
+        plot is frozen.
+        """
+        for desc_id, range_selector in self.range_selectors.items():
+            if range_selector is tool:
+                desc = self.contained_plot_map[desc_id]
+                if not desc.frozen:
+                    self._set_brushed_range(desc, new)
+                return
+
+    def _set_brushed_range(self, desc, selection):
+        """ Set (or clear if selection is None) the range brushed along the x
+        column of a plot.
+        """
+        brushed_ranges = dict(self.brushed_ranges)
+        if selection is None:
+            brushed_ranges.pop(desc.x_col_name, None)
+        else:
+            low, high = sorted(selection)
+            brushed_ranges[desc.x_col_name] = (low, high)
+        self.brushed_ranges = brushed_ranges
+
     def _set_selection_to(self, tool, selection):
         for datasource_name in ["index", "value"]:
             datasource = getattr(tool.component, datasource_name)
@@ -384,6 +582,21 @@ class DataFramePlotManager(DataElement):
     def _get_containers_in_use(self):
         return {desc.container_idx for desc in self.contained_plots}
 
+    @cached_property
+    def _get_data_source(self):
+        if self.data_view is None:
+            return None
+        return self.data_view.to_frame()
+
+    def _set_data_source(self, new):
+        self.data_view = None if new is None else DataFrameView(new)
+
+    @cached_property
+    def _get_data_schema(self):
+        if self.data_view is None:
+            return None
+        return self.data_view.take(slice(0, 0)).to_frame()
+
     # Traits listeners --------------------------------------------------------
 
     @on_trait_change("contained_plots:container_idx")
@@ -415,30 +628,41 @@ class DataFramePlotManager(DataElement):
                                                   container=new_container)
 
     def _source_analyzer_changed(self):
-        self.data_source = self.source_analyzer.filtered_df
+        self.data_view = self.source_analyzer.filtered_view
 
-    def _data_source_changed(self, new_df):
-        """ Change the data source: update plot data & descriptions as needed.
+    def _data_view_changed(self):
+        """ Change the data view: update plot data & descriptions as needed.
 
         We can't rebuild the plots, because they are currently inserted in the
-        enable container.
-
-        FIXME: rebuilding histogram or scatters is unnecessary when sorting DF:
-         should we try to detect situations when a full rebuilding isn't
-         necessary.
+        enable container. If the new data only reorders the rows (see
+        update_row_order), plots which don't depend on the row order are
+        skipped. If rows were appended (see append_rows), plots with column
+        arrays only receive the new values. Each plot only gathers the columns
+        it uses.
         """
         for desc in self.contained_plots:
             if desc.frozen or desc.plot is None:
                 # The plot is not created yet or set to not change: skip
                 continue
 
+            if self._reordering_rows and isinstance(
+                    desc.plot_factory, ROW_ORDER_INSENSITIVE_FACTORIES):
+                # Keep the configuration in sync for future rebuilds only:
+                config = desc.plot_config
+                config.data_source = self._get_plot_data(config)
+                continue
+
+            if self._appended_rows is not None and self._append_plot_data(
+                    desc, self._appended_rows):
+                continue
+
             if self.source_analyzer:
                 desc.data_filter = self.source_analyzer.filter_exp
             else:
                 desc.data_filter = ""
 
             config = desc.plot_config
-            config.data_source = new_df
+            config.data_source = self._get_plot_data(config)
             old_factory = desc.plot_factory
             factory = self._factory_from_config(config)
 
@@ -472,7 +696,7 @@ class DataFramePlotManager(DataElement):
             # Plot type specific updates --------------------------------------
 
             elif isinstance(factory, HistogramPlotFactory):
-                x_arr = new_df[desc.x_col_name]
+                x_arr = config.data_source[desc.x_col_name]
                 num_bins = factory.plot_style['num_bins']
                 _, edges = factory.build_hist_data(desc.x_col_name, x_arr,
                                                    num_bins)
@@ -585,6 +809,10 @@ class DataFramePlotManager(DataElement):
             tool.component.index.metadata[SELECTION_METADATA_NAME] = \
                 self.index_selected
 
+    def _range_selectors_items_changed(self, event):
+        for tool in event.added.values():
+            tool.on_trait_change(self._update_brushed_range, "selection")
+
     @on_trait_change("contained_plots:frozen", post_init=True)
     def disconnect_selection(self, object, name, old, new):
         """ Since the data of frozen plots doesn't update, its selection
@@ -640,3 +868,11 @@ def embed_plot_in_desc(plot):
         raise ValueError(msg)
 
     return desc
+
+
+def _as_view(data):
+    """ Returns the view of all rows of a DataFrame, or the view passed.
+    """
+    if isinstance(data, pd.DataFrame):
+        return DataFrameView(data)
+    return data
@@ -0,0 +1,220 @@
+""" Lightweight view on the rows of a DataFrame, selected by their positions.
+
+A DataFrameView stores the source DataFrame and an array of row positions
+(O(rows) memory) instead of a copy of the selected rows. Columns are gathered
+only when a consumer asks for them, so that using 2 columns out of 300 only
+copies these 2 columns. Contiguous rows in their original order (for example
+selected by a range filter on the sorted index) are sliced without copying.
+"""
+import logging
+
+import numpy as np
+from pandas import DataFrame, Index
+
+logger = logging.getLogger(__name__)
+
+
+class DataFrameView(object):
+    """ Rows of a source DataFrame, selected and ordered by their positions.
+
+    Parameters
+    ----------
+    source : pd.DataFrame
+        DataFrame the rows are taken from. It must not be modified in place
+        while the view is in use.
+
+    positions : np.ndarray or None, optional
+        Positions of the rows of the view in the source DataFrame, in order.
+        Leave as None to view all rows in their original order.
+
+    data_key : hashable or None, optional
+        Key identifying the rows of the view (regardless of their order), if
+        known.
+    """
+    def __init__(self, source, positions=None, data_key=None):
+        if positions is not None:
+            positions = np.asarray(positions)
+            if positions.dtype.kind not in "iu":
+                msg = "View positions must be integers, not {}."
+                msg = msg.format(positions.dtype)
+                logger.exception(msg)
+                raise ValueError(msg)
+
+        self.source = source
+        self.positions = positions
+        self.data_key = data_key
+        self._index = None
+        self._row_slice = None
+
+    def __len__(self):
+        if self.positions is None:
+            return len(self.source)
+        return len(self.positions)
+
+    def __getitem__(self, key):
+        """ Returns a column as a Series, or a list of columns as a DataFrame.
+        """
+        if isinstance(key, (list, tuple, np.ndarray, Index)):
+            return self.to_frame(columns=key)
+        return self.column(key)
+
+    @property
+    def columns(self):
+        return self.source.columns
+
+    @property
+    def dtypes(self):
+        return self.source.dtypes
+
+    @property
+    def index_name(self):
+        return self.source.index.name
+
+    @property
+    def index(self):
+        """ Index of the rows of the view (computed once).
+        """
+        if self._index is None:
+            if self.positions is None:
+                self._index = self.source.index
+            else:
+                self._index = self.source.index[self.positions]
+        return self._index
+
+    @property
+    def row_slice(self):
+        """ Slice of the source rows of the view if they are contiguous and in
+        their original order, None otherwise (computed once).
+        """
+        if self._row_slice is None:
+            self._row_slice = _positions_to_slice(self.positions)
+        return self._row_slice or None
+
+    @property
+    def is_full(self):
+        """ Whether the view contains all source rows in their original order.
+        """
+        return self.positions is None
+
+    def column(self, name):
+        """ Returns the values of a column for the rows of the view.
+        """
+        col = self.source[name]
+        if self.positions is None:
+            return col
+        return col.iloc[self._get_row_indexer()]
+
+    def take(self, rows):
+        """ Returns the view of some rows of this view.
+
+        Parameters
+        ----------
+        rows : slice or sequence(int)
+            Rows to select, as positions along this view.
+        """
+        if self.positions is None:
+            positions = _take_positions(len(self.source), rows)
+        else:
+            positions = self.positions[rows]
+        return DataFrameView(self.source, positions)
+
+    def to_frame(self, columns=None):
+        """ Gather the rows of the view into a DataFrame.
+
+        No data is copied if the rows of the view are contiguous and in their
+        original order: the DataFrame may then share the data of the source,
+        so it must not be modified in place.
+
+        Parameters
+        ----------
+        columns : list or None, optional
+            Columns to gather. Leave as None to gather all columns.
+        """
+        df = self.source
+        if columns is None:
+            if self.positions is None:
+                return df
+            columns = df.columns
+        return gather_columns(df, list(columns), self._get_row_indexer())
+
+    def select_columns(self, include=None, exclude=None):
+        """ Returns the columns selected by dtype, like select_dtypes would.
+        """
+        empty = gather_columns(self.source, list(self.columns), slice(0, 0))
+        return empty.select_dtypes(include=include, exclude=exclude).columns
+
+    def _get_row_indexer(self):
+        """ Returns the slice of the rows of the view if possible (to gather
+        them without copying), their positions otherwise.
+        """
+        row_slice = self.row_slice
+        return self.positions if row_slice is None else row_slice
+
+
+def gather_columns(df, columns, rows=slice(None)):
+    """ Gather rows of columns of a DataFrame into a new DataFrame, one column
+    at a time.
+
+    Selecting several columns (or rows by position) of a DataFrame at once
+    first consolidates all its columns of the same dtype into one block,
+    copying the whole DataFrame (once per DataFrame). Gathering one column at
+    a time only copies the requested values, and nothing if the rows are a
+    slice.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to gather from.
+
+    columns : list
+        Columns to gather.
+
+    rows : slice or np.ndarray, optional
+        Rows to gather, as a slice or positions. Gather all rows by default.
+    """
+    if not df.columns.is_unique:
+        col_indexer = df.columns.get_indexer_for(columns)
+        return df.iloc[rows, col_indexer]
+
+    data = {name: df[name].iloc[rows].array for name in columns}
+    return DataFrame(data, index=df.index[rows], columns=columns, copy=False)
+
+
+def _take_positions(num_rows, rows):
+    """ Returns the positions of some rows out of num_rows, avoiding building
+    the positions of all rows when selecting a slice (a window of rows) or a
+    few rows.
+    """
+    if isinstance(rows, slice):
+        return np.arange(*rows.indices(num_rows))
+
+    rows = np.asarray(rows)
+    if rows.dtype == bool:
+        return np.arange(num_rows)[rows]
+
+    positions = rows.astype(np.intp, copy=False)
+    if len(positions) and (positions.min() < -num_rows or
+                           positions.max() >= num_rows):
+        msg = "Row positions must be between {} and {}."
+        msg = msg.format(-num_rows, num_rows - 1)
+        logger.exception(msg)
+        raise IndexError(msg)
+    return np.where(positions < 0, positions + num_rows, positions)
+
+
+def _positions_to_slice(positions):
+    """ Returns the slice equivalent to row positions, or False if they
+    aren't contiguous and increasing.
+    """
+    if positions is None:
+        return False
+
+    num_rows = len(positions)
+    if num_rows == 0:
+        return slice(0, 0)
+
+    start = int(positions[0])
+    if int(positions[-1]) - start != num_rows - 1 or \
+            not np.array_equal(positions, np.arange(start, start + num_rows)):
+        return False
+    return slice(start, start + num_rows)
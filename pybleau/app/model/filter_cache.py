@@ -0,0 +1,135 @@
+""" Caches of filter results, so known filter expressions (or filter clauses)
+aren't re-evaluated.
+"""
+from collections import OrderedDict
+import logging
+
+import numpy as np
+from traits.api import HasStrictTraits, Instance, Int
+
+logger = logging.getLogger(__name__)
+
+#: Default memory budget for the cached filter results, in bytes
+DEFAULT_FILTER_CACHE_SIZE = 256 * 1024 ** 2
+
+
+class MemoryBoundedCache(HasStrictTraits):
+    """ LRU cache of arrays computed from a filter expression, bounded by the
+    memory they use.
+
+    Arrays are keyed on the (normalized) expression they were computed from
+    and on the version of the source data they were computed on. When adding
+    an array exceeds the memory budget, the least recently used arrays are
+    evicted first. Stored arrays are made read-only since they may be shared
+    by multiple consumers.
+    """
+    #: Maximum number of bytes used by the cached arrays. Set to 0 to disable.
+    max_size = Int(DEFAULT_FILTER_CACHE_SIZE)
+
+    #: Number of bytes currently used by the cached arrays
+    size = Int
+
+    #: Cached arrays, ordered from least to most recently used
+    _cache = Instance(OrderedDict, ())
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, expression, data_version):
+        """ Returns the cached array for an expression or None if unknown.
+
+        Parameters
+        ----------
+        expression : str
+            Normalized filter expression.
+
+        data_version : int
+            Version of the source data the result must have been computed on.
+        """
+        key = (expression, data_version)
+        array = self._cache.get(key, None)
+        if array is not None:
+            # Mark as most recently used:
+            self._cache.move_to_end(key)
+        return array
+
+    def set(self, expression, data_version, array):
+        """ Store the array computed from an expression.
+
+        Returns
+        -------
+        np.ndarray
+            Array as stored in the cache.
+        """
+        array = self._prepare_array(array)
+        if array.nbytes > self.max_size:
+            return array
+
+        key = (expression, data_version)
+        self.pop(expression, data_version)
+        self._cache[key] = array
+        self.size += array.nbytes
+        self._evict()
+        return array
+
+    def pop(self, expression, data_version):
+        """ Remove an entry from the cache if present.
+        """
+        array = self._cache.pop((expression, data_version), None)
+        if array is not None:
+            self.size -= array.nbytes
+        return array
+
+    def clear(self):
+        """ Empty the cache.
+        """
+        self._cache.clear()
+        self.size = 0
+
+    # Private interface -------------------------------------------------------
+
+    def _prepare_array(self, array):
+        array = np.asarray(array)
+        array.flags.writeable = False
+        return array
+
+    def _evict(self):
+        """ Remove least recently used arrays until the budget is respected.
+        """
+        while self.size > self.max_size and self._cache:
+            key, array = self._cache.popitem(last=False)
+            self.size -= array.nbytes
+            msg = "Evicted result for '{}' from cache.".format(key[0])
+            logger.debug(msg)
+
+    # Traits listeners --------------------------------------------------------
+
+    def _max_size_changed(self):
+        self._evict()
+
+
+class FilterResultCache(MemoryBoundedCache):
+    """ LRU cache of filter results, bounded by the memory they use.
+
+    Results are stored as arrays of row positions along the source DataFrame
+    (not as filtered DataFrames), using the smallest integer type supporting
+    them.
+    """
+    def _prepare_array(self, array):
+        return compact_positions(array)
+
+
+def compact_positions(positions):
+    """ Returns read-only row positions using the smallest int type possible.
+    """
+    positions = np.asarray(positions)
+    if len(positions) and positions.max() < np.iinfo(np.int32).max:
+        positions = positions.astype(np.int32, copy=False)
+    else:
+        positions = positions.astype(np.int64, copy=False)
+
+    positions.flags.writeable = False
+    return positions
@@ -0,0 +1,554 @@
+""" Compiler turning DataFrameAnalyzer filter expressions into a tree of
+clauses evaluated as vectorized boolean masks.
+
+Filter expressions follow the pandas query syntax: comparisons (possibly
+chained) between columns (or the index) and literals, membership tests with
+'in' and 'not in', combined with 'and'/'&', 'or'/'|' and 'not'/'~'. Each
+comparison is a clause, evaluated into a boolean mask which can be cached
+(keyed on the clause and the source data version) so filters sharing clauses
+reuse each other's work. Clause masks are combined with bitwise operations.
+
+Comparisons of a sorted column (or index) with literals are range clauses:
+the conjunction of the range clauses of a filter selects a contiguous range
+of rows, found with binary searches (see CompiledFilter.split_range).
+
+Expressions using constructs the compiler doesn't support (arithmetic,
+function calls, backtick-quoted names, ...) raise an UnsupportedExpression and
+should be evaluated with pandas instead.
+"""
+import ast
+from io import StringIO
+import logging
+from numbers import Number
+import operator
+from tokenize import generate_tokens, OP, TokenError
+
+import numpy as np
+from pandas import BooleanDtype
+
+logger = logging.getLogger(__name__)
+
+COMPARISON_OPERATORS = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<",
+                        ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+                        ast.In: "in", ast.NotIn: "not in"}
+
+#: Operator to use when swapping the 2 sides of a comparison
+REFLECTED_OPERATORS = {"==": "==", "!=": "!=", "<": ">", "<=": ">=",
+                       ">": "<", ">=": "<="}
+
+COMPARISON_FUNCTIONS = {"==": operator.eq, "!=": operator.ne,
+                        "<": operator.lt, "<=": operator.le,
+                        ">": operator.gt, ">=": operator.ge}
+
+#: Numpy dtype kinds that can be compared to numbers directly in numpy
+NUMERICAL_KINDS = "biuf"
+
+#: Comparison operators selecting a contiguous range of sorted values
+RANGE_OPERATORS = {"==", "<", "<=", ">", ">="}
+
+
+class UnsupportedExpression(ValueError):
+    """ Raised when a filter can't be compiled or evaluated by the compiler.
+    """
+    pass
+
+
+class ColumnOperand(object):
+    """ Operand of a clause referring to a column (or the index) by name.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def key(self):
+        return self.name
+
+    def value(self, resolve):
+        try:
+            return resolve(self.name)
+        except KeyError:
+            msg = "Unknown name {} in filter.".format(self.name)
+            raise UnsupportedExpression(msg)
+
+
+class LiteralOperand(object):
+    """ Operand of a clause containing a literal value.
+    """
+    def __init__(self, value):
+        self.literal = value
+
+    @property
+    def key(self):
+        return repr(self.literal)
+
+    def value(self, resolve):
+        return self.literal
+
+
+class FilterNode(object):
+    """ Base class for the nodes of a compiled filter.
+    """
+    def evaluate(self, context):
+        """ Returns the boolean mask of the rows selected by the node.
+        """
+        raise NotImplementedError()
+
+    def iter_clauses(self):
+        """ Iterate over the leaf clauses below this node.
+        """
+        raise NotImplementedError()
+
+
+class ClauseNode(FilterNode):
+    """ Leaf clause: comparison between a column and a literal or a column.
+    """
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+        #: Whether the clause is (possibly indirectly) negated in its filter
+        self.negated = False
+
+    @property
+    def key(self):
+        """ Normalized description of the clause, used as a cache key.
+        """
+        return "{} {} {}".format(self.left.key, self.op, self.right.key)
+
+    @property
+    def columns(self):
+        return {operand.name for operand in (self.left, self.right)
+                if isinstance(operand, ColumnOperand)}
+
+    @property
+    def is_range(self):
+        """ Whether the clause compares a column with a literal, so it selects
+        a range of rows if the column is sorted.
+        """
+        return isinstance(self.left, ColumnOperand) and \
+            isinstance(self.right, LiteralOperand) and \
+            self.op in RANGE_OPERATORS
+
+    def evaluate(self, context):
+        return context.clause_mask(self)
+
+    def iter_clauses(self):
+        yield self
+
+    def search_range(self, resolve):
+        """ Returns the (start, stop) positions of the rows selected by this
+        range clause, with binary searches in its (sorted) column.
+
+        Returns None if the column and literal can't be searched (for example
+        strings compared to numbers).
+        """
+        values = self.left.value(resolve)
+        literal = self.right.literal
+        kind = values.dtype.kind
+        if not (kind in "iuf" and _is_plain_number(literal) or
+                kind == "M" and isinstance(literal, str)):
+            return None
+
+        try:
+            left = int(values.searchsorted(literal, side="left"))
+            right = int(values.searchsorted(literal, side="right"))
+        except (TypeError, ValueError) as e:
+            msg = "Failed to search clause {}: {}".format(self.key, e)
+            logger.debug(msg)
+            return None
+
+        num_rows = len(values)
+        return {"==": (left, right), "<": (0, left), "<=": (0, right),
+                ">": (right, num_rows), ">=": (left, num_rows)}[self.op]
+
+    def compute_mask(self, resolve):
+        """ Compute the boolean mask selected by this clause.
+
+        Parameters
+        ----------
+        resolve : callable
+            Function returning the Series (or Index) for a column name.
+
+        Returns
+        -------
+        tuple
+            The boolean mask, and whether some rows have a missing (pd.NA)
+            result, not selected by the mask.
+        """
+        left = self.left.value(resolve)
+        right = self.right.value(resolve)
+        try:
+            if self.op in ("in", "not in"):
+                if not isinstance(self.right, LiteralOperand):
+                    msg = "Membership test only supported against literals."
+                    raise UnsupportedExpression(msg)
+
+                values = right
+                if not isinstance(values, (list, tuple, set, frozenset)):
+                    values = [values]
+
+                mask = to_mask(left.isin(list(values))).astype(bool)
+                if self.op == "not in":
+                    mask = ~mask
+                return mask, False
+
+            if isinstance(self.right, LiteralOperand) and \
+                    _is_plain_number(right) and \
+                    isinstance(left.dtype, np.dtype) and \
+                    left.dtype.kind in NUMERICAL_KINDS:
+                # Fast path: pure numpy comparison
+                mask = COMPARISON_FUNCTIONS[self.op](np.asarray(left), right)
+                return mask, False
+
+            if isinstance(self.right, ColumnOperand):
+                # Compare arrays to avoid index alignment considerations:
+                left = _as_array(left)
+                right = _as_array(right)
+
+            return _comparison_mask(COMPARISON_FUNCTIONS[self.op](left, right))
+        except UnsupportedExpression:
+            raise
+        except Exception as e:
+            msg = "Failed to evaluate clause {}: {}".format(self.key, e)
+            logger.debug(msg)
+            raise UnsupportedExpression(msg)
+
+
+class BooleanColumnNode(FilterNode):
+    """ Leaf clause made of a boolean column used directly as a mask.
+    """
+    def __init__(self, name):
+        self.operand = ColumnOperand(name)
+        #: Whether the clause is (possibly indirectly) negated in its filter
+        self.negated = False
+
+    @property
+    def key(self):
+        return self.operand.key
+
+    @property
+    def columns(self):
+        return {self.operand.name}
+
+    def evaluate(self, context):
+        return context.clause_mask(self)
+
+    def iter_clauses(self):
+        yield self
+
+    def compute_mask(self, resolve):
+        values = self.operand.value(resolve)
+        if values.dtype != bool and not isinstance(values.dtype, BooleanDtype):
+            msg = "Column {} isn't boolean: it can't be used as a filter " \
+                  "clause.".format(self.operand.name)
+            raise UnsupportedExpression(msg)
+        return _comparison_mask(values)
+
+
+class BoolOpNode(FilterNode):
+    """ Node combining the masks of its children with 'and' or 'or'.
+    """
+    def __init__(self, op, children):
+        self.op = op
+        self.children = children
+
+    def evaluate(self, context):
+        combine = np.logical_and if self.op == "and" else np.logical_or
+        mask = None
+        for child in self.children:
+            child_mask = child.evaluate(context)
+            if mask is None:
+                # Don't modify the child's mask in place: it may be cached
+                mask = np.array(child_mask, dtype=bool)
+            else:
+                combine(mask, child_mask, out=mask)
+        return mask
+
+    def iter_clauses(self):
+        for child in self.children:
+            for clause in child.iter_clauses():
+                yield clause
+
+
+class NotNode(FilterNode):
+    """ Node negating the mask of its child.
+    """
+    def __init__(self, child):
+        self.child = child
+
+    def evaluate(self, context):
+        return ~self.child.evaluate(context)
+
+    def iter_clauses(self):
+        return self.child.iter_clauses()
+
+
+class EvaluationContext(object):
+    """ Data needed to evaluate a compiled filter, and cache of clause masks.
+    """
+    def __init__(self, resolve, mask_cache=None, data_version=None):
+        self.resolve = resolve
+        self.mask_cache = mask_cache
+        self.data_version = data_version
+
+    def clause_mask(self, clause):
+        """ Returns the mask of a clause, from the cache if available.
+        """
+        cache = self.mask_cache
+        if cache is not None:
+            mask = cache.get(clause.key, self.data_version)
+            if mask is not None:
+                return mask
+
+        mask, has_missing = clause.compute_mask(self.resolve)
+        if has_missing:
+            if clause.negated:
+                # Negating a missing result is still missing (not selected):
+                msg = "Clause {} has missing results and is negated.".format(
+                    clause.key)
+                raise UnsupportedExpression(msg)
+            # Not cached, so negated clauses can't read it:
+            return mask
+
+        if cache is not None:
+            mask = cache.set(clause.key, self.data_version, mask)
+        return mask
+
+
+class CompiledFilter(object):
+    """ Filter expression compiled into a tree of clauses.
+    """
+    def __init__(self, expression, root):
+        self.expression = expression
+        self.root = root
+
+    @property
+    def clauses(self):
+        """ List of the leaf clauses of the filter.
+        """
+        return list(self.root.iter_clauses())
+
+    @property
+    def columns(self):
+        """ Set of the names of the columns (or index) the filter uses.
+        """
+        columns = set()
+        for clause in self.root.iter_clauses():
+            columns.update(clause.columns)
+        return columns
+
+    def evaluate(self, resolve, mask_cache=None, data_version=None):
+        """ Evaluate the filter into a boolean mask.
+
+        Parameters
+        ----------
+        resolve : callable
+            Function returning the Series (or Index) for a column name, and
+            raising a KeyError for unknown names.
+
+        mask_cache : MemoryBoundedCache or None, optional
+            Cache of clause masks to use and populate.
+
+        data_version : int or None, optional
+            Version of the data being filtered, to key the clause masks on.
+
+        Raises
+        ------
+        UnsupportedExpression
+            If a clause can't be evaluated by the compiler.
+        """
+        context = EvaluationContext(resolve, mask_cache=mask_cache,
+                                    data_version=data_version)
+        return np.asarray(self.root.evaluate(context), dtype=bool)
+
+    def split_range(self, resolve, is_sorted):
+        """ Select rows with binary searches for the range clauses on sorted
+        columns combined (with 'and') at the top level of the filter.
+
+        Parameters
+        ----------
+        resolve : callable
+            Function returning the Series (or Index) for a column name, and
+            raising a KeyError for unknown names.
+
+        is_sorted : callable
+            Function returning whether the column (or index) of a name is
+            sorted in increasing order, without null values.
+
+        Returns
+        -------
+        tuple or None
+            None if the filter has no range clause on a sorted column.
+            Otherwise, the positions start and stop of the range of rows
+            selected by these clauses, and the CompiledFilter of the other
+            clauses to evaluate on these rows (None if there are none).
+        """
+        start, stop = 0, None
+        others = []
+        for node in _iter_conjunction(self.root):
+            found = None
+            if isinstance(node, ClauseNode) and node.is_range and \
+                    is_sorted(node.left.name):
+                found = node.search_range(resolve)
+
+            if found is None:
+                others.append(node)
+            else:
+                start = max(start, found[0])
+                stop = found[1] if stop is None else min(stop, found[1])
+
+        if stop is None:
+            return None
+
+        remainder = None
+        if others:
+            root = others[0] if len(others) == 1 else BoolOpNode("and",
+                                                                 others)
+            remainder = CompiledFilter(self.expression, root)
+        return start, max(start, stop), remainder
+
+
+def compile_filter(expression):
+    """ Compile a filter expression into a CompiledFilter.
+
+    Raises
+    ------
+    UnsupportedExpression
+        If the expression isn't valid Python syntax once '&' and '|' are
+        replaced, or uses constructs the compiler doesn't support.
+    """
+    try:
+        source = _replace_bitwise_booleans(expression.strip())
+        tree = ast.parse(source, mode="eval")
+    except (SyntaxError, TokenError) as e:
+        msg = "Failed to parse {}: {}".format(expression, e)
+        raise UnsupportedExpression(msg)
+
+    return CompiledFilter(expression, _build_node(tree.body))
+
+
+# Private utilities -----------------------------------------------------------
+
+
+def _replace_bitwise_booleans(expression):
+    """ Replace '&' and '|' by 'and' and 'or' (pandas query precedence).
+    """
+    pieces = []
+    last = 0
+    for token in generate_tokens(StringIO(expression).readline):
+        tok_type, string, (row, start), (_, end), _ = token
+        if tok_type == OP and string in ("&", "|"):
+            if row != 1:
+                msg = "Multi-line expressions aren't supported."
+                raise UnsupportedExpression(msg)
+            pieces.append(expression[last:start])
+            pieces.append(" and " if string == "&" else " or ")
+            last = end
+
+    pieces.append(expression[last:])
+    return "".join(pieces)
+
+
+def _iter_conjunction(node):
+    """ Iterate over the nodes combined with 'and' at the top of a tree.
+    """
+    if isinstance(node, BoolOpNode) and node.op == "and":
+        for child in node.children:
+            for sub_node in _iter_conjunction(child):
+                yield sub_node
+    else:
+        yield node
+
+
+def _build_node(node):
+    """ Convert a Python AST node into a FilterNode.
+    """
+    if isinstance(node, ast.BoolOp):
+        op = "and" if isinstance(node.op, ast.And) else "or"
+        return BoolOpNode(op, [_build_node(value) for value in node.values])
+
+    if isinstance(node, ast.UnaryOp) and \
+            isinstance(node.op, (ast.Not, ast.Invert)):
+        child = _build_node(node.operand)
+        for clause in child.iter_clauses():
+            clause.negated = True
+        return NotNode(child)
+
+    if isinstance(node, ast.Compare):
+        return _build_comparison(node)
+
+    if isinstance(node, ast.Name):
+        return BooleanColumnNode(node.id)
+
+    msg = "Unsupported filter element: {}".format(ast.dump(node))
+    raise UnsupportedExpression(msg)
+
+
+def _build_comparison(node):
+    """ Convert a (chained) comparison into a clause or a conjunction.
+    """
+    clauses = []
+    left = node.left
+    for op_node, right in zip(node.ops, node.comparators):
+        op = COMPARISON_OPERATORS[type(op_node)]
+        left_operand = _build_operand(left)
+        right_operand = _build_operand(right)
+        if isinstance(left_operand, LiteralOperand):
+            if isinstance(right_operand, LiteralOperand) or \
+                    op not in REFLECTED_OPERATORS:
+                msg = "Unsupported comparison in filter: {}".format(
+                    ast.dump(node))
+                raise UnsupportedExpression(msg)
+
+            # Normalize so the column is on the left side:
+            left_operand, right_operand = right_operand, left_operand
+            op = REFLECTED_OPERATORS[op]
+
+        clauses.append(ClauseNode(left_operand, op, right_operand))
+        left = right
+
+    if len(clauses) == 1:
+        return clauses[0]
+    return BoolOpNode("and", clauses)
+
+
+def _build_operand(node):
+    if isinstance(node, ast.Name):
+        return ColumnOperand(node.id)
+
+    try:
+        return LiteralOperand(ast.literal_eval(node))
+    except ValueError:
+        msg = "Unsupported operand in filter: {}".format(ast.dump(node))
+        raise UnsupportedExpression(msg)
+
+
+def to_mask(values):
+    """ Returns the result of a comparison as a numpy array, with the missing
+    values of nullable booleans (pd.NA) as False, like DataFrame.query.
+    """
+    if isinstance(getattr(values, "dtype", None), BooleanDtype):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values)
+
+
+def _comparison_mask(values):
+    """ Returns the boolean mask of the result of a comparison, and whether
+    it has missing values.
+    """
+    has_missing = isinstance(getattr(values, "dtype", None), BooleanDtype) \
+        and bool(values.isna().any())
+    return np.asarray(to_mask(values), dtype=bool), has_missing
+
+
+def _as_array(values):
+    """ Returns the array of a Series or Index, keeping extension arrays (so
+    nullable values compare to pd.NA rather than to objects).
+    """
+    if isinstance(values.dtype, np.dtype):
+        return np.asarray(values)
+    return values.array
+
+
+def _is_plain_number(value):
+    return isinstance(value, Number) and not isinstance(value, (bool, complex))
@@ -0,0 +1,129 @@
+""" Background evaluation of filters, keeping only the latest request.
+
+Filters are evaluated in a worker thread after a debounce delay, so that
+typing a filter expression doesn't evaluate every intermediate expression.
+Scheduling a new evaluation supersedes the pending one: if it hasn't started
+yet, it is cancelled, otherwise its result is dropped. Results are applied in
+the UI thread (see UICallQueue), or by the thread waiting for them if no UI
+is running.
+"""
+import threading
+
+from traits.api import Any, Bool, HasStrictTraits, Instance, Int
+
+from ..utils.ui_calls import UICallQueue
+
+
+class FilterScheduler(HasStrictTraits):
+    """ Runs evaluations in a worker thread, and hands the result of the
+    latest one back to the thread owning the traits.
+    """
+    #: Whether an evaluation is pending (scheduled, running or waiting for
+    #: its result to be applied)
+    computing = Bool
+
+    #: Token identifying the latest request: results of older ones are stale
+    request_id = Int
+
+    #: Timer running the pending evaluation
+    _worker = Any
+
+    #: Results of the evaluations, applied in the UI thread (or by the thread
+    #: waiting for them if no UI is running)
+    _results = Instance(UICallQueue, ())
+
+    def schedule(self, delay, evaluate, apply):
+        """ Evaluate in a worker thread after a delay, superseding the
+        pending evaluation.
+
+        Parameters
+        ----------
+        delay : float
+            Time to wait (in seconds) before evaluating.
+
+        evaluate : callable
+            Function called without arguments in the worker thread. It must
+            not modify any trait.
+
+        apply : callable
+            Function called with the result of evaluate and the exception it
+            raised (None if it succeeded), in the UI thread (or the thread
+            waiting for it), unless the request was superseded.
+        """
+        self.cancel()
+        self.computing = True
+        worker = threading.Timer(delay, self._run,
+                                 args=(self.request_id, evaluate, apply))
+        worker.daemon = True
+        self._worker = worker
+        worker.start()
+
+    def cancel(self):
+        """ Cancel the pending evaluation, if any: its result is dropped.
+        """
+        self.request_id += 1
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self.computing = False
+
+    def join(self, timeout=None):
+        """ Block until the pending evaluation is done (but not applied).
+        """
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def wait(self, timeout=None):
+        """ Block until the pending evaluation is done, and apply its result
+        if no UI is running.
+
+        Note: when a UI is running, the result is only applied once the UI
+        event loop processes it.
+        """
+        self.join(timeout)
+        return self.process_results()
+
+    def process_results(self):
+        """ Apply the results of the evaluations done so far, in the calling
+        thread.
+
+        Only needed when no UI is running: results are otherwise applied in
+        the UI thread as soon as they are available.
+
+        Returns
+        -------
+        bool
+            Whether any result was processed.
+        """
+        return self._results.process() > 0
+
+    # Private interface -------------------------------------------------------
+
+    def _run(self, request_id, evaluate, apply):
+        """ Evaluate a request in the worker thread and dispatch the result.
+        """
+        if request_id != self.request_id:
+            return
+
+        result = error = None
+        try:
+            result = evaluate()
+        except Exception as e:
+            error = e
+
+        if request_id != self.request_id:
+            # Superseded while evaluating:
+            return
+
+        self._results.dispatch(self._apply, request_id, apply, result, error)
+
+    def _apply(self, request_id, apply, result, error):
+        """ Apply the result of a request if it is still the latest one.
+        """
+        if request_id != self.request_id:
+            return
+
+        self._worker = None
+        self.computing = False
+        apply(result, error)
@@ -0,0 +1,85 @@
+""" Utilities to analyze the structure of DataFrameAnalyzer filter expressions.
+"""
+from io import StringIO
+import logging
+from tokenize import ENDMARKER, generate_tokens, NEWLINE, NL, TokenError
+
+logger = logging.getLogger(__name__)
+
+CONJUNCTION_OPERATORS = {"and", "&"}
+
+DISJUNCTION_OPERATORS = {"or", "|"}
+
+OPENING_BRACKETS = set("([{")
+
+CLOSING_BRACKETS = set(")]}")
+
+
+def split_conjunction(expression):
+    """ Split a filter expression into the clauses of its top level 'and'.
+
+    Following the pandas query syntax, '&' is treated like 'and'. Expressions
+    containing a top level 'or' (or '|') aren't a conjunction and are returned
+    as a single clause, and so are expressions that can't be tokenized.
+
+    Parameters
+    ----------
+    expression : str
+        Single line filter expression, as cleaned up by the analyzer.
+
+    Returns
+    -------
+    list(str)
+        List of the clauses, stripped of surrounding spaces.
+    """
+    expression = expression.strip()
+    clauses = []
+    depth = 0
+    clause_start = 0
+    try:
+        for token in generate_tokens(StringIO(expression).readline):
+            tok_type, string, (row, start), (_, end), _ = token
+            if tok_type in (ENDMARKER, NEWLINE, NL):
+                continue
+
+            if row != 1:
+                # Multi-line expressions aren't split:
+                return [expression]
+
+            if string in OPENING_BRACKETS:
+                depth += 1
+            elif string in CLOSING_BRACKETS:
+                depth -= 1
+            elif depth == 0 and string in DISJUNCTION_OPERATORS:
+                return [expression]
+            elif depth == 0 and string in CONJUNCTION_OPERATORS:
+                clauses.append(expression[clause_start:start].strip())
+                clause_start = end
+    except (TokenError, SyntaxError) as e:
+        msg = "Failed to tokenize expression {}: {}".format(expression, e)
+        logger.debug(msg)
+        return [expression]
+
+    clauses.append(expression[clause_start:].strip())
+    if not all(clauses):
+        # Incomplete expression:
+        return [expression]
+
+    return clauses
+
+
+def find_refining_clauses(new_clauses, old_clauses):
+    """ Returns the clauses to add to old_clauses to build new_clauses.
+
+    Returns None if the new conjunction doesn't contain all the old clauses
+    (i.e. it isn't a refinement of it), or if it doesn't add any clause.
+    """
+    old_clauses = set(old_clauses)
+    if not old_clauses.issubset(new_clauses):
+        return None
+
+    added = [clause for clause in new_clauses if clause not in old_clauses]
+    if not added:
+        return None
+
+    return added
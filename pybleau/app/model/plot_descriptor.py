@@ -1,11 +1,12 @@
 
 from chaco.base_plot_container import BasePlotContainer
 from traits.api import Any, Bool, Button, Enum, Event, HasStrictTraits, \
-    Instance, Int, Str
+    Instance, Int, on_trait_change, Str
 
 from pybleau.app.plotting.plot_config import BasePlotConfigurator
 from pybleau.app.plotting.base_factories import BasePlotFactory
 from ..plotting.api import PLOT_TYPES
+from .data_store import DataHandle, get_data_store
 
 CONTAINER_IDX_REMOVAL = "delete"
 
@@ -71,6 +72,10 @@ class PlotDescriptor(HasStrictTraits):
     #: Whether the plot should update on data_source change
     frozen = Bool
 
+    #: Handle on the data of the frozen plot in the DataStore, so frozen plots
+    #: of the same data (or of some of its columns) share it
+    data_handle = Instance(DataHandle)
+
     #: Launch the config editor
     edit_plot_style = Button("Edit")
 
@@ -79,6 +84,24 @@ class PlotDescriptor(HasStrictTraits):
 
     # Traits listeners --------------------------------------------------------
 
+    @on_trait_change("frozen, plot_config.data_source")
+    def update_data_handle(self):
+        """ Hold the data of the plot in the DataStore while it is frozen.
+        """
+        config = self.plot_config
+        data = None if config is None else config.data_source
+        handle = self.data_handle
+        if handle is not None and not handle.released and \
+                handle.data is data and self.frozen:
+            return
+
+        if handle is not None:
+            handle.release()
+        self.data_handle = None
+        if self.frozen and data is not None:
+            # Keyed by identity, so freezing doesn't hash the data:
+            self.data_handle = get_data_store().share(data)
+
     def _edit_plot_style_fired(self):
         ui = self.plot_config.plot_style.edit_traits(kind="livemodal")
         if ui.result:
@@ -0,0 +1,251 @@
+""" Selection of rows of a DataFrame, stored as a boolean mask.
+"""
+import logging
+
+import numpy as np
+from pandas import unique
+from traits.api import Array, Event, HasStrictTraits, Int, Property
+
+logger = logging.getLogger(__name__)
+
+
+class RowSelection(HasStrictTraits):
+    """ Set of selected row positions, backed by a boolean mask.
+
+    Membership tests, comparisons with lists of positions, toggling and
+    extending the selection are vectorized operations on the mask. The
+    order in which the rows were selected is kept too, for displaying them
+    in that order. The version is incremented every time the selection
+    changes, so consumers can detect changes in constant time.
+    """
+    #: Number of rows the selection applies to
+    num_rows = Property(Int, depends_on="_mask")
+
+    #: Number of rows selected
+    count = Int
+
+    #: Counter incremented every time the selected rows change
+    version = Int
+
+    #: Event fired when the selected rows change, with the increasing
+    #: positions of the rows added to and removed from the selection (None if
+    #: the number of rows changed too)
+    rows_changed = Event
+
+    #: Mask of the selected rows
+    _mask = Array(dtype=bool, shape=(None,), value=np.zeros(0, dtype=bool))
+
+    #: Selected positions, in the order they were selected
+    _order = Array(dtype=np.intp, shape=(None,),
+                   value=np.zeros(0, dtype=np.intp))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, position):
+        return 0 <= position < self.num_rows and bool(self._mask[position])
+
+    @property
+    def mask(self):
+        """ Read-only view of the mask of the selected rows.
+        """
+        mask = self._mask.view()
+        mask.flags.writeable = False
+        return mask
+
+    @property
+    def positions(self):
+        """ Array of the selected positions, in increasing order.
+        """
+        return np.sort(self._order)
+
+    @property
+    def ordered_positions(self):
+        """ Read-only array of the selected positions, in the order they were
+        selected.
+        """
+        order = self._order.view()
+        order.flags.writeable = False
+        return order
+
+    def set_positions(self, positions, num_rows=None):
+        """ Select exactly the positions provided, in that order.
+
+        Parameters
+        ----------
+        positions : sequence(int)
+            Positions to select.
+
+        num_rows : int or None, optional
+            Number of rows the selection applies to. Leave as None to keep
+            the current number of rows.
+        """
+        if num_rows is None:
+            num_rows = self.num_rows
+
+        order = _unique_in_order(self._validate_positions(positions,
+                                                          num_rows))
+        changed = not self.matches(order)
+        if not changed and np.array_equal(order, self._order):
+            if num_rows != self.num_rows:
+                # Resized, for example because rows were appended:
+                mask = np.zeros(num_rows, dtype=bool)
+                mask[order] = True
+                self._mask = mask
+            return
+
+        mask = np.zeros(num_rows, dtype=bool)
+        mask[order] = True
+        if changed:
+            self._set_mask(mask, order)
+        else:
+            # Same rows, selected in a different order:
+            self._mask = mask
+            self._order = order
+            self.version += 1
+
+    def extend(self, positions):
+        """ Add positions to the selection.
+        """
+        positions = _unique_in_order(
+            self._validate_positions(positions, self.num_rows)
+        )
+        added = positions[~self._mask[positions]]
+        if not len(added):
+            return
+
+        mask = self._mask.copy()
+        mask[added] = True
+        self._set_mask(mask, np.concatenate([self._order, added]))
+
+    def toggle(self, positions):
+        """ Select unselected positions and unselect selected positions.
+        """
+        positions = _unique_in_order(
+            self._validate_positions(positions, self.num_rows)
+        )
+        if not len(positions):
+            return
+
+        mask = self._mask.copy()
+        mask[positions] = ~mask[positions]
+        added = positions[mask[positions]]
+        order = np.concatenate([self._order[mask[self._order]], added])
+        self._set_mask(mask, order)
+
+    def clear(self):
+        """ Unselect all rows.
+        """
+        if self.count:
+            self._set_mask(np.zeros(self.num_rows, dtype=bool),
+                           np.array([], dtype=np.intp))
+
+    def reorder(self, permutation):
+        """ Keep the same rows selected after the rows were reordered.
+
+        The rows selected don't change, so rows_changed isn't fired, but the
+        version is incremented since their positions change.
+
+        Parameters
+        ----------
+        permutation : np.ndarray
+            Previous positions of the rows, in their new order. Rows beyond
+            the permutation are dropped from the selection.
+        """
+        permutation = self._validate_positions(permutation, self.num_rows)
+        new_positions = np.full(self.num_rows, -1, dtype=np.intp)
+        new_positions[permutation] = np.arange(len(permutation))
+        order = new_positions[self._order]
+        order = order[order >= 0]
+        mask = np.zeros(len(permutation), dtype=bool)
+        mask[order] = True
+        self._mask = mask
+        self._order = order
+        self.count = len(order)
+        self.version += 1
+
+    def matches(self, positions):
+        """ Returns whether the positions provided are exactly the selection.
+
+        Order and duplicates are ignored.
+        """
+        positions = np.asarray(positions, dtype=np.intp).ravel()
+        if not len(positions):
+            return self.count == 0
+
+        if positions.min() < 0 or positions.max() >= self.num_rows:
+            return False
+
+        if not self._mask[positions].all():
+            return False
+        return len(unique(positions)) == self.count
+
+    def labels(self, index):
+        """ Returns the labels of the selected rows along an index, in the
+        order they were selected.
+        """
+        return index[self._order]
+
+    # Private interface -------------------------------------------------------
+
+    def _set_mask(self, mask, order):
+        old_mask = self._mask
+        self._mask = mask
+        self._order = order
+        self.count = len(order)
+        self.version += 1
+        if len(old_mask) != len(mask):
+            self.rows_changed = None
+        else:
+            changed = old_mask != mask
+            self.rows_changed = (np.flatnonzero(changed & mask),
+                                 np.flatnonzero(changed & old_mask))
+
+    @staticmethod
+    def _validate_positions(positions, num_rows):
+        positions = np.asarray(positions, dtype=np.intp).ravel()
+        if len(positions) and (positions.min() < 0 or
+                               positions.max() >= num_rows):
+            msg = "Selected positions must be between 0 and {}."
+            msg = msg.format(num_rows - 1)
+            logger.exception(msg)
+            raise IndexError(msg)
+        return positions
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_num_rows(self):
+        return len(self._mask)
+
+
+def labels_to_positions(index, labels):
+    """ Returns the (increasing) positions of labels along an index.
+
+    Labels that aren't found are ignored. Uses the index's hash table, so
+    mapping k labels costs O(k) once the index is hashed.
+    """
+    if not index.is_unique:
+        return np.flatnonzero(index.isin(labels))
+
+    positions = index.get_indexer(labels)
+    return np.unique(positions[positions >= 0])
+
+
+def same_elements(values1, values2):
+    """ Returns whether 2 sequences of hashable values contain the same
+    elements.
+
+    Order and duplicates are ignored, like when comparing sets (which takes
+    linear time, unlike sorting the values).
+    """
+    if len(values1) == 0 or len(values2) == 0:
+        return len(values1) == len(values2)
+
+    return set(values1) == set(values2)
+
+
+def _unique_in_order(positions):
+    """ Returns the positions without duplicates, in the order of their first
+    occurrence (hashing them, in linear time).
+    """
+    return unique(positions).astype(np.intp, copy=False)
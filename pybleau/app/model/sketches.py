@@ -0,0 +1,321 @@
+""" Mergeable sketches summarizing large columns in bounded memory.
+
+- KLLSketch: quantiles, with a deterministic bound on the rank error,
+- HyperLogLog: number of distinct values, with a relative standard error,
+- HeavyHittersSketch: most frequent values and their counts (Misra-Gries),
+  with a bound on the count errors.
+
+All sketches are updated with arrays of values (vectorized), and can be merged
+so that sketches built on separate chunks of data can be combined into the
+sketch of their union.
+"""
+import logging
+
+import numpy as np
+from pandas import factorize, isnull, Series
+from pandas.util import hash_array
+
+logger = logging.getLogger(__name__)
+
+#: Default number of items kept in the top compactor of a KLLSketch
+DEFAULT_KLL_SIZE = 200
+
+#: Default number of register index bits of a HyperLogLog
+DEFAULT_HLL_PRECISION = 12
+
+#: Default number of counters of a HeavyHittersSketch
+DEFAULT_HEAVY_HITTERS_CAPACITY = 100
+
+#: Ratio between the capacities of successive KLL compactors
+KLL_CAPACITY_RATIO = 2. / 3.
+
+
+class KLLSketch(object):
+    """ Quantile sketch made of a hierarchy of compactors (Karnin, Lang and
+    Liberty).
+
+    Items at level h stand for 2 ** h values. When a level exceeds its
+    capacity, its items are sorted and every other item (starting at a random
+    offset) is promoted to the next level. Each such compaction moves the rank
+    of any value by at most the weight of the compacted level, so the sum of
+    these weights is a deterministic bound on the rank error of quantiles.
+
+    NaN values are ignored.
+
+    Parameters
+    ----------
+    k : int, optional
+        Capacity of the top compactor, controlling the accuracy and size.
+
+    seed : int or None, optional
+        Seed of the random offsets used when compacting.
+    """
+    def __init__(self, k=DEFAULT_KLL_SIZE, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self.max_rank_error = 0
+        self._random = np.random.RandomState(seed)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def rank_error(self):
+        """ Bound on the rank error of quantiles, as a fraction of the count.
+        """
+        if not self.count:
+            return 0.
+        # Add the resolution of the heaviest items to the compaction errors:
+        top_weight = 2 ** (len(self.levels) - 1)
+        return (self.max_rank_error + top_weight) / float(self.count)
+
+    def update(self, values):
+        """ Add an array of values to the sketch.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """ Merge another sketch into this one (in place).
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+
+        self.count += other.count
+        self.max_rank_error += other.max_rank_error
+        self._compress()
+        return self
+
+    def copy(self):
+        new = KLLSketch(k=self.k)
+        new.count = self.count
+        new.levels = [items.copy() for items in self.levels]
+        new.max_rank_error = self.max_rank_error
+        new._random = self._random
+        return new
+
+    def quantiles(self, quantiles):
+        """ Returns estimates of quantiles (between 0 and 1) of the values.
+
+        The rank of each estimate is within rank_error (as a fraction of the
+        count) of the rank of the exact quantile.
+        """
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if not self.count:
+            return np.full(quantiles.shape, np.nan)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2. ** h)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="mergesort")
+        items = items[order]
+        cum_weights = np.cumsum(weights[order])
+        # Rank (0-based) of each quantile, as in linear interpolation:
+        ranks = np.clip(quantiles, 0., 1.) * (cum_weights[-1] - 1)
+        idx = np.searchsorted(cum_weights, ranks, side="right")
+        return items[np.minimum(idx, len(items) - 1)]
+
+    def quantile_bounds(self, quantiles):
+        """ Returns the range of values each quantile estimate may stand for.
+
+        Returns
+        -------
+        tuple(np.ndarray, np.ndarray)
+            Values of the quantiles shifted by -rank_error and +rank_error.
+        """
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        error = self.rank_error
+        return self.quantiles(quantiles - error), \
+            self.quantiles(quantiles + error)
+
+    # Private interface -------------------------------------------------------
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * KLL_CAPACITY_RATIO ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                items = np.sort(items)
+                # Compact an even number of items, keep the odd one out:
+                num_compacted = len(items) - len(items) % 2
+                offset = self._random.randint(2)
+                promoted = items[offset:num_compacted:2]
+                self.levels[h] = items[num_compacted:]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1],
+                                                     promoted])
+                self.max_rank_error += 2 ** h
+            h += 1
+
+
+class HyperLogLog(object):
+    """ Estimator of the number of distinct values (Flajolet et al.).
+
+    Values are hashed with pandas' hash_array: the first `precision` bits of
+    each hash select a register, which keeps the maximum position of the
+    first 1 bit in the rest of the hash. Null values are ignored.
+
+    Parameters
+    ----------
+    precision : int, optional
+        Number of bits selecting a register (between 4 and 16). The sketch
+        uses 2 ** precision bytes.
+    """
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            msg = "HyperLogLog precision must be between 4 and 16, not {}."
+            msg = msg.format(precision)
+            logger.exception(msg)
+            raise ValueError(msg)
+
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        """ Relative standard error of the estimate.
+        """
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, values):
+        """ Add an array of values to the sketch.
+        """
+        values = np.asarray(values)
+        if values.dtype == object:
+            values = values[~isnull(values)]
+        elif values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        hashes = hash_array(values)
+        num_bits = 64 - self.precision
+        register_idx = (hashes >> np.uint64(num_bits)).astype(np.intp)
+        remaining = hashes & np.uint64(2 ** num_bits - 1)
+        # num_bits <= 60 bits values are converted to floats exactly enough
+        # for their base 2 logarithm to give the position of their first 1:
+        with np.errstate(divide="ignore"):
+            first_bit = np.floor(np.log2(remaining.astype(np.float64)))
+        ranks = np.where(remaining == 0, num_bits + 1,
+                         num_bits - first_bit).astype(np.uint8)
+        np.maximum.at(self.registers, register_idx, ranks)
+        return self
+
+    def merge(self, other):
+        """ Merge another sketch into this one (in place).
+        """
+        if other.precision != self.precision:
+            msg = "Can't merge HyperLogLogs of different precisions."
+            logger.exception(msg)
+            raise ValueError(msg)
+
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def copy(self):
+        new = HyperLogLog(precision=self.precision)
+        new.registers = self.registers.copy()
+        return new
+
+    def estimate(self):
+        """ Returns the estimated number of distinct values.
+        """
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1. + 1.079 / m)
+        raw = alpha * m ** 2 / np.sum(2. ** -self.registers.astype(np.float64))
+        num_zeros = np.count_nonzero(self.registers == 0)
+        if raw <= 2.5 * m and num_zeros:
+            # Small range correction (linear counting):
+            return m * np.log(m / num_zeros)
+        return raw
+
+
+class HeavyHittersSketch(object):
+    """ Counts of the most frequent values (Misra-Gries summary).
+
+    At most `capacity` counters are kept. When there are more, the
+    (capacity + 1)-th largest count is subtracted from all counters and non
+    positive counters are dropped. Counts are therefore underestimated by at
+    most max_count_error, which is bounded by count / (capacity + 1). Merging
+    two sketches follows the same procedure (Agarwal et al.). Null values are
+    ignored.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        Maximum number of counters kept.
+    """
+    def __init__(self, capacity=DEFAULT_HEAVY_HITTERS_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.max_count_error = 0
+        self.counters = Series([], dtype=np.int64)
+
+    def update(self, values):
+        """ Add an array of values to the sketch.
+        """
+        codes, uniques = factorize(np.asarray(values))
+        valid_codes = codes[codes >= 0]
+        if not len(valid_codes):
+            return self
+
+        counts = np.bincount(valid_codes, minlength=len(uniques))
+        self.count += len(valid_codes)
+        self._add_counters(Series(counts, index=uniques))
+        return self
+
+    def merge(self, other):
+        """ Merge another sketch into this one (in place).
+        """
+        self.count += other.count
+        self.max_count_error += other.max_count_error
+        self._add_counters(other.counters)
+        return self
+
+    def copy(self):
+        new = HeavyHittersSketch(capacity=self.capacity)
+        new.count = self.count
+        new.max_count_error = self.max_count_error
+        new.counters = self.counters.copy()
+        return new
+
+    def most_frequent(self, num_values=2):
+        """ Returns the (value, estimated count) pairs of the most frequent
+        values, most frequent first.
+
+        Values with equal counts are ranked by order of first appearance.
+        """
+        counters = self.counters.sort_values(ascending=False, kind="mergesort")
+        return list(counters.iloc[:num_values].items())
+
+    # Private interface -------------------------------------------------------
+
+    def _add_counters(self, counters):
+        if len(self.counters):
+            counters = self.counters.add(counters, fill_value=0)
+            counters = counters.astype(np.int64)
+
+        if len(counters) > self.capacity:
+            values = counters.to_numpy()
+            threshold = -np.partition(-values, self.capacity)[self.capacity]
+            counters = counters - threshold
+            counters = counters[counters > 0]
+            self.max_count_error += int(threshold)
+
+        self.counters = counters
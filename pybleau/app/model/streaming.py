@@ -0,0 +1,212 @@
+""" Support for streaming rows into a DataFrame.
+
+Appending rows with pandas.concat copies the whole DataFrame, so streaming m
+rows at a time into n rows costs O(n) per append. An AppendableFrame stores
+the columns (and the index) in buffers with spare capacity instead, doubled
+when full: each append only copies the new rows (amortized), and returns a
+new DataFrame viewing the first rows of the buffers. DataFrames returned
+earlier keep seeing their own rows, since the buffers are only written past
+them.
+
+pandas consolidates the columns of a DataFrame into one block per dtype (a
+copy) the first time several of its columns are selected at once, so the
+DataFrames of an AppendableFrame should be read one column at a time (see
+gather_columns in dataframe_view.py).
+"""
+import logging
+
+import numpy as np
+from pandas import concat, DataFrame, Index, MultiIndex, RangeIndex
+
+logger = logging.getLogger(__name__)
+
+
+class AppendableFrame(object):
+    """ DataFrame growing by appended rows, without copying its rows.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Initial rows. They aren't copied until rows are first appended.
+    """
+    def __init__(self, frame):
+        #: Current DataFrame, viewing the first rows of the buffers
+        self.frame = frame
+
+        # Buffers of the columns with a numpy dtype, by column name, and of
+        # the index. Created when rows are first appended:
+        self._buffers = {}
+        self._index_buffer = None
+
+    def append(self, new_rows):
+        """ Append rows to the frame.
+
+        Columns with an extension dtype (categories, nullable integers...) or
+        whose dtype changes (like ints receiving floats) are concatenated, as
+        by pandas.concat.
+
+        Parameters
+        ----------
+        new_rows : pd.DataFrame
+            Rows to append, with the columns of the frame, in the same order.
+
+        Returns
+        -------
+        pd.DataFrame
+            The new frame.
+        """
+        frame = self.frame
+        if not frame.columns.is_unique:
+            self._buffers.clear()
+            self.frame = concat([frame, new_rows])
+            return self.frame
+
+        num_rows = len(frame) + len(new_rows)
+        data = {}
+        for name in frame.columns:
+            old, new = frame[name], new_rows[name]
+            if _is_bufferable(old, new):
+                data[name] = self._append_to_buffer(name, old.to_numpy(),
+                                                    new.to_numpy(), num_rows)
+            else:
+                self._buffers.pop(name, None)
+                data[name] = concat([old, new], ignore_index=True).array
+
+        index = self._append_index(frame.index, new_rows.index, num_rows)
+        self.frame = DataFrame(data, index=index, columns=frame.columns,
+                               copy=False)
+        return self.frame
+
+    # Private interface -------------------------------------------------------
+
+    def _append_index(self, index, new_index, num_rows):
+        """ Returns the index of the frame with the appended rows.
+        """
+        if isinstance(index, RangeIndex):
+            step = index.step
+            stop = index.stop + len(new_index) * step
+            if new_index.equals(RangeIndex(index.stop, stop, step)):
+                return RangeIndex(index.start, stop, step, name=index.name)
+        elif not isinstance(index, MultiIndex) and \
+                _is_bufferable(index, new_index):
+            self._index_buffer = _append_values(
+                self._index_buffer, index.to_numpy(), new_index.to_numpy(),
+                num_rows
+            )
+            return Index(self._index_buffer[:num_rows], dtype=index.dtype,
+                         name=index.name, copy=False)
+
+        self._index_buffer = None
+        return index.append(new_index)
+
+    def _append_to_buffer(self, name, old_values, new_values, num_rows):
+        """ Returns the values of a column with the appended rows, written
+        into its buffer.
+        """
+        buffer = _append_values(self._buffers.get(name, None), old_values,
+                                new_values, num_rows)
+        self._buffers[name] = buffer
+        return buffer[:num_rows]
+
+
+def align_appended_rows(new_rows, frame, index_sorted=False,
+                        sanitize_columns=None):
+    """ Validate rows to append to a DataFrame and align their columns on it.
+
+    Parameters
+    ----------
+    new_rows : pd.DataFrame
+        Rows to append, with the columns of the frame (possibly in another
+        order) and index values not already in the frame.
+
+    frame : pd.DataFrame
+        DataFrame the rows are appended to.
+
+    index_sorted : bool, optional
+        Whether the frame index is sorted. If so, index values appended in
+        order can't be in it already, which skips looking them up.
+
+    sanitize_columns : callable or None, optional
+        Function sanitizing column names, applied to the columns of the new
+        rows if they don't match the frame's (for frames whose column names
+        were sanitized).
+
+    Returns
+    -------
+    pd.DataFrame
+        New rows, with the columns of the frame in the same order.
+
+    Raises
+    ------
+    ValueError
+        If the columns don't match or if index values are already used.
+    """
+    if not isinstance(new_rows, DataFrame):
+        msg = "Rows to append must be a DataFrame, not a {}."
+        msg = msg.format(type(new_rows))
+        logger.exception(msg)
+        raise ValueError(msg)
+
+    columns = list(frame.columns)
+    if set(new_rows.columns) != set(columns):
+        new_cols = list(new_rows.columns)
+        if sanitize_columns is not None:
+            new_cols = sanitize_columns(new_cols)
+        if set(new_cols) != set(columns):
+            msg = "The columns of the rows to append ({}) don't match " \
+                  "the source data's columns ({})."
+            msg = msg.format(list(new_rows.columns), columns)
+            logger.exception(msg)
+            raise ValueError(msg)
+        new_rows = new_rows.set_axis(new_cols, axis=1)
+
+    index = new_rows.index
+    in_order = index_sorted and index_appended_in_order(frame.index, index)
+    if not index.is_unique or (not in_order and (
+            frame.index.get_indexer(index) >= 0).any()):
+        msg = "The index values of the rows to append must be unique and" \
+              " not already be in the source data."
+        logger.exception(msg)
+        raise ValueError(msg)
+
+    return new_rows[columns]
+
+
+def index_appended_in_order(index, new_index):
+    """ Returns whether appending new_index to a sorted index keeps it sorted.
+    """
+    if not new_index.is_monotonic_increasing:
+        return False
+    if len(index) == 0 or len(new_index) == 0:
+        return True
+    try:
+        return bool(new_index[0] > index[-1])
+    except TypeError:
+        return False
+
+
+def _is_bufferable(old, new):
+    """ Returns whether values (of a Series or Index) with a numpy dtype can
+    receive new values without changing dtype.
+    """
+    return isinstance(old.dtype, np.dtype) and old.dtype == new.dtype
+
+
+def _append_values(buffer, old_values, new_values, num_rows):
+    """ Write new values past the old ones in a buffer, and returns the
+    buffer.
+
+    The buffer is replaced by one of twice the capacity when it is too small
+    (or missing), so that the old values are copied in amortized constant
+    time per appended value.
+    """
+    num_old = len(old_values)
+    if buffer is None or len(buffer) < num_rows:
+        capacity = num_old if buffer is None else len(buffer)
+        capacity = max(num_rows, 2 * capacity)
+        grown = np.empty(capacity, dtype=old_values.dtype)
+        grown[:num_old] = old_values
+        buffer = grown
+
+    buffer[num_old:num_rows] = new_values
+    return buffer
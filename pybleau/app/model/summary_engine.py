@@ -0,0 +1,1139 @@
+""" Engines computing the summary statistics of a DataFrame.
+
+All plain numerical columns (ints and floats) are converted to a single float
+block, from which the count, mean, standard deviation, min and max are
+computed with vectorized operations along the rows, and all requested
+percentiles with a single call to np.nanquantile. Results are cached per
+column and per data key, so that recomputing the summary of the same data
+(for example after re-sorting it, or after adding a percentile) only computes
+what is missing.
+
+Categorical columns are factorized once (or their codes used directly for
+the category dtype), and their summary derived from the value counts.
+
+Columns (or blocks of columns) are independent, so they can be summarized in
+parallel in a thread pool (see get_shared_executor): NumPy and pandas release
+the GIL for most of the work.
+
+The SketchSummaryEngine computes approximate summaries, with error bounds,
+from mergeable sketches built per chunk of rows (see sketches.py).
+
+The IncrementalSummary summarizes a set of rows which changes by small steps
+(like a growing selection), from the rows added and removed at each step.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+import os
+import threading
+import warnings
+
+import numpy as np
+from pandas import CategoricalDtype, concat, DataFrame, factorize, Series
+from traits.api import Any, Array, Callable, HasStrictTraits, Instance, \
+    Int, List
+
+from .chunked_table import DataFrameTable
+from .sketches import DEFAULT_HEAVY_HITTERS_CAPACITY, DEFAULT_HLL_PRECISION, \
+    DEFAULT_KLL_SIZE, HeavyHittersSketch, HyperLogLog, KLLSketch
+
+logger = logging.getLogger(__name__)
+
+#: Summary elements computed by the engine, besides percentiles
+MOMENT_ELEMENTS = ["count", "mean", "std", "min", "max"]
+
+#: Numpy dtype kinds summarized by the vectorized engine
+ENGINE_DTYPE_KINDS = "iuf"
+
+#: Elements of the categorical summary
+CATEGORICAL_ELEMENTS = ['count', 'unique', 'top', 'freq', 'next', 'next_freq']
+
+#: Default number of numerical columns summarized by each thread pool task
+DEFAULT_COLUMN_BLOCK_SIZE = 64
+
+# Entries of the cached column statistics holding the quantile sketch of the
+# column, and the error bounds of the percentiles estimated from it:
+_SKETCH_ENTRY = "_quantile_sketch"
+
+_ERRORS_ENTRY = "_errors"
+
+# Thread pools shared by all summaries, by number of threads:
+_shared_executors = {}
+
+_shared_executors_lock = threading.Lock()
+
+
+class NumericalSummaryEngine(HasStrictTraits):
+    """ Computes (and caches) numerical summaries like DataFrame.describe.
+
+    Percentiles can't be merged when rows are appended (see append_data), so
+    a KLLSketch of each column is kept up to date instead, from which the
+    percentiles of the data with appended rows are estimated (with error
+    bounds, see error_bounds).
+    """
+    #: Maximum number of data keys for which column statistics are kept
+    max_cached_data = Int(16)
+
+    #: Capacity of the top compactor of the quantile sketches
+    kll_size = Int(DEFAULT_KLL_SIZE)
+
+    #: Number of columns summarized by each task when using a thread pool
+    column_block_size = Int(DEFAULT_COLUMN_BLOCK_SIZE)
+
+    #: Cached statistics: maps data keys to {column: {element: value}} dicts
+    _cache = Instance(OrderedDict, ())
+
+    def summarize(self, data, summary_index, data_key=None, executor=None,
+                  columns=None, use_sketches=True):
+        """ Returns the summary statistics of the columns of a DataFrame.
+
+        Parameters
+        ----------
+        data : pd.DataFrame or DataFrameView
+            Data to summarize. Only the columns without cached statistics are
+            gathered from it.
+
+        summary_index : list(str)
+            Summary elements to compute: 'count', 'mean', 'std', 'min', 'max'
+            and percentiles (for example '25%'). Unknown elements are set to
+            NaN.
+
+        data_key : hashable or None, optional
+            Key identifying the content of the data (regardless of the row
+            order), used to cache the statistics of each column. Leave as None
+            to skip caching.
+
+        executor : concurrent.futures.Executor or None, optional
+            Thread pool computing blocks of columns in parallel. Leave as None
+            to compute all columns in the calling thread.
+
+        columns : list or None, optional
+            Columns to summarize. Leave as None to summarize all columns of
+            the data.
+
+        use_sketches : bool, optional
+            Whether to estimate the percentiles of data with appended rows
+            from their quantile sketches. If False, they are computed exactly.
+
+        Returns
+        -------
+        pd.DataFrame
+            Summary with one row per summary_index element and one column per
+            summarized column, in the order of the columns.
+        """
+        summary_index = list(summary_index)
+        if columns is None:
+            columns = list(data.columns)
+        dtypes = data.dtypes
+        engine_cols = [col for col in columns
+                       if dtypes[col].kind in ENGINE_DTYPE_KINDS]
+        engine_col_set = set(engine_cols)
+        other_cols = [col for col in columns if col not in engine_col_set]
+
+        summaries = []
+        if engine_cols:
+            summaries.append(self._summarize_engine_cols(
+                data, engine_cols, summary_index, data_key, executor,
+                use_sketches
+            ))
+
+        if other_cols:
+            summaries.append(describe_summary(data[other_cols],
+                                              summary_index))
+
+        if not summaries:
+            return DataFrame([])
+
+        summary = concat(summaries, axis=1)
+        return summary.reindex(index=summary_index, columns=list(columns))
+
+    def append_data(self, data_key, new_data_key, new_data, old_data=None):
+        """ Derive the cached statistics of data with appended rows.
+
+        Counts, means, standard deviations, minima and maxima cached for
+        data_key are merged with those of the new rows (using Chan et al.'s
+        parallel version of Welford's algorithm) and cached for new_data_key,
+        so the new rows are the only ones to read. Percentiles can't be
+        merged: the new rows are added to the quantile sketch of each column
+        instead, and the percentiles of the new data are estimated from it.
+
+        Parameters
+        ----------
+        data_key : hashable
+            Key of the data the rows are appended to.
+
+        new_data_key : hashable
+            Key of the data once the rows are appended.
+
+        new_data : pd.DataFrame
+            Appended rows. Only pass the columns that should be summarized.
+
+        old_data : pd.DataFrame or DataFrameView or None, optional
+            Data the rows are appended to, read once to build the quantile
+            sketches of the columns whose percentiles were computed exactly.
+            Leave as None to compute the percentiles of the new data exactly
+            instead.
+
+        Returns
+        -------
+        bool
+            Whether statistics were cached for data_key and could be merged.
+        """
+        old_stats = self._cache.get(data_key, None)
+        if old_stats is None:
+            return False
+
+        columns = [col for col, dtype in new_data.dtypes.items()
+                   if dtype.kind in ENGINE_DTYPE_KINDS and col in old_stats]
+        block = new_data[columns].to_numpy(dtype=np.float64)
+        stats = compute_block_stats(block, MOMENT_ELEMENTS)
+        new_stats = self._get_cached_stats(new_data_key)
+        for i, col in enumerate(columns):
+            appended = {entry: stats[entry][i] for entry in MOMENT_ELEMENTS}
+            merged = merge_moments(old_stats[col], appended)
+            col_stats = new_stats.setdefault(col, {})
+            for entry, value in merged.items():
+                col_stats.setdefault(entry, value)
+
+            sketch = self._get_quantile_sketch(old_stats[col], old_data, col)
+            if sketch is not None:
+                col_stats[_SKETCH_ENTRY] = sketch.copy().update(block[:, i])
+        return True
+
+    def error_bounds(self, data_key, summary_index, columns):
+        """ Returns bounds on the absolute errors of the cached statistics of
+        the columns of some data.
+
+        Parameters
+        ----------
+        data_key : hashable
+            Key of the summarized data.
+
+        summary_index : list(str)
+            Summary elements.
+
+        columns : list
+            Summarized columns.
+
+        Returns
+        -------
+        pd.DataFrame
+            Error bounds with one row per summary_index element and one column
+            per column (0 for exact values), or an empty DataFrame if all
+            values are exact.
+        """
+        col_stats = self._cache.get(data_key, {})
+        errors = [col_stats.get(col, {}).get(_ERRORS_ENTRY, {})
+                  for col in columns]
+        if not any(errors):
+            return DataFrame([])
+
+        values = [[col_errors.get(entry, 0.) for col_errors in errors]
+                  for entry in summary_index]
+        return DataFrame(values, index=list(summary_index),
+                         columns=list(columns), dtype=np.float64)
+
+    def clear(self):
+        """ Empty the cache of statistics.
+        """
+        self._cache.clear()
+
+    # Private interface -------------------------------------------------------
+
+    def _summarize_engine_cols(self, data, columns, summary_index, data_key,
+                               executor=None, use_sketches=True):
+        """ Summarize plain numerical columns, using cached values if any.
+        """
+        elements = [entry for entry in summary_index
+                    if entry in MOMENT_ELEMENTS or is_percentile(entry)]
+
+        if data_key is None:
+            col_stats = {}
+        else:
+            col_stats = self._get_cached_stats(data_key)
+
+        missing_cols = []
+        missing_elements = set()
+        for col in columns:
+            entries = col_stats.setdefault(col, {})
+            if use_sketches:
+                self._estimate_percentiles(entries, elements)
+            estimated = {} if use_sketches else \
+                entries.get(_ERRORS_ENTRY, {})
+            missing = [entry for entry in elements
+                       if entry not in entries or entry in estimated]
+            if missing:
+                missing_cols.append(col)
+                missing_elements.update(missing)
+
+        if missing_cols:
+            if executor is None:
+                blocks = [missing_cols]
+            else:
+                blocks = split_blocks(missing_cols, self.column_block_size)
+            compute = partial(_compute_column_block_stats, data,
+                              missing_elements)
+            block_stats = map_in_order(compute, blocks, executor)
+            for block_cols, stats in zip(blocks, block_stats):
+                for i, col in enumerate(block_cols):
+                    col_entries = col_stats[col]
+                    estimated = col_entries.get(_ERRORS_ENTRY, {})
+                    for entry in missing_elements:
+                        col_entries[entry] = stats[entry][i]
+                        estimated.pop(entry, None)
+
+        values = np.array([[col_stats[col][entry] for col in columns]
+                           for entry in elements], dtype=np.float64)
+        return DataFrame(values.reshape(len(elements), len(columns)),
+                         index=elements, columns=columns)
+
+    def _estimate_percentiles(self, entries, elements):
+        """ Estimate the missing percentiles of a column from its quantile
+        sketch, if any, storing their error bounds.
+        """
+        sketch = entries.get(_SKETCH_ENTRY, None)
+        percentiles = [entry for entry in elements
+                       if is_percentile(entry) and entry not in entries]
+        if sketch is None or not percentiles:
+            return
+
+        quantiles = [float(entry[:-1]) / 100. for entry in percentiles]
+        estimates = sketch.quantiles(quantiles)
+        lower, upper = sketch.quantile_bounds(quantiles)
+        errors = entries.setdefault(_ERRORS_ENTRY, {})
+        for entry, est, low, high in zip(percentiles, estimates, lower,
+                                         upper):
+            entries[entry] = est
+            errors[entry] = max(est - low, high - est)
+
+    def _get_quantile_sketch(self, entries, data, col):
+        """ Returns the quantile sketch of a column, built from the data if
+        its percentiles were computed exactly, or None if it has none.
+        """
+        sketch = entries.get(_SKETCH_ENTRY, None)
+        if sketch is None and data is not None and \
+                any(is_percentile(entry) for entry in entries):
+            sketch = KLLSketch(k=self.kll_size).update(
+                data[col].to_numpy(dtype=np.float64)
+            )
+            entries[_SKETCH_ENTRY] = sketch
+        return sketch
+
+    def _get_cached_stats(self, data_key):
+        """ Returns the (mutable) cached column statistics for a data key.
+        """
+        if data_key in self._cache:
+            self._cache.move_to_end(data_key)
+        else:
+            self._cache[data_key] = {}
+            while len(self._cache) > self.max_cached_data:
+                self._cache.popitem(last=False)
+
+        return self._cache[data_key]
+
+
+class SketchSummaryEngine(HasStrictTraits):
+    """ Computes approximate summaries from mergeable sketches.
+
+    Rows are split into chunks of the source data (the chunks of a
+    ChunkedTable, or chunks of chunk_size rows of a DataFrame), and each
+    column of each chunk is summarized by sketches: exact moments (count,
+    mean, std, min, max) and a KLLSketch for numerical columns, a HyperLogLog
+    and a HeavyHittersSketch for categorical columns. The sketches of the
+    chunks fully included in the summarized rows are cached, and the summary
+    of any subset of rows (for example a filter result) is derived by merging
+    the sketches of its chunks. Only the chunks partially included are read
+    again.
+
+    Each summary comes with an error DataFrame of the same shape, containing
+    bounds on the absolute error of each element (0 for exact elements).
+    """
+    #: Number of rows in each chunk of DataFrame sources
+    chunk_size = Int(2 ** 16)
+
+    #: Capacity of the top compactor of the quantile sketches
+    kll_size = Int(DEFAULT_KLL_SIZE)
+
+    #: Number of register index bits of the distinct value sketches
+    hll_precision = Int(DEFAULT_HLL_PRECISION)
+
+    #: Number of counters of the most frequent value sketches
+    heavy_hitters_capacity = Int(DEFAULT_HEAVY_HITTERS_CAPACITY)
+
+    #: Maximum number of (column, chunk) sketches cached
+    max_cached_sketches = Int(4096)
+
+    #: Cached sketches of full chunks: maps (data version, column, chunk id)
+    #: to the chunk's sketches
+    _cache = Instance(OrderedDict, ())
+
+    #: Lock protecting the cache from columns summarized in parallel
+    _cache_lock = Any
+
+    def summarize(self, source, positions, columns, summary_index,
+                  data_version=None, executor=None):
+        """ Returns the approximate numerical summary of rows of a DataFrame.
+
+        Parameters
+        ----------
+        source : pd.DataFrame or ChunkedTable
+            Data the rows are taken from.
+
+        positions : np.ndarray or None
+            Positions of the rows to summarize in the source. Leave as None to
+            summarize all rows.
+
+        columns : list(str)
+            Columns to summarize.
+
+        summary_index : list(str)
+            Summary elements to compute: 'count', 'mean', 'std', 'min', 'max'
+            and percentiles (for example '25%'). Unknown elements are set to
+            NaN.
+
+        data_version : hashable or None, optional
+            Key identifying the content of the source, used to cache the
+            sketches of its chunks. Leave as None to skip caching.
+
+        executor : concurrent.futures.Executor or None, optional
+            Thread pool summarizing columns in parallel. Leave as None to
+            summarize all columns in the calling thread.
+
+        Returns
+        -------
+        tuple(pd.DataFrame, pd.DataFrame)
+            Summary with one row per summary_index element and one column per
+            summarized column, and bounds on the absolute errors of its
+            values.
+        """
+        source = self._as_table(source)
+        summary_index = list(summary_index)
+        percentiles = [entry for entry in summary_index
+                       if is_percentile(entry)]
+        quantiles = [float(entry[:-1]) / 100. for entry in percentiles]
+
+        sketch_cols = [col for col in columns
+                       if source.dtypes[col].kind in ENGINE_DTYPE_KINDS]
+        other_cols = [col for col in columns if col not in set(sketch_cols)]
+        summarize_column = partial(
+            self._summarize_numerical_column, source, positions,
+            data_version, percentiles, quantiles
+        )
+        results = map_in_order(summarize_column, sketch_cols, executor)
+        summaries = {col: result[0] for col, result in zip(sketch_cols,
+                                                           results)}
+        errors = {col: result[1] for col, result in zip(sketch_cols,
+                                                        results)}
+
+        summary = DataFrame(summaries, index=summary_index,
+                            columns=list(summaries), dtype=np.float64)
+        error = DataFrame(errors, index=summary_index,
+                          columns=list(summaries), dtype=np.float64)
+        if other_cols:
+            # Columns the sketches don't support are summarized exactly:
+            data = source.read_rows(positions, columns=other_cols)
+            other_summary = describe_summary(data, summary_index)
+            other_summary = other_summary.reindex(summary_index)
+            summary = concat([summary, other_summary], axis=1)
+            error = concat([error, DataFrame(0., index=summary_index,
+                                             columns=other_summary.columns)],
+                           axis=1)
+
+        columns = list(columns)
+        return summary.reindex(columns=columns), error.reindex(columns=columns)
+
+    def summarize_categorical(self, source, positions, columns,
+                              data_version=None, executor=None):
+        """ Returns the approximate categorical summary of rows of a DataFrame.
+
+        The count is exact, the number of unique values is estimated with a
+        HyperLogLog, and the frequencies of the top and next values are lower
+        bounds (exact when there are fewer distinct values than counters).
+
+        Parameters
+        ----------
+        source : pd.DataFrame or ChunkedTable
+            Data the rows are taken from.
+
+        positions : np.ndarray or None
+            Positions of the rows to summarize in the source. Leave as None to
+            summarize all rows.
+
+        columns : list(str)
+            Columns to summarize.
+
+        data_version : hashable or None, optional
+            Key identifying the content of the source, used to cache the
+            sketches of its chunks. Leave as None to skip caching.
+
+        executor : concurrent.futures.Executor or None, optional
+            Thread pool summarizing columns in parallel. Leave as None to
+            summarize all columns in the calling thread.
+
+        Returns
+        -------
+        tuple(pd.DataFrame, pd.DataFrame)
+            Object DataFrame with one row per CATEGORICAL_ELEMENTS element and
+            one column per column, and bounds on the absolute errors of its
+            numerical values (NaN for the top and next values).
+        """
+        source = self._as_table(source)
+        columns = list(columns)
+        values = np.empty((len(CATEGORICAL_ELEMENTS), len(columns)),
+                          dtype=object)
+        errors = np.full((len(CATEGORICAL_ELEMENTS), len(columns)), np.nan)
+        summarize_column = partial(self._summarize_categorical_column, source,
+                                   positions, data_version)
+        results = map_in_order(summarize_column, columns, executor)
+        for i, (summary, col_errors) in enumerate(results):
+            values[:, i] = summary
+            errors[:, i] = col_errors
+
+        return (DataFrame(values, index=CATEGORICAL_ELEMENTS, columns=columns),
+                DataFrame(errors, index=CATEGORICAL_ELEMENTS, columns=columns))
+
+    def append_data(self, data_version, new_data_version, num_rows):
+        """ Keep the cached sketches of data that rows were appended to.
+
+        Sketches of the chunks that were complete before the rows were
+        appended remain valid for the new data version.
+
+        Parameters
+        ----------
+        data_version : hashable
+            Version of the data the rows are appended to.
+
+        new_data_version : hashable
+            Version of the data once the rows are appended.
+
+        num_rows : int
+            Number of rows before the rows were appended.
+        """
+        num_full_chunks = num_rows // self.chunk_size
+        with self._cache_lock:
+            for key in list(self._cache):
+                version, col, chunk_id = key
+                if version == data_version and chunk_id < num_full_chunks:
+                    self._cache[(new_data_version, col, chunk_id)] = \
+                        self._cache[key]
+
+    def clear(self):
+        """ Empty the cache of sketches.
+        """
+        with self._cache_lock:
+            self._cache.clear()
+
+    # Private interface -------------------------------------------------------
+
+    def _as_table(self, source):
+        """ Returns the ChunkedTable of a source DataFrame or ChunkedTable.
+        """
+        if isinstance(source, DataFrame):
+            return DataFrameTable(source, chunk_size=self.chunk_size)
+        return source
+
+    def _summarize_numerical_column(self, source, positions, data_version,
+                                    percentiles, quantiles, col):
+        """ Returns the summary of a numerical column and its error bounds,
+        as dicts.
+        """
+        moments, kll = self._merge_chunk_sketches(
+            source, positions, col, data_version,
+            self._numerical_sketches, _merge_numerical_sketches
+        )
+        values = dict(moments)
+        errors = {entry: 0. for entry in MOMENT_ELEMENTS}
+        if quantiles:
+            estimates = kll.quantiles(quantiles)
+            lower, upper = kll.quantile_bounds(quantiles)
+            for entry, est, low, high in zip(percentiles, estimates, lower,
+                                             upper):
+                values[entry] = est
+                errors[entry] = max(est - low, high - est)
+        return values, errors
+
+    def _summarize_categorical_column(self, source, positions, data_version,
+                                      col):
+        """ Returns the categorical summary of a column and its error bounds,
+        as lists.
+        """
+        count, hll, heavy_hitters = self._merge_chunk_sketches(
+            source, positions, col, data_version,
+            self._categorical_sketches, _merge_categorical_sketches
+        )
+        unique = int(round(hll.estimate())) if count else 0
+        summary = [count, unique, np.nan, np.nan, np.nan, np.nan]
+        for j, (value, freq) in enumerate(
+                heavy_hitters.most_frequent(num_values=2)):
+            summary[2 + 2 * j: 4 + 2 * j] = value, int(freq)
+
+        max_count_error = heavy_hitters.max_count_error
+        errors = [0., hll.relative_error * unique, np.nan, max_count_error,
+                  np.nan, max_count_error]
+        return summary, errors
+
+    def _merge_chunk_sketches(self, source, positions, col, data_version,
+                              build_sketches, merge_sketches):
+        """ Returns the merged sketches of the chunks of rows of a column.
+        """
+        merged = None
+        for chunk_id, chunk_positions in self._iter_chunks(source, positions):
+            if chunk_positions is None:
+                key = (data_version, col, chunk_id)
+                sketches = self._get_cached_sketches(key) \
+                    if data_version is not None else None
+                if sketches is None:
+                    chunk = source.read_chunk(chunk_id, columns=[col])
+                    sketches = build_sketches(chunk[col])
+                    if data_version is not None:
+                        self._cache_sketches(key, sketches)
+            else:
+                chunk = source.read_chunk(chunk_id, columns=[col])
+                start = source.chunk_bounds[chunk_id]
+                sketches = build_sketches(
+                    chunk[col].iloc[chunk_positions - start]
+                )
+
+            merged = merge_sketches(merged, sketches)
+
+        if merged is None:
+            merged = build_sketches(Series([], dtype=np.float64))
+        return merged
+
+    def _iter_chunks(self, source, positions):
+        """ Yields the id of each chunk containing rows to summarize, and the
+        positions of these rows, or None if the chunk is fully included.
+        """
+        if positions is None:
+            for chunk_id in range(source.num_chunks):
+                yield chunk_id, None
+            return
+
+        chunk_bounds = source.chunk_bounds
+        positions = np.sort(positions)
+        splits = np.searchsorted(positions, chunk_bounds)
+        for chunk_id in range(source.num_chunks):
+            start, stop = splits[chunk_id], splits[chunk_id + 1]
+            if start == stop:
+                continue
+
+            chunk_length = chunk_bounds[chunk_id + 1] - chunk_bounds[chunk_id]
+            if stop - start == chunk_length:
+                # Positions are unique, so they cover the whole chunk:
+                yield chunk_id, None
+            else:
+                yield chunk_id, positions[start:stop]
+
+    def _get_cached_sketches(self, key):
+        with self._cache_lock:
+            sketches = self._cache.get(key, None)
+            if sketches is not None:
+                self._cache.move_to_end(key)
+            return sketches
+
+    def _cache_sketches(self, key, sketches):
+        with self._cache_lock:
+            self._cache[key] = sketches
+            while len(self._cache) > self.max_cached_sketches:
+                self._cache.popitem(last=False)
+
+    def _numerical_sketches(self, col):
+        values = col.to_numpy(dtype=np.float64)
+        stats = compute_block_stats(values.reshape(-1, 1), MOMENT_ELEMENTS)
+        moments = {entry: stats[entry][0] for entry in MOMENT_ELEMENTS}
+        return moments, KLLSketch(k=self.kll_size).update(values)
+
+    def _categorical_sketches(self, col):
+        values = np.asarray(col)
+        hll = HyperLogLog(precision=self.hll_precision).update(values)
+        heavy_hitters = HeavyHittersSketch(
+            capacity=self.heavy_hitters_capacity
+        ).update(values)
+        return heavy_hitters.count, hll, heavy_hitters
+
+    # Traits initialization methods -------------------------------------------
+
+    def __cache_lock_default(self):
+        return threading.Lock()
+
+
+class IncrementalSummary(HasStrictTraits):
+    """ Numerical summary of a set of rows, updated from the rows added to
+    or removed from the set.
+
+    The count, sum and sum of squares of each column (shifted by a reference
+    value, for accuracy) are updated from the changed rows only, and so are
+    the min and max when rows are added. Removing the min or max of a column,
+    or any row for percentiles, invalidates them: they are computed again
+    from all the rows when the summary is next requested, the percentiles
+    from a KLLSketch (approximate), which is then updated with added rows.
+
+    Parameters
+    ----------
+    columns : list(str)
+        Columns to summarize.
+
+    get_values : callable
+        Function returning the values of all the rows of the set, as a 2D
+        float array with one column per summarized column.
+    """
+    #: Columns summarized
+    columns = List
+
+    #: Function returning the values of all the rows of the set
+    get_values = Callable
+
+    #: Capacity of the top compactor of the quantile sketches
+    kll_size = Int(DEFAULT_KLL_SIZE)
+
+    #: Number of non-null values of each column
+    count = Array(dtype=np.float64, shape=(None,))
+
+    #: Value subtracted from each column before summing values and squares
+    _shift = Array(dtype=np.float64, shape=(None,))
+
+    #: Sum of the shifted values of each column
+    _sum = Array(dtype=np.float64, shape=(None,))
+
+    #: Sum of the squared shifted values of each column
+    _sum_squares = Array(dtype=np.float64, shape=(None,))
+
+    #: Min and max of each column (NaN where they must be recomputed)
+    _min = Array(dtype=np.float64, shape=(None,))
+
+    _max = Array(dtype=np.float64, shape=(None,))
+
+    #: Quantile sketches of each column, None if they must be rebuilt
+    _sketches = Any
+
+    def __init__(self, columns, get_values, **traits):
+        super(IncrementalSummary, self).__init__(
+            columns=list(columns), get_values=get_values, **traits
+        )
+        num_cols = len(self.columns)
+        self.count = np.zeros(num_cols)
+        self._shift = np.zeros(num_cols)
+        self._sum = np.zeros(num_cols)
+        self._sum_squares = np.zeros(num_cols)
+        self._min = np.full(num_cols, np.nan)
+        self._max = np.full(num_cols, np.nan)
+
+    def add(self, values):
+        """ Add rows to the set, from their values (2D float array).
+        """
+        values = self._validate_values(values)
+        if not len(values):
+            return
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            # Shift empty columns by the first values they receive:
+            empty = self.count == 0
+            self._shift[empty] = np.nan_to_num(
+                np.nanmean(values[:, empty], axis=0)
+            )
+            self._update_sums(values, 1.)
+            # Min and max to recompute stay NaN:
+            new_min = np.nanmin(values, axis=0)
+            new_max = np.nanmax(values, axis=0)
+            self._min = np.where(empty, new_min, np.where(
+                np.isnan(new_min), self._min, np.minimum(self._min, new_min)
+            ))
+            self._max = np.where(empty, new_max, np.where(
+                np.isnan(new_max), self._max, np.maximum(self._max, new_max)
+            ))
+
+        if self._sketches is not None:
+            for i, sketch in enumerate(self._sketches):
+                sketch.update(values[:, i])
+
+    def remove(self, values):
+        """ Remove rows from the set, from their values (2D float array).
+        """
+        values = self._validate_values(values)
+        if not len(values):
+            return
+
+        self._update_sums(values, -1.)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            self._min[np.nanmin(values, axis=0) <= self._min] = np.nan
+            self._max[np.nanmax(values, axis=0) >= self._max] = np.nan
+        self._sketches = None
+
+    def summarize(self, summary_index):
+        """ Returns the summary of the set of rows.
+
+        Parameters
+        ----------
+        summary_index : list(str)
+            Summary elements to compute: 'count', 'mean', 'std', 'min', 'max'
+            and percentiles (for example '25%', approximate). Unknown elements
+            are set to NaN.
+        """
+        summary_index = list(summary_index)
+        count = self.count
+        stats = {"count": count}
+        with warnings.catch_warnings(), np.errstate(invalid="ignore",
+                                                    divide="ignore"):
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            stats["mean"] = self._shift + self._sum / count
+            variance = (self._sum_squares - self._sum ** 2 / count) / \
+                (count - 1)
+            variance[count <= 1] = np.nan
+            stats["std"] = np.sqrt(np.maximum(variance, 0.))
+
+        percentiles = [entry for entry in summary_index
+                       if is_percentile(entry)]
+        values = None
+        outdated = np.isnan(self._min) | np.isnan(self._max)
+        if np.any(outdated & (count > 0)):
+            values = self._get_all_values()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                self._min[outdated] = np.nanmin(values[:, outdated], axis=0)
+                self._max[outdated] = np.nanmax(values[:, outdated], axis=0)
+        stats["min"] = np.where(count > 0, self._min, np.nan)
+        stats["max"] = np.where(count > 0, self._max, np.nan)
+
+        if percentiles:
+            if self._sketches is None:
+                if values is None:
+                    values = self._get_all_values()
+                self._sketches = [KLLSketch(k=self.kll_size).update(col)
+                                  for col in values.T]
+            quantiles = [float(entry[:-1]) / 100. for entry in percentiles]
+            estimates = np.array([sketch.quantiles(quantiles)
+                                  for sketch in self._sketches])
+            for i, entry in enumerate(percentiles):
+                stats[entry] = estimates[:, i] if len(estimates) else \
+                    np.zeros(0)
+
+        nan_values = np.full(len(self.columns), np.nan)
+        rows = [stats.get(entry, nan_values) for entry in summary_index]
+        return DataFrame(rows, index=summary_index, columns=self.columns,
+                         dtype=np.float64)
+
+    # Private interface -------------------------------------------------------
+
+    def _update_sums(self, values, sign):
+        valid = ~np.isnan(values)
+        shifted = np.where(valid, values - self._shift, 0.)
+        self.count = self.count + sign * valid.sum(axis=0)
+        self._sum = self._sum + sign * shifted.sum(axis=0)
+        self._sum_squares = self._sum_squares + \
+            sign * (shifted ** 2).sum(axis=0)
+        # Drop the rounding errors accumulated by emptied columns:
+        empty = self.count == 0
+        self._sum[empty] = 0.
+        self._sum_squares[empty] = 0.
+
+    def _get_all_values(self):
+        return self._validate_values(self.get_values())
+
+    def _validate_values(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        return values.reshape(len(values), len(self.columns))
+
+
+def get_shared_executor(num_threads=0):
+    """ Returns the thread pool shared by summaries using a number of
+    threads.
+
+    Parameters
+    ----------
+    num_threads : int, optional
+        Number of threads of the pool. 0 (or less) uses the number of CPUs.
+
+    Returns
+    -------
+    ThreadPoolExecutor or None
+        Thread pool, or None when using a single thread (the calling one).
+    """
+    if num_threads <= 0:
+        num_threads = os.cpu_count() or 1
+    if num_threads == 1:
+        return None
+
+    with _shared_executors_lock:
+        executor = _shared_executors.get(num_threads, None)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=num_threads,
+                                          thread_name_prefix="pybleau_summary")
+            _shared_executors[num_threads] = executor
+    return executor
+
+
+def map_in_order(func, items, executor=None):
+    """ Returns the list of the results of func for each item, in order.
+
+    Items are processed in the executor's threads if any (and if there is more
+    than one item), in the calling thread otherwise.
+    """
+    if executor is None or len(items) <= 1:
+        return [func(item) for item in items]
+    return list(executor.map(func, items))
+
+
+def split_blocks(items, block_size):
+    """ Split a list into consecutive blocks of (at most) block_size items.
+    """
+    block_size = max(block_size, 1)
+    return [items[i:i + block_size] for i in range(0, len(items), block_size)]
+
+
+def compute_block_stats(block, elements):
+    """ Compute summary elements of each column of a 2D float array.
+
+    NaN values are ignored, like in DataFrame.describe.
+
+    Parameters
+    ----------
+    block : np.ndarray
+        2D float array, with one column per data column.
+
+    elements : iterable(str)
+        Elements to compute: 'count', 'mean', 'std', 'min', 'max' and
+        percentiles (for example '25%').
+
+    Returns
+    -------
+    dict
+        Maps each element to a 1D array of the values for each column.
+    """
+    stats = {}
+    num_cols = block.shape[1]
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=0)
+    stats["count"] = count.astype(np.float64)
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore",
+                                                divide="ignore"):
+        # All-NaN columns lead to NaN values, not warnings:
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if "mean" in elements or "std" in elements:
+            mean = np.where(valid, block, 0.).sum(axis=0) / count
+            stats["mean"] = mean
+            if "std" in elements:
+                deviations = np.where(valid, block - mean, 0.)
+                variance = (deviations ** 2).sum(axis=0) / (count - 1)
+                variance[count <= 1] = np.nan
+                stats["std"] = np.sqrt(variance)
+
+        if "min" in elements:
+            stats["min"] = np.nanmin(block, axis=0) if len(block) else \
+                np.full(num_cols, np.nan)
+        if "max" in elements:
+            stats["max"] = np.nanmax(block, axis=0) if len(block) else \
+                np.full(num_cols, np.nan)
+
+        percentiles = [entry for entry in elements if is_percentile(entry)]
+        if percentiles:
+            quantiles = [float(entry[:-1]) / 100. for entry in percentiles]
+            if len(block):
+                values = np.nanquantile(block, quantiles, axis=0)
+            else:
+                values = np.full((len(quantiles), num_cols), np.nan)
+            for entry, value in zip(percentiles, values):
+                stats[entry] = value
+
+    return stats
+
+
+def merge_moments(stats1, stats2):
+    """ Merge the statistics of 2 sets of rows of a column.
+
+    The count, mean, std, min and max of the union are computed from those of
+    each part, following the parallel variance algorithm of Chan et al.
+    Elements missing from stats1 are left out.
+
+    Parameters
+    ----------
+    stats1, stats2 : dict
+        Map summary elements to their values for each set of rows. stats2
+        must contain all MOMENT_ELEMENTS.
+
+    Returns
+    -------
+    dict
+        Map of the summary elements that could be merged to their values.
+    """
+    if "count" not in stats1:
+        return {}
+
+    count1, count2 = stats1["count"], stats2["count"]
+    count = count1 + count2
+    merged = {"count": count}
+    if "min" in stats1:
+        merged["min"] = np.fmin(stats1["min"], stats2["min"])
+    if "max" in stats1:
+        merged["max"] = np.fmax(stats1["max"], stats2["max"])
+
+    if "mean" not in stats1:
+        return merged
+
+    if count1 == 0 or count2 == 0:
+        source = stats1 if count2 == 0 else stats2
+        merged["mean"] = source["mean"]
+        if "std" in stats1:
+            merged["std"] = source["std"]
+        return merged
+
+    delta = stats2["mean"] - stats1["mean"]
+    merged["mean"] = stats1["mean"] + delta * count2 / count
+    if "std" in stats1:
+        sum_squares1 = stats1["std"] ** 2 * (count1 - 1) if count1 > 1 else 0.
+        sum_squares2 = stats2["std"] ** 2 * (count2 - 1) if count2 > 1 else 0.
+        sum_squares = sum_squares1 + sum_squares2 + \
+            delta ** 2 * count1 * count2 / count
+        merged["std"] = np.sqrt(sum_squares / (count - 1))
+    return merged
+
+
+def describe_summary(data, summary_index):
+    """ Summarize columns the engine doesn't support with DataFrame.describe.
+
+    Boolean columns are described separately, since describing them with
+    numerical-like columns (timedeltas for example) would drop them.
+    """
+    bool_cols = [col for col, dtype in data.dtypes.items()
+                 if dtype.kind == "b"]
+    bool_col_set = set(bool_cols)
+    other_cols = [col for col in data.columns if col not in bool_col_set]
+    summary = concat([data[cols].describe() for cols in (bool_cols, other_cols)
+                      if cols], axis=1)
+    missing = [entry for entry in summary_index
+               if is_percentile(entry) and entry not in summary.index]
+    numerical = data[other_cols].select_dtypes(include=[np.number])
+    if missing and len(numerical.columns):
+        extra_values = {}
+        for entry in missing:
+            percent = float(entry[:-1])
+            extra_values[entry] = numerical.apply(np.percentile, q=percent)
+        extra_summary = DataFrame(extra_values).transpose()
+        summary = concat([summary, extra_summary], sort=True)
+
+    return summary
+
+
+def is_percentile(entry):
+    """ Returns whether a summary element is a percentile, like '25%'.
+    """
+    if not entry.endswith("%"):
+        return False
+    try:
+        float(entry[:-1])
+    except ValueError:
+        return False
+    return True
+
+
+def _compute_column_block_stats(data, elements, columns):
+    """ Compute summary elements of some (numerical) columns of a DataFrame.
+    """
+    block = data[columns].to_numpy(dtype=np.float64)
+    return compute_block_stats(block, elements)
+
+
+def summarize_categorical(data, max_workers=None, executor=None):
+    """ Returns the categorical summary of the columns of a DataFrame.
+
+    Each column is summarized by categorical_column_summary, in a thread pool
+    when there are multiple columns: the executor if provided, otherwise a
+    temporary pool of max_workers threads.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Data to summarize. Only pass the columns that should be summarized.
+
+    max_workers : int or None, optional
+        Maximum number of threads to use. Defaults to the number of CPUs.
+        Ignored if an executor is provided.
+
+    executor : concurrent.futures.Executor or None, optional
+        Thread pool to use, for example the one returned by
+        get_shared_executor.
+
+    Returns
+    -------
+    pd.DataFrame
+        Object DataFrame with one row per CATEGORICAL_ELEMENTS element and
+        one column per data column.
+    """
+    columns = list(data.columns)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(columns))
+
+    col_data = [data.iloc[:, i] for i in range(len(columns))]
+    if executor is not None:
+        summaries = map_in_order(categorical_column_summary, col_data,
+                                 executor)
+    elif max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            summaries = list(executor.map(categorical_column_summary,
+                                          col_data))
+    else:
+        summaries = [categorical_column_summary(col) for col in col_data]
+
+    values = np.empty((len(CATEGORICAL_ELEMENTS), len(columns)), dtype=object)
+    for i, summary in enumerate(summaries):
+        values[:, i] = summary
+    return DataFrame(values, index=CATEGORICAL_ELEMENTS, columns=columns)
+
+
+def categorical_column_summary(col):
+    """ Returns the count, unique, top, freq, next and next_freq of a Series.
+
+    Null values are ignored. Values with equal frequencies are ranked by order
+    of first appearance (category order for categorical data). Top and next
+    values are set to NaN when the column doesn't contain enough distinct
+    values.
+    """
+    if isinstance(col.dtype, CategoricalDtype):
+        codes = np.asarray(col.cat.codes)
+        uniques = col.cat.categories
+    else:
+        codes, uniques = factorize(col)
+
+    valid_codes = codes[codes >= 0]
+    counts = np.bincount(valid_codes, minlength=len(uniques))
+    num_unique = int(np.count_nonzero(counts))
+    summary = [len(valid_codes), num_unique, np.nan, np.nan, np.nan, np.nan]
+    if num_unique >= 1:
+        # argmax returns the first of the most frequent values:
+        top = counts.argmax()
+        summary[2:4] = uniques[top], int(counts[top])
+        if num_unique >= 2:
+            counts[top] = -1
+            next_ = counts.argmax()
+            summary[4:6] = uniques[next_], int(counts[next_])
+
+    return summary
+
+
+def _merge_numerical_sketches(merged, sketches):
+    """ Merge chunk sketches into merged ones (None at first), without
+    modifying the (possibly cached) chunk sketches.
+    """
+    moments, kll = sketches
+    if merged is None:
+        return dict(moments), kll.copy()
+
+    merged_moments, merged_kll = merged
+    return merge_moments(merged_moments, moments), merged_kll.merge(kll)
+
+
+def _merge_categorical_sketches(merged, sketches):
+    """ Merge chunk sketches into merged ones (None at first), without
+    modifying the (possibly cached) chunk sketches.
+    """
+    count, hll, heavy_hitters = sketches
+    if merged is None:
+        return count, hll.copy(), heavy_hitters.copy()
+
+    merged_count, merged_hll, merged_heavy_hitters = merged
+    return (merged_count + count, merged_hll.merge(hll),
+            merged_heavy_hitters.merge(heavy_hitters))
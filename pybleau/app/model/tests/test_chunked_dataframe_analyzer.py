@@ -0,0 +1,79 @@
+from unittest import skipIf, TestCase
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+try:
+    import kiwisolver  # noqa
+    KIWI_AVAILABLE = True
+except ImportError:
+    KIWI_AVAILABLE = False
+
+BACKEND_AVAILABLE = os.environ.get("ETS_TOOLKIT", "qt4") != "null"
+
+if BACKEND_AVAILABLE and KIWI_AVAILABLE:
+    from pybleau.app.model.chunked_dataframe_analyzer import \
+        ChunkedDataFrameAnalyzer
+    from pybleau.app.model.chunked_table import ChunkedTableView, \
+        DataFrameTable
+    from pybleau.app.model.dataframe_analyzer import NO_SORTING_ENTRY, \
+        REVERSED_SUFFIX
+
+msg = "No UI backend to paint into or no Kiwisolver"
+
+
+@skipIf(not BACKEND_AVAILABLE or not KIWI_AVAILABLE, msg)
+class TestChunkedDataFrameAnalyzer(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(11), "b": range(0, 110, 10),
+                                "c": list("abcdeabcaab")})
+        self.table = DataFrameTable(self.df, chunk_size=3)
+
+    def test_rows_stay_in_table(self):
+        analyzer = ChunkedDataFrameAnalyzer(self.table, num_displayed_rows=4)
+        self.assertEqual(len(analyzer.source_df), 0)
+        self.assertEqual(analyzer.sort_by_col, NO_SORTING_ENTRY)
+        self.assertIsInstance(analyzer.filtered_view, ChunkedTableView)
+        self.assertEqual(len(analyzer.filtered_view), 11)
+        assert_frame_equal(analyzer.displayed_df, self.df.iloc[:4])
+        assert_frame_equal(analyzer.filtered_df, self.df)
+
+    def test_filter_by_chunk(self):
+        analyzer = ChunkedDataFrameAnalyzer(self.table)
+        analyzer.filter_exp = "a > 2 and c == 'a'"
+        assert_frame_equal(analyzer.filtered_df, self.df.iloc[[5, 8, 9]])
+        # Refining the filter only evaluates the new clause:
+        analyzer.filter_exp = "a > 2 and c == 'a' and b < 90"
+        assert_frame_equal(analyzer.filtered_df, self.df.iloc[[5, 8]])
+        # Expressions evaluated by pandas:
+        analyzer.filter_exp = "a.isin([1, 2]) | (index > 9)"
+        assert_frame_equal(analyzer.filtered_df, self.df.iloc[[1, 2, 10]])
+
+    def test_sort(self):
+        analyzer = ChunkedDataFrameAnalyzer(self.table)
+        analyzer.filter_exp = "a > 6"
+        analyzer.sort_by_col = "b" + REVERSED_SUFFIX
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [10, 9, 8, 7])
+        analyzer.selected_idx = [0, 2]
+        self.assertEqual(analyzer.data_selected, [10, 8])
+
+    def test_summaries_from_chunks(self):
+        analyzer = ChunkedDataFrameAnalyzer(self.table)
+        analyzer.filter_exp = "a > 2"
+        summary = analyzer.summary_df
+        self.assertEqual(summary.loc["count", "a"], 8)
+        self.assertEqual(summary.loc["mean", "b"], 65)
+        self.assertEqual(analyzer.summary_error_df.shape, summary.shape)
+        self.assertEqual(analyzer.summary_categorical_df.loc["top", "c"], "a")
+
+        analyzer.compute_exact_summary()
+        expected = self.df.iloc[3:][["a", "b"]].describe().astype(np.float64)
+        assert_frame_equal(analyzer.summary_df, expected)
+
+    def test_append_rows_not_supported(self):
+        analyzer = ChunkedDataFrameAnalyzer(self.table)
+        with self.assertRaises(NotImplementedError):
+            analyzer.append_rows(self.df)
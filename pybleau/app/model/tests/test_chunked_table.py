@@ -0,0 +1,142 @@
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import skipIf, TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_frame_equal, assert_index_equal
+
+from pybleau.app.model.chunked_table import ChunkedTableView, \
+    DataFrameTable, open_chunked_table
+
+try:
+    import pyarrow  # noqa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import tables  # noqa
+    PYTABLES_AVAILABLE = True
+except ImportError:
+    PYTABLES_AVAILABLE = False
+
+
+class TestDataFrameTable(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(10), "b": list("xyzxyzxyzx")},
+                               index=range(100, 110))
+        self.table = DataFrameTable(self.df, chunk_size=4)
+
+    def test_chunks(self):
+        self.assertEqual(self.table.num_rows, 10)
+        self.assertEqual(self.table.num_chunks, 3)
+        assert_frame_equal(self.table.schema, self.df.iloc[:0])
+        chunks = list(self.table.iter_chunks(columns=["a"]))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        assert_frame_equal(pd.concat(chunks), self.df[["a"]])
+
+    def test_iter_chunks_skips_chunks_without_positions(self):
+        chunks = list(self.table.iter_chunks(positions=[1, 2, 9]))
+        self.assertEqual(len(chunks), 2)
+        assert_frame_equal(pd.concat(chunks), self.df.iloc[[1, 2, 9]])
+
+    def test_read_rows_in_order(self):
+        assert_frame_equal(self.table.read_rows([9, 0, 5]),
+                           self.df.iloc[[9, 0, 5]])
+        assert_frame_equal(self.table.read_rows([], columns=["b"]),
+                           self.df[["b"]].iloc[:0])
+        assert_frame_equal(self.table.read_rows(), self.df)
+
+    def test_read_index(self):
+        assert_index_equal(self.table.read_index([8, 3]),
+                           self.df.index[[8, 3]])
+
+    def test_empty_table(self):
+        table = DataFrameTable(self.df.iloc[:0])
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(list(table.iter_chunks()), [])
+
+
+class TestChunkedTableView(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(10), "b": np.linspace(0, 1, 10)},
+                               index=list("abcdefghij"))
+        self.table = DataFrameTable(self.df, chunk_size=3)
+
+    def test_full_view(self):
+        view = ChunkedTableView(self.table)
+        self.assertEqual(len(view), 10)
+        assert_frame_equal(view.to_frame(), self.df)
+        self.assertEqual(view.select_columns(include=["float"]).tolist(),
+                         ["b"])
+
+    def test_positions(self):
+        view = ChunkedTableView(self.table, np.array([7, 1, 4]))
+        self.assertEqual(list(view.index), ["h", "b", "e"])
+        self.assertEqual(view["a"].tolist(), [7, 1, 4])
+        assert_frame_equal(view[["b"]], self.df[["b"]].iloc[[7, 1, 4]])
+        taken = view.take(slice(None, 2))
+        self.assertIsInstance(taken, ChunkedTableView)
+        assert_frame_equal(taken.to_frame(), self.df.iloc[[7, 1]])
+
+
+class TestOpenChunkedTable(TestCase):
+
+    def setUp(self):
+        self.temp_dir = mkdtemp()
+        self.df = pd.DataFrame({"a": np.arange(10.), "b": list("xyzxyzxyzx")},
+                               index=pd.Index(range(100, 110), name="idx"))
+
+    def tearDown(self):
+        rmtree(self.temp_dir)
+
+    def test_unsupported_extension(self):
+        path = join(self.temp_dir, "data.csv")
+        self.df.to_csv(path)
+        with self.assertRaises(ValueError):
+            open_chunked_table(path)
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            open_chunked_table(join(self.temp_dir, "data.parquet"))
+
+    @skipIf(not PYARROW_AVAILABLE, "pyarrow not available")
+    def test_parquet_row_groups(self):
+        path = join(self.temp_dir, "data.parquet")
+        self.df.to_parquet(path, row_group_size=4)
+        table = open_chunked_table(path)
+        self.assertEqual(table.num_chunks, 3)
+        assert_frame_equal(table.read_rows([9, 0, 5]),
+                           self.df.iloc[[9, 0, 5]])
+        assert_index_equal(table.read_index([2]), self.df.index[[2]])
+
+    @skipIf(not PYARROW_AVAILABLE, "pyarrow not available")
+    def test_parquet_without_index(self):
+        path = join(self.temp_dir, "data.parquet")
+        df = self.df.reset_index(drop=True)
+        df.to_parquet(path, row_group_size=4)
+        table = open_chunked_table(path)
+        assert_frame_equal(table.read_rows([9, 5]), df.iloc[[9, 5]],
+                           check_index_type=False)
+
+    @skipIf(not PYTABLES_AVAILABLE, "pytables not available")
+    def test_hdf_table(self):
+        path = join(self.temp_dir, "data.h5")
+        self.df.to_hdf(path, "data", format="table")
+        table = open_chunked_table(path, chunk_size=4)
+        self.assertEqual(table.key, "/data")
+        self.assertEqual(table.num_chunks, 3)
+        assert_frame_equal(table.read_rows([9, 0, 5]),
+                           self.df.iloc[[9, 0, 5]])
+        assert_index_equal(table.read_index([2]), self.df.index[[2]])
+
+    @skipIf(not PYTABLES_AVAILABLE, "pytables not available")
+    def test_hdf_fixed_format_rejected(self):
+        path = join(self.temp_dir, "data.h5")
+        self.df.to_hdf(path, "data")
+        with self.assertRaises(ValueError):
+            open_chunked_table(path)
@@ -0,0 +1,133 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from traits.testing.unittest_tools import UnittestTools
+
+from pybleau.app.model.crossfilter import CrossFilter, DimensionIndex
+
+
+class TestDimensionIndex(TestCase):
+
+    def test_search(self):
+        index = DimensionIndex(pd.Series([5., 1., np.nan, 3., 1.]))
+        self.assertEqual(index.num_valid, 4)
+        np.testing.assert_array_equal(index.positions, [1, 4, 3, 0, 2])
+        start, stop = index.search(1, 3)
+        self.assertEqual(sorted(index.positions[start:stop]), [1, 3, 4])
+        start, stop = index.search(4, 4.5)
+        self.assertEqual(start, stop)
+        start, stop = index.search(3, 1)
+        self.assertEqual(start, stop)
+
+    def test_search_strings(self):
+        index = DimensionIndex(np.array(["b", "a", None, "c"], dtype=object))
+        self.assertEqual(index.num_valid, 3)
+        start, stop = index.search("a", "b")
+        self.assertEqual(sorted(index.positions[start:stop]), [0, 1])
+
+
+class TestCrossFilter(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": np.arange(10.),
+                                "b": [3, 1, 4, 1, 5, 9, 2, 6, 5, 3]})
+        self.df.loc[2, "a"] = np.nan
+        self.crossfilter = CrossFilter(len(self.df), self.df.__getitem__)
+
+    def assert_selects(self, expected):
+        np.testing.assert_array_equal(self.crossfilter.get_positions(),
+                                      expected)
+        self.assertEqual(self.crossfilter.num_selected, len(expected))
+
+    def test_no_brush(self):
+        self.assert_selects(np.arange(10))
+        self.assertTrue(self.crossfilter.get_mask().all())
+
+    def test_brush(self):
+        crossfilter = self.crossfilter
+        with self.assertTraitChanges(crossfilter, "mask_updated", 1):
+            crossfilter.brush("a", 1, 5)
+        self.assert_selects([1, 3, 4, 5])
+        self.assertEqual(crossfilter.brushes, {"a": (1, 5)})
+
+        crossfilter.brush("b", 1, 4)
+        self.assert_selects([1, 3])
+        np.testing.assert_array_equal(
+            np.flatnonzero(crossfilter.get_mask(exclude="b")), [1, 3, 4, 5]
+        )
+        np.testing.assert_array_equal(crossfilter.contains([0, 1, 4]),
+                                      [False, True, False])
+
+    def test_move_brush(self):
+        crossfilter = self.crossfilter
+        crossfilter.brush("a", 1, 5)
+        events = []
+        crossfilter.on_trait_change(lambda new: events.append(new),
+                                    "mask_updated")
+        crossfilter.brush("a", 4, 7)
+        self.assert_selects([4, 5, 6, 7])
+        entered, exited = events[-1]
+        np.testing.assert_array_equal(entered, [6, 7])
+        np.testing.assert_array_equal(exited, [1, 3])
+
+        # Disjoint ranges:
+        crossfilter.brush("a", 8, 20)
+        self.assert_selects([8, 9])
+
+        # Moving within the same rows doesn't notify:
+        crossfilter.brush("a", 7.5, 20)
+        self.assertEqual(len(events), 2)
+
+    def test_clear_brush(self):
+        crossfilter = self.crossfilter
+        crossfilter.brush("a", 1, 5)
+        crossfilter.brush("b", 1, 4)
+        crossfilter.clear_brush("a")
+        self.assert_selects([0, 1, 2, 3, 6, 9])
+        self.assertEqual(crossfilter.brushes, {"b": (1, 4)})
+        crossfilter.clear_brush("a")
+        crossfilter.clear()
+        self.assert_selects(np.arange(10))
+        self.assertEqual(crossfilter.brushes, {})
+
+    def test_brush_unknown_column(self):
+        with self.assertRaises(KeyError):
+            self.crossfilter.brush("c", 1, 5)
+        self.assertEqual(self.crossfilter.brushes, {})
+
+    def test_brush_ranges(self):
+        crossfilter = self.crossfilter
+        crossfilter.brush_ranges({"a": (1, 5), "c": (0, 1), "b": (1, 4)})
+        self.assertEqual(crossfilter.brushes, {"a": (1, 5), "b": (1, 4)})
+        self.assert_selects([1, 3])
+
+    def test_restrict(self):
+        crossfilter = self.crossfilter
+        crossfilter.brush("a", 1, 5)
+        np.testing.assert_array_equal(crossfilter.restrict(), [1, 3, 4, 5])
+        np.testing.assert_array_equal(
+            crossfilter.restrict(np.array([5, 0, 9, 1])), [5, 1]
+        )
+
+    def test_random_brushes(self):
+        rng = np.random.RandomState(0)
+        df = pd.DataFrame(rng.randint(0, 100, size=(500, 3)),
+                          columns=list("xyz"))
+        crossfilter = CrossFilter(len(df), df.__getitem__)
+        ranges = {}
+        for _ in range(30):
+            col = "xyz"[rng.randint(3)]
+            if rng.rand() < 0.2:
+                crossfilter.clear_brush(col)
+                ranges.pop(col, None)
+            else:
+                low, high = sorted(rng.randint(0, 100, size=2))
+                crossfilter.brush(col, low, high)
+                ranges[col] = (low, high)
+
+            mask = np.ones(len(df), dtype=bool)
+            for name, (low, high) in ranges.items():
+                mask &= df[name].between(low, high).to_numpy()
+            np.testing.assert_array_equal(crossfilter.get_mask(), mask)
+            self.assertEqual(crossfilter.num_selected, mask.sum())
@@ -0,0 +1,176 @@
+import gc
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+from pybleau.app.model.data_store import content_key, DataStore, \
+    get_data_store
+
+
+class TestDataStore(TestCase):
+
+    def setUp(self):
+        self.store = DataStore()
+        self.df = pd.DataFrame({"a": np.arange(10.), "b": list("xyzxyzxyzx")})
+
+    def test_share_same_data(self):
+        handle = self.store.share(self.df)
+        handle2 = self.store.share(self.df)
+        self.assertEqual(handle.key, handle2.key)
+        # Copies are different DataFrames, unless shared by content:
+        handle3 = self.store.share(self.df.copy())
+        self.assertNotEqual(handle3.key, handle.key)
+        self.assertEqual(self.store.num_entries, 2)
+
+    def test_share_same_content(self):
+        handle = self.store.share(self.df, by_content=True)
+        handle2 = self.store.share(self.df.copy(), by_content=True)
+        self.assertEqual(handle.key, handle2.key)
+        self.assertIs(handle2.data, self.df)
+        self.assertEqual(self.store.num_entries, 1)
+
+        handle3 = self.store.share(self.df.assign(a=0.), by_content=True)
+        self.assertNotEqual(handle3.key, handle.key)
+        self.assertEqual(self.store.num_entries, 2)
+
+    def test_add_unique_keys(self):
+        handle = self.store.add(self.df)
+        handle2 = self.store.add(self.df)
+        self.assertNotEqual(handle.key, handle2.key)
+        self.assertEqual(self.store.num_entries, 2)
+
+    def test_release(self):
+        handle = self.store.share(self.df)
+        handle2 = self.store.acquire(handle.key)
+        handle.release()
+        handle.release()
+        self.assertTrue(handle.released)
+        self.assertIn(handle.key, self.store)
+        with self.assertRaises(ValueError):
+            handle.data
+
+        handle2.release()
+        self.assertNotIn(handle.key, self.store)
+        self.assertEqual(self.store.num_entries, 0)
+        with self.assertRaises(KeyError):
+            self.store.acquire(handle.key)
+
+    def test_release_on_garbage_collection(self):
+        handle = self.store.add(self.df)
+        key = handle.key
+        del handle
+        gc.collect()
+        self.assertNotIn(key, self.store)
+
+    def test_get_or_add(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return self.df, {"note": 1}
+
+        handle = self.store.get_or_add("k", factory)
+        handle2 = self.store.get_or_add("k", factory)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(handle2.data, self.df)
+        self.assertEqual(handle2.info, {"note": 1})
+
+    def test_copy_for_write_shared(self):
+        handle = self.store.share(self.df)
+        handle2 = self.store.acquire(handle.key)
+        data = handle2.copy_for_write()
+        self.assertIsNot(data, self.df)
+        assert_frame_equal(data, self.df)
+        data["a"] = 0.
+        self.assertEqual(self.df["a"].sum(), 45.)
+        self.assertNotEqual(handle2.key, handle.key)
+        self.assertEqual(self.store.num_entries, 2)
+
+        # Each handle releases its own entry:
+        handle.release()
+        self.assertEqual(self.store.num_entries, 1)
+        handle2.release()
+        self.assertEqual(self.store.num_entries, 0)
+
+    def test_copy_for_write_only_holder(self):
+        handle = self.store.share(self.df)
+        shared_key = handle.key
+        data = handle.copy_for_write()
+        self.assertIs(data, self.df)
+        self.assertNotIn(shared_key, self.store)
+        # Sharing the same content again doesn't return the modifiable data:
+        handle2 = self.store.share(self.df.copy(), by_content=True)
+        self.assertIsNot(handle2.data, data)
+        self.assertEqual(self.store.num_entries, 2)
+        handle.release()
+        self.assertEqual(self.store.num_entries, 1)
+
+    def test_resident_bytes_and_report(self):
+        self.assertEqual(self.store.resident_bytes, 0)
+        handle = self.store.share(self.df)
+        handle2 = self.store.share(self.df)
+        self.store.add(self.df.iloc[:0])
+        nbytes = self.df.memory_usage(index=True, deep=True).sum()
+        report = self.store.report()
+        self.assertEqual(report.loc[handle.key, "num_handles"], 2)
+        self.assertEqual(report.loc[handle.key, "nbytes"], nbytes)
+        # The handle on the empty DataFrame was garbage collected:
+        self.assertEqual(len(report), 1)
+        self.assertEqual(self.store.resident_bytes, nbytes)
+        handle.release()
+        handle2.release()
+        self.assertEqual(self.store.resident_bytes, 0)
+        self.assertEqual(len(self.store.report()), 0)
+
+    def test_nbytes_computed_when_read(self):
+        handle = self.store.add(self.df)
+        arrays = self.store._entries[handle.key].arrays.values()
+        self.assertTrue(all(stored._nbytes is None for stored in arrays))
+        nbytes = self.df.memory_usage(index=True, deep=True).sum()
+        self.assertEqual(self.store.resident_bytes, nbytes)
+        self.assertEqual(sum(stored._nbytes for stored in arrays), nbytes)
+
+    def test_shared_arrays_counted_once(self):
+        handle = self.store.add(self.df)
+        # DataFrame of a column of the stored one, without copy:
+        subset = pd.DataFrame({"b": self.df["b"].to_numpy()},
+                              index=self.df.index, copy=False)
+        handle2 = self.store.add(subset)
+        nbytes = self.df.memory_usage(index=True, deep=True).sum()
+        self.assertEqual(self.store.resident_bytes, nbytes)
+        self.assertEqual(self.store.report().loc[handle2.key, "nbytes"],
+                         subset.memory_usage(index=True, deep=True).sum())
+
+        # Only the shared column is copied to be modified:
+        handle.release()
+        a_values = self.df["a"].to_numpy()
+        handle3 = self.store.add(self.df)
+        data = handle3.copy_for_write()
+        self.assertTrue(np.shares_memory(data["a"].to_numpy(), a_values))
+        self.assertFalse(np.shares_memory(data["b"].to_numpy(),
+                                          subset["b"].to_numpy()))
+        handle2.release()
+        handle3.release()
+        self.assertEqual(self.store.resident_bytes, 0)
+
+    def test_shared_store(self):
+        self.assertIs(get_data_store(), get_data_store())
+
+
+class TestContentKey(TestCase):
+
+    def test_content_key(self):
+        df = pd.DataFrame({"a": [1, 2, 3], "b": list("xyz")})
+        self.assertEqual(content_key(df), content_key(df.copy()))
+        self.assertNotEqual(content_key(df),
+                            content_key(df.rename(columns={"a": "c"})))
+        self.assertNotEqual(content_key(df), content_key(df.astype(
+            {"a": "float64"})))
+        self.assertNotEqual(content_key(df),
+                            content_key(df.set_axis([3, 4, 5])))
+
+    def test_unhashable_content(self):
+        df = pd.DataFrame({"a": [[1], [2]]})
+        self.assertNotEqual(content_key(df), content_key(df))
@@ -1,9 +1,11 @@
+import gc
 from unittest import skipIf, TestCase
 import pandas as pd
 from pandas.core.computation.ops import UndefinedVariableError
 from pandas.util.testing import assert_frame_equal, assert_series_equal
 import numpy as np
 import os
+import threading
 
 from traits.api import TraitError
 from traits.testing.unittest_tools import UnittestTools
@@ -23,6 +25,7 @@ if BACKEND_AVAILABLE and KIWI_AVAILABLE:
     from pybleau.app.model.dataframe_analyzer import DataFrameAnalyzer, \
         DEFAULT_CATEG_SUMMARY_ELEMENTS, DEFAULT_SUMMARY_ELEMENTS, \
         REVERSED_SUFFIX, DataFramePlotManager, NO_SORTING_ENTRY
+    from pybleau.app.model.data_store import get_data_store
     from pybleau.app.plotting.plot_config import ScatterPlotConfigurator
 
 msg = "No UI backend to paint into or no Kiwisolver"
@@ -43,6 +46,53 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
         analyzer = DataFrameAnalyzer(source_df=df)
         self.assertEqual(set(analyzer.source_df.columns), set("abc"))
 
+    def test_optimize_source_dtypes(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df,
+                                     optimize_source_dtypes=True)
+        self.assertEqual(analyzer.source_df["c"].dtype, "category")
+        self.assertEqual(analyzer.source_df["a"].dtype, np.int8)
+        self.assertIn("c", analyzer.dtype_optimization_report.index)
+        analyzer.filter_exp = "c == 'a' and a > 4"
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [5, 8, 9])
+        self.assertEqual(analyzer.summary_categorical_df.columns.tolist(),
+                         ["c"])
+
+    def test_optimize_source_dtypes_requires_copy(self):
+        with self.assertRaises(ValueError):
+            DataFrameAnalyzer(source_df=self.df, copy_source_df=False,
+                              optimize_source_dtypes=True)
+
+    def test_source_df_shared_between_analyzers(self):
+        store = get_data_store()
+        analyzer = DataFrameAnalyzer(source_df=self.df, share_source_df=True)
+        key = analyzer.source_handle.key
+        # Release the handles of analyzers left by other tests:
+        gc.collect()
+        num_handles = store.report().loc[key, "num_handles"]
+        analyzer2 = DataFrameAnalyzer(source_df=self.df.copy(),
+                                      share_source_df=True)
+        self.assertIs(analyzer2.source_df, analyzer.source_df)
+        self.assertEqual(store.report().loc[key, "num_handles"],
+                         num_handles + 1)
+
+        # Copies are private by default:
+        analyzer3 = DataFrameAnalyzer(source_df=self.df)
+        self.assertIsNot(analyzer3.source_df, analyzer.source_df)
+        analyzer4 = DataFrameAnalyzer(source_df=self.df, share_source_df=True,
+                                      optimize_source_dtypes=True)
+        self.assertIsNot(analyzer4.source_df, analyzer.source_df)
+
+        analyzer2.source_df = self.df2
+        self.assertIsNone(analyzer2.source_handle)
+        self.assertEqual(store.report().loc[key, "num_handles"], num_handles)
+
+        # Appending rows creates a new DataFrame:
+        new_rows = pd.DataFrame({"a": [20], "b": [5], "c": ["x"]},
+                                index=[11])
+        analyzer.append_rows(new_rows)
+        self.assertNotEqual(analyzer.source_handle.key, key)
+        self.assertEqual(len(analyzer.source_handle.data), 12)
+
     def test_sanitize_columns_remove_special_char_collision(self):
         df = self.df
         df.columns = ["~a./", "&)b[", "@b."]
@@ -70,21 +120,21 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
         analyzer = DataFrameAnalyzer(source_df=df, filter_auto_apply=False)
         self.assertEqual(analyzer.filter_exp, "")
         assert_frame_equal(analyzer.filtered_df, analyzer.source_df)
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = "a > 2"
         analyzer.recompute_filtered_df()
         expected = pd.DataFrame({"a": [3, 4, 5], "b": [20, 15, 10]},
                                 index=[2, 3, 4])
         assert_frame_equal(analyzer.filtered_df, expected)
 
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = "a > 2 and b < 18"
 
         analyzer.recompute_filtered_df()
         expected = pd.DataFrame({"a": [4, 5], "b": [15, 10]},
                                 index=[3, 4])
         assert_frame_equal(analyzer.filtered_df, expected)
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = ""
 
         analyzer.recompute_filtered_df()
@@ -101,6 +151,165 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
                                 index=[0, 5, 8, 9])
         assert_frame_equal(analyzer.filtered_df, expected)
 
+    def test_filtered_df_gathered_on_request(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, num_displayed_rows=2)
+        analyzer.filter_exp = "c == 'a'"
+        # Only the displayed rows are gathered:
+        assert_frame_equal(analyzer.displayed_df, df.iloc[[0, 5]])
+        view = analyzer.filtered_view
+        np.testing.assert_array_equal(view.positions, [0, 5, 8, 9])
+        self.assertIsNone(analyzer._materialized_filtered_df)
+
+        filtered_df = analyzer.filtered_df
+        assert_frame_equal(filtered_df, df.iloc[[0, 5, 8, 9]])
+        # Gathered once per filtered view:
+        self.assertIs(analyzer.filtered_df, filtered_df)
+
+    def test_filtered_rows_known_after_init(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        self.assertEqual(analyzer._get_filtered_data_key(),
+                         (analyzer.source_data_version, ""))
+        np.testing.assert_array_equal(analyzer._get_filtered_positions(),
+                                      np.arange(len(self.df)))
+
+    def test_set_filtered_df_externally(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        new_df = self.df.iloc[:3]
+        with self.assertTraitChanges(analyzer, "filtered_data_changed", 1):
+            analyzer.filtered_df = new_df
+        self.assertIs(analyzer.filtered_df, new_df)
+        self.assertEqual(len(analyzer.filtered_view), 3)
+        self.assertIsNone(analyzer._get_filtered_positions())
+
+    def test_filter_change_doesnt_gather_filtered_df(self):
+        # Only the first rows are displayed:
+        analyzer = DataFrameAnalyzer(source_df=self.df, num_displayed_rows=2)
+        views = []
+        analyzer.on_trait_change(lambda new: views.append(new),
+                                 "filtered_data_changed")
+        analyzer.filter_exp = "a > 4"
+        self.assertEqual(views, [analyzer.filtered_view])
+        self.assertIsNone(analyzer._materialized_filtered_df)
+        assert_frame_equal(analyzer.filtered_df, self.df.query("a > 4"))
+
+    def test_append_rows(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 4"
+        new_rows = pd.DataFrame({"a": [20, 1], "b": [5, 6], "c": ["x", "y"]},
+                                index=[11, 12])
+        with self.assertTraitChanges(analyzer, "filtered_data_changed", 1):
+            analyzer.append_rows(new_rows)
+
+        expected = pd.concat([df, new_rows])
+        assert_frame_equal(analyzer.source_df, expected)
+        assert_frame_equal(analyzer.filtered_df, expected.query("a > 4"))
+        self.assertTrue(analyzer.data_sorted)
+
+    def test_brush_column(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.filter_exp = "c == 'a' or c == 'b'"
+        with self.assertTraitChanges(analyzer, "filtered_data_changed", 1):
+            analyzer.brush_column("a", 1, 8)
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [1, 5, 6, 8])
+
+        analyzer.sort_by_col = "b" + REVERSED_SUFFIX
+        analyzer.brush_column("b", 0, 55)
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [5, 1])
+        analyzer.brush_column("a", 0, 10)
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [5, 1, 0])
+
+        analyzer.filter_exp = "c == 'a'"
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [5, 0])
+        analyzer.clear_brushes("b")
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [9, 8, 5, 0])
+        analyzer.clear_brushes()
+        self.assertEqual(analyzer.crossfilter.brushes, {})
+        self.assertEqual(analyzer.summary_df.loc["count", "a"], 4)
+
+        with self.assertRaises(ValueError):
+            analyzer.brush_column("d", 0, 1)
+
+    def test_brushes_kept_when_appending_rows(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.brush_column("a", 8, 20)
+        self.assertEqual(analyzer.summary_df.loc["count", "a"], 3)
+        new_rows = pd.DataFrame({"a": [20, 1], "b": [5, 6], "c": ["x", "y"]},
+                                index=[11, 12])
+        analyzer.append_rows(new_rows)
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [8, 9, 10, 11])
+        self.assertEqual(analyzer.summary_df.loc["count", "a"], 4)
+
+    def test_append_rows_updates_summary(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 4"
+        # Cache the statistics of the rows before appending:
+        analyzer.compute_summary()
+        new_rows = pd.DataFrame({"a": [20, 1], "b": [5, 6], "c": ["x", "y"]},
+                                index=[11, 12])
+        analyzer.append_rows(new_rows)
+        expected = pd.concat([df, new_rows]).query("a > 4").describe()
+        expected = expected.astype(np.float64)
+        moments = ["count", "mean", "std", "min", "max"]
+        assert_frame_equal(analyzer.summary_df.loc[moments],
+                           expected.loc[moments])
+        # Percentiles are estimated from the quantile sketches:
+        error = analyzer.summary_error_df
+        diff = (analyzer.summary_df - expected).abs()
+        self.assertTrue((diff <= error + 1e-9).all().all())
+        self.assertEqual(analyzer.summary_categorical_df.loc["count", "c"], 7)
+
+        analyzer.compute_exact_summary()
+        assert_frame_equal(analyzer.summary_df, expected)
+        self.assertTrue(analyzer.summary_error_df.empty)
+
+    def test_append_rows_doesnt_copy_source(self):
+        df = pd.DataFrame({"a": np.arange(10.), "b": np.arange(10)})
+        analyzer = DataFrameAnalyzer(source_df=df)
+        for i in range(10, 14):
+            analyzer.append_rows(pd.DataFrame({"a": [float(i)], "b": [i]},
+                                              index=[i]))
+        source_df = analyzer.source_df
+        a_values = source_df["a"].to_numpy()
+        analyzer.append_rows(pd.DataFrame({"a": [14.], "b": [14]},
+                                          index=[14]))
+        # The new source_df shares the memory of the previous one:
+        new_values = analyzer.source_df["a"].to_numpy()
+        self.assertTrue(np.shares_memory(new_values, a_values))
+        self.assertEqual(list(new_values), list(range(15)))
+        self.assertEqual(list(source_df["a"]), list(range(14)))
+        self.assertEqual(analyzer.filtered_df["b"].tolist(), list(range(15)))
+
+    def test_append_rows_sorted(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.sort_by_col = "b" + REVERSED_SUFFIX
+        analyzer.selected_idx = [0]
+        new_rows = pd.DataFrame({"a": [20, 1], "b": [500, -6],
+                                 "c": ["x", "y"]}, index=[11, 12])
+        analyzer.append_rows(new_rows)
+        self.assertEqual(list(analyzer.filtered_df.index[:2]), [11, 10])
+        self.assertEqual(analyzer.filtered_df.index[-1], 12)
+        # Selection follows the moved row:
+        self.assertEqual(analyzer.data_selected, [10])
+        self.assertEqual(analyzer.selected_idx, [1])
+
+    def test_append_rows_with_original_column_names(self):
+        df = pd.DataFrame({"a b": [1, 2]})
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.append_rows(pd.DataFrame({"a b": [3]}, index=[2]))
+        self.assertEqual(list(analyzer.filtered_df["a_b"]), [1, 2, 3])
+
+    def test_append_invalid_rows(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        with self.assertRaises(ValueError):
+            analyzer.append_rows(pd.DataFrame({"z": [1]}, index=[11]))
+        with self.assertRaises(ValueError):
+            analyzer.append_rows(self.df.iloc[:1])
+        self.assertEqual(len(analyzer.source_df), len(self.df))
+
     def test_bad_filter(self):
         """ If filter set to a bad value, filtered DF unchanged.
         """
@@ -128,17 +337,17 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
                                      filter_error_handling="ignore")
         self.assertEqual(analyzer.filter_exp, "")
 
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = "a"
 
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = "a "
 
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = "a > "
 
         # DF finally changes because expression is complete:
-        with self.assertTraitChanges(analyzer, "filtered_df", 1):
+        with self.assertTraitChanges(analyzer, "filtered_data_changed", 1):
             analyzer.filter_exp = "a > 1"
 
         expected = pd.DataFrame({"a": [2, 3, 4, 5],
@@ -173,14 +382,14 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
         self.assertEqual(analyzer.filter_exp, "")
         assert_frame_equal(analyzer.filtered_df, analyzer.source_df)
         # Spaces are ignored
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = " "
 
         # And so are space-like characters
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = " \n"
 
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             analyzer.filter_exp = " \n  \t \r\n"
 
     def test_new_line_in_filter(self):
@@ -192,6 +401,174 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
                                  "b": [15, 20, 15, 10]}, index=[1, 2, 3, 4])
         assert_frame_equal(analyzer.filtered_df, expected)
 
+    def test_filter_results_cached(self):
+        df = self.df2
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 2"
+        analyzer.filter_exp = "a > 2 and b < 18"
+        self.assertEqual(len(analyzer.filter_cache), 2)
+        version = analyzer.source_data_version
+        self.assertIn(("a > 2", version), analyzer.filter_cache)
+
+        # Going back to a known filter uses the cached positions:
+        analyzer.filter_cache.pop("a > 2", version)
+        analyzer.filter_cache.set("a > 2", version, np.array([0]))
+        analyzer.filter_exp = "a > 2"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[0]])
+
+    def test_filter_cache_reset_when_source_changes(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df2)
+        analyzer.filter_exp = "a > 2"
+        version = analyzer.source_data_version
+        analyzer.source_df = pd.DataFrame({"a": [5, 1], "b": [1, 1]})
+        self.assertGreater(analyzer.source_data_version, version)
+        self.assertNotIn(("a > 2", version), analyzer.filter_cache)
+        expected = pd.DataFrame({"a": [5], "b": [1]})
+        assert_frame_equal(analyzer.filtered_df, expected)
+
+    def test_filter_refinement(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 2"
+        analyzer.filter_exp = "a > 2 and c == 'a'"
+        expected = df.iloc[[5, 8, 9]]
+        assert_frame_equal(analyzer.filtered_df, expected)
+        analyzer.filter_exp = "a > 2 and c == 'a' and b < 90"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[5, 8]])
+
+    def test_filter_refinement_evaluated_on_previous_rows(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 2"
+        # Pretend the previous filter selected fewer rows: the refinement is
+        # only evaluated on them:
+        version = analyzer.source_data_version
+        analyzer._last_filter_result = (version, ["a > 2"], np.array([5, 6]))
+        analyzer.filter_exp = "a > 2 and c == 'a'"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[5]])
+
+    def test_filter_clause_masks_shared(self):
+        # Not sorted, so ranges of 'a' aren't found by binary searches:
+        df = self.df.assign(a=self.df["a"].values[::-1])
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a > 2 and c == 'a'"
+        version = analyzer.source_data_version
+        self.assertIn(("a > 2", version), analyzer.clause_mask_cache)
+        self.assertIn(("c == 'a'", version), analyzer.clause_mask_cache)
+
+        # Another filter sharing a clause reuses its mask:
+        analyzer.clause_mask_cache.set("c == 'a'", version,
+                                       np.zeros(len(df), dtype=bool))
+        analyzer.filter_exp = "c == 'a' or b == 0"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[0]])
+
+    def test_filter_unsupported_by_compiler(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.filter_exp = "a + 1 > 10"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[10]])
+
+    def test_filter_nullable_columns(self):
+        df = pd.DataFrame({
+            "a": pd.array([0, 1, 2, 3, None], dtype="Int64"),
+            "b": [1., 2., 3., 4., 5.],
+            "c": pd.array([True, None, False, True, True], dtype="boolean")
+        })
+        analyzer = DataFrameAnalyzer(source_df=df)
+        for filter_exp in ["a > 1", "a > b - 2", "~(a > 1)", "not c",
+                           "c and b > 1"]:
+            analyzer.filter_exp = filter_exp
+            assert_frame_equal(analyzer.filtered_df, df.query(filter_exp))
+
+    def test_get_filter_columns(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        self.assertEqual(analyzer.get_filter_columns("a > 2 and c == 'a'"),
+                         ["a", "c"])
+        self.assertEqual(analyzer.get_filter_columns("b + a > 2"), ["a", "b"])
+        self.assertEqual(analyzer.get_filter_columns("index > 2"), [])
+        analyzer.filter_exp = "b > 20"
+        self.assertEqual(analyzer.get_filter_columns(), ["b"])
+
+    def test_async_filter(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.2)
+        analyzer.filter_exp = "a > 8"
+        self.assertTrue(analyzer.filter_computing)
+        # Not applied until the background evaluation is done:
+        assert_frame_equal(analyzer.filtered_df, df)
+        analyzer.wait_for_filter(timeout=5)
+        self.assertFalse(analyzer.filter_computing)
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[9, 10]])
+
+    def test_async_filter_superseded_requests_dropped(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.05)
+        with self.assertTraitChanges(analyzer, "filtered_data_changed",
+                                     count=1):
+            analyzer.filter_exp = "a > 2"
+            analyzer.filter_exp = "a > 8"
+            analyzer.wait_for_filter(timeout=5)
+
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[9, 10]])
+
+    def test_async_filter_cancelled(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.)
+        with self.assertTraitChanges(analyzer, "filter_computing", count=2):
+            analyzer.filter_exp = "a > 8"
+            self.assertTrue(analyzer.filter_computing)
+            analyzer.cancel_filter_computation()
+        self.assertFalse(analyzer.filter_computing)
+        analyzer._filter_scheduler.join(5)
+        self.assertFalse(analyzer.apply_filter_results())
+        assert_frame_equal(analyzer.filtered_df, df)
+
+    def test_async_filter_sort_changed_while_pending(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.2)
+        analyzer.filter_exp = "a > 6"
+        analyzer.sort_by_col = "c"
+        analyzer.wait_for_filter(timeout=5)
+        self.assertEqual(analyzer.sort_by_col, "c")
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[8, 9, 10, 7]])
+
+        analyzer.filter_exp = "a > 4"
+        analyzer.sort_by_col = NO_SORTING_ENTRY
+        analyzer.wait_for_filter(timeout=5)
+        assert_frame_equal(analyzer.filtered_df, df.iloc[5:])
+
+    def test_async_filter_error(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.)
+        analyzer.filter_exp = "e > 8"
+        analyzer.wait_for_filter(timeout=5)
+        self.assertFalse(analyzer.filter_computing)
+        assert_frame_equal(analyzer.filtered_df, df)
+
+    def test_async_filter_applied_in_waiting_thread(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df, filter_async=True,
+                                     filter_debounce_delay=0.)
+        threads = []
+        analyzer.on_trait_change(
+            lambda: threads.append(threading.current_thread()),
+            "filtered_view"
+        )
+        analyzer.filter_exp = "a > 8"
+        analyzer._filter_scheduler.join(5)
+        # Not applied by the worker thread:
+        self.assertEqual(threads, [])
+        self.assertTrue(analyzer.filter_computing)
+        self.assertTrue(analyzer.apply_filter_results())
+        self.assertEqual(threads, [threading.current_thread()])
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[9, 10]])
+        self.assertEqual(analyzer._last_filter_result[1], ["a > 8"])
+
     def test_subclass_filter_applied(self):
         class DFAnalyzer(DataFrameAnalyzer):
             def _filter_exp_default(self):
@@ -203,6 +580,31 @@ class TestFilterDataFrameAnalyzer(TestCase, UnittestTools):
                                  "b": [15, 20, 15, 10]}, index=[1, 2, 3, 4])
         assert_frame_equal(analyzer.filtered_df, expected)
 
+    def test_range_filter_on_sorted_index(self):
+        index = pd.date_range("2023-12-01", periods=100, freq="D")
+        df = pd.DataFrame({"a": np.arange(100) % 7,
+                           "b": np.arange(100)[::-1]}, index=index)
+        analyzer = DataFrameAnalyzer(source_df=df)
+        query = "index >= '2024-01-01' and index < '2024-02-01' and a > 2"
+        self.assertIsNotNone(analyzer._search_filter_range(query))
+        analyzer.filter_exp = query
+        assert_frame_equal(analyzer.filtered_df, df.query(query))
+        # The descending column isn't searched:
+        self.assertIsNone(analyzer._search_filter_range("b < 10"))
+        analyzer.filter_exp = "b < 10"
+        assert_frame_equal(analyzer.filtered_df, df.query("b < 10"))
+
+    def test_range_filter_on_sorted_column(self):
+        df = self.df2.assign(c=[1., 1., 2., 3., 5.])
+        analyzer = DataFrameAnalyzer(source_df=df, sort_by_col="b")
+        analyzer.filter_exp = "c >= 1 and c < 3"
+        assert_frame_equal(analyzer.filtered_df,
+                           df.iloc[[0, 1, 2]].sort_values("b",
+                                                          kind="mergesort"))
+        # Sorting along the sorted column sorts the positions directly:
+        analyzer.sort_by_col = "c"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[0, 1, 2]])
+
 
 @skipIf(not BACKEND_AVAILABLE or not KIWI_AVAILABLE, msg)
 class TestSummaryDataFrameAnalyzer(TestCase, UnittestTools):
@@ -277,6 +679,109 @@ class TestSummaryDataFrameAnalyzer(TestCase, UnittestTools):
                 assert_series_equal(orig_summarizer.summary_df.loc[col, :],
                                     analyzer.summary_df.loc[col, :])
 
+    def test_summary_statistics_cached_when_sorting(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.filter_exp = "a > 2"
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], 6.5)
+        # Tamper with the cached statistics to check they are reused:
+        data_key = analyzer._get_filtered_data_key()
+        analyzer.summary_engine._cache[data_key]["a"]["mean"] = -1
+        analyzer.sort_by_col = "b" + REVERSED_SUFFIX
+        analyzer.compute_summary()
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], -1)
+        # Changing the filter recomputes it:
+        analyzer.filter_exp = "a > 3"
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], 7)
+
+    def test_approximate_summary(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.filter_exp = "a > 2"
+        self.assertEqual(len(analyzer.summary_error_df), 0)
+        with self.assertTraitChanges(analyzer, "summary_df"):
+            analyzer.approximate_summary = True
+
+        summary = analyzer.summary_df
+        self.assertEqual(summary.loc["mean", "a"], 6.5)
+        self.assertEqual(analyzer.summary_error_df.shape, summary.shape)
+        self.assertEqual(analyzer.summary_error_df.loc["mean", "a"], 0)
+        cat_summary = analyzer.summary_categorical_df
+        self.assertEqual(cat_summary.loc["count", "c"], 8)
+        self.assertEqual(cat_summary.loc["top", "c"], "a")
+        self.assertEqual(analyzer.summary_categorical_error_df.shape,
+                         cat_summary.shape)
+
+        # Exact summaries on demand:
+        analyzer.compute_exact_summary()
+        self.assertEqual(len(analyzer.summary_error_df), 0)
+        self.assertEqual(len(analyzer.summary_categorical_error_df), 0)
+        self.assertEqual(analyzer.summary_df.loc["25%", "a"], 4.75)
+
+        # Back to approximate summaries when the data changes:
+        analyzer.filter_exp = "a > 3"
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], 7)
+        self.assertNotEqual(len(analyzer.summary_error_df), 0)
+
+    def test_summaries_computed_when_read(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.filter_exp = "a > 2"
+        # Nothing read the summaries yet:
+        self.assertEqual(len(analyzer.summary_engine._cache), 0)
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], 6.5)
+        self.assertEqual(len(analyzer.summary_engine._cache), 1)
+        self.assertEqual(analyzer.summary_categorical_df.loc["count", "c"], 8)
+
+    def test_hidden_summaries_dont_notify(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        analyzer.summary_visible = False
+        with self.assertTraitDoesNotChange(analyzer, "summary_df"):
+            with self.assertTraitDoesNotChange(analyzer,
+                                               "summary_categorical_df"):
+                analyzer.filter_exp = "a > 2"
+
+        with self.assertTraitChanges(analyzer, "summary_df"):
+            analyzer.summary_visible = True
+        self.assertEqual(analyzer.summary_df.loc["mean", "a"], 6.5)
+
+    def test_selection_summary(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        self.assertEqual(len(analyzer.selection_summary_df), 0)
+        analyzer.selected_idx = [1, 3]
+        moments = ["count", "mean", "std", "min", "max"]
+        summary = analyzer.selection_summary_df
+        self.assertEqual(list(summary.columns), ["a", "b"])
+        expected = df.iloc[[1, 3]][["a", "b"]].describe().loc[moments]
+        assert_frame_equal(summary.loc[moments], expected.astype(float))
+
+        # Growing the selection updates the statistics incrementally:
+        with self.assertTraitChanges(analyzer, "selection_summary_df", 1):
+            analyzer.selected_idx = [1, 3, 4, 5]
+        expected = df.iloc[[1, 3, 4, 5]][["a", "b"]].describe().loc[moments]
+        assert_frame_equal(analyzer.selection_summary_df.loc[moments],
+                           expected.astype(float))
+
+        analyzer.filter_exp = "a > 4"
+        self.assertEqual(len(analyzer.selection_summary_df), 0)
+        analyzer.selected_idx = [0]
+        self.assertEqual(analyzer.selection_summary_df.loc["max", "a"], 5)
+
+    def test_hidden_summary_columns(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df)
+        with self.assertTraitChanges(analyzer, "summary_df"):
+            analyzer.hidden_summary_columns = ["a", "c"]
+        self.assertEqual(analyzer.summary_df.columns.tolist(), ["b"])
+        self.assertEqual(len(analyzer.summary_categorical_df), 0)
+        analyzer.hidden_summary_columns.remove("a")
+        self.assertEqual(analyzer.summary_df.columns.tolist(), ["a", "b"])
+
+    def test_summary_num_threads(self):
+        sequential = DataFrameAnalyzer(source_df=self.df,
+                                       summary_num_threads=1)
+        threaded = DataFrameAnalyzer(source_df=self.df, summary_num_threads=2)
+        assert_frame_equal(threaded.summary_df, sequential.summary_df)
+        assert_frame_equal(threaded.summary_categorical_df,
+                           sequential.summary_categorical_df)
+
 
 @skipIf(not BACKEND_AVAILABLE or not KIWI_AVAILABLE, msg)
 class TestDataFrameAnalyzer(TestCase, UnittestTools):
@@ -303,6 +808,48 @@ class TestDataFrameAnalyzer(TestCase, UnittestTools):
         expected = pd.DataFrame({"a_b": [1], "c_d": [3], "e_f": [5]})
         assert_frame_equal(analyzer.filtered_df, expected)
 
+    def test_no_copy_source_df(self):
+        df = pd.DataFrame({"a b": [1, 2, 3], "c*d": [6, 5, 4]})
+        analyzer = DataFrameAnalyzer(source_df=df, copy_source_df=False)
+        self.assertIs(analyzer.source_df, df)
+        self.assertEqual(analyzer.source_df.columns.tolist(), ["a b", "c*d"])
+        self.assertEqual(analyzer.column_name_map,
+                         {"a_b": "a b", "c_d": "c*d"})
+        self.assertIn("c_d" + REVERSED_SUFFIX, analyzer.sort_by_col_list)
+
+        # Filtering and sorting use the sanitized names:
+        analyzer.filter_exp = "a_b > 1 and c_d > 4"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[1:2])
+        analyzer.filter_exp = "a_b > 1"
+        analyzer.sort_by_col = "c_d"
+        assert_frame_equal(analyzer.filtered_df, df.iloc[[2, 1]])
+
+    def test_no_copy_source_df_unsorted_index(self):
+        df = pd.DataFrame({"a": range(5)}, index=[1, 2, 5, 6, 3])
+        analyzer = DataFrameAnalyzer(source_df=df, copy_source_df=False)
+        self.assertIs(analyzer.source_df, df)
+        self.assertFalse(analyzer.data_sorted)
+        # The sorting is applied to the filtered data only:
+        self.assertEqual(analyzer.sort_by_col, "index")
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [1, 2, 3, 5, 6])
+        self.assertEqual(df.index.tolist(), [1, 2, 5, 6, 3])
+
+    def test_source_df_copied(self):
+        df = pd.DataFrame({"a": [1, 2, 3], "b": [6., 5., 4.]})
+        for kw in [{}, {"convert_source_dtypes": True}]:
+            analyzer = DataFrameAnalyzer(source_df=df, **kw)
+            source_df = analyzer.source_df
+            for col in ["a", "b"]:
+                self.assertFalse(np.shares_memory(source_df[col].to_numpy(),
+                                                  df[col].to_numpy()))
+            assert_frame_equal(source_df, df, check_dtype=not kw)
+
+    def test_no_copy_source_df_with_conversion(self):
+        df = pd.DataFrame({"a": [1, 2], "b": [3, 4]}, dtype=object)
+        with self.assertRaises(ValueError):
+            DataFrameAnalyzer(source_df=df, copy_source_df=False,
+                              convert_source_dtypes=True)
+
     def test_object_df(self):
         df = pd.DataFrame({"a": ["x", "x", "x"], "b": ["x", "y", "y"]})
         analyzer = DataFrameAnalyzer(source_df=df)
@@ -435,7 +982,7 @@ class TestSortingDataFrameAnalyzer(TestCase, UnittestTools):
         a_vals = [1, 2, 3, 4, 5, 2, 1]
         df = pd.DataFrame({"a": a_vals, "b": b_vals})
         analyzer = DataFrameAnalyzer(source_df=df)
-        with self.assertTraitChanges(analyzer, "filtered_df"):
+        with self.assertTraitChanges(analyzer, "filtered_data_changed"):
             with self.assertTraitChanges(analyzer, "displayed_df"):
                 analyzer.sort_by_col = "b" + REVERSED_SUFFIX
 
@@ -448,7 +995,7 @@ class TestSortingDataFrameAnalyzer(TestCase, UnittestTools):
         self.assertEqual(analyzer.displayed_df["a"].tolist(), expected)
 
         # Invalid option
-        with self.assertTraitDoesNotChange(analyzer, "filtered_df"):
+        with self.assertTraitDoesNotChange(analyzer, "filtered_data_changed"):
             with self.assertTraitDoesNotChange(analyzer, "displayed_df"):
                 with self.assertRaises(TraitError):
                     analyzer.sort_by_col = "BLAH"
@@ -463,7 +1010,7 @@ class TestSortingDataFrameAnalyzer(TestCase, UnittestTools):
         # Initially, data unchanged/unsorted
         self.assertEqual(analyzer.sort_by_col, "index")
 
-        with self.assertTraitChanges(analyzer, "filtered_df"):
+        with self.assertTraitChanges(analyzer, "filtered_data_changed"):
             with self.assertTraitChanges(analyzer, "displayed_df"):
                 analyzer.sort_by_col = "index" + REVERSED_SUFFIX
 
@@ -472,6 +1019,98 @@ class TestSortingDataFrameAnalyzer(TestCase, UnittestTools):
         self.assertEqual(analyzer.filtered_df["b"].tolist(), b_vals[::-1])
         self.assertEqual(analyzer.displayed_df["b"].tolist(), b_vals[::-1])
 
+    def test_sort_permutation_cached(self):
+        df = pd.DataFrame({"a": [3., np.nan, 1., 2., 1.]})
+        analyzer = DataFrameAnalyzer(source_df=df)
+        analyzer.sort_by_col = "a"
+        version = analyzer.source_data_version
+        self.assertIn(("a", version), analyzer.sort_permutation_cache)
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [2, 4, 3, 0, 1])
+
+        # Reversed order reads it backwards, null values remaining last:
+        analyzer.sort_by_col = "a" + REVERSED_SUFFIX
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [0, 3, 4, 2, 1])
+
+        # The cached permutation is used, and filtered to the filter result:
+        analyzer.sort_permutation_cache.set("a", version,
+                                            np.array([1, 0, 2, 3, 4]))
+        analyzer.sort_by_col = "a"
+        analyzer.filter_exp = "index != 2"
+        self.assertEqual(analyzer.filtered_df.index.tolist(), [1, 0, 3, 4])
+
+    def test_sort_permutation_reset_when_source_changes(self):
+        analyzer = DataFrameAnalyzer(source_df=self.df2)
+        analyzer.sort_by_col = "b"
+        version = analyzer.source_data_version
+        analyzer.source_df = pd.DataFrame({"a": [1, 2], "b": [5, 4]})
+        self.assertNotIn(("b", version), analyzer.sort_permutation_cache)
+        analyzer.sort_by_col = "b"
+        self.assertEqual(analyzer.filtered_df["b"].tolist(), [4, 5])
+
+    def test_partial_sort(self):
+        values = np.random.RandomState(0).permutation(50)
+        df = pd.DataFrame({"a": values})
+        analyzer = DataFrameAnalyzer(source_df=df, partial_sort=True,
+                                     num_displayed_rows=5,
+                                     num_display_increment=5)
+        analyzer.sort_by_col = "a" + REVERSED_SUFFIX
+        # Only the rows that can be displayed are sorted:
+        self.assertEqual(analyzer.displayed_df["a"].tolist(),
+                         [49, 48, 47, 46, 45])
+        self.assertEqual(analyzer.filtered_df["a"].tolist()[:10],
+                         list(range(49, 39, -1)))
+        self.assertEqual(sorted(analyzer.filtered_df["a"]), list(range(50)))
+
+        # Displaying more rows sorts more rows:
+        analyzer.num_displayed_rows = 20
+        self.assertEqual(analyzer.displayed_df["a"].tolist(),
+                         list(range(49, 29, -1)))
+
+        analyzer.complete_sort()
+        self.assertEqual(analyzer.filtered_df["a"].tolist(),
+                         list(range(49, -1, -1)))
+
+    def test_displayed_rows_beyond_partial_sort(self):
+        values = np.random.RandomState(0).permutation(50)
+        df = pd.DataFrame({"a": values, "b": values * 2})
+        analyzer = DataFrameAnalyzer(source_df=df, partial_sort=True,
+                                     num_displayed_rows=5,
+                                     num_display_increment=5)
+        analyzer.sort_by_col = "a"
+        rows = analyzer.get_displayed_rows(0, 3, columns=["b"])
+        self.assertEqual(rows.columns.tolist(), ["b"])
+        self.assertEqual(rows["b"].tolist(), [0, 2, 4])
+
+        # Reading rows that weren't sorted yet sorts them:
+        rows = analyzer.get_displayed_rows(40, 60)
+        self.assertEqual(rows["a"].tolist(), list(range(40, 50)))
+        self.assertEqual(analyzer.filtered_df["a"].tolist(), list(range(50)))
+
+    def test_partial_sort_tz_aware_datetimes(self):
+        values = np.random.RandomState(0).permutation(20)
+        dates = pd.date_range("2020-01-01", periods=20, tz="US/Eastern")
+        df = pd.DataFrame({"a": values, "d": dates[values]})
+        df.loc[3, "d"] = pd.NaT
+        with reraise_traits_notification_exceptions():
+            analyzer = DataFrameAnalyzer(source_df=df, partial_sort=True,
+                                         num_displayed_rows=3,
+                                         num_display_increment=2)
+            analyzer.sort_by_col = "d"
+
+        expected = df["d"].sort_values(kind="mergesort")
+        self.assertEqual(analyzer.displayed_df["d"].tolist(),
+                         expected.tolist()[:3])
+        self.assertEqual(analyzer.filtered_df["d"].tolist()[:5],
+                         expected.tolist()[:5])
+
+    def test_partial_sort_not_used_for_non_numerical(self):
+        df = pd.DataFrame({"a": list("ecdba")})
+        analyzer = DataFrameAnalyzer(source_df=df, partial_sort=True,
+                                     num_displayed_rows=1,
+                                     num_display_increment=1)
+        analyzer.sort_by_col = "a"
+        self.assertEqual(analyzer.filtered_df["a"].tolist(), list("abcde"))
+
     def test_filter_transformation(self):
         df = self.df
         with self.assertRaises(UndefinedVariableError):
@@ -631,6 +1270,84 @@ class TestSortingDataFrameAnalyzer(TestCase, UnittestTools):
 
         self.assertEqual(model.selected_idx, [len(df)-1])
 
+    def test_selection_mask_follows_selected_idx(self):
+        model = DataFrameAnalyzer(source_df=self.df)
+        version = model.selection.version
+        model.selected_idx = [3, 1]
+        np.testing.assert_array_equal(model.selection.positions, [1, 3])
+        self.assertGreater(model.selection.version, version)
+
+        model.selected_idx.append(5)
+        np.testing.assert_array_equal(model.selection.positions, [1, 3, 5])
+
+        # Same selection in a different order: only the order changes
+        version = model.selection.version
+        model.selected_idx = [5, 3, 1]
+        self.assertEqual(model.selection.version, version + 1)
+        self.assertEqual(model.selected_idx, [5, 3, 1])
+        np.testing.assert_array_equal(model.selection.positions, [1, 3, 5])
+
+        model.filter_exp = "a > 4"
+        self.assertEqual(len(model.selection), 0)
+        self.assertEqual(model.selection.num_rows, 6)
+
+    def test_selection_follows_shuffled_rows(self):
+        df = self.df
+        model = DataFrameAnalyzer(source_df=df)
+        model.data_selected = [df.index[2], df.index[5]]
+        with self.assertTraitDoesNotChange(model, "data_selected"):
+            model.shuffle_filtered_df()
+        self.assertEqual(model.data_selected, [df.index[2], df.index[5]])
+        self.assertEqual(model.filtered_df.index[model.selected_idx].tolist(),
+                         [df.index[2], df.index[5]])
+
+    def test_extend_and_toggle_selection(self):
+        df = self.df
+        model = DataFrameAnalyzer(source_df=df)
+        model.extend_selection([2, 4])
+        self.assertEqual(model.selected_idx, [2, 4])
+        self.assertEqual(model.data_selected, [df.index[2], df.index[4]])
+
+        model.toggle_selection([4, 6])
+        self.assertEqual(model.selected_idx, [2, 6])
+        self.assertEqual(model.data_selected, [df.index[2], df.index[6]])
+
+    def test_map_df_index_to_idx_ignores_unknown_labels(self):
+        model = DataFrameAnalyzer(source_df=self.df)
+        model.sort_by_col = "index" + REVERSED_SUFFIX
+        idx = model.map_df_index_to_idx([1, 0, 100])
+        self.assertEqual(idx, [9, 10])
+
+    def test_sorting_fires_row_order_event(self):
+        df = self.df
+        model = DataFrameAnalyzer(source_df=df)
+        with self.assertTraitChanges(model, "filtered_rows_reordered",
+                                     count=1) as result:
+            model.sort_by_col = "b" + REVERSED_SUFFIX
+
+        permutation = result.events[0][3]
+        np.testing.assert_array_equal(permutation, np.arange(11)[::-1])
+
+    def test_sorting_doesnt_recompute_summaries(self):
+        model = DataFrameAnalyzer(source_df=self.df)
+        with self.assertTraitDoesNotChange(model, "summary_df"):
+            with self.assertTraitDoesNotChange(model,
+                                               "summary_categorical_df"):
+                model.sort_by_col = "b" + REVERSED_SUFFIX
+
+        with self.assertTraitChanges(model, "summary_df"):
+            model.filter_exp = "a > 4"
+
+    def test_shuffle_fires_row_order_event(self):
+        df = self.df
+        model = DataFrameAnalyzer(source_df=df)
+        with self.assertTraitChanges(model, "filtered_rows_reordered",
+                                     count=1) as result:
+            model.shuffle_filtered_df()
+
+        permutation = result.events[0][3]
+        assert_frame_equal(model.filtered_df, df.iloc[permutation])
+
     def test_shuffle(self):
         df = self.df
         model = DataFrameAnalyzer(source_df=df)
@@ -694,6 +1411,30 @@ class TestDisplayingDataFrameAnalyzer(TestCase, UnittestTools):
 
         self.assertIs(analyzer.displayed_df, analyzer.filtered_df)
 
+    def test_displayed_view(self):
+        df = self.df
+        analyzer = DataFrameAnalyzer(source_df=df)
+        self.assertIs(analyzer.displayed_view, analyzer.filtered_view)
+        assert_frame_equal(analyzer.get_displayed_rows(2, 4), df.iloc[2:4])
+        assert_frame_equal(analyzer.get_displayed_rows(9, 20, ["c", "a"]),
+                           df.iloc[9:, [2, 0]])
+        self.assertEqual(len(analyzer.get_displayed_rows(20, 30)), 0)
+
+        with self.assertTraitChanges(analyzer, "displayed_view"):
+            analyzer.show_selected_only = True
+        self.assertEqual(len(analyzer.displayed_view), 0)
+
+        analyzer.selected_idx = [3, 1]
+        self.assertEqual(len(analyzer.displayed_view), 2)
+        assert_frame_equal(analyzer.get_displayed_rows(0, 10),
+                           df.iloc[[3, 1]])
+
+        analyzer.filter_exp = "a > 5"
+        self.assertEqual(len(analyzer.displayed_view), 0)
+        analyzer.show_selected_only = False
+        self.assertIs(analyzer.displayed_view, analyzer.filtered_view)
+        assert_frame_equal(analyzer.get_displayed_rows(0, 2), df.iloc[6:8])
+
     def test_truncating_data(self):
         df = self.df
         analyzer = DataFrameAnalyzer(source_df=df, num_displayed_rows=100)
@@ -772,6 +772,67 @@ class TestPlotManagerFromDFAnalyzer(TestCase, UnittestTools):
         self.assertIs(self.model.source_analyzer, self.source_analyzer)
         assert_frame_equal(self.model.data_source, TEST_DF.query("a > 1"))
 
+    def test_plots_only_gather_their_columns(self):
+        self.assertIs(self.model.data_view, self.source_analyzer.filtered_view)
+        self.assertEqual(len(self.model.data_schema), 0)
+        self.assertEqual(list(self.model.data_schema.columns),
+                         list(TEST_DF.columns))
+
+        config = ScatterPlotConfigurator(data_source=self.model.data_schema,
+                                         plot_title="Plot")
+        config.x_col_name = "a"
+        config.y_col_name = "b"
+        self.model._add_new_plot(config)
+        plot_desc = self.model.contained_plots[0]
+        self.assertEqual(len(plot_desc.plot.data.arrays["a"]), len(TEST_DF))
+
+        self.source_analyzer.filter_exp = "a > 1"
+        expected = TEST_DF.query("a > 1")[["a", "b"]]
+        assert_frame_equal(plot_desc.plot_config.data_source, expected)
+        assert_array_equal(plot_desc.plot.data.arrays["b"], expected["b"])
+
+    def test_brush_range_in_plots(self):
+        config = ScatterPlotConfigurator(data_source=TEST_DF,
+                                         plot_title="Plot")
+        config.x_col_name = "a"
+        config.y_col_name = "b"
+        self.model._add_new_plot(config)
+        config = HistogramPlotConfigurator(data_source=TEST_DF,
+                                           plot_title="Plot")
+        config.x_col_name = "c"
+        self.model._add_new_plot(config)
+        self.assertEqual(set(self.model.range_selectors), {"0", "1"})
+
+        # Brush along the x axes, as a right-drag of the tools would:
+        self.model.range_selectors["0"].selection = (3., 2.)
+        self.assertEqual(self.model.brushed_ranges, {"a": (2., 3.)})
+        self.model.range_selectors["1"].selection = (2., 4.)
+        self.assertEqual(self.model.brushed_ranges,
+                         {"a": (2., 3.), "c": (2., 4.)})
+        expected = TEST_DF.query("2 <= a <= 3 and 2 <= c <= 4")
+        assert_frame_equal(self.source_analyzer.filtered_df, expected)
+
+        self.model.range_selectors["0"].deselect()
+        self.assertEqual(self.model.brushed_ranges, {"c": (2., 4.)})
+        expected = TEST_DF.query("2 <= c <= 4")
+        assert_frame_equal(self.source_analyzer.filtered_df, expected)
+
+        # Deleting a plot clears its brush:
+        self.model.delete_plots(self.model.contained_plots[1])
+        self.assertEqual(self.model.brushed_ranges, {})
+        assert_frame_equal(self.source_analyzer.filtered_df, TEST_DF)
+
+    def test_brush_range_in_frozen_plot(self):
+        config = ScatterPlotConfigurator(data_source=TEST_DF,
+                                         plot_title="Plot")
+        config.x_col_name = "a"
+        config.y_col_name = "b"
+        self.model._add_new_plot(config)
+        self.model.contained_plots[0].frozen = True
+
+        self.model.range_selectors["0"].selection = (2., 3.)
+        self.assertEqual(self.model.brushed_ranges, {})
+
 
 @skipIf(not BACKEND_AVAILABLE or not KIWI_AVAILABLE, msg)
 class TestPlotManagerDataUpdate(TestCase, UnittestTools):
@@ -797,6 +858,71 @@ class TestPlotManagerDataUpdate(TestCase, UnittestTools):
         self.assertEqual(data0[HISTOGRAM_Y_LABEL].sum(), len(TEST_DF) // 2)
         self.assertEqual(data1[HISTOGRAM_Y_LABEL].sum(), len(TEST_DF) // 2)
 
+    def test_hist_not_rebuilt_on_row_reordering(self):
+        config = HistogramPlotConfigurator(data_source=TEST_DF,
+                                           plot_title="Plot")
+        config.x_col_name = "a"
+        self.model._add_new_plot(config)
+        self.assert_plot_created()
+
+        data = self.model.contained_plots[0].plot.data
+        new_df = TEST_DF.iloc[::-1]
+        with self.assertTraitDoesNotChange(data, "data_changed"):
+            self.model.update_row_order(new_df)
+
+        self.assertIs(self.model.data_source, new_df)
+        self.assertIs(self.model.contained_plots[0].plot_config.data_source,
+                      new_df)
+
+    def test_scatter_rebuilt_on_row_reordering(self):
+        config = ScatterPlotConfigurator(data_source=TEST_DF,
+                                         plot_title="Plot")
+        config.x_col_name = "a"
+        config.y_col_name = "b"
+        self.model._add_new_plot(config)
+        self.assert_plot_created()
+
+        data = self.model.contained_plots[0].plot.data
+        new_df = TEST_DF.iloc[::-1]
+        with self.assertTraitChanges(data, "data_changed", 1):
+            self.model.update_row_order(new_df)
+
+        self.assertEqual(list(data["a"]), list(new_df["a"]))
+
+    def test_scatter_data_appended(self):
+        config = ScatterPlotConfigurator(data_source=TEST_DF,
+                                         plot_title="Plot")
+        config.x_col_name = "a"
+        config.y_col_name = "b"
+        self.model._add_new_plot(config)
+        self.assert_plot_created()
+
+        data = self.model.contained_plots[0].plot.data
+        appended_df = TEST_DF.iloc[:2]
+        new_df = pd.concat([TEST_DF, appended_df])
+        with self.assertTraitChanges(data, "data_changed", 1):
+            self.model.append_rows(new_df, appended_df)
+
+        self.assertEqual(list(data["a"]), list(new_df["a"]))
+        self.assertEqual(list(data["b"]), list(new_df["b"]))
+        self.assertIs(self.model.contained_plots[0].plot_config.data_source,
+                      new_df)
+
+    def test_hist_rebuilt_on_appended_data(self):
+        config = HistogramPlotConfigurator(data_source=TEST_DF,
+                                           plot_title="Plot")
+        config.x_col_name = "a"
+        self.model._add_new_plot(config)
+        self.assert_plot_created()
+
+        data = self.model.contained_plots[0].plot.data
+        appended_df = TEST_DF.iloc[:2]
+        new_df = pd.concat([TEST_DF, appended_df])
+        with self.assertTraitChanges(data, "data_changed", 1):
+            self.model.append_rows(new_df, appended_df)
+
+        self.assertEqual(data[HISTOGRAM_Y_LABEL].sum(), len(new_df))
+
     def test_update_scatter_on_data_update(self):
 
         config = ScatterPlotConfigurator(data_source=TEST_DF,
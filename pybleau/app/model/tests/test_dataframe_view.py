@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_frame_equal, assert_series_equal
+
+from pybleau.app.model.dataframe_view import DataFrameView
+
+
+class TestDataFrameView(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(6), "b": list("xyzxyz"),
+                                "c": np.linspace(0, 1, 6)},
+                               index=list("uvwxyz"))
+
+    def test_full_view(self):
+        view = DataFrameView(self.df)
+        self.assertTrue(view.is_full)
+        self.assertEqual(len(view), 6)
+        self.assertIs(view.to_frame(), self.df)
+        self.assertIs(view.index, self.df.index)
+
+    def test_positions(self):
+        view = DataFrameView(self.df, np.array([4, 1, 2]))
+        self.assertFalse(view.is_full)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(list(view.index), ["y", "v", "w"])
+        assert_frame_equal(view.to_frame(), self.df.iloc[[4, 1, 2]])
+
+    def test_contiguous_rows_sliced(self):
+        view = DataFrameView(self.df, np.arange(1, 4))
+        self.assertEqual(view.row_slice, slice(1, 4))
+        assert_frame_equal(view.to_frame(), self.df.iloc[1:4])
+        self.assertIsNone(DataFrameView(self.df, np.array([1, 3])).row_slice)
+        self.assertIsNone(DataFrameView(self.df, np.array([2, 1])).row_slice)
+        self.assertIsNone(DataFrameView(self.df).row_slice)
+
+    def test_gather_some_columns(self):
+        view = DataFrameView(self.df, np.array([4, 1]))
+        assert_series_equal(view["a"], self.df["a"].iloc[[4, 1]])
+        assert_frame_equal(view[["c", "a"]], self.df[["c", "a"]].iloc[[4, 1]])
+
+    def test_gather_doesnt_consolidate_source(self):
+        a, b = np.arange(6.), np.arange(6.) * 2
+        df = pd.DataFrame({"a": a, "b": b}, copy=False)
+        view = DataFrameView(df, np.array([4, 1]))
+        expected = pd.DataFrame({"a": [4., 1.], "b": [8., 2.]}, index=[4, 1])
+        assert_frame_equal(view.to_frame(), expected)
+        self.assertEqual(list(view.select_columns(include=[float])),
+                         ["a", "b"])
+        # The source still uses the original arrays:
+        self.assertTrue(np.shares_memory(df["a"].to_numpy(), a))
+        self.assertTrue(np.shares_memory(df["b"].to_numpy(), b))
+
+    def test_take(self):
+        view = DataFrameView(self.df, np.array([5, 3, 1]))
+        sub_view = view.take([2, 0])
+        np.testing.assert_array_equal(sub_view.positions, [1, 5])
+        head = DataFrameView(self.df).take(slice(None, 2))
+        assert_frame_equal(head.to_frame(), self.df.iloc[:2])
+
+    def test_select_columns(self):
+        view = DataFrameView(self.df, np.array([0]))
+        columns = view.select_columns(exclude=[object])
+        self.assertEqual(list(columns), ["a", "c"])
+
+    def test_invalid_positions(self):
+        with self.assertRaises(ValueError):
+            DataFrameView(self.df, np.array([0.5]))
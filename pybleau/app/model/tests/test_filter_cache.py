@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pybleau.app.model.filter_cache import compact_positions, \
+    FilterResultCache, MemoryBoundedCache
+
+
+class TestFilterResultCache(TestCase):
+
+    def test_store_and_retrieve(self):
+        cache = FilterResultCache()
+        self.assertIsNone(cache.get("a > 2", 0))
+        stored = cache.set("a > 2", 0, np.array([3, 4, 5]))
+        self.assertEqual(len(cache), 1)
+        np.testing.assert_array_equal(cache.get("a > 2", 0), [3, 4, 5])
+        self.assertIs(cache.get("a > 2", 0), stored)
+        self.assertEqual(cache.size, stored.nbytes)
+
+    def test_data_version_part_of_key(self):
+        cache = FilterResultCache()
+        cache.set("a > 2", 0, np.array([3, 4, 5]))
+        self.assertIsNone(cache.get("a > 2", 1))
+
+    def test_stored_positions_read_only(self):
+        cache = FilterResultCache()
+        positions = cache.set("a > 2", 0, np.array([3, 4, 5]))
+        self.assertFalse(positions.flags.writeable)
+        self.assertEqual(positions.dtype, np.int32)
+
+    def test_evict_least_recently_used(self):
+        positions = np.arange(10)
+        nbytes = compact_positions(positions).nbytes
+        cache = FilterResultCache(max_size=2 * nbytes)
+        cache.set("a > 0", 0, positions)
+        cache.set("a > 1", 0, positions)
+        # Use the first one so it becomes most recently used:
+        cache.get("a > 0", 0)
+        cache.set("a > 2", 0, positions)
+        self.assertEqual(len(cache), 2)
+        self.assertIn(("a > 0", 0), cache)
+        self.assertNotIn(("a > 1", 0), cache)
+        self.assertIn(("a > 2", 0), cache)
+        self.assertEqual(cache.size, 2 * nbytes)
+
+    def test_result_too_large_not_stored(self):
+        cache = FilterResultCache(max_size=8)
+        cache.set("a > 0", 0, np.arange(10))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_reduce_max_size(self):
+        cache = FilterResultCache()
+        cache.set("a > 0", 0, np.arange(10))
+        cache.set("a > 1", 0, np.arange(10))
+        cache.max_size = 0
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_clear(self):
+        cache = FilterResultCache()
+        cache.set("a > 0", 0, np.arange(10))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+
+
+class TestMemoryBoundedCache(TestCase):
+
+    def test_store_boolean_masks(self):
+        cache = MemoryBoundedCache()
+        mask = cache.set("a > 2", 0, np.array([True, False, True]))
+        self.assertEqual(mask.dtype, bool)
+        self.assertFalse(mask.flags.writeable)
+        self.assertEqual(cache.size, 3)
@@ -0,0 +1,145 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from pybleau.app.model.filter_cache import MemoryBoundedCache
+from pybleau.app.model.filter_compiler import compile_filter, \
+    UnsupportedExpression
+
+
+class TestCompileFilter(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(11), "b": range(0, 110, 10),
+                                "c": list("abcdeabcaab"),
+                                "d": [True, False] * 5 + [True]})
+
+    def resolve(self, name):
+        if name == "index":
+            return self.df.index
+        return self.df[name]
+
+    def assert_same_as_pandas(self, expression):
+        mask = compile_filter(expression).evaluate(self.resolve)
+        expected = self.df.eval(expression).values
+        np.testing.assert_array_equal(mask, expected)
+
+    def test_simple_comparisons(self):
+        for expression in ["a > 3", "a >= 3", "a < 3", "a <= 3", "a == 3",
+                           "a != 3", "c == 'a'", "3 < a", "a < b"]:
+            self.assert_same_as_pandas(expression)
+
+    def test_combined_clauses(self):
+        for expression in ["a > 3 and c == 'a'", "(a > 3) & (c == 'a')",
+                           "a > 8 or c == 'e'", "a > 8 | c == 'e'",
+                           "not a > 3", "~(a > 3) | b >= 90",
+                           "a > 3 and not d", "2 < a <= 8"]:
+            self.assert_same_as_pandas(expression)
+
+    def test_membership(self):
+        for expression in ["c in ['a', 'b']", "c not in ['a', 'b']",
+                           "a in [1, 5]", "index in [0, 3]"]:
+            self.assert_same_as_pandas(expression)
+
+    def test_clauses_and_columns(self):
+        compiled = compile_filter("2 < a <= 8 & c in ['a', 'b'] or not d")
+        self.assertEqual([clause.key for clause in compiled.clauses],
+                         ["a > 2", "a <= 8", "c in ['a', 'b']", "d"])
+        self.assertEqual(compiled.columns, {"a", "c", "d"})
+
+    def test_clause_masks_cached_and_shared(self):
+        cache = MemoryBoundedCache()
+        compile_filter("a > 3 and c == 'a'").evaluate(self.resolve, cache, 0)
+        self.assertIn(("a > 3", 0), cache)
+        self.assertIn(("c == 'a'", 0), cache)
+
+        # A cached clause mask is reused by another filter:
+        cache.set("a > 3", 0, np.zeros(11, dtype=bool))
+        mask = compile_filter("a > 3 or b == 0").evaluate(self.resolve,
+                                                          cache, 0)
+        np.testing.assert_array_equal(mask, [True] + [False] * 10)
+        # Cached masks weren't modified when combining them:
+        self.assertFalse(cache.get("a > 3", 0).any())
+
+    def test_unsupported_expressions(self):
+        for expression in ["a + 1 > 2", "`a` > 2", "a > ", "a.abs() > 2",
+                           "1 < 2"]:
+            with self.assertRaises(UnsupportedExpression):
+                compile_filter(expression)
+
+    def test_unknown_column(self):
+        compiled = compile_filter("e > 2")
+        with self.assertRaises(UnsupportedExpression):
+            compiled.evaluate(self.resolve)
+
+    def test_nullable_columns(self):
+        # Missing values aren't selected, even by negated clauses, like
+        # DataFrame.query does:
+        self.df = pd.DataFrame({
+            "a": pd.array([0, 1, None, 3, 4], dtype="Int64"),
+            "b": [1., 2., 3., 4., 5.],
+            "d": pd.array([True, None, False, True, True], dtype="boolean")
+        })
+        for expression in ["a > 1", "a < b", "a in [1, 3]", "d",
+                           "d and a != 3", "a not in [1, 3]"]:
+            mask = compile_filter(expression).evaluate(self.resolve)
+            expected = self.df.index.isin(self.df.query(expression).index)
+            np.testing.assert_array_equal(mask, expected)
+
+        for expression in ["~(a > 1)", "not d"]:
+            with self.assertRaises(UnsupportedExpression):
+                compile_filter(expression).evaluate(self.resolve)
+
+    def test_nullable_clause_masks_not_cached(self):
+        self.df = pd.DataFrame({"a": pd.array([0, None, 3], dtype="Int64")})
+        cache = MemoryBoundedCache()
+        compile_filter("a > 1").evaluate(self.resolve, cache, 0)
+        self.assertNotIn(("a > 1", 0), cache)
+        with self.assertRaises(UnsupportedExpression):
+            compile_filter("not a > 1").evaluate(self.resolve, cache, 0)
+
+    def test_non_boolean_column(self):
+        compiled = compile_filter("a")
+        with self.assertRaises(UnsupportedExpression):
+            compiled.evaluate(self.resolve)
+
+    def test_split_range_on_sorted_columns(self):
+        compiled = compile_filter("a >= 2 and c == 'a' and 40 > b")
+        start, stop, remainder = compiled.split_range(
+            self.resolve, lambda name: name in ["a", "b"]
+        )
+        self.assertEqual((start, stop), (2, 4))
+        self.assertEqual([clause.key for clause in remainder.clauses],
+                         ["c == 'a'"])
+
+        # Range clauses only:
+        start, stop, remainder = compile_filter("3 < a <= 5").split_range(
+            self.resolve, lambda name: True
+        )
+        self.assertEqual((start, stop, remainder), (4, 6, None))
+
+        # Empty range:
+        start, stop, _ = compile_filter("a > 5 & a < 2").split_range(
+            self.resolve, lambda name: True
+        )
+        self.assertEqual(start, stop)
+
+    def test_split_range_not_applicable(self):
+        for expression in ["a > 3 or b < 10", "a != 3", "c == 'a'",
+                           "a in [1, 2]", "a < b"]:
+            compiled = compile_filter(expression)
+            self.assertIsNone(compiled.split_range(self.resolve,
+                                                   lambda name: True))
+        compiled = compile_filter("a > 3")
+        self.assertIsNone(compiled.split_range(self.resolve,
+                                               lambda name: False))
+
+    def test_split_range_on_datetimes(self):
+        index = pd.date_range("2023-12-25", periods=20, freq="D")
+        df = pd.DataFrame({"a": range(20)}, index=index)
+        compiled = compile_filter("index >= '2024-01-01' and "
+                                  "index < '2024-01-03'")
+        start, stop, _ = compiled.split_range(lambda name: df.index,
+                                              lambda name: True)
+        self.assertEqual((start, stop), (7, 9))
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from traits.testing.unittest_tools import UnittestTools
+
+from pybleau.app.model.filter_scheduler import FilterScheduler
+
+
+class TestFilterScheduler(TestCase, UnittestTools):
+
+    def setUp(self):
+        self.scheduler = FilterScheduler()
+        self.applied = []
+
+    def apply(self, result, error):
+        self.applied.append((result, error))
+
+    def test_result_applied(self):
+        scheduler = self.scheduler
+        with self.assertTraitChanges(scheduler, "computing", count=2):
+            scheduler.schedule(0., lambda: 1, self.apply)
+            self.assertTrue(scheduler.computing)
+            scheduler.join(5)
+            # Not applied until processed by the thread owning the traits:
+            self.assertEqual(self.applied, [])
+            self.assertTrue(scheduler.wait(5))
+        self.assertEqual(self.applied, [(1, None)])
+        self.assertFalse(scheduler.process_results())
+
+    def test_superseded_request_dropped(self):
+        scheduler = self.scheduler
+        scheduler.schedule(0.2, lambda: 1, self.apply)
+        scheduler.schedule(0., lambda: 2, self.apply)
+        scheduler.wait(5)
+        self.assertEqual(self.applied, [(2, None)])
+        self.assertFalse(scheduler.computing)
+
+    def test_stale_result_dropped(self):
+        scheduler = self.scheduler
+        scheduler.schedule(0., lambda: 1, self.apply)
+        scheduler.join(5)
+        # Result dispatched, but superseded before being applied:
+        scheduler.cancel()
+        scheduler.process_results()
+        self.assertEqual(self.applied, [])
+
+        request_id = scheduler.request_id
+        scheduler.cancel()
+        scheduler._run(request_id, lambda: 1, self.apply)
+        scheduler.process_results()
+        self.assertEqual(self.applied, [])
+
+    def test_error_passed(self):
+        error = ValueError("failed")
+
+        def evaluate():
+            raise error
+
+        self.scheduler.schedule(0., evaluate, self.apply)
+        self.scheduler.wait(5)
+        self.assertEqual(self.applied, [(None, error)])
+        self.assertFalse(self.scheduler.computing)
@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+from pybleau.app.model.filter_utils import find_refining_clauses, \
+    split_conjunction
+
+
+class TestSplitConjunction(TestCase):
+
+    def test_single_clause(self):
+        self.assertEqual(split_conjunction("a > 3"), ["a > 3"])
+        self.assertEqual(split_conjunction(" a > 3 "), ["a > 3"])
+
+    def test_and_conjunction(self):
+        self.assertEqual(split_conjunction("a > 3 and b == 'x'"),
+                         ["a > 3", "b == 'x'"])
+        self.assertEqual(split_conjunction("a > 3 and b == 'x' and c < 10"),
+                         ["a > 3", "b == 'x'", "c < 10"])
+
+    def test_ampersand_conjunction(self):
+        self.assertEqual(split_conjunction("(a > 3) & (b == 'x')"),
+                         ["(a > 3)", "(b == 'x')"])
+
+    def test_parenthesized_clauses_not_split(self):
+        self.assertEqual(split_conjunction("(a > 3 and b < 2) and c < 10"),
+                         ["(a > 3 and b < 2)", "c < 10"])
+        self.assertEqual(split_conjunction("a in [1, 2] and c < 10"),
+                         ["a in [1, 2]", "c < 10"])
+
+    def test_string_content_not_split(self):
+        self.assertEqual(split_conjunction("b == 'x and y' and c < 10"),
+                         ["b == 'x and y'", "c < 10"])
+
+    def test_disjunction_not_split(self):
+        expr = "a > 3 or b == 'x' and c < 10"
+        self.assertEqual(split_conjunction(expr), [expr])
+        expr = "a > 3 | b == 'x' & c < 10"
+        self.assertEqual(split_conjunction(expr), [expr])
+
+    def test_incomplete_expression_not_split(self):
+        self.assertEqual(split_conjunction("a > 3 and"), ["a > 3 and"])
+        self.assertEqual(split_conjunction("(a > 3 and b"), ["(a > 3 and b"])
+
+
+class TestFindRefiningClauses(TestCase):
+
+    def test_refinement(self):
+        added = find_refining_clauses(["a > 3", "b == 'x'"], ["a > 3"])
+        self.assertEqual(added, ["b == 'x'"])
+
+    def test_not_refinement(self):
+        self.assertIsNone(find_refining_clauses(["a > 4", "b == 'x'"],
+                                                ["a > 3"]))
+        self.assertIsNone(find_refining_clauses(["a > 3"],
+                                                ["a > 3", "b == 'x'"]))
+
+    def test_same_clauses(self):
+        self.assertIsNone(find_refining_clauses(["b == 'x'", "a > 3"],
+                                                ["a > 3", "b == 'x'"]))
@@ -0,0 +1,147 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from pybleau.app.model.selection import labels_to_positions, RowSelection, \
+    same_elements
+
+
+class TestRowSelection(TestCase):
+
+    def test_set_positions(self):
+        selection = RowSelection()
+        selection.set_positions([4, 1, 4], num_rows=6)
+        self.assertEqual(selection.num_rows, 6)
+        self.assertEqual(len(selection), 2)
+        np.testing.assert_array_equal(selection.positions, [1, 4])
+        self.assertIn(4, selection)
+        self.assertNotIn(2, selection)
+        self.assertNotIn(10, selection)
+
+    def test_version_only_changes_with_selection(self):
+        selection = RowSelection()
+        selection.set_positions([1, 2], num_rows=5)
+        version = selection.version
+        selection.set_positions([1, 2, 2])
+        selection.extend([1])
+        self.assertEqual(selection.version, version)
+        # Selecting the same rows in another order is a change:
+        selection.set_positions([2, 1])
+        version += 1
+        self.assertEqual(selection.version, version)
+        selection.extend([3])
+        self.assertEqual(selection.version, version + 1)
+        selection.clear()
+        self.assertEqual(selection.version, version + 2)
+        selection.clear()
+        self.assertEqual(selection.version, version + 2)
+
+    def test_rows_changed(self):
+        selection = RowSelection()
+        events = []
+        selection.on_trait_change(lambda new: events.append(new),
+                                  "rows_changed")
+        selection.set_positions([1, 2], num_rows=5)
+        self.assertIsNone(events[-1])
+        selection.set_positions([2, 4, 0])
+        added, removed = events[-1]
+        np.testing.assert_array_equal(added, [0, 4])
+        np.testing.assert_array_equal(removed, [1])
+        selection.toggle([0, 3])
+        added, removed = events[-1]
+        np.testing.assert_array_equal(added, [3])
+        np.testing.assert_array_equal(removed, [0])
+        self.assertEqual(len(events), 3)
+
+    def test_matches(self):
+        selection = RowSelection()
+        selection.set_positions([1, 3], num_rows=5)
+        self.assertTrue(selection.matches([3, 1]))
+        self.assertTrue(selection.matches([3, 1, 1]))
+        self.assertFalse(selection.matches([1]))
+        self.assertFalse(selection.matches([1, 3, 4]))
+        self.assertFalse(selection.matches([1, 3, 7]))
+        self.assertFalse(selection.matches([]))
+        selection.clear()
+        self.assertTrue(selection.matches([]))
+
+    def test_toggle(self):
+        selection = RowSelection()
+        selection.set_positions([1, 3], num_rows=5)
+        selection.toggle([3, 4, 4])
+        np.testing.assert_array_equal(selection.positions, [1, 4])
+
+    def test_selection_order(self):
+        selection = RowSelection()
+        selection.set_positions([3, 0, 3], num_rows=5)
+        np.testing.assert_array_equal(selection.ordered_positions, [3, 0])
+        selection.extend([4, 0, 1])
+        np.testing.assert_array_equal(selection.ordered_positions,
+                                      [3, 0, 4, 1])
+        selection.toggle([0, 2])
+        np.testing.assert_array_equal(selection.ordered_positions,
+                                      [3, 4, 1, 2])
+        np.testing.assert_array_equal(selection.positions, [1, 2, 3, 4])
+        # Resizing keeps the order:
+        selection.set_positions([3, 4, 1, 2], num_rows=6)
+        np.testing.assert_array_equal(selection.ordered_positions,
+                                      [3, 4, 1, 2])
+        self.assertEqual(selection.num_rows, 6)
+
+    def test_reorder(self):
+        selection = RowSelection()
+        events = []
+        selection.on_trait_change(lambda new: events.append(new),
+                                  "rows_changed")
+        selection.set_positions([0, 3], num_rows=4)
+        version = selection.version
+        # Rows reversed, the last one dropped:
+        selection.reorder([2, 1, 0])
+        np.testing.assert_array_equal(selection.ordered_positions, [2])
+        self.assertEqual(selection.num_rows, 3)
+        self.assertEqual(selection.count, 1)
+        self.assertEqual(selection.version, version + 1)
+        self.assertEqual(len(events), 1)
+
+    def test_invalid_positions(self):
+        selection = RowSelection()
+        selection.set_positions([], num_rows=3)
+        with self.assertRaises(IndexError):
+            selection.extend([3])
+        with self.assertRaises(IndexError):
+            selection.toggle([-1])
+
+    def test_mask_read_only(self):
+        selection = RowSelection()
+        selection.set_positions([0], num_rows=2)
+        with self.assertRaises(ValueError):
+            selection.mask[1] = True
+
+    def test_labels(self):
+        selection = RowSelection()
+        selection.set_positions([0, 2], num_rows=3)
+        index = pd.Index(list("xyz"))
+        self.assertEqual(list(selection.labels(index)), ["x", "z"])
+        selection.set_positions([2, 0])
+        self.assertEqual(list(selection.labels(index)), ["z", "x"])
+
+
+class TestSelectionUtilities(TestCase):
+
+    def test_labels_to_positions(self):
+        index = pd.Index([10, 5, 7, 3])
+        positions = labels_to_positions(index, [3, 10, 4])
+        np.testing.assert_array_equal(positions, [0, 3])
+
+    def test_labels_to_positions_non_unique_index(self):
+        index = pd.Index([10, 5, 10, 3])
+        positions = labels_to_positions(index, [10])
+        np.testing.assert_array_equal(positions, [0, 2])
+
+    def test_same_elements(self):
+        self.assertTrue(same_elements([1, 2, 2], [2, 1]))
+        self.assertFalse(same_elements([1, 2], [1, 3]))
+        self.assertTrue(same_elements([], []))
+        self.assertFalse(same_elements([], [1]))
+        self.assertTrue(same_elements(["a", 1], [1, "a"]))
@@ -0,0 +1,105 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pybleau.app.model.sketches import HeavyHittersSketch, HyperLogLog, \
+    KLLSketch
+
+
+class TestKLLSketch(TestCase):
+
+    def setUp(self):
+        self.values = np.random.RandomState(0).normal(size=100000)
+
+    def assert_rank_within_bound(self, sketch, values, quantiles):
+        estimates = sketch.quantiles(quantiles)
+        ranks = np.searchsorted(np.sort(values), estimates) / len(values)
+        errors = np.abs(ranks - quantiles)
+        self.assertTrue(np.all(errors <= sketch.rank_error))
+
+    def test_exact_when_small(self):
+        sketch = KLLSketch(k=200).update(np.arange(101.))
+        np.testing.assert_array_equal(sketch.quantiles([0., 0.25, 1.]),
+                                      [0., 25., 100.])
+        self.assertEqual(sketch.max_rank_error, 0)
+
+    def test_quantiles_within_bound(self):
+        quantiles = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+        sketch = KLLSketch(seed=0).update(self.values)
+        self.assertEqual(len(sketch), len(self.values))
+        self.assertLess(sketch.rank_error, 0.1)
+        self.assert_rank_within_bound(sketch, self.values, quantiles)
+
+    def test_merge_chunks(self):
+        quantiles = np.array([0.1, 0.5, 0.9])
+        sketch = KLLSketch(seed=0)
+        for chunk in np.array_split(self.values, 10):
+            sketch.merge(KLLSketch(seed=1).update(chunk))
+        self.assertEqual(sketch.count, len(self.values))
+        self.assert_rank_within_bound(sketch, self.values, quantiles)
+
+    def test_quantile_bounds_contain_estimates(self):
+        sketch = KLLSketch(seed=0).update(self.values)
+        estimates = sketch.quantiles([0.5])
+        lower, upper = sketch.quantile_bounds([0.5])
+        self.assertLessEqual(lower[0], estimates[0])
+        self.assertGreaterEqual(upper[0], estimates[0])
+        self.assertLessEqual(lower[0], np.median(self.values))
+        self.assertGreaterEqual(upper[0], np.median(self.values))
+
+    def test_nans_ignored(self):
+        sketch = KLLSketch().update([1., np.nan, 3.])
+        self.assertEqual(sketch.count, 2)
+        self.assertTrue(np.isnan(KLLSketch().quantiles([0.5])[0]))
+
+
+class TestHyperLogLog(TestCase):
+
+    def test_estimate_within_error(self):
+        values = np.random.RandomState(0).randint(0, 20000, 100000)
+        sketch = HyperLogLog()
+        for chunk in np.array_split(values, 4):
+            sketch.merge(HyperLogLog().update(chunk))
+        num_unique = len(np.unique(values))
+        error = abs(sketch.estimate() - num_unique) / num_unique
+        self.assertLess(error, 4 * sketch.relative_error)
+
+    def test_small_counts_and_nulls(self):
+        sketch = HyperLogLog().update(np.array(["a", "b", None, "a"],
+                                               dtype=object))
+        self.assertEqual(round(sketch.estimate()), 2)
+        self.assertEqual(HyperLogLog().estimate(), 0)
+
+    def test_invalid_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=20)
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=8).merge(HyperLogLog(precision=10))
+
+
+class TestHeavyHittersSketch(TestCase):
+
+    def test_exact_below_capacity(self):
+        sketch = HeavyHittersSketch(capacity=5)
+        sketch.update(list("abcabca"))
+        sketch.merge(HeavyHittersSketch(capacity=5).update(list("bb")))
+        self.assertEqual(sketch.most_frequent(), [("b", 4), ("a", 3)])
+        self.assertEqual(sketch.max_count_error, 0)
+
+    def test_counts_within_bound(self):
+        rng = np.random.RandomState(0)
+        values = np.concatenate([rng.randint(0, 1000, 20000),
+                                 np.full(3000, 7), np.full(2000, 3)])
+        rng.shuffle(values)
+        sketch = HeavyHittersSketch(capacity=20)
+        for chunk in np.array_split(values, 5):
+            sketch.merge(HeavyHittersSketch(capacity=20).update(chunk))
+
+        self.assertLessEqual(sketch.max_count_error, len(values) / 21.)
+        true_counts = np.bincount(values)
+        (top, top_freq), (next_, next_freq) = sketch.most_frequent()
+        self.assertEqual((top, next_), (7, 3))
+        for value, freq in [(top, top_freq), (next_, next_freq)]:
+            self.assertLessEqual(freq, true_counts[value])
+            self.assertGreaterEqual(freq + sketch.max_count_error,
+                                    true_counts[value])
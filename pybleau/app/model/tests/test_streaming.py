@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from pybleau.app.model.streaming import align_appended_rows, \
+    AppendableFrame, index_appended_in_order
+
+
+class TestAppendableFrame(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": np.arange(4.), "b": list("wxyz"),
+                                "c": pd.Categorical(list("abab"))})
+
+    def new_rows(self, start, stop):
+        return pd.DataFrame({"a": np.arange(start, stop, dtype=float),
+                             "b": ["v"] * (stop - start),
+                             "c": pd.Categorical(["a"] * (stop - start))},
+                            index=range(start, stop))
+
+    def test_append_like_concat(self):
+        appendable = AppendableFrame(self.df)
+        expected = self.df
+        for start in range(4, 20, 3):
+            new_rows = self.new_rows(start, start + 3)
+            expected = pd.concat([expected, new_rows])
+            assert_frame_equal(appendable.append(new_rows), expected,
+                               check_index_type=False)
+        self.assertIsInstance(appendable.frame.index, pd.RangeIndex)
+
+    def test_previous_frames_unchanged(self):
+        appendable = AppendableFrame(self.df)
+        first = appendable.append(self.new_rows(4, 5))
+        second = appendable.append(self.new_rows(5, 6))
+        self.assertEqual(list(first["a"]), [0., 1., 2., 3., 4.])
+        # The rows are written in the same buffer:
+        self.assertTrue(np.shares_memory(first["a"].to_numpy(),
+                                         second["a"].to_numpy()))
+        self.assertEqual(len(second), 6)
+
+    def test_source_not_modified(self):
+        values = self.df["a"].to_numpy().copy()
+        AppendableFrame(self.df).append(self.new_rows(4, 6))
+        np.testing.assert_array_equal(self.df["a"].to_numpy(), values)
+
+    def test_buffered_index(self):
+        df = pd.DataFrame({"a": [1, 2]}, index=pd.Index([10, 20], name="i"))
+        appendable = AppendableFrame(df)
+        appendable.append(pd.DataFrame({"a": [3]}, index=[30]))
+        result = appendable.append(pd.DataFrame({"a": [4]}, index=[40]))
+        self.assertEqual(list(result.index), [10, 20, 30, 40])
+        self.assertEqual(result.index.name, "i")
+
+    def test_dtype_change(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        appendable = AppendableFrame(df)
+        result = appendable.append(pd.DataFrame({"a": [.5]}, index=[2]))
+        self.assertEqual(result["a"].dtype, np.float64)
+        result = appendable.append(pd.DataFrame({"a": [.25]}, index=[3]))
+        self.assertEqual(list(result["a"]), [1., 2., .5, .25])
+
+
+class TestAlignAppendedRows(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": [1, 2], "b c": [3, 4]}, index=[0, 2])
+
+    def test_columns_reordered(self):
+        new_rows = pd.DataFrame({"b c": [5], "a": [6]}, index=[3])
+        result = align_appended_rows(new_rows, self.df)
+        self.assertEqual(list(result.columns), ["a", "b c"])
+        self.assertEqual(list(result.loc[3]), [6, 5])
+
+    def test_sanitized_columns(self):
+        df = self.df.rename(columns={"b c": "b_c"})
+        new_rows = pd.DataFrame({"a": [6], "b c": [5]}, index=[3])
+        with self.assertRaises(ValueError):
+            align_appended_rows(new_rows, df)
+
+        def sanitize(columns):
+            return [col.replace(" ", "_") for col in columns]
+
+        result = align_appended_rows(new_rows, df, sanitize_columns=sanitize)
+        self.assertEqual(list(result.columns), ["a", "b_c"])
+
+    def test_invalid_rows(self):
+        with self.assertRaises(ValueError):
+            align_appended_rows([[1, 2]], self.df)
+        with self.assertRaises(ValueError):
+            align_appended_rows(pd.DataFrame({"a": [1]}), self.df)
+        new_rows = pd.DataFrame({"a": [5], "b c": [6]}, index=[2])
+        for index_sorted in [False, True]:
+            with self.assertRaises(ValueError):
+                align_appended_rows(new_rows, self.df,
+                                    index_sorted=index_sorted)
+        with self.assertRaises(ValueError):
+            align_appended_rows(new_rows.iloc[[0, 0]], self.df)
+
+
+class TestIndexAppendedInOrder(TestCase):
+
+    def test_in_order(self):
+        index = pd.Index([1, 3])
+        self.assertTrue(index_appended_in_order(index, pd.Index([4, 6])))
+        self.assertFalse(index_appended_in_order(index, pd.Index([2, 6])))
+        self.assertFalse(index_appended_in_order(index, pd.Index([6, 4])))
+        self.assertTrue(index_appended_in_order(pd.Index([]),
+                                                pd.Index([4])))
+        self.assertFalse(index_appended_in_order(index, pd.Index(["a"])))
@@ -0,0 +1,396 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from pybleau.app.model.dataframe_view import DataFrameView
+from pybleau.app.model.summary_engine import CATEGORICAL_ELEMENTS, \
+    categorical_column_summary, compute_block_stats, get_shared_executor, \
+    IncrementalSummary, merge_moments, NumericalSummaryEngine, \
+    SketchSummaryEngine, split_blocks, summarize_categorical
+
+SUMMARY_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+MOMENTS = ["count", "mean", "std", "min", "max"]
+
+
+class TestNumericalSummaryEngine(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(11),
+                                "b": np.linspace(0., 1., 11),
+                                "c": [1., np.nan] * 5 + [3.]})
+
+    def test_matches_describe(self):
+        engine = NumericalSummaryEngine()
+        summary = engine.summarize(self.df, SUMMARY_INDEX)
+        assert_frame_equal(summary, self.df.describe().astype(np.float64))
+
+    def test_extra_percentiles(self):
+        engine = NumericalSummaryEngine()
+        summary = engine.summarize(self.df[["a", "b"]],
+                                   ["mean", "0.5%", "99%"])
+        self.assertEqual(summary.index.tolist(), ["mean", "0.5%", "99%"])
+        for col in ["a", "b"]:
+            expected = np.percentile(self.df[col], [0.5, 99])
+            np.testing.assert_allclose(summary.loc[["0.5%", "99%"], col],
+                                       expected)
+
+    def test_unknown_elements_are_nan(self):
+        engine = NumericalSummaryEngine()
+        summary = engine.summarize(self.df, ["mean", "foo"])
+        self.assertTrue(summary.loc["foo"].isnull().all())
+
+    def test_unsupported_dtype_described_by_pandas(self):
+        df = pd.DataFrame({"a": [1, 2, 3],
+                           "b": pd.to_timedelta([1, 2, 3], unit="s")})
+        engine = NumericalSummaryEngine()
+        summary = engine.summarize(df, ["mean", "max"])
+        self.assertEqual(summary.columns.tolist(), ["a", "b"])
+        self.assertEqual(summary.loc["mean", "a"], 2)
+        self.assertEqual(summary.loc["max", "b"], pd.Timedelta("3s"))
+
+    def test_bool_columns_counted(self):
+        engine = NumericalSummaryEngine()
+        bools = [True, False] * 5 + [True]
+        df = pd.DataFrame({"a": range(11), "d": bools})
+        summary = engine.summarize(df, SUMMARY_INDEX + ["10%"])
+        self.assertEqual(summary.columns.tolist(), ["a", "d"])
+        self.assertEqual(summary.loc["mean", "a"], 5)
+        self.assertEqual(summary.loc["count", "d"], 11)
+        self.assertTrue(summary["d"].iloc[1:].isnull().all())
+
+        # Along with other columns described by pandas:
+        df["e"] = pd.to_timedelta(range(11), unit="s")
+        summary = engine.summarize(df, ["count", "max"])
+        self.assertEqual(summary.columns.tolist(), ["a", "d", "e"])
+        self.assertEqual(summary.loc["count", "d"], 11)
+        self.assertEqual(summary.loc["max", "e"], pd.Timedelta("10s"))
+
+    def test_cached_per_data_key(self):
+        engine = NumericalSummaryEngine()
+        engine.summarize(self.df, ["mean"], data_key=0)
+        # Same key: values come from the cache, even if the data differs:
+        summary = engine.summarize(self.df * 2, ["mean", "max"], data_key=0)
+        self.assertEqual(summary.loc["mean", "a"], 5)
+        # Missing elements are computed:
+        self.assertEqual(summary.loc["max", "a"], 20)
+        summary = engine.summarize(self.df * 2, ["mean"], data_key=1)
+        self.assertEqual(summary.loc["mean", "a"], 10)
+
+    def test_cache_bounded(self):
+        engine = NumericalSummaryEngine(max_cached_data=2)
+        for key in range(3):
+            engine.summarize(self.df, ["mean"], data_key=key)
+        summary = engine.summarize(self.df * 2, ["mean"], data_key=0)
+        self.assertEqual(summary.loc["mean", "a"], 10)
+
+    def test_summarize_view_columns(self):
+        gathered = []
+
+        class RecordingView(DataFrameView):
+            def to_frame(self, columns=None):
+                gathered.append(list(columns))
+                return super(RecordingView, self).to_frame(columns)
+
+        view = RecordingView(self.df, positions=np.arange(0, 11, 2))
+        engine = NumericalSummaryEngine()
+        summary = engine.summarize(view, ["mean"], data_key=0,
+                                   columns=["c", "a"])
+        self.assertEqual(summary.columns.tolist(), ["c", "a"])
+        self.assertEqual(summary.loc["mean", "a"], 5)
+        self.assertEqual(gathered, [["c", "a"]])
+
+        # Only the columns without cached statistics are gathered:
+        summary = engine.summarize(view, ["mean"], data_key=0,
+                                   columns=["a", "b"])
+        self.assertEqual(gathered[-1], ["b"])
+        self.assertEqual(summary.loc["mean", "b"], 0.5)
+
+    def test_append_data_merges_moments(self):
+        engine = NumericalSummaryEngine()
+        engine.summarize(self.df.iloc[:6], SUMMARY_INDEX, data_key=0)
+        self.assertTrue(engine.append_data(0, 1, self.df.iloc[6:]))
+        summary = engine.summarize(self.df, SUMMARY_INDEX, data_key=1)
+        assert_frame_equal(summary, self.df.describe().astype(np.float64))
+
+    def test_append_data_updates_quantile_sketches(self):
+        df = pd.DataFrame({"a": np.random.RandomState(0).normal(size=1000)})
+        engine = NumericalSummaryEngine(kll_size=32)
+        engine.summarize(df.iloc[:600], SUMMARY_INDEX, data_key=0)
+        engine.append_data(0, 1, df.iloc[600:900], old_data=df.iloc[:600])
+        engine.append_data(1, 2, df.iloc[900:])
+        gathered = []
+        view = DataFrameView(df)
+        view.to_frame = lambda columns=None: gathered.append(columns)
+        summary = engine.summarize(view, SUMMARY_INDEX, data_key=2)
+        # Percentiles are estimated without reading the data:
+        self.assertEqual(gathered, [])
+        expected = df.describe()
+        error = engine.error_bounds(2, SUMMARY_INDEX, ["a"])
+        diff = (summary - expected).abs()
+        self.assertTrue((diff <= error + 1e-9).all().all())
+        self.assertTrue((error.loc[MOMENTS] == 0).all().all())
+        self.assertTrue((error.loc[["25%", "50%", "75%"]] > 0).all().all())
+
+        # Unless exact values are requested:
+        summary = engine.summarize(df, SUMMARY_INDEX, data_key=2,
+                                   use_sketches=False)
+        assert_frame_equal(summary, expected)
+        self.assertTrue(engine.error_bounds(2, SUMMARY_INDEX, ["a"]).empty)
+
+    def test_append_data_unknown_key(self):
+        engine = NumericalSummaryEngine()
+        self.assertFalse(engine.append_data(0, 1, self.df))
+
+    def test_blocks_of_columns_in_thread_pool(self):
+        df = pd.DataFrame(np.random.RandomState(0).normal(size=(50, 7)),
+                          columns=list("gfedcba"))
+        expected = NumericalSummaryEngine().summarize(df, SUMMARY_INDEX)
+        engine = NumericalSummaryEngine(column_block_size=2)
+        summary = engine.summarize(df, SUMMARY_INDEX, data_key=0,
+                                   executor=get_shared_executor(3))
+        # Columns are merged back in their original order:
+        assert_frame_equal(summary, expected)
+
+
+class TestSketchSummaryEngine(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.df = pd.DataFrame({"a": rng.normal(size=1000),
+                                "b": rng.randint(0, 10, 1000),
+                                "c": rng.choice(list("abcd"), 1000)})
+        self.positions = np.flatnonzero(self.df["a"] > 0)
+
+    def test_moments_exact(self):
+        engine = SketchSummaryEngine(chunk_size=64)
+        summary, error = engine.summarize(self.df, self.positions,
+                                          ["a", "b"], SUMMARY_INDEX)
+        expected = self.df.iloc[self.positions][["a", "b"]].describe()
+        assert_frame_equal(summary.loc[MOMENTS], expected.loc[MOMENTS])
+        self.assertTrue((error.loc[MOMENTS] == 0).all().all())
+
+    def test_percentiles_within_error(self):
+        engine = SketchSummaryEngine(chunk_size=64, kll_size=32)
+        summary, error = engine.summarize(self.df, None, ["a"],
+                                          ["25%", "50%", "75%"])
+        expected = self.df[["a"]].describe().loc[["25%", "50%", "75%"]]
+        self.assertTrue(((summary - expected).abs() <= error).all().all())
+        self.assertTrue((error > 0).all().all())
+
+    def test_full_chunks_cached(self):
+        engine = SketchSummaryEngine(chunk_size=100)
+        engine.summarize(self.df, None, ["a"], ["mean"], data_version=0)
+        self.assertEqual(len(engine._cache), 10)
+        # Positions covering the first 2 chunks and part of the third:
+        positions = np.arange(250)
+        summary, _ = engine.summarize(self.df * 2, positions, ["a"],
+                                      ["mean"], data_version=0)
+        expected = (self.df["a"].iloc[:200].sum() +
+                    2 * self.df["a"].iloc[200:250].sum()) / 250
+        self.assertAlmostEqual(summary.loc["mean", "a"], expected)
+
+    def test_append_data_keeps_full_chunks(self):
+        engine = SketchSummaryEngine(chunk_size=100)
+        engine.summarize(self.df.iloc[:250], None, ["a"], ["mean"],
+                         data_version=0)
+        engine.append_data(0, 1, 250)
+        self.assertEqual(sorted(key[2] for key in engine._cache
+                                if key[0] == 1), [0, 1])
+
+    def test_columns_in_thread_pool(self):
+        engine = SketchSummaryEngine(chunk_size=64)
+        executor = get_shared_executor(2)
+        summary, error = engine.summarize(self.df, self.positions,
+                                          ["b", "a"], SUMMARY_INDEX,
+                                          data_version=0, executor=executor)
+        expected = self.df.iloc[self.positions][["b", "a"]].describe()
+        # Columns are merged back in their original order:
+        assert_frame_equal(summary.loc[MOMENTS], expected.loc[MOMENTS])
+        percentiles = ["25%", "50%", "75%"]
+        diff = (summary - expected).loc[percentiles].abs()
+        self.assertTrue((diff <= error.loc[percentiles]).all().all())
+        summary, _ = engine.summarize_categorical(
+            self.df, None, ["c", "b"], executor=executor
+        )
+        self.assertEqual(summary.columns.tolist(), ["c", "b"])
+
+    def test_categorical_summary(self):
+        engine = SketchSummaryEngine(chunk_size=64)
+        summary, error = engine.summarize_categorical(self.df, self.positions,
+                                                      ["c"])
+        expected = summarize_categorical(self.df.iloc[self.positions][["c"]])
+        # Fewer distinct values than counters: the sketch is exact:
+        assert_frame_equal(summary, expected)
+        self.assertEqual(error.loc["freq", "c"], 0)
+        self.assertTrue(np.isnan(error.loc["top", "c"]))
+
+    def test_unsupported_dtype_described_by_pandas(self):
+        df = pd.DataFrame({"a": [1, 2, 3],
+                           "b": pd.to_timedelta([1, 2, 3], unit="s")})
+        engine = SketchSummaryEngine()
+        summary, error = engine.summarize(df, None, ["a", "b"],
+                                          ["mean", "max"])
+        self.assertEqual(summary.columns.tolist(), ["a", "b"])
+        self.assertEqual(summary.loc["max", "b"], pd.Timedelta("3s"))
+        self.assertEqual(error.loc["max", "b"], 0)
+
+
+class TestSharedExecutor(TestCase):
+
+    def test_single_thread(self):
+        self.assertIsNone(get_shared_executor(1))
+
+    def test_shared_per_num_threads(self):
+        executor = get_shared_executor(2)
+        self.assertIs(get_shared_executor(2), executor)
+        self.assertIsNot(get_shared_executor(3), executor)
+
+    def test_split_blocks(self):
+        self.assertEqual(split_blocks(list("abcde"), 2),
+                         [["a", "b"], ["c", "d"], ["e"]])
+        self.assertEqual(split_blocks([], 2), [])
+
+
+class TestIncrementalSummary(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": np.arange(20.),
+                                "b": [1., np.nan] * 10,
+                                "c": np.arange(20.) ** 2 + 1e9})
+        self.rows = []
+        self.summary = IncrementalSummary(list(self.df), self.get_values)
+
+    def get_values(self):
+        return self.df.iloc[sorted(self.rows)].to_numpy()
+
+    def update(self, added=(), removed=()):
+        self.rows = sorted(set(self.rows) - set(removed) | set(added))
+        self.summary.remove(self.df.iloc[list(removed)].to_numpy())
+        self.summary.add(self.df.iloc[list(added)].to_numpy())
+
+    def assert_summary_matches(self):
+        summary = self.summary.summarize(MOMENTS)
+        expected = self.df.iloc[self.rows].describe().loc[MOMENTS]
+        assert_frame_equal(summary, expected.astype(np.float64))
+
+    def test_add_and_remove_rows(self):
+        self.update(added=[3, 1, 7])
+        self.assert_summary_matches()
+        self.update(added=[10, 12])
+        self.assert_summary_matches()
+        # Removing the min and max:
+        self.update(removed=[1, 12])
+        self.assert_summary_matches()
+        self.update(removed=[3])
+        self.assert_summary_matches()
+
+    def test_empty(self):
+        summary = self.summary.summarize(SUMMARY_INDEX)
+        np.testing.assert_array_equal(summary.loc["count"], [0, 0, 0])
+        self.assertTrue(summary.drop("count").isnull().all().all())
+        self.update(added=[1, 3])
+        summary = self.summary.summarize(MOMENTS)
+        self.assertEqual(summary.loc["count", "b"], 0)
+        self.assertTrue(np.isnan(summary.loc["max", "b"]))
+        self.update(added=[2], removed=[1, 3])
+        self.assert_summary_matches()
+
+    def test_percentiles(self):
+        self.update(added=range(10))
+        summary = self.summary.summarize(["50%", "max"])
+        self.assertIn(summary.loc["50%", "a"], [4., 5.])
+        self.assertEqual(summary.loc["max", "a"], 9.)
+        # Added rows update the sketches, removed rows rebuild them:
+        self.update(added=range(10, 20))
+        self.assertIn(self.summary.summarize(["50%"]).loc["50%", "a"],
+                      [9., 10.])
+        self.update(removed=range(10))
+        self.assertIn(self.summary.summarize(["50%"]).loc["50%", "a"],
+                      [14., 15.])
+
+
+class TestComputeBlockStats(TestCase):
+
+    def test_all_nan_and_single_values(self):
+        block = np.array([[np.nan, 1.], [np.nan, np.nan]])
+        stats = compute_block_stats(block, ["count", "mean", "std", "min",
+                                            "50%"])
+        np.testing.assert_array_equal(stats["count"], [0, 1])
+        np.testing.assert_array_equal(stats["mean"], [np.nan, 1])
+        self.assertTrue(np.isnan(stats["std"]).all())
+        np.testing.assert_array_equal(stats["min"], [np.nan, 1])
+        np.testing.assert_array_equal(stats["50%"], [np.nan, 1])
+
+
+class TestMergeMoments(TestCase):
+
+    def test_merge(self):
+        values = np.array([1., 5., 2., 8., 3.])
+        block = values[:, None]
+        stats1 = {entry: value[0] for entry, value in
+                  compute_block_stats(block[:2], MOMENTS).items()}
+        stats2 = {entry: value[0] for entry, value in
+                  compute_block_stats(block[2:], MOMENTS).items()}
+        merged = merge_moments(stats1, stats2)
+        self.assertEqual(merged["count"], 5)
+        self.assertAlmostEqual(merged["mean"], values.mean())
+        self.assertAlmostEqual(merged["std"], values.std(ddof=1))
+        self.assertEqual(merged["min"], 1)
+        self.assertEqual(merged["max"], 8)
+
+    def test_merge_with_empty_part(self):
+        stats = {"count": 2., "mean": 1., "std": 0.5, "min": 0.5, "max": 1.5}
+        empty = {"count": 0., "mean": np.nan, "std": np.nan, "min": np.nan,
+                 "max": np.nan}
+        self.assertEqual(merge_moments(stats, empty), stats)
+        self.assertEqual(merge_moments(empty, stats), stats)
+
+    def test_only_known_elements_merged(self):
+        stats = {"count": 2., "min": 0.5}
+        other = {"count": 1., "mean": 1., "std": np.nan, "min": 0.,
+                 "max": 1.}
+        self.assertEqual(merge_moments(stats, other), {"count": 3.,
+                                                       "min": 0.})
+
+
+class TestCategoricalSummary(TestCase):
+
+    def test_object_column(self):
+        col = pd.Series(list("abcdeabcaab") + [None])
+        self.assertEqual(categorical_column_summary(col),
+                         [11, 5, "a", 4, "b", 3])
+
+    def test_categorical_column(self):
+        col = pd.Series(pd.Categorical(list("bbac"),
+                                       categories=["z", "c", "b", "a"]))
+        self.assertEqual(categorical_column_summary(col),
+                         [4, 3, "b", 2, "c", 1])
+
+    def test_datetime_column(self):
+        col = pd.Series(pd.to_datetime(["2020-1-2", "2020-1-1", "2020-1-1"]))
+        self.assertEqual(categorical_column_summary(col),
+                         [3, 2, pd.Timestamp("2020-1-1"), 2,
+                          pd.Timestamp("2020-1-2"), 1])
+
+    def test_not_enough_values(self):
+        summary = categorical_column_summary(pd.Series(["x", "x"]))
+        self.assertEqual(summary[:4], [2, 1, "x", 2])
+        self.assertTrue(np.isnan(summary[4]) and np.isnan(summary[5]))
+        summary = categorical_column_summary(pd.Series([], dtype=object))
+        self.assertEqual(summary[:2], [0, 0])
+        self.assertTrue(np.all(np.isnan(summary[2:])))
+
+    def test_summarize_multiple_columns(self):
+        df = pd.DataFrame({"a": ["x", "x", "x"], "b": ["x", "y", "y"]})
+        expected = pd.DataFrame({"a": [3, 1, "x", 3, np.nan, np.nan],
+                                 "b": [3, 2, "y", 2, "x", 1]},
+                                index=CATEGORICAL_ELEMENTS)
+        assert_frame_equal(summarize_categorical(df), expected)
+        assert_frame_equal(summarize_categorical(df, max_workers=1), expected)
+        assert_frame_equal(
+            summarize_categorical(df, executor=get_shared_executor(2)),
+            expected
+        )
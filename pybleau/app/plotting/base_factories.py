@@ -23,7 +23,8 @@ from six import string_types
 from traits.api import Any, Dict, HasStrictTraits, Instance, Int, List, Set, \
     Str
 from chaco.api import ArrayPlotData, LabelAxis, Plot
-from chaco.tools.api import BetterSelectingZoom, LegendTool, PanTool
+from chaco.tools.api import BetterSelectingZoom, LegendTool, PanTool, \
+    RangeSelection, RangeSelectionOverlay
 from chaco.ticks import DefaultTickGenerator, ShowAllTickGenerator
 
 from app_common.chaco.legend import Legend, LegendHighlighter
@@ -34,6 +35,10 @@ SELECTION_COLOR = "red"
 
 DEFAULT_RENDERER_NAME = "plot0"
 
+#: Name of the index metadata storing the range brushed along the x axis
+#: (distinct from the scatter selection, which uses "selections")
+BRUSH_METADATA_NAME = "brushed_range"
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,6 +84,9 @@ class BasePlotFactory(HasStrictTraits):
     #: Inspector tool and overlay to hover over or select scatter data points
     inspector = Any
 
+    #: Range selection tool brushing a range of x values (right-drag)
+    range_selector = Any
+
     #: Color of the marker once selected
     inspector_selection_color = Str(SELECTION_COLOR)
 
@@ -304,6 +312,9 @@ class StdXYPlotFactory(BasePlotFactory):
 
         self.add_tools(plot)
 
+        if "range_selector" in self.plot_tools:
+            self.add_range_selector_tool(plot)
+
         # Build a description of the plot to build a PlotDescriptor
         desc = dict(plot_type=self.plot_type, plot=plot, visible=True,
                     plot_title=self.plot_title, x_col_name=self.x_col_name,
@@ -323,6 +334,24 @@ class StdXYPlotFactory(BasePlotFactory):
             zoom_tool = BetterSelectingZoom(component=plot)
             plot.overlays.append(zoom_tool)
 
+    def add_range_selector_tool(self, plot):
+        """ Add a tool to brush a range of x values, along the first renderer.
+
+        Skipped if the x values are labels, since the range would be label
+        positions.
+        """
+        if self.x_labels:
+            return
+
+        renderer = list(plot.plots.values())[0][0]
+        range_selector = RangeSelection(component=renderer,
+                                        metadata_name=BRUSH_METADATA_NAME)
+        renderer.tools.append(range_selector)
+        overlay = RangeSelectionOverlay(component=renderer,
+                                        metadata_name=BRUSH_METADATA_NAME)
+        renderer.overlays.append(overlay)
+        self.range_selector = range_selector
+
     def add_renderers(self, plot):
         for desc in self.renderer_desc:
             plot.plot((desc["x"], desc["y"]), type=self.plot_type_name,
@@ -143,4 +143,4 @@ class HistogramPlotFactory(StdXYPlotFactory):
         return bar_width_factor * (bin_edges[-1] - bin_edges[0]) / num_bins
 
     def _plot_tools_default(self):
-        return {"zoom", "pan"}
+        return {"zoom", "pan", "range_selector"}
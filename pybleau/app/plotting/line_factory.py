@@ -27,4 +27,4 @@ class LinePlotFactory(StdXYPlotFactory):
     plot_type = Constant(LINE_PLOT_TYPE)
 
     def _plot_tools_default(self):
-        return {"zoom", "pan", "legend"}
+        return {"zoom", "pan", "legend", "range_selector"}
@@ -54,6 +54,10 @@ class BasePlotConfigurator(HasStrictTraits):
     #: Class to use to create TraitsUI window to open controls
     view_klass = Any(View)
 
+    #: Map of (sanitized) column names to data_source column names, for
+    #: analyzers that don't copy/rename their source data
+    column_name_map = Dict
+
     # List of attributes to export to pass to the factory
     _dict_keys = List
 
@@ -113,7 +117,8 @@ class BasePlotConfigurator(HasStrictTraits):
             if isinstance(key, str):
                 val = out[key] = getattr(self, key)
                 known_cols = self.transformed_data.columns
-                if key.endswith("col_name") and val and val not in known_cols:
+                if key.endswith("col_name") and val and \
+                        self.source_col_name(val) not in known_cols:
                     msg = "Unknown column name requested: '{}'.".format(val)
                     logger.exception(msg)
                     raise KeyError(msg)
@@ -133,7 +138,12 @@ class BasePlotConfigurator(HasStrictTraits):
         if col_name in ["index", df.index.name]:
             return df.index.values
 
-        return df[col_name].values
+        return df[self.source_col_name(col_name)].values
+
+    def source_col_name(self, col_name):
+        """ Translate a (sanitized) column name to the data_source column name.
+        """
+        return self.column_name_map.get(col_name, col_name)
 
     # Traits property getters/setters -----------------------------------------
 
@@ -244,7 +254,9 @@ class BaseSingleXYPlotConfigurator(BaseSinglePlotConfigurator):
         if self._single_renderer:
             return self.df_column2array(self.x_col_name)
         else:
-            grpby = self.transformed_data.groupby(self.z_col_name)
+            grpby = self.transformed_data.groupby(
+                self.source_col_name(self.z_col_name)
+            )
             all_x_arr = {}
             for z_val, subdf in grpby:
                 all_x_arr[z_val] = self.df_column2array(self.x_col_name,
@@ -267,7 +279,9 @@ class BaseSingleXYPlotConfigurator(BaseSinglePlotConfigurator):
         if self._single_renderer:
             return self.df_column2array(self.y_col_name)
         else:
-            grpby = self.transformed_data.groupby(self.z_col_name)
+            grpby = self.transformed_data.groupby(
+                self.source_col_name(self.z_col_name)
+            )
             all_y_arr = {}
             for z_val, subdf in grpby:
                 all_y_arr[z_val] = self.df_column2array(self.y_col_name,
@@ -296,7 +310,9 @@ class BaseSingleXYPlotConfigurator(BaseSinglePlotConfigurator):
         else:
             for col in self.hover_col_names:
                 hover_data[col] = {}
-                grpby = self.transformed_data.groupby(self.z_col_name)
+                grpby = self.transformed_data.groupby(
+                    self.source_col_name(self.z_col_name)
+                )
                 for z_val, subdf in grpby:
                     hover_data[col][z_val] = self.df_column2array(col,
                                                                   df=subdf)
@@ -307,7 +323,8 @@ class BaseSingleXYPlotConfigurator(BaseSinglePlotConfigurator):
             # No coloring, so single renderer
             return True
 
-        if self.transformed_data[self.z_col_name].dtype in [bool, object]:
+        z_col_name = self.source_col_name(self.z_col_name)
+        if self.transformed_data[z_col_name].dtype in [bool, object]:
             # Coloring by a string column so multiple renderers
             return False
         else:
@@ -456,7 +473,8 @@ class BarPlotConfigurator(BaseSingleXYPlotConfigurator):
         """
         if self.columns_to_melt:
             if self.z_col_name:
-                return self.data_source.melt(id_vars=[self.z_col_name],
+                z_col_name = self.source_col_name(self.z_col_name)
+                return self.data_source.melt(id_vars=[z_col_name],
                                              value_vars=self.columns_to_melt)
             else:
                 return self.data_source.melt(value_vars=self.columns_to_melt)
@@ -504,7 +522,8 @@ class ScatterPlotConfigurator(BaseSingleXYPlotConfigurator):
             return False
 
         df = self.data_source
-        color_by_discrete = (df[self.z_col_name].dtype in [bool, object] or
+        z_col_name = self.source_col_name(self.z_col_name)
+        color_by_discrete = (df[z_col_name].dtype in [bool, object] or
                              self.force_discrete_colors)
         return not color_by_discrete
 
@@ -512,7 +531,7 @@ class ScatterPlotConfigurator(BaseSingleXYPlotConfigurator):
         # Collect an array for z (color) if the dimension exists and is
         # numerical
         if self.plot_type == CMAP_SCATTER_PLOT_TYPE:
-            return self.data_source[self.z_col_name].values
+            return self.df_column2array(self.z_col_name, df=self.data_source)
 
     def _z_col_name_changed(self, new):
         super(ScatterPlotConfigurator, self)._z_col_name_changed(new)
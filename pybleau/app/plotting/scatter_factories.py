@@ -44,18 +44,19 @@ class ScatterPlotFactory(StdXYPlotFactory):
     inspector = Tuple
 
     def _plot_tools_default(self):
-        return {"zoom", "pan", "click_selector", "legend", "hover"}
+        return {"zoom", "pan", "click_selector", "legend", "hover",
+                "range_selector"}
 
-    def generate_plot(self):
-        plot, desc = super(ScatterPlotFactory, self).generate_plot()
+    def add_tools(self, plot):
+        """ Add pan, zoom, click selection and hover tools.
+        """
+        super(ScatterPlotFactory, self).add_tools(plot)
         if "click_selector" in self.plot_tools:
             self.add_click_selector_tool(plot)
 
         if "hover" in self.plot_tools:
             self.add_hover_display_tool(plot)
 
-        return plot, desc
-
     def add_click_selector_tool(self, plot):
         for renderer_name in plot.plots:
             renderer = plot.plots[renderer_name][0]
@@ -115,7 +116,8 @@ class CmapScatterPlotFactory(ScatterPlotFactory):
 
     def _plot_tools_default(self):
         # No need for a legend
-        return {"zoom", "pan", "click_selector", "colorbar_selector", "hover"}
+        return {"zoom", "pan", "click_selector", "colorbar_selector", "hover",
+                "range_selector"}
 
     def adjust_plot_style(self):
         """ Translate general plotting style info into cmap_scatter params.
@@ -14,7 +14,8 @@ try:
     from chaco.color_bar import ColorBar
     from chaco.cmap_image_plot import CMapImagePlot
     from chaco.contour_line_plot import ContourLinePlot
-    from chaco.tools.api import LegendTool, LegendHighlighter, PanTool
+    from chaco.tools.api import LegendTool, LegendHighlighter, PanTool, \
+        RangeSelection
     from chaco.colormapped_selection_overlay import ColormappedSelectionOverlay
     from chaco.colormapped_scatterplot import ColormappedScatterPlot
     from chaco.ticks import DefaultTickGenerator, ShowAllTickGenerator
@@ -27,6 +28,8 @@ try:
     from pybleau.app.plotting.plot_factories import BAR_PLOT_TYPE, \
         DEFAULT_FACTORIES, HIST_PLOT_TYPE, LINE_PLOT_TYPE, \
         SCATTER_PLOT_TYPE, HEATMAP_PLOT_TYPE, CMAP_SCATTER_PLOT_TYPE
+    from pybleau.app.plotting.base_factories import BRUSH_METADATA_NAME, \
+        DEFAULT_RENDERER_NAME
     from pybleau.app.plotting.bar_factory import BAR_SQUEEZE_FACTOR, \
         ERROR_BAR_DATA_KEY_PREFIX
     from pybleau.app.plotting.histogram_factory import HISTOGRAM_Y_LABEL
@@ -985,7 +988,9 @@ class BaseScatterPlotTools(object):
 
         for name, renderers in plot.plots.items():
             renderer = renderers[0]
-            self.assertEqual(len(renderer.tools), 1)
+            tools = [tool for tool in renderer.tools
+                     if tool is not factory.range_selector]
+            self.assertEqual(len(tools), 1)
             # It's a DataFrameInspector because it can then drive both click
             # and hover events/tools:
             self.assertIsInstance(renderer.tools[0], DataframeScatterInspector)
@@ -1001,7 +1006,9 @@ class BaseScatterPlotTools(object):
         overlay_inspectors = set(plot.overlays[-1].inspectors)
         for name, renderer in plot.plots.items():
             renderer = renderer[0]
-            self.assertEqual(len(renderer.tools), 1)
+            tools = [tool for tool in renderer.tools
+                     if tool is not factory.range_selector]
+            self.assertEqual(len(tools), 1)
             inspector = renderer.tools[0]
             self.assertIsInstance(inspector, DataframeScatterInspector)
             self.assertIn(inspector, overlay_inspectors)
@@ -1035,6 +1042,15 @@ class TestScatterPlotTools(TestCase, BaseScatterPlotTools):
         # But by default, no hover columns so no overlay:
         self.assertEqual(self.factory.hover_col_names, [])
 
+    def test_range_selector_present(self):
+        self.assertIn("range_selector", self.factory.plot_tools)
+        renderer = self.plot.plots[DEFAULT_RENDERER_NAME][0]
+        range_selector = self.factory.range_selector
+        self.assertIsInstance(range_selector, RangeSelection)
+        self.assertIs(range_selector.component, renderer)
+        self.assertEqual(range_selector.metadata_name, BRUSH_METADATA_NAME)
+        self.assertIn(range_selector, renderer.tools)
+
     def test_hover_tool_no_color(self):
         factory = self.plot_factory_klass(
             x_col_name="a", x_arr=TEST_DF["a"].values,
@@ -1178,5 +1194,5 @@ class TestCmapScatterPlotTools(TestCase, BaseScatterPlotTools):
         for name, renderer in plot.plots.items():
             renderer = renderer[0]
             # First overlay is the click_inspector tool's:
-            self.assertIsInstance(renderer.overlays[1],
+            self.assertIsInstance(renderer.overlays[-1],
                                   ColormappedSelectionOverlay)
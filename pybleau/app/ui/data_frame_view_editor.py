@@ -0,0 +1,222 @@
+""" TraitsUI editor displaying the rows of a DataFrameView by windows.
+
+The DataFrameEditor displays a DataFrame, so displaying all rows of a large
+filtered DataFrame requires gathering (and copying) them first. The
+DataFrameViewEditor displays a DataFrameView instead: the table only asks its
+adapter for the rows being painted, and the DataFrameViewAdapter gathers them
+by windows of rows (the visible rows plus a prefetch margin), so scrolling
+through millions of rows uses constant memory. Cells are formatted when
+painted, and the format of each column is resolved when it is first painted,
+so opening a view on thousands of columns doesn't look at all of them.
+"""
+import logging
+
+import numpy as np
+from traits.api import Any, Callable, Dict, Int, Str
+from traitsui.ui_editors.data_frame_editor import _DataFrameEditor, \
+    DataFrameAdapter, DataFrameEditor
+
+logger = logging.getLogger(__name__)
+
+#: Default number of rows gathered for each window
+DEFAULT_WINDOW_SIZE = 200
+
+#: Default number of rows gathered before and after each window
+DEFAULT_PREFETCH_MARGIN = 100
+
+
+class LazyFormatDataFrameAdapter(DataFrameAdapter):
+    """ DataFrame adapter resolving the format of each column when first
+    displayed.
+    """
+    #: Function returning the format of a column from its id, for the columns
+    #: without a format in the formats dict. Called once per column. Leave
+    #: unset to format these columns with '%s'.
+    get_column_format = Callable
+
+    #: Formats returned by get_column_format, by column id
+    _column_formats = Dict
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_format(self):
+        formats = self._formats
+        if isinstance(formats, str):
+            return formats
+
+        column_id = self.column_id
+        if column_id in formats:
+            return formats[column_id]
+        if self.get_column_format is None:
+            return "%s"
+
+        column_format = self._column_formats.get(column_id, None)
+        if column_format is None:
+            column_format = self.get_column_format(column_id)
+            self._column_formats[column_id] = column_format
+        return column_format
+
+
+class DataFrameViewAdapter(LazyFormatDataFrameAdapter):
+    """ Tabular adapter reading the rows of a DataFrameView by windows.
+
+    Only the columns of the adapter are gathered, and the last window is
+    kept until a row outside of it (or of another view) is requested.
+    """
+    #: Number of rows gathered for each window
+    window_size = Int(DEFAULT_WINDOW_SIZE)
+
+    #: Number of rows gathered before and after the requested rows
+    prefetch_margin = Int(DEFAULT_PREFETCH_MARGIN)
+
+    #: Function returning the rows (start, stop) of the view, as a DataFrame
+    #: of the columns requested: f(start, stop, columns). Leave unset to
+    #: gather them from the view directly.
+    fetch_rows = Callable
+
+    #: View the window was gathered from
+    _window_view = Any
+
+    #: Rows of the last window gathered, and position of its first row
+    _window = Any
+
+    _window_start = Int
+
+    def len(self, object, trait):
+        view = getattr(object, trait)
+        return 0 if view is None else len(view)
+
+    def get_item(self, object, trait, row):
+        """ Returns a DataFrame with the row of the view, from the window of
+        rows containing it.
+        """
+        view = getattr(object, trait)
+        window = self._window
+        offset = row - self._window_start
+        if view is not self._window_view or window is None or \
+                not 0 <= offset < len(window):
+            self._fetch_window(object, trait, row)
+            window = self._window
+            offset = row - self._window_start
+        return window.iloc[offset:offset + 1]
+
+    def delete(self, object, trait, row):
+        msg = "Rows of a DataFrameView can't be deleted."
+        logger.exception(msg)
+        raise ValueError(msg)
+
+    def insert(self, object, trait, row, value):
+        msg = "Rows can't be inserted in a DataFrameView."
+        logger.exception(msg)
+        raise ValueError(msg)
+
+    def clear_window(self):
+        """ Drop the rows gathered, for example after the columns changed.
+        """
+        self._window = None
+        self._window_view = None
+
+    # Private interface -------------------------------------------------------
+
+    def _fetch_window(self, object, trait, row):
+        start = max(row - self.prefetch_margin, 0)
+        stop = row + self.window_size + self.prefetch_margin
+        columns = [column_id for _, column_id in self.columns
+                   if column_id != "index"]
+        if self.fetch_rows is not None:
+            window = self.fetch_rows(start, stop, columns)
+        else:
+            view = getattr(object, trait)
+            stop = min(stop, len(view))
+            window = view.take(slice(start, stop)).to_frame(columns)
+
+        # Fetching rows may sort the view (see
+        # DataFrameAnalyzer.get_displayed_rows):
+        self._window_view = getattr(object, trait)
+        self._window = window
+        self._window_start = start
+
+    def _columns_changed(self):
+        self.clear_window()
+
+    def _columns_items_changed(self):
+        self.clear_window()
+
+    # Property getters/setters ------------------------------------------------
+
+    def _get_index_alignment(self):
+        # Don't build the index of the whole view:
+        if np.issubdtype(self.item.index.dtype, np.number):
+            return "right"
+        else:
+            return "left"
+
+
+class _DataFrameViewEditor(_DataFrameEditor):
+    """ Editor implementation for DataFrameViews.
+    """
+    def init_ui(self, parent):
+        """ Creates the Traits UI for displaying the view.
+
+        Unlike the DataFrameEditor, the view's index isn't read.
+        """
+        factory = self.factory
+        available = set(self.value.columns)
+        columns = []
+        for column in factory.columns or list(self.value.columns):
+            if isinstance(column, str):
+                title, column_id = column, column
+            else:
+                title, column_id = column
+            if column_id in available:
+                columns.append((title, column_id))
+
+        if factory.show_index:
+            index_name = self.value.index_name
+            if index_name is None:
+                index_name = ""
+            columns.insert(0, (index_name, "index"))
+
+        if isinstance(factory.adapter, DataFrameViewAdapter):
+            adapter = factory.adapter
+            adapter.trait_set(_formats=factory.formats, _fonts=factory.fonts)
+            if not adapter.columns:
+                adapter.columns = columns
+        else:
+            adapter = DataFrameViewAdapter(
+                columns=columns, _formats=factory.formats,
+                _fonts=factory.fonts, window_size=factory.window_size,
+                prefetch_margin=factory.prefetch_margin
+            )
+        if factory.get_column_format is not None:
+            adapter.get_column_format = factory.get_column_format
+        if factory.fetch_rows:
+            adapter.fetch_rows = getattr(self.object, factory.fetch_rows)
+        self.adapter = adapter
+
+        return self.edit_traits(
+            view="_data_frame_view", parent=parent, kind="subpanel"
+        )
+
+
+class DataFrameViewEditor(DataFrameEditor):
+    """ Editor factory displaying a DataFrameView by windows of rows.
+    """
+    #: Number of rows gathered for each window
+    window_size = Int(DEFAULT_WINDOW_SIZE)
+
+    #: Number of rows gathered before and after the requested rows
+    prefetch_margin = Int(DEFAULT_PREFETCH_MARGIN)
+
+    #: Name of the method of the context object fetching rows of the view
+    #: (see DataFrameViewAdapter.fetch_rows). Leave empty to gather rows from
+    #: the view directly.
+    fetch_rows = Str
+
+    #: Function returning the format of a column from its id, for the columns
+    #: without a format in the formats dict (see
+    #: LazyFormatDataFrameAdapter.get_column_format)
+    get_column_format = Callable
+
+    def _get_klass(self):
+        return _DataFrameViewEditor
@@ -2,21 +2,25 @@ import logging
 import numpy as np
 import pandas as pd
 from copy import copy
+from os.path import splitext
 
-from pyface.api import warning
+from pyface.api import error, FileDialog, OK
 from traits.api import Any, Bool, Button, cached_property, Dict, Either, Enum,\
     Instance, Int, List, on_trait_change, Property, Set, Str
 import traitsui
-from traitsui.api import ButtonEditor, CheckListEditor, HGroup, HSplit, \
-    InstanceEditor, Item, Label, ModelView, OKButton, Spring, Tabbed, VGroup, \
-    View, VSplit
+from traitsui.api import CheckListEditor, HGroup, HSplit, \
+    InstanceEditor, Item, Label, ModelView, OKButton, ProgressEditor, \
+    Spring, Tabbed, VGroup, View, VSplit
 from traitsui.ui_editors.data_frame_editor import DataFrameEditor
 
 from app_common.traitsui.common_traitsui_groups import make_window_title_group
-from app_common.pyface.ui.extra_file_dialogs import request_csv_file
 from app_common.std_lib.filepath_utils import open_file
 
+from ..io.export_job import export_data, export_file_wildcard, \
+    EXPORT_FORMATS, ExportJob, JOB_DONE, JOB_FAILED
 from ..model.dataframe_analyzer import DataFrameAnalyzer
+from .data_frame_view_editor import DataFrameViewEditor, \
+    LazyFormatDataFrameAdapter
 try:
     from .dataframe_plot_manager_view import DataFramePlotManager, \
         DataFramePlotManagerView
@@ -89,7 +93,9 @@ class DataFrameAnalyzerView(ModelView):
     #: Number of digits to display in the tables
     display_precision = Int(-1)
 
-    #: Formatting to use to include
+    #: Format of all columns, or dict mapping column names to formats. Columns
+    #: missing from the dict are formatted based on the display_precision
+    #: when first displayed (see get_column_format).
     formats = Either(Str, Dict)
 
     #: UI title for the Data section
@@ -128,9 +134,6 @@ class DataFrameAnalyzerView(ModelView):
     #: DFPlotManager traits to customize it
     plotter_kw = Dict
 
-    #: Message displayed below the table if truncated
-    truncation_msg = Property(Str, depends_on="model.num_displayed_rows")
-
     # Functionality controls --------------------------------------------------
 
     #: Button to shuffle the order of the filtered data
@@ -138,12 +141,6 @@ class DataFrameAnalyzerView(ModelView):
 
     show_shuffle_button = Bool(True)
 
-    #: Button to display more rows in the data table
-    show_more_button = Button
-
-    #: Button to display all rows in the data table
-    show_all_button = Button("Show All")
-
     #: Apply button for the filter if model not in auto-apply mode
     apply_filter_button = Button("Apply")
 
@@ -167,11 +164,20 @@ class DataFrameAnalyzerView(ModelView):
 
     allow_show_summary = Bool(True)
 
-    #: Button to export the analyzed data to a CSV file
-    data_exporter = Button("Export Data to CSV")
+    #: Button to export the analyzed data to a CSV, Parquet or Feather file
+    data_exporter = Button("Export Data...")
+
+    #: Button to export the summary data to a CSV, Parquet or Feather file
+    summary_exporter = Button("Export Summary...")
 
-    #: Button to export the summary data to a CSV file
-    summary_exporter = Button("Export Summary to CSV")
+    #: Button to cancel the running export
+    cancel_export_button = Button("Cancel Export")
+
+    #: Export of the data or summary running in the background, if any
+    export_job = Instance(ExportJob)
+
+    #: Button to compute the exact summaries in approximate summary mode
+    exact_summary_button = Button("Compute Exact Summary")
 
     # Detailed configuration traits -------------------------------------------
 
@@ -189,12 +195,6 @@ class DataFrameAnalyzerView(ModelView):
 
     max_names_per_column = Int(12)
 
-    truncation_msg_template = Str("Table truncated at {} rows")
-
-    warn_if_sel_hidden = Bool(True)
-
-    hidden_selection_msg = Str
-
     # Implementation details --------------------------------------------------
 
     #: Evaluate number of columns to select panel or popup column control
@@ -206,6 +206,12 @@ class DataFrameAnalyzerView(ModelView):
     #: Collected traitsUI editors for both the data DF and the summary DF
     _df_editors = Dict
 
+    #: Whether an export is running
+    _exporting = Bool
+
+    #: Progress of the running export, in percent
+    _export_progress = Int
+
     # HasTraits interface -----------------------------------------------------
 
     def __init__(self, **traits):
@@ -236,9 +242,17 @@ class DataFrameAnalyzerView(ModelView):
         plotter_group = self.view_plotter_group_builder()
 
         button_content = [
-            Item("data_exporter", show_label=False),
+            Item("data_exporter", show_label=False,
+                 enabled_when="not _exporting"),
+            Spring(),
+            Item("_export_progress", show_label=False,
+                 editor=ProgressEditor(min=0, max=100),
+                 visible_when="_exporting"),
+            Item("cancel_export_button", show_label=False,
+                 visible_when="_exporting"),
             Spring(),
-            Item("summary_exporter", show_label=False)
+            Item("summary_exporter", show_label=False,
+                 enabled_when="not _exporting")
         ]
 
         if self.plotter_layout == "popup":
@@ -308,8 +322,12 @@ class DataFrameAnalyzerView(ModelView):
         """
         editor_kw = dict(show_index=True, columns=self.visible_columns,
                          fonts=self.fonts, formats=self.formats)
-        data_editor = DataFrameEditor(selected_row="selected_idx",
-                                      multi_select=True, **editor_kw)
+        # The table only gathers the rows it displays:
+        data_editor = DataFrameViewEditor(
+            selected_row="selected_idx", multi_select=True,
+            fetch_rows="get_displayed_rows",
+            get_column_format=self.get_column_format, **editor_kw
+        )
 
         filter_group = HGroup(
             Item("model.filter_exp", label="Filter",
@@ -323,19 +341,16 @@ class DataFrameAnalyzerView(ModelView):
                  visible_when="filter_manager"),
             Item("manage_filter_button", show_label=False,
                  visible_when="filter_manager"),
+            # Workaround the fact that the Label's visible_when is buggy:
+            # encapsulate it into a group and add the visible_when to the group
+            HGroup(
+                Label(u"Computing\u2026"),
+                visible_when="model.filter_computing"
+            ),
         )
 
-        truncated = ("len(model.displayed_df) < len(model.filtered_df) and "
-                     "not model.show_selected_only")
-        more_label = "Show {} More".format(self.model.num_display_increment)
         display_control_group = HGroup(
             Item("model.show_selected_only", label="Selected rows only"),
-            Item("truncation_msg", style="readonly", show_label=False,
-                 visible_when=truncated),
-            Item("show_more_button", editor=ButtonEditor(label=more_label),
-                 show_label=False, visible_when=truncated),
-            Item("show_all_button", show_label=False,
-                 visible_when=truncated),
         )
 
         data_group = VGroup(
@@ -349,7 +364,7 @@ class DataFrameAnalyzerView(ModelView):
                 filter_group
             ),
             HGroup(
-                Item("model.displayed_df", editor=data_editor,
+                Item("model.displayed_view", editor=data_editor,
                      show_label=False),
             ),
             HGroup(
@@ -401,23 +416,45 @@ class DataFrameAnalyzerView(ModelView):
         """
         editor_kw = dict(show_index=True, columns=self.visible_columns,
                          fonts=self.fonts, formats=self.formats)
-        summary_editor = DataFrameEditor(**editor_kw)
+        summary_editor = DataFrameEditor(adapter=self._make_adapter(),
+                                         **editor_kw)
+        error_editor = DataFrameEditor(adapter=self._make_adapter(),
+                                       **editor_kw)
+        selection_editor = DataFrameEditor(adapter=self._make_adapter(),
+                                           **editor_kw)
 
         summary_group = VGroup(
             make_window_title_group(self.summary_section_title, title_size=3,
                                     include_blank_spaces=False),
+            # Summaries are computed when read: only read them when shown.
             Item("model.summary_df", editor=summary_editor, show_label=False,
-                 visible_when="len(model.summary_df) != 0"),
+                 visible_when="_show_summary and len(model.summary_df) != 0"),
             # Workaround the fact that the Label's visible_when is buggy:
             # encapsulate it into a group and add the visible_when to the group
             HGroup(
                 Label("No data columns with numbers were found."),
-                visible_when="len(model.summary_df) == 0"
+                visible_when="_show_summary and len(model.summary_df) == 0"
+            ),
+            VGroup(
+                Label("Error bounds of the approximate summary:"),
+                Item("model.summary_error_df", editor=error_editor,
+                     show_label=False),
+                visible_when="_show_summary and "
+                             "len(model.summary_error_df) != 0"
+            ),
+            VGroup(
+                Label("Summary of the selected rows:"),
+                Item("model.selection_summary_df", editor=selection_editor,
+                     show_label=False),
+                visible_when="_show_summary and model.selection.count != 0"
             ),
             HGroup(
                 Item("show_summary_controls"),
                 Spring(),
-                visible_when="len(model.summary_df) != 0"
+                Item("model.approximate_summary"),
+                Item("exact_summary_button", show_label=False,
+                     enabled_when="model.approximate_summary"),
+                visible_when="_show_summary and len(model.summary_df) != 0"
             ),
             show_border=True,
         )
@@ -441,19 +478,31 @@ class DataFrameAnalyzerView(ModelView):
         """
         editor_kw = dict(show_index=True, fonts=self.fonts,
                          formats=self.formats)
-        summary_editor = DataFrameEditor(**editor_kw)
+        summary_editor = DataFrameEditor(adapter=self._make_adapter(),
+                                         **editor_kw)
+        error_editor = DataFrameEditor(adapter=self._make_adapter(),
+                                       **editor_kw)
 
         cat_summary_group = VGroup(
             make_window_title_group(self.cat_summary_section_title,
                                     title_size=3, include_blank_spaces=False),
             Item("model.summary_categorical_df", editor=summary_editor,
                  show_label=False,
-                 visible_when="len(model.summary_categorical_df)!=0"),
+                 visible_when="_show_summary and "
+                              "len(model.summary_categorical_df)!=0"),
             # Workaround the fact that the Label's visible_when is buggy:
             # encapsulate it into a group and add the visible_when to the group
             HGroup(
                 Label("No data columns with numbers were found."),
-                visible_when="len(model.summary_categorical_df)==0"
+                visible_when="_show_summary and "
+                             "len(model.summary_categorical_df)==0"
+            ),
+            VGroup(
+                Label("Error bounds of the approximate summary:"),
+                Item("model.summary_categorical_error_df",
+                     editor=error_editor, show_label=False),
+                visible_when="_show_summary and "
+                             "len(model.summary_categorical_error_df) != 0"
             ),
             show_border=True, label=self.cat_summary_group_name
         )
@@ -471,12 +520,30 @@ class DataFrameAnalyzerView(ModelView):
 
     # Public interface --------------------------------------------------------
 
+    def get_column_format(self, column):
+        """ Returns the format of a data column without an entry in the
+        formats dict, based on its dtype and the display_precision.
+
+        Called by the table adapters when the column is first displayed.
+        """
+        source_df = self.model.source_df
+        if self.display_precision < 0 or column not in source_df.columns:
+            return '%s'
+
+        if np.issubdtype(source_df[column].dtype, np.number):
+            return '%.{}g'.format(self.display_precision)
+        return '%s'
+
     def destroy(self):
         """ Clean up resources.
         """
         if self._control_popup:
             self._control_popup.dispose()
 
+        self.model.cancel_filter_computation()
+        if self.export_job is not None:
+            self.export_job.cancel()
+
     # Traits listeners --------------------------------------------------------
 
     def _open_column_controls_fired(self):
@@ -503,11 +570,17 @@ class DataFrameAnalyzerView(ModelView):
         # WARNING: this will modify the info object the view points to!
         self._control_popup = self.edit_traits(view=view, kind="live")
 
+    def _exact_summary_button_fired(self):
+        self.model.compute_exact_summary()
+
     def _shuffle_button_fired(self):
         self.model.shuffle_filtered_df()
 
     def _apply_filter_button_fired(self):
-        self.model.recompute_filtered_df()
+        if self.model.filter_async:
+            self.model.schedule_filter_computation(delay=0.)
+        else:
+            self.model.recompute_filtered_df()
 
     def _manage_filter_button_fired(self):
         """ TODO: review if replaceing the copy by a deepcopy or removing the
@@ -550,67 +623,72 @@ class DataFrameAnalyzerView(ModelView):
         expr = FilterExpression(name=exp, expression=exp)
         self.model.known_filter_exps.append(expr)
 
-    def _show_more_button_fired(self):
-        self.model.num_displayed_rows += self.model.num_display_increment
-
-    def _show_all_button_fired(self):
-        self.model.num_displayed_rows = -1
-
-    @on_trait_change("model:selected_data_in_plotter_updated", post_init=True)
-    def warn_if_selection_hidden(self):
-        """ Pop up warning msg if some of the selected rows aren't displayed.
+    @on_trait_change("model, _show_summary")
+    def update_summary_visibility(self):
+        """ Let the model know whether its summaries are displayed, so they
+        are only computed when they are.
         """
-        if not self.warn_if_sel_hidden:
-            return
-
-        if not self.model.selected_idx:
-            return
-
-        truncated = len(self.model.displayed_df) < len(self.model.filtered_df)
-        max_displayed = self.model.displayed_df.index.max()
-        some_selection_hidden = max(self.model.selected_idx) > max_displayed
-        if truncated and some_selection_hidden:
-            warning(None, self.hidden_selection_msg, "Hidden selection")
+        if self.model is not None:
+            self.model.summary_visible = self._show_summary
 
     @on_trait_change("visible_columns[]", post_init=True)
     def update_filtered_df_on_columns(self):
         """ Just show the columns that are set to visible.
 
+        Hidden columns are left out of the model's summaries.
+
         Notes
         -----
         We are not modifying the filtered data because if we remove a column
         and then bring it back, the adapter breaks because it is missing data.
         Breakage happen when removing a column if the model is changed first,
         or when bring a column back if the adapter column list is changed
-        first.
+        first. For the same reason, columns brought back are summarized before
+        the adapters are updated, and removed columns after.
         """
+        visible = set(self.visible_columns)
+        hidden = [col for col in self.all_data_columns if col not in visible]
         if not self.info.initialized:
+            self.model.hidden_summary_columns = hidden
             return
 
+        hidden_set = set(hidden)
+        self.model.hidden_summary_columns = [
+            col for col in self.model.hidden_summary_columns
+            if col in hidden_set
+        ]
+
         if not self._df_editors:
             self._collect_df_editors()
 
-        for df_name in ["displayed_df", "summary_df"]:
-            df = getattr(self.model, df_name)
-            index_name = df.index.name
-            if index_name is None:
-                index_name = ''
-
-            # Rebuild the column list (col name, column id) for the tabular
-            # adapter:
-            all_cols = [(col, col) for col in self.all_data_columns
-                        if col in self.visible_columns]
+        # Rebuild the column list (col name, column id) for the tabular
+        # adapters:
+        all_cols = [(col, col) for col in self.all_data_columns
+                    if col in visible]
+        for df_name in ["displayed_view", "summary_df"]:
             try:
                 # This grabs the corresponding _DataFrameEditor (not the editor
                 # factory) which has access to the adapter object:
-                editor = self._df_editors[df_name]
-                editor.adapter.columns = [(index_name, 'index')] + all_cols
+                adapter = self._df_editors[df_name].adapter
             except Exception as e:
                 msg = "Error trying to collect the tabular adapter: {}"
                 logger.error(msg.format(e))
+                continue
+
+            # Keep the index title rather than reading the data (which would
+            # compute the summary before its columns are updated):
+            index_title = ''
+            old_columns = adapter.columns
+            if old_columns and old_columns[0][1] == 'index':
+                index_title = old_columns[0][0]
+            new_columns = [(index_title, 'index')] + all_cols
+            if new_columns != list(old_columns):
+                adapter.columns = new_columns
+
+        self.model.hidden_summary_columns = hidden
 
     def _collect_df_editors(self):
-        for df_name in ["displayed_df", "summary_df"]:
+        for df_name in ["displayed_view", "summary_df"]:
             try:
                 # This grabs the corresponding _DataFrameEditor (not the editor
                 # factory) which has access to the adapter object:
@@ -625,27 +703,72 @@ class DataFrameAnalyzerView(ModelView):
         self.plotter.edit_traits(kind="livemodal")
 
     def _data_exporter_fired(self):
-        filepath = request_csv_file(action="save as")
-        if filepath:
-            self.model.filtered_df.to_csv(filepath)
-            open_file(filepath)
+        filepath = self._request_export_file()
+        if filepath and self.model.filtered_view is not None:
+            # Export the rows in their displayed order:
+            self.model.complete_sort()
+            self._start_export(self.model.filtered_view, filepath)
 
     def _summary_exporter_fired(self):
-        filepath = request_csv_file(action="save as")
+        filepath = self._request_export_file()
         if filepath:
-            self.model.summary_df.to_csv(filepath)
-            open_file(filepath)
+            self._start_export(self.model.summary_df, filepath)
+
+    def _cancel_export_button_fired(self):
+        if self.export_job is not None:
+            self.export_job.cancel()
+
+    @on_trait_change("export_job:num_rows_written")
+    def update_export_progress(self):
+        self._export_progress = int(round(100 * self.export_job.progress))
+
+    @on_trait_change("export_job:finished")
+    def open_exported_file(self, status):
+        """ Open the exported file once written, or report the failure.
+        """
+        job = self.export_job
+        self._exporting = False
+        if status == JOB_DONE:
+            open_file(job.path)
+        elif status == JOB_FAILED:
+            error(None, job.error_msg, "Export failed")
+
+    # Private interface -------------------------------------------------------
+
+    def _request_export_file(self):
+        """ Returns the path of the file to export to, requested from the user
+        (None if cancelled).
+        """
+        dialog = FileDialog(action="save as", wildcard=export_file_wildcard())
+        if dialog.open() != OK:
+            return None
+
+        filepath = dialog.path
+        if splitext(filepath)[1].lower() not in EXPORT_FORMATS:
+            filepath += EXPORT_FORMATS[dialog.wildcard_index]
+        return filepath
+
+    def _start_export(self, data, filepath):
+        """ Export data to a file in a worker thread, showing its progress.
+        """
+        self.export_job = export_data(data, filepath, start=False)
+        self._export_progress = 0
+        self._exporting = True
+        self.export_job.start()
+
+    def _make_adapter(self):
+        """ Returns the adapter of a summary table, resolving the formats of
+        its columns when first displayed.
+        """
+        return LazyFormatDataFrameAdapter(
+            get_column_format=self.get_column_format
+        )
 
     # Traits property getters/setters -----------------------------------------
 
     def _get__known_expr(self):
         return {e.expression for e in self.model.known_filter_exps}
 
-    @cached_property
-    def _get_truncation_msg(self):
-        num_displayed_rows = self.model.num_displayed_rows
-        return self.truncation_msg_template.format(num_displayed_rows)
-
     @cached_property
     def _get__many_columns(self):
         return len(self.all_data_columns) > 2 * self.max_names_per_column
@@ -665,7 +788,6 @@ class DataFrameAnalyzerView(ModelView):
                 plot_manager = self.model.plot_manager_list[0]
             else:
                 plot_manager = DataFramePlotManager(
-                    data_source=self.model.filtered_df,
                     source_analyzer=self.model,
                     **self.plotter_kw
                 )
@@ -677,17 +799,8 @@ class DataFrameAnalyzerView(ModelView):
     def _formats_default(self):
         if self.display_precision < 0:
             return '%s'
-        else:
-            formats = {}
-            float_format = '%.{}g'.format(self.display_precision)
-            for col in self.model.source_df.columns:
-                col_dtype = self.model.source_df.dtypes[col]
-                if np.issubdtype(col_dtype, np.number):
-                    formats[col] = float_format
-                else:
-                    formats[col] = '%s'
-
-            return formats
+        # Column formats are resolved when first displayed:
+        return {}
 
     def _visible_columns_default(self):
         return self.all_data_columns
@@ -695,13 +808,11 @@ class DataFrameAnalyzerView(ModelView):
     def _all_data_columns_default(self):
         return self.model.source_df.columns.tolist()
 
-    def _hidden_selection_msg_default(self):
-        msg = "The displayed data is truncated and some of the selected " \
-              "rows isn't displayed in the data table."
-        return msg
-
     def _summary_section_title_default(self):
-        if len(self.model.summary_categorical_df) == 0:
+        # Look at the dtypes rather than computing the categorical summary:
+        categorical_columns = self.model.source_df.iloc[:0].select_dtypes(
+            include=self.model.categorical_dtypes).columns
+        if len(categorical_columns) == 0:
             return "Data summary"
         else:
             return "Numerical data summary"
@@ -721,7 +832,7 @@ if __name__ == "__main__":
                    dtype=float)
     df.index.name = "BALH"
 
-    summarizer = DataFrameAnalyzer(source_df=df, num_displayed_rows=5)
+    summarizer = DataFrameAnalyzer(source_df=df)
     print(summarizer.compute_summary())
 
     view = DataFrameAnalyzerView(model=summarizer, include_plotter=True,
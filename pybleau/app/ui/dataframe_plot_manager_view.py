@@ -226,7 +226,7 @@ class DataFramePlotManagerView(ModelView):
             new_plot_default_title = "Plot {}".format(next_plot_num)
 
         config_klass = PLOT_CONFIGURATORS[plot_type]
-        configurator = config_klass(data_source=self.model.data_source,
+        configurator = config_klass(data_source=self.model.data_schema,
                                     plot_title=new_plot_default_title,
                                     view_klass=self.view_klass)
         ui = configurator.edit_traits(kind="modal")
@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from traits.api import HasTraits, Instance
+
+from pybleau.app.model.dataframe_view import DataFrameView
+from pybleau.app.ui.data_frame_view_editor import DataFrameViewAdapter, \
+    LazyFormatDataFrameAdapter
+
+
+class ViewHolder(HasTraits):
+    view = Instance(DataFrameView)
+
+
+class DataFrameHolder(HasTraits):
+    df = Instance(pd.DataFrame)
+
+
+class TestLazyFormatDataFrameAdapter(TestCase):
+
+    def setUp(self):
+        self.holder = DataFrameHolder(
+            df=pd.DataFrame({"a": [1.2345], "b": [2.5], "c": ["x"]})
+        )
+        self.requested = []
+
+        def get_column_format(column):
+            self.requested.append(column)
+            return "%.2f" if column != "c" else "%s"
+
+        self.adapter = LazyFormatDataFrameAdapter(
+            columns=[("a", "a"), ("b", "b"), ("c", "c")],
+            _formats={"b": "%.1e"}, get_column_format=get_column_format
+        )
+
+    def get_text(self, column):
+        return self.adapter.get_text(self.holder, "df", 0, column)
+
+    def test_formats_resolved_when_displayed(self):
+        self.assertEqual(self.get_text(0), "1.23")
+        self.assertEqual(self.requested, ["a"])
+        self.assertEqual(self.get_text(2), "x")
+        self.assertEqual(self.get_text(0), "1.23")
+        # Resolved once per column:
+        self.assertEqual(self.requested, ["a", "c"])
+
+    def test_explicit_formats(self):
+        self.assertEqual(self.get_text(1), "2.5e+00")
+        self.assertEqual(self.requested, [])
+        self.adapter._formats = "%s"
+        self.assertEqual(self.get_text(0), "1.2345")
+        self.assertEqual(self.requested, [])
+
+    def test_no_column_format(self):
+        self.adapter.get_column_format = None
+        self.assertEqual(self.get_text(0), "1.2345")
+
+
+class TestDataFrameViewAdapter(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({"a": range(100), "b": range(0, 200, 2),
+                                "c": list("abcd") * 25})
+        self.holder = ViewHolder(view=DataFrameView(self.df))
+        self.adapter = DataFrameViewAdapter(
+            columns=[("", "index"), ("a", "a"), ("c", "c")], window_size=10,
+            prefetch_margin=5
+        )
+
+    def test_len(self):
+        self.assertEqual(self.adapter.len(self.holder, "view"), 100)
+        self.holder.view = None
+        self.assertEqual(self.adapter.len(self.holder, "view"), 0)
+
+    def test_rows_read_by_windows(self):
+        adapter = self.adapter
+        row = adapter.get_item(self.holder, "view", 50)
+        assert_frame_equal(row, self.df.iloc[50:51, [0, 2]])
+        window = adapter._window
+        self.assertEqual(len(window), 20)
+        self.assertEqual(adapter._window_start, 45)
+
+        # Rows of the window are served from it:
+        adapter.get_item(self.holder, "view", 60)
+        self.assertIs(adapter._window, window)
+
+        row = adapter.get_item(self.holder, "view", 98)
+        assert_frame_equal(row, self.df.iloc[98:99, [0, 2]])
+        self.assertIsNot(adapter._window, window)
+
+        self.assertEqual(adapter.get_text(self.holder, "view", 98, 1), "98")
+        self.assertEqual(adapter.get_text(self.holder, "view", 98, 2), "c")
+
+    def test_new_view_read_again(self):
+        adapter = self.adapter
+        adapter.get_item(self.holder, "view", 0)
+        self.holder.view = DataFrameView(self.df, positions=[5, 4, 3])
+        row = adapter.get_item(self.holder, "view", 1)
+        self.assertEqual(row.index.tolist(), [4])
+
+    def test_fetch_rows(self):
+        calls = []
+
+        def fetch_rows(start, stop, columns):
+            calls.append((start, stop, columns))
+            return self.df[columns].iloc[start:stop]
+
+        self.adapter.fetch_rows = fetch_rows
+        self.adapter.get_item(self.holder, "view", 3)
+        self.assertEqual(calls, [(0, 18, ["a", "c"])])
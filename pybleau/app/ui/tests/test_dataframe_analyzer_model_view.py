@@ -56,7 +56,7 @@ class TestDataFrameAnalyzerView(TestCase):
             self.assertIsNone(view._control_popup)
             view.open_column_controls = True
             self.assertIsNotNone(view._control_popup)
-            self.assertIn("displayed_df", view._df_editors)
+            self.assertIn("displayed_view", view._df_editors)
             self.assertIn("summary_df", view._df_editors)
 
     def test_bring_up_with_categorical_data(self):
@@ -92,8 +92,9 @@ class TestDataFrameAnalyzerView(TestCase):
             with temp_bringup_ui_for(view):
                 pass
 
-    def test_bring_up_truncated(self):
-        self.analyzer.num_displayed_rows = 5
+    def test_bring_up_selected_only(self):
+        self.analyzer.selected_idx = [1, 3]
+        self.analyzer.show_selected_only = True
         view = DataFrameAnalyzerView(model=self.analyzer)
         with temp_bringup_ui_for(view):
             pass
@@ -117,32 +118,32 @@ class TestDataFrameAnalyzerView(TestCase):
 
             # Both DFEditor's adapters are modified, now containing only 2
             # columns: the one requested and the index:
-            editor = view.info.displayed_df
+            editor = view.info.displayed_view
             self.assertEqual(len(editor.adapter.columns), 2)
             editor = view.info.summary_df
             self.assertEqual(len(editor.adapter.columns), 2)
 
-            # The model data is unchanged:
-            self.assertEqual(len(view.model.displayed_df.columns), init_len)
-            self.assertEqual(len(view.model.summary_df.columns), init_len)
+            # The model data is unchanged, but the hidden column isn't
+            # summarized:
+            self.assertEqual(len(view.model.displayed_view.columns),
+                             init_len)
+            self.assertEqual(view.model.summary_df.columns.tolist(),
+                             view.visible_columns)
             self.assertEqual(len(view.model.filtered_df.columns), init_len)
             self.assertEqual(len(view.model.source_df.columns), init_len)
 
-    def test_truncate(self):
-        self.analyzer.num_displayed_rows = 3
-        self.analyzer.num_display_increment = 1
-        view = DataFrameAnalyzerView(model=self.analyzer,
-                                     include_plotter=False)
-        self.assertEqual(len(self.analyzer.displayed_df), 3)
-        view.show_more_button = True
-        self.assertEqual(len(self.analyzer.displayed_df), 4)
-        view.show_more_button = True
-        self.assertEqual(len(self.analyzer.displayed_df), 5)
-        # No more rows to add:
-        view.show_more_button = True
-        self.assertEqual(len(self.analyzer.displayed_df), 5)
-        view.show_more_button = True
-        self.assertEqual(len(self.analyzer.displayed_df), 5)
+    def test_rows_displayed_by_windows(self):
+        df = DataFrame({"a": range(1000), "b": range(0, 2000, 2)})
+        analyzer = DataFrameAnalyzer(source_df=df)
+        view = DataFrameAnalyzerView(model=analyzer, include_plotter=False)
+        with temp_bringup_ui_for(view):
+            adapter = view.info.displayed_view.adapter
+            adapter.trait_set(window_size=10, prefetch_margin=5)
+            self.assertEqual(adapter.len(analyzer, "displayed_view"), 1000)
+            row = adapter.get_item(analyzer, "displayed_view", 900)
+            assert_frame_equal(row, df.iloc[900:901])
+            # Only the rows around the one requested were gathered:
+            self.assertEqual(len(adapter._window), 20)
 
     def test_plot_manager_list_with_plotter(self):
         view = DataFrameAnalyzerView(model=self.analyzer,
@@ -178,17 +179,17 @@ class TestDataFrameAnalyzerTableView(TestCase):
         view = DataFrameAnalyzerView(model=analyzer, include_plotter=True,
                                      display_precision=3)
         with temp_bringup_ui_for(view):
-            self.assertEqual(view.info.displayed_df.adapter.format, "%.3g")
+            self.assertEqual(view.info.displayed_view.adapter.format, "%.3g")
 
         view = DataFrameAnalyzerView(model=analyzer, include_plotter=True,
                                      formats="%.5e")
         with temp_bringup_ui_for(view):
-            self.assertEqual(view.info.displayed_df.adapter.format, "%.5e")
+            self.assertEqual(view.info.displayed_view.adapter.format, "%.5e")
 
         view = DataFrameAnalyzerView(model=analyzer, include_plotter=True,
                                      formats={"a": "%.5e", "b": "%.8f"})
         with temp_bringup_ui_for(view):
-            self.assertEqual(view.info.displayed_df.adapter._formats,
+            self.assertEqual(view.info.displayed_view.adapter._formats,
                              {"a": "%.5e", "b": "%.8f"})
 
     def test_bring_up_control_precision_object_df_can_convert_to_float(self):
@@ -200,7 +201,7 @@ class TestDataFrameAnalyzerTableView(TestCase):
         with temp_bringup_ui_for(view):
             # Because the DF is set as `dtype=object` but columns can be
             # converted to float:
-            self.assertEqual(view.info.displayed_df.adapter.format, "%s")
+            self.assertEqual(view.info.displayed_view.adapter.format, "%s")
 
         df = DataFrame({"a": [1, 2, 3, 4, 5], "b": [10, 15, 20, 15, 10]},
                        dtype=object)
@@ -210,7 +211,16 @@ class TestDataFrameAnalyzerTableView(TestCase):
         with temp_bringup_ui_for(view):
             # Because the DF is set as `dtype=object` but columns can be
             # converted to float:
-            self.assertEqual(view.info.displayed_df.adapter.format, "%.3g")
+            self.assertEqual(view.info.displayed_view.adapter.format, "%.3g")
+
+    def test_column_formats_resolved_when_displayed(self):
+        df = DataFrame({"a": [1.5, 2.5], "b": list("xy")})
+        analyzer = DataFrameAnalyzer(source_df=df)
+        view = DataFrameAnalyzerView(model=analyzer, display_precision=3)
+        self.assertEqual(view.formats, {})
+        self.assertEqual(view.get_column_format("a"), "%.3g")
+        self.assertEqual(view.get_column_format("b"), "%s")
+        self.assertEqual(view.get_column_format("index"), "%s")
 
     def test_bring_up_control_precision_object_df(self):
         df = DataFrame({"a": list('abcd')})
@@ -219,7 +229,7 @@ class TestDataFrameAnalyzerTableView(TestCase):
                                      display_precision=3)
         with temp_bringup_ui_for(view):
             # Because the DF is set as `dtype=object`:
-            self.assertEqual(view.info.displayed_df.adapter.format, "%s")
+            self.assertEqual(view.info.displayed_view.adapter.format, "%s")
 
     def test_bring_up_control_fonts(self):
         view = DataFrameAnalyzerView(model=self.analyzer, include_plotter=True,
@@ -232,7 +242,7 @@ class TestDataFrameAnalyzerTableView(TestCase):
         view = DataFrameAnalyzerView(model=self.analyzer, include_plotter=True,
                                      fonts=fonts)
         with temp_bringup_ui_for(view):
-            self.assertEqual(view.info.displayed_df.adapter._fonts, fonts)
+            self.assertEqual(view.info.displayed_view.adapter._fonts, fonts)
 
     def test_bring_up_control_font_name(self):
         view = DataFrameAnalyzerView(model=self.analyzer, font_name="Arial")
@@ -262,7 +272,7 @@ class TestDataFrameAnalyzerTableView(TestCase):
         exp_font_name = " ".join(expected_font.split()[:-1])
         exp_font_size = expected_font.split()[-1]
 
-        effective_font = view.info.displayed_df.adapter._fonts.toString()
+        effective_font = view.info.displayed_view.adapter._fonts.toString()
         font_name, font_size = effective_font.split(",")[:2]
         self.assertEqual(font_name, exp_font_name)
         self.assertEqual(font_size, exp_font_size)
@@ -0,0 +1,25 @@
+import threading
+from unittest import TestCase
+
+from pybleau.app.utils.ui_calls import UICallQueue
+
+
+class TestUICallQueue(TestCase):
+
+    def test_calls_queued_without_ui(self):
+        calls = UICallQueue()
+        results = []
+
+        def handler(value):
+            results.append((value, threading.current_thread()))
+
+        worker = threading.Thread(target=calls.dispatch, args=(handler, 1))
+        worker.start()
+        worker.join()
+        calls.dispatch(handler, 2)
+        self.assertEqual(results, [])
+
+        self.assertEqual(calls.process(), 2)
+        current = threading.current_thread()
+        self.assertEqual(results, [(1, current), (2, current)])
+        self.assertEqual(calls.process(), 0)
@@ -0,0 +1,46 @@
+""" Hand the results of worker threads back to the thread owning the traits.
+
+Traits listeners (and the UI they update) must run in the UI thread, so
+worker threads don't set traits themselves: they dispatch the calls doing it
+to the UI event loop. When no UI is running, the calls are queued instead,
+and processed by the thread waiting for the worker.
+"""
+import queue
+
+from traits import trait_notifiers
+
+
+class UICallQueue(object):
+    """ Calls handlers in the UI thread if a UI is running, or queues them to
+    be called by the thread processing the queue otherwise.
+    """
+    def __init__(self):
+        self._calls = queue.SimpleQueue()
+
+    def dispatch(self, handler, *args):
+        """ Call a handler in the UI thread, or queue the call if no UI is
+        running.
+
+        Safe to call from any thread.
+        """
+        if trait_notifiers.ui_handler is None:
+            self._calls.put((handler, args))
+        else:
+            trait_notifiers.ui_dispatch(handler, *args)
+
+    def process(self):
+        """ Call the queued handlers in the calling thread, in order.
+
+        Returns
+        -------
+        int
+            Number of handlers called.
+        """
+        num_calls = 0
+        while True:
+            try:
+                handler, args = self._calls.get_nowait()
+            except queue.Empty:
+                return num_calls
+            handler(*args)
+            num_calls += 1
@@ -37,6 +37,10 @@ class PlotReportElement(BaseReportElement):
                     self.source_data = pd.read_hdf(data_url)
                 if splitext(data_url)[1] == ".csv":
                     self.source_data = pd.read_csv(data_url)
+                if splitext(data_url)[1] == ".parquet":
+                    self.source_data = pd.read_parquet(data_url)
+                if splitext(data_url)[1] == ".feather":
+                    self.source_data = pd.read_feather(data_url)
             elif "values" in data_info:
                 self.source_data = pd.DataFrame(data_info["values"]).set_index(
                     "index")
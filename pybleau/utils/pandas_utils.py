@@ -1,10 +1,21 @@
 import logging
+import re
 from six import string_types
+import numpy as np
 import pandas as pd
 from os.path import isfile, splitext
 
 logger = logging.getLogger(__name__)
 
+#: Label of the row of the dtype optimization report with the total memory
+TOTAL_MEMORY_LABEL = "Total"
+
+# Pattern of ISO 8601 dates, optionally followed by a time:
+ISO_DATE_PATTERN = re.compile(
+    r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?"
+    r"(Z|[+-]\d{2}:?\d{2})?)?$"
+)
+
 
 def is_string_series(series, data=None):
     """ Returns whether a column contains strings.
@@ -59,3 +70,135 @@ def pd_read_any(target, pandas_func=None, **kwargs):
 
     target = pandas_func(target, **kwargs)
     return target
+
+
+def optimize_dtypes(df, max_categorical_ratio=0.5, float_tolerance=0.,
+                    convert_dates=True, downcast_numbers=True):
+    """ Returns a copy of a DataFrame with memory efficient column dtypes.
+
+    - Object columns of ISO 8601 date strings are converted to datetime64,
+    - Object columns with few distinct values are converted to categoricals,
+    - Integer columns are downcast to the smallest signed integer type that
+      holds their values,
+    - Float columns are downcast to float32 if no value changes by more than
+      float_tolerance (relative), so only if lossless by default.
+
+    Note that arithmetic on downcast columns (for example in filter
+    expressions) is computed in their smaller type.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data to optimize. It isn't modified.
+
+    max_categorical_ratio : float, optional
+        Maximum ratio between the number of distinct values and the number of
+        (non-null) values for an object column to be converted to a category.
+
+    float_tolerance : float, optional
+        Maximum relative error allowed when downcasting floats.
+
+    convert_dates : bool, optional
+        Whether to convert columns of ISO 8601 date strings to datetime64.
+
+    downcast_numbers : bool, optional
+        Whether to downcast integer and float columns.
+
+    Returns
+    -------
+    tuple(pd.DataFrame, pd.DataFrame)
+        Optimized DataFrame, and report of the dtype and memory usage (in
+        bytes) of each column before and after, with a final row of totals.
+    """
+    new_columns = {}
+    for i, col_name in enumerate(df.columns):
+        col = df.iloc[:, i]
+        new_col = _optimize_column(col, max_categorical_ratio,
+                                   float_tolerance, convert_dates,
+                                   downcast_numbers)
+        if new_col is not None:
+            new_columns[i] = new_col
+
+    new_df = df.copy(deep=False)
+    for i, new_col in new_columns.items():
+        new_df.isetitem(i, new_col)
+
+    memory_before = df.memory_usage(deep=True, index=False).to_numpy()
+    memory_after = new_df.memory_usage(deep=True, index=False).to_numpy()
+    report = pd.DataFrame({
+        "dtype_before": [str(dtype) for dtype in df.dtypes],
+        "dtype_after": [str(dtype) for dtype in new_df.dtypes],
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+    }, index=df.columns)
+    report.loc[TOTAL_MEMORY_LABEL] = ["", "", memory_before.sum(),
+                                      memory_after.sum()]
+
+    msg = "Optimizing dtypes reduced the memory used by the columns from {} " \
+          "to {} bytes.".format(memory_before.sum(), memory_after.sum())
+    logger.info(msg)
+    return new_df, report
+
+
+def _optimize_column(col, max_categorical_ratio, float_tolerance,
+                     convert_dates, downcast_numbers):
+    """ Returns the optimized version of a column, or None to keep it.
+    """
+    kind = col.dtype.kind
+    if kind in "if" and not downcast_numbers:
+        return None
+
+    if kind == "i":
+        new_col = pd.to_numeric(col, downcast="integer")
+        return new_col if new_col.dtype != col.dtype else None
+
+    if kind == "f":
+        if col.dtype.itemsize <= 4:
+            return None
+        values = col.to_numpy()
+        # Values overflowing float32 are rejected below:
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            downcast = values.astype(np.float32)
+            errors = np.abs(downcast - values) / np.abs(values)
+        errors = errors[np.isfinite(values) & (values != 0)]
+        if len(errors) and errors.max() > float_tolerance:
+            return None
+        # Infinite values must remain infinite (not overflow):
+        if np.any(np.isinf(downcast) & np.isfinite(values)):
+            return None
+        return pd.Series(downcast, index=col.index, name=col.name)
+
+    if col.dtype != object:
+        return None
+
+    # Analyze the distinct values only:
+    codes, uniques = pd.factorize(col)
+    num_values = np.count_nonzero(codes >= 0)
+    if not num_values or \
+            not all(isinstance(value, string_types) for value in uniques):
+        return None
+
+    if convert_dates:
+        unique_strings = pd.Series(uniques, dtype=object)
+        if unique_strings.str.match(ISO_DATE_PATTERN).all():
+            try:
+                dates = pd.to_datetime(unique_strings)
+            except (ValueError, TypeError, OverflowError):
+                dates = None
+            # Mixed time zones lead to objects:
+            if dates is not None and dates.dtype.kind == "M":
+                values = dates.to_numpy()[codes]
+                values[codes < 0] = np.datetime64("NaT")
+                return pd.Series(values, index=col.index, name=col.name)
+
+    if len(uniques) <= max_categorical_ratio * num_values:
+        categories = pd.Index(uniques)
+        order = np.argsort(categories.to_numpy())
+        # Lexically sorted categories, like astype("category") would build:
+        new_codes = np.empty_like(order)
+        new_codes[order] = np.arange(len(order))
+        codes = np.where(codes >= 0, new_codes[np.maximum(codes, 0)], -1)
+        values = pd.Categorical.from_codes(codes, categories[order])
+        return pd.Series(values, index=col.index, name=col.name)
+
+    return None
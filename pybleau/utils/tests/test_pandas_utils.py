@@ -0,0 +1,73 @@
+from unittest import TestCase
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.util.testing import assert_series_equal
+
+from pybleau.utils.pandas_utils import optimize_dtypes, TOTAL_MEMORY_LABEL
+
+
+class TestOptimizeDtypes(TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "ints": np.arange(100, dtype=np.int64),
+            "halves": np.arange(100) / 2.,
+            "floats": np.linspace(0, 1, 100),
+            "labels": ["b", "a", None, "c"] * 25,
+            "dates": ["2020-01-0{}".format(i % 9 + 1) for i in range(100)],
+            "names": ["name{}".format(i) for i in range(100)],
+            "mixed": [1, "a"] * 50,
+        })
+
+    def test_dtypes(self):
+        new_df, _ = optimize_dtypes(self.df)
+        self.assertEqual(new_df["ints"].dtype, np.int8)
+        self.assertEqual(new_df["halves"].dtype, np.float32)
+        # Downcasting would lose precision:
+        self.assertEqual(new_df["floats"].dtype, np.float64)
+        self.assertEqual(new_df["labels"].dtype, "category")
+        self.assertEqual(new_df["dates"].dtype.kind, "M")
+        # Too many distinct values, or not strings:
+        self.assertEqual(new_df["names"].dtype, object)
+        self.assertEqual(new_df["mixed"].dtype, object)
+        # The original DataFrame isn't modified:
+        self.assertEqual(self.df["labels"].dtype, object)
+
+    def test_values_preserved(self):
+        new_df, _ = optimize_dtypes(self.df)
+        for col in ["ints", "halves"]:
+            np.testing.assert_array_equal(new_df[col], self.df[col])
+        assert_series_equal(new_df["labels"].astype(object),
+                            self.df["labels"])
+        self.assertEqual(new_df["labels"].cat.categories.tolist(),
+                         ["a", "b", "c"])
+        assert_series_equal(new_df["dates"], pd.to_datetime(self.df["dates"]))
+
+    def test_float_tolerance(self):
+        new_df, _ = optimize_dtypes(self.df, float_tolerance=1e-6)
+        self.assertEqual(new_df["floats"].dtype, np.float32)
+
+    def test_float_overflow_not_downcast(self):
+        df = pd.DataFrame({"big": [0.5, 1e300]})
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            new_df, _ = optimize_dtypes(df)
+        self.assertEqual(new_df["big"].dtype, np.float64)
+
+    def test_no_numerical_downcast(self):
+        new_df, _ = optimize_dtypes(self.df, downcast_numbers=False)
+        self.assertEqual(new_df["ints"].dtype, np.int64)
+        self.assertEqual(new_df["halves"].dtype, np.float64)
+
+    def test_report(self):
+        _, report = optimize_dtypes(self.df)
+        self.assertEqual(report.index.tolist(),
+                         list(self.df.columns) + [TOTAL_MEMORY_LABEL])
+        self.assertEqual(report.loc["labels", "dtype_before"], "object")
+        self.assertEqual(report.loc["labels", "dtype_after"], "category")
+        total = report.loc[TOTAL_MEMORY_LABEL]
+        self.assertEqual(total["memory_before"],
+                         self.df.memory_usage(deep=True, index=False).sum())
+        self.assertLess(total["memory_after"], total["memory_before"])